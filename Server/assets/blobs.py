@@ -0,0 +1,302 @@
+"""
+Content-addressed storage for uploaded images.
+
+Uploads are hashed (SHA-256) while they are written to temporary storage. The
+hash names the stored object, so a file that has been uploaded before is never
+sent to the storage backend again: the new ProductImage simply references the
+existing ImageBlob. Blobs are reference counted and deleted by
+``collect_unreferenced_blobs`` once no image uses them.
+"""
+import hashlib
+import logging
+import os
+from datetime import timedelta
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import F, ProtectedError, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from assets.models import ImageBlob
+
+logger = logging.getLogger(__name__)
+
+BLOB_PREFIX = 'blobs'
+
+# Read size used when hashing files already on disk
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def blob_path(sha256, filename=''):
+    """
+    Return the storage path for content with the given hash.
+
+    Args:
+        sha256: Hex SHA-256 digest of the content
+        filename: Original file name; only its extension is used
+
+    Returns:
+        str: e.g. ``blobs/ab/cd/abcd....jpg``
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    return f"{BLOB_PREFIX}/{sha256[:2]}/{sha256[2:4]}/{sha256}{extension}"
+
+
+def write_and_hash(chunks, file_path):
+    """
+    Write an iterable of byte chunks to a file, hashing them on the way.
+
+    Args:
+        chunks: Iterable of bytes, e.g. ``UploadedFile.chunks()``
+        file_path: Destination path
+
+    Returns:
+        str: Hex SHA-256 digest of the written content
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'wb') as destination:
+        for chunk in chunks:
+            digest.update(chunk)
+            destination.write(chunk)
+    return digest.hexdigest()
+
+
+def hash_file(file_path):
+    """
+    Return the hex SHA-256 digest of a file on disk.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def save_temporary_upload(uploaded_file, file_path):
+    """
+    Save an uploaded file to temporary storage unless its content is already stored.
+
+    The file is hashed while it is streamed to disk. If a blob with the same
+    hash exists the temporary copy is discarded straight away, so linking the
+    upload later neither re-reads nor re-uploads it.
+
+    Args:
+        uploaded_file: The Django UploadedFile
+        file_path: Temporary path to write the file to
+
+    Returns:
+        tuple: (file_path or None if deduplicated, sha256, existing ImageBlob or None)
+    """
+    sha256 = write_and_hash(uploaded_file.chunks(), file_path)
+    blob = find_blob(sha256)
+    if blob is not None:
+        claim_blob(blob)
+        os.remove(file_path)
+        logger.info("Upload %s matches stored blob %s", uploaded_file.name, sha256)
+        return None, sha256, blob
+    return file_path, sha256, None
+
+
+def find_blob(sha256, client_id=None):
+    """
+    Return the blob holding content with the given hash, or None.
+
+    Args:
+        sha256: Hex SHA-256 digest of the content
+        client_id: Only find blobs that images of this client reference; use it
+            when the caller has the hash but not the content, since knowing a
+            hash does not prove having the file it names
+    """
+    if not sha256:
+        return None
+    blobs = ImageBlob.objects.filter(sha256=sha256.lower())
+    if client_id is not None:
+        blobs = blobs.filter(product_images__client_id=client_id)
+    return blobs.first()
+
+
+def claim_blob(blob):
+    """
+    Record that an upload matched a stored blob, which may not be referenced yet.
+
+    The garbage collector keeps blobs claimed within its grace period, so
+    content an upload was deduplicated to is still there when it is linked.
+    """
+    blob.last_claimed_at = timezone.now()
+    ImageBlob.objects.filter(pk=blob.pk).update(last_claimed_at=blob.last_claimed_at)
+
+
+def store_blob_file(*, file_path, filename, sha256=None):
+    """
+    Upload a file to its content-addressed location in storage.
+
+    Only storage I/O happens here, no database access, so it can run in worker
+    threads while the caller creates the rows.
+
+    Args:
+        file_path: Local path of the uploaded file
+        filename: Original file name
+        sha256: Hex digest of the file if already known (computed otherwise)
+
+    Returns:
+        tuple: (sha256, stored name, size in bytes)
+    """
+    sha256 = (sha256 or hash_file(file_path)).lower()
+    name = blob_path(sha256, filename)
+    if default_storage.exists(name):
+        # Stored before but its row was lost, or another request is creating it right now
+        saved_name = name
+    else:
+        with open(file_path, 'rb') as f:
+            saved_name = default_storage.save(name, File(f))
+    return sha256, saved_name, os.path.getsize(file_path)
+
+
+def register_blob(*, sha256, saved_name, size_bytes, mime_type=''):
+    """
+    Create the row for a file stored by store_blob_file.
+
+    Returns:
+        tuple: (ImageBlob, created); created is False if a concurrent upload of
+        the same content won the race, in which case the duplicate file is removed
+    """
+    try:
+        with transaction.atomic():
+            blob = ImageBlob.objects.create(
+                sha256=sha256,
+                file=saved_name,
+                size_bytes=size_bytes,
+                mime_type=mime_type or '',
+            )
+    except IntegrityError:
+        # Lost a race with a concurrent upload of the same content
+        blob = ImageBlob.objects.get(sha256=sha256)
+        if saved_name != blob.file.name:
+            default_storage.delete(saved_name)
+        return blob, False
+    return blob, True
+
+
+def register_blobs(stored):
+    """
+    Create the rows for several files stored by store_blob_file at once.
+
+    Args:
+        stored: Iterable of (sha256, stored name, size in bytes, mime type)
+
+    Returns:
+        dict: {sha256: ImageBlob}
+    """
+    stored = {sha256: (saved_name, size_bytes, mime_type) for sha256, saved_name, size_bytes, mime_type in stored}
+    if not stored:
+        return {}
+    ImageBlob.objects.bulk_create(
+        [
+            ImageBlob(sha256=sha256, file=saved_name, size_bytes=size_bytes, mime_type=mime_type or '')
+            for sha256, (saved_name, size_bytes, mime_type) in stored.items()
+        ],
+        # Rows created concurrently by other uploads of the same content are kept
+        ignore_conflicts=True,
+    )
+    blobs = {blob.sha256: blob for blob in ImageBlob.objects.filter(sha256__in=stored)}
+    for sha256, blob in blobs.items():
+        saved_name = stored[sha256][0]
+        if saved_name != blob.file.name:
+            default_storage.delete(saved_name)
+    return blobs
+
+
+def get_or_create_blob(*, file_path, filename, mime_type='', sha256=None):
+    """
+    Return the blob for a file, storing the file only if its content is new.
+
+    Args:
+        file_path: Local path of the uploaded file
+        filename: Original file name
+        mime_type: MIME type of the file
+        sha256: Hex digest of the file if already known (computed otherwise)
+
+    Returns:
+        tuple: (ImageBlob, created)
+    """
+    sha256 = (sha256 or hash_file(file_path)).lower()
+    blob = find_blob(sha256)
+    if blob is not None:
+        logger.info("Reusing stored blob %s for %s", sha256, filename)
+        return blob, False
+
+    sha256, saved_name, size_bytes = store_blob_file(file_path=file_path, filename=filename, sha256=sha256)
+    return register_blob(sha256=sha256, saved_name=saved_name, size_bytes=size_bytes, mime_type=mime_type)
+
+
+def adjust_ref_count(blob_id, delta):
+    """
+    Atomically add delta to a blob's reference count, never going below zero.
+    """
+    if blob_id is None or not delta:
+        return
+    ImageBlob.objects.filter(pk=blob_id).update(ref_count=Greatest(F('ref_count') + delta, 0))
+
+
+def adjust_ref_counts(deltas):
+    """
+    Apply reference count changes to several blobs, one update per distinct delta.
+
+    Args:
+        deltas: {blob_id: delta}
+    """
+    by_delta = {}
+    for blob_id, delta in deltas.items():
+        if blob_id is not None and delta:
+            by_delta.setdefault(delta, []).append(blob_id)
+    for delta, blob_ids in by_delta.items():
+        ImageBlob.objects.filter(pk__in=blob_ids).update(ref_count=Greatest(F('ref_count') + delta, 0))
+
+
+def collect_unreferenced_blobs(grace_period=timedelta(hours=48)):
+    """
+    Delete blobs that no image references.
+
+    Blobs created or claimed by an upload (see claim_blob) within the grace
+    period are kept, since uploads that have not been linked to a product yet
+    may still reference them.
+
+    Args:
+        grace_period: Minimum time since a blob was created or last claimed before it can be deleted
+
+    Returns:
+        int: Number of blobs deleted
+    """
+    from products.models import ProductImage
+
+    cutoff = timezone.now() - grace_period
+    unclaimed = Q(last_claimed_at__isnull=True) | Q(last_claimed_at__lt=cutoff)
+    candidates = ImageBlob.objects.filter(unclaimed, ref_count=0, created_at__lt=cutoff).exclude(
+        # ref_count is maintained by signals; double-check against the actual references
+        pk__in=ProductImage.objects.filter(blob__isnull=False).values('blob_id')
+    )
+
+    deleted = 0
+    for blob in candidates.iterator():
+        # Delete the row first: once it is gone no new image can reference the file
+        try:
+            with transaction.atomic():
+                count, _ = ImageBlob.objects.filter(unclaimed, pk=blob.pk, ref_count=0).delete()
+        except ProtectedError:
+            continue
+        if not count:
+            continue
+        try:
+            default_storage.delete(blob.file.name)
+            # Resized derivatives are stored next to each other under the content hash
+            derivative_dir = f"derivatives/{blob.sha256}"
+            if default_storage.exists(derivative_dir):
+                for name in default_storage.listdir(derivative_dir)[1]:
+                    default_storage.delete(f"{derivative_dir}/{name}")
+        except Exception as e:
+            logger.error("Failed to delete blob file %s: %s", blob.file.name, e)
+        deleted += 1
+    logger.info("Collected %s unreferenced image blobs", deleted)
+    return deleted
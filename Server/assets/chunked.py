@@ -0,0 +1,364 @@
+"""
+Chunked, resumable uploads for temporary assets.
+
+Large files are sent as a sequence of chunks instead of one multipart request:
+
+1. ``start_upload`` creates a session and fixes the chunk size.
+2. ``write_chunk`` stores one chunk, identified by its byte offset, after
+   verifying its length and SHA-256 checksum. Chunks may arrive in any order
+   and may be retried; a retry simply replaces the chunk.
+3. ``complete_upload`` assembles the chunks into a single temporary upload,
+   appending each chunk file in the kernel (copy_file_range/sendfile) rather
+   than copying it through Python, and registers the result under the same
+   ``temp_upload:{id}`` metadata as a single-request upload. The assembled
+   file is hashed, so content that is already stored as an ImageBlob is
+   deduplicated exactly like a single-request upload.
+
+Session state lives in the default cache (Redis). Received chunks are fields of
+one Redis hash per session, so concurrent chunk requests never overwrite each
+other's progress and reading the progress costs one HGETALL however many chunks
+the file has. A client that lost its connection asks for the session's progress
+and re-sends only the missing chunks.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotFound, ValidationError
+
+from assets.blobs import claim_blob, find_blob, hash_file
+from core.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+SESSION_KEY = 'chunked_upload:{upload_id}'
+CHUNKS_KEY = 'chunked_upload:{upload_id}:chunks'
+COMPLETE_LOCK_KEY = 'chunked_upload:{upload_id}:complete'
+
+# Block size used when streaming a chunk from the request body to disk
+STREAM_BLOCK_SIZE = 64 * 1024
+
+
+class UploadConflict(APIException):
+    """Raised when a request does not match the state of the upload session."""
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'The upload is not in a state that allows this request.'
+    default_code = 'upload_conflict'
+
+
+def get_cache():
+    return caches['default']
+
+
+def get_chunk_root():
+    """
+    Return the directory holding in-progress chunked uploads.
+    """
+    return os.path.join(settings.MEDIA_ROOT, 'temp_uploads', 'chunked')
+
+
+def get_session_ttl():
+    return getattr(settings, 'ASSET_CHUNKED_UPLOAD_TTL', 48 * 60 * 60)
+
+
+def start_upload(*, filename, size, content_type='', chunk_size=None, user_id=None, tenant_id=None):
+    """
+    Create a chunked upload session.
+
+    Args:
+        filename: Original name of the file being uploaded
+        size: Total size of the file in bytes
+        content_type: MIME type reported by the client
+        chunk_size: Requested chunk size; clamped to ASSET_CHUNKED_UPLOAD_MAX_CHUNK_SIZE
+        user_id: ID of the uploading user
+        tenant_id: ID of the tenant the upload belongs to
+
+    Returns:
+        dict: The session, including its ``upload_id`` and ``chunk_size``
+
+    Raises:
+        ValidationError: If the file exceeds ASSET_CHUNKED_UPLOAD_MAX_SIZE
+    """
+    max_size = getattr(settings, 'ASSET_CHUNKED_UPLOAD_MAX_SIZE', 2 * 1024 * 1024 * 1024)
+    if size > max_size:
+        raise ValidationError({'size': f"File size exceeds maximum limit of {max_size / (1024 * 1024)}MB"})
+
+    max_chunk_size = getattr(settings, 'ASSET_CHUNKED_UPLOAD_MAX_CHUNK_SIZE', 8 * 1024 * 1024)
+    chunk_size = min(chunk_size or getattr(settings, 'ASSET_CHUNKED_UPLOAD_CHUNK_SIZE', 5 * 1024 * 1024),
+                     max_chunk_size)
+
+    upload_id = str(uuid.uuid4())
+    session = {
+        'upload_id': upload_id,
+        'original_filename': filename,
+        'mime_type': content_type,
+        'size_bytes': size,
+        'chunk_size': chunk_size,
+        'chunk_count': max(1, -(-size // chunk_size)),
+        'tenant_id': tenant_id,
+        'user_id': user_id,
+        'created_at': time.time(),
+    }
+    os.makedirs(os.path.join(get_chunk_root(), upload_id), exist_ok=True)
+    get_cache().set(SESSION_KEY.format(upload_id=upload_id), session, get_session_ttl())
+    logger.info("Started chunked upload %s for %s (%s bytes in %s chunks)", upload_id, filename, size, session['chunk_count'])
+    return session
+
+
+def get_session(upload_id, *, user_id, tenant_id):
+    """
+    Load an upload session.
+
+    Args:
+        upload_id: The session ID
+        user_id: ID of the requesting user; the session must belong to this user
+        tenant_id: ID of the requesting tenant; the session must belong to this tenant
+
+    Returns:
+        dict: The session
+
+    Raises:
+        NotFound: If the session does not exist, has expired or belongs to another user or tenant
+    """
+    session = get_cache().get(SESSION_KEY.format(upload_id=upload_id))
+    if session is None or session['user_id'] != user_id or session['tenant_id'] != tenant_id:
+        raise NotFound('Upload not found or expired.')
+    return session
+
+
+def get_received_chunks(session):
+    """
+    Return the chunks received so far.
+
+    Returns:
+        dict: Chunk index mapped to {'size': int, 'sha256': str}
+    """
+    fields = get_redis().hgetall(CHUNKS_KEY.format(upload_id=session['upload_id']))
+    return _decode_chunks(fields)
+
+
+def _decode_chunks(fields):
+    return {int(index): json.loads(value) for index, value in fields.items()}
+
+
+def get_progress(session, received=None):
+    """
+    Summarize the progress of an upload, for display and for resuming.
+
+    Args:
+        session: The upload session
+        received: The received chunks, if already loaded (see get_received_chunks)
+
+    Returns:
+        dict: Bytes received, received chunk indexes and missing chunk offsets
+    """
+    if received is None:
+        received = get_received_chunks(session)
+    chunk_size = session['chunk_size']
+    return {
+        'upload_id': session['upload_id'],
+        'size_bytes': session['size_bytes'],
+        'chunk_size': chunk_size,
+        'received_bytes': sum(chunk['size'] for chunk in received.values()),
+        'received_chunks': sorted(received),
+        'missing_offsets': [
+            index * chunk_size for index in range(session['chunk_count']) if index not in received
+        ],
+    }
+
+
+def expected_chunk_length(session, index):
+    """
+    Return the exact length of the chunk at an index; only the last chunk may be short.
+    """
+    start = index * session['chunk_size']
+    return min(session['chunk_size'], session['size_bytes'] - start)
+
+
+def write_chunk(session, *, offset, stream, length, sha256):
+    """
+    Store one chunk of an upload.
+
+    The chunk is streamed to a scratch file while being hashed and only moved
+    into place once its length and checksum match, so a failed or interrupted
+    request never leaves a partial chunk behind.
+
+    Args:
+        session: The upload session
+        offset: Byte offset of the chunk; must be a multiple of the chunk size
+        stream: File-like object to read the chunk from
+        length: Length of the chunk in bytes
+        sha256: Hex SHA-256 digest of the chunk, as computed by the client
+
+    Returns:
+        dict: The upload progress after storing the chunk
+
+    Raises:
+        ValidationError: If the offset, length or checksum is wrong
+    """
+    chunk_size = session['chunk_size']
+    if offset < 0 or offset % chunk_size or offset >= max(session['size_bytes'], 1):
+        raise ValidationError({'offset': f"Offset must be a multiple of {chunk_size} within the file."})
+    index = offset // chunk_size
+    expected = expected_chunk_length(session, index)
+    if length != expected:
+        raise ValidationError({'length': f"Chunk at offset {offset} must be {expected} bytes, got {length}."})
+    if not sha256:
+        raise ValidationError({'checksum': 'A SHA-256 checksum of the chunk is required.'})
+
+    upload_id = session['upload_id']
+    chunk_dir = os.path.join(get_chunk_root(), upload_id)
+    os.makedirs(chunk_dir, exist_ok=True)
+    chunk_path = os.path.join(chunk_dir, f"{index:06d}")
+    scratch_path = f"{chunk_path}.{uuid.uuid4().hex}.tmp"
+
+    digest = hashlib.sha256()
+    written = 0
+    try:
+        with open(scratch_path, 'wb') as scratch:
+            while written < length:
+                block = stream.read(min(STREAM_BLOCK_SIZE, length - written))
+                if not block:
+                    break
+                digest.update(block)
+                scratch.write(block)
+                written += len(block)
+        if written != length:
+            raise ValidationError({'length': f"Expected {length} bytes, received {written}."})
+        if digest.hexdigest() != sha256.lower():
+            raise ValidationError({'checksum': f"Checksum mismatch for chunk at offset {offset}."})
+        os.replace(scratch_path, chunk_path)
+    finally:
+        if os.path.exists(scratch_path):
+            os.remove(scratch_path)
+
+    # Record the chunk and read the progress back in one round trip
+    chunks_key = CHUNKS_KEY.format(upload_id=upload_id)
+    pipe = get_redis().pipeline(transaction=False)
+    pipe.hset(chunks_key, index, json.dumps({'size': length, 'sha256': sha256.lower()}))
+    pipe.expire(chunks_key, get_session_ttl())
+    pipe.hgetall(chunks_key)
+    _, _, fields = pipe.execute()
+    return get_progress(session, _decode_chunks(fields))
+
+
+def append_file(destination, source_path):
+    """
+    Append a file to an open destination file without copying through user space.
+
+    Uses copy_file_range where available (reflinks on filesystems that support
+    them) or sendfile, falling back to a buffered copy.
+
+    Args:
+        destination: Destination file object opened for binary writing
+        source_path: Path of the file to append
+    """
+    destination.flush()
+    with open(source_path, 'rb') as source:
+        size = os.fstat(source.fileno()).st_size
+        offset = 0
+        try:
+            while offset < size:
+                if hasattr(os, 'copy_file_range'):
+                    copied = os.copy_file_range(source.fileno(), destination.fileno(), size - offset, offset)
+                else:
+                    copied = os.sendfile(destination.fileno(), source.fileno(), offset, size - offset)
+                if copied == 0:
+                    break
+                offset += copied
+        except OSError as e:
+            logger.debug("Kernel copy unavailable for %s, falling back: %s", source_path, e)
+        if offset < size:
+            source.seek(offset)
+            shutil.copyfileobj(source, destination)
+
+
+def complete_upload(session):
+    """
+    Assemble a finished upload into a temporary upload file.
+
+    Args:
+        session: The upload session
+
+    Returns:
+        dict: The temporary upload metadata, including ``temp_id``; ``file_path``
+        is None and ``blob_id`` set if the content is already stored
+
+    Raises:
+        UploadConflict: If chunks are missing or the upload is already being completed
+    """
+    upload_id = session['upload_id']
+    progress = get_progress(session)
+    if progress['missing_offsets']:
+        raise UploadConflict(f"Upload is missing {len(progress['missing_offsets'])} chunks.")
+
+    cache = get_cache()
+    lock_key = COMPLETE_LOCK_KEY.format(upload_id=upload_id)
+    if not cache.add(lock_key, True, 300):
+        raise UploadConflict('Upload is already being completed.')
+
+    try:
+        chunk_dir = os.path.join(get_chunk_root(), upload_id)
+        _, file_extension = os.path.splitext(session['original_filename'])
+        file_path = os.path.join(settings.MEDIA_ROOT, 'temp_uploads', f"{upload_id}{file_extension}")
+        with open(file_path, 'wb') as destination:
+            for index in range(session['chunk_count']):
+                append_file(destination, os.path.join(chunk_dir, f"{index:06d}"))
+
+        if os.path.getsize(file_path) != session['size_bytes']:
+            os.remove(file_path)
+            raise UploadConflict('Assembled file size does not match the declared size.')
+
+        sha256 = hash_file(file_path)
+        blob = find_blob(sha256)
+        if blob is not None:
+            claim_blob(blob)
+            os.remove(file_path)
+            file_path = None
+            logger.info("Chunked upload %s matches stored blob %s", upload_id, sha256)
+
+        shutil.rmtree(chunk_dir, ignore_errors=True)
+        cache.delete(SESSION_KEY.format(upload_id=upload_id))
+        get_redis().delete(CHUNKS_KEY.format(upload_id=upload_id))
+    finally:
+        cache.delete(lock_key)
+
+    logger.info("Completed chunked upload %s (%s bytes)", upload_id, session['size_bytes'])
+    return {
+        'temp_id': upload_id,
+        'file_path': file_path,
+        'original_filename': session['original_filename'],
+        'mime_type': session['mime_type'],
+        'size_bytes': session['size_bytes'],
+        'sha256': sha256,
+        'blob_id': blob.id if blob is not None else None,
+        'tenant_id': session['tenant_id'],
+        'user_id': session['user_id'],
+        'created_at': time.time(),
+    }
+
+
+def purge_stale_chunk_dirs(max_age_seconds):
+    """
+    Delete chunk directories of uploads abandoned for longer than max_age_seconds.
+
+    Returns:
+        int: Number of directories deleted
+    """
+    root = get_chunk_root()
+    if not os.path.isdir(root):
+        return 0
+    threshold = time.time() - max_age_seconds
+    deleted = 0
+    for entry in os.scandir(root):
+        if entry.is_dir() and entry.stat().st_mtime < threshold:
+            shutil.rmtree(entry.path, ignore_errors=True)
+            deleted += 1
+    return deleted
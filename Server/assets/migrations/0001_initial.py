@@ -0,0 +1,51 @@
+# Generated by Django 4.2.20 on 2026-10-19 12:48
+
+import assets.models
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="ImageBlob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("sha256", models.CharField(max_length=64, unique=True)),
+                (
+                    "file",
+                    models.FileField(
+                        max_length=255, upload_to=assets.models.blob_upload_to
+                    ),
+                ),
+                ("size_bytes", models.PositiveBigIntegerField()),
+                ("mime_type", models.CharField(blank=True, max_length=100)),
+                ("ref_count", models.PositiveIntegerField(default=0)),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, editable=False
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["ref_count", "created_at"], name="assets_blob_unref_idx"
+                    )
+                ],
+            },
+        ),
+    ]
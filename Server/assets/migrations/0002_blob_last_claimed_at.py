@@ -0,0 +1,21 @@
+# Generated by Django 4.2.20 on 2026-10-19 14:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("assets", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="imageblob",
+            name="last_claimed_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="When an upload last matched this content; it may still be linked to an image",
+                null=True,
+            ),
+        ),
+    ]
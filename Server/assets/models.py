@@ -0,0 +1,47 @@
+"""
+Models for the assets app.
+"""
+from django.db import models
+from django.utils import timezone
+
+
+def blob_upload_to(instance, filename):
+    """
+    Build the content-addressed storage path for a blob.
+
+    The path only depends on the content hash (plus the original extension, so
+    that storage backends and CDNs serve the right content type), which makes
+    every upload of the same bytes map to the same object.
+    """
+    from assets.blobs import blob_path
+    return blob_path(instance.sha256, filename)
+
+
+class ImageBlob(models.Model):
+    """
+    A stored image file, identified by the SHA-256 of its content.
+
+    Identical uploads share one blob; ProductImage rows reference it and
+    ref_count tracks how many do, so the file can be garbage collected once
+    nothing uses it. Blobs are shared across clients, since their content is.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.FileField(upload_to=blob_upload_to, max_length=255)
+    size_bytes = models.PositiveBigIntegerField()
+    mime_type = models.CharField(max_length=100, blank=True)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    last_claimed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When an upload last matched this content; it may still be linked to an image"
+    )
+
+    class Meta:
+        indexes = [
+            # Garbage collection looks for unreferenced blobs
+            models.Index(fields=['ref_count', 'created_at'], name='assets_blob_unref_idx'),
+        ]
+
+    def __str__(self):
+        return self.sha256
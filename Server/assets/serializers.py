@@ -8,7 +8,11 @@ class TemporaryUploadSerializer(serializers.Serializer):
     This serializer validates the uploaded file and provides methods to check
     file size and type if needed.
     """
-    file = serializers.FileField(write_only=True, required=True)
+    file = serializers.FileField(write_only=True, required=False)
+    # Clients may send just the SHA-256 of a file; if images of the client already
+    # use its content the upload is skipped entirely
+    sha256 = serializers.RegexField(r'^[0-9a-fA-F]{64}$', required=False)
+    filename = serializers.CharField(max_length=255, required=False)
     
     def validate_file(self, value):
         """
@@ -38,3 +42,24 @@ class TemporaryUploadSerializer(serializers.Serializer):
         #     )
         
         return value
+    
+    def validate(self, attrs):
+        """
+        Require either a file or the hash of already stored content.
+        """
+        if 'file' not in attrs and 'sha256' not in attrs:
+            raise serializers.ValidationError({"file": "Provide a file or the sha256 of a stored file."})
+        return attrs
+
+
+class ChunkedUploadStartSerializer(serializers.Serializer):
+    """
+    Serializer for starting a chunked upload session.
+    
+    The client declares the file up front; the response tells it the chunk
+    size to use for every chunk but the last.
+    """
+    filename = serializers.CharField(max_length=255)
+    size = serializers.IntegerField(min_value=1)
+    content_type = serializers.CharField(max_length=255, required=False, allow_blank=True, default='')
+    chunk_size = serializers.IntegerField(min_value=256 * 1024, required=False)
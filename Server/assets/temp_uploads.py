@@ -0,0 +1,259 @@
+"""
+Registry of temporary uploads.
+
+Every temporary upload has its metadata under ``temp_upload:{id}`` and is also
+indexed in a Redis sorted set scored by its creation time (plus one sorted set
+per tenant). Cleanup therefore never scans the keyspace: expired uploads are
+found with a range query on the index, their keys are deleted in a pipeline and
+their files are removed by a small thread pool. The metadata key outlives the
+cleanup cutoff by a grace period so that cleanup still finds the file path;
+per-tenant indexes are also trimmed by score, so their entries go even when
+the metadata is gone. Files left in the temporary directories without any
+index entry (crashed requests, keys that expired on their own) are swept by
+age with ``os.scandir``.
+"""
+import json
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+METADATA_KEY = 'temp_upload:{temp_id}'
+INDEX_KEY = 'temp_uploads:index'
+TENANT_INDEX_KEY = 'temp_uploads:index:{tenant_id}'
+TENANTS_KEY = 'temp_uploads:tenants'
+CLEANUP_LOCK_KEY = 'temp_uploads:cleanup:lock'
+
+DEFAULT_TTL = timedelta(hours=48)
+# Cleanup runs hourly; metadata is kept for several runs past the cutoff
+DEFAULT_METADATA_GRACE = timedelta(hours=6)
+
+# Directories under MEDIA_ROOT holding temporary upload files
+TEMP_DIRECTORIES = ('temp_uploads', 'temp_metadata')
+
+
+def get_upload_ttl():
+    """
+    Return how long temporary uploads are kept, in seconds.
+    """
+    return int(getattr(settings, 'TEMP_UPLOAD_TTL', DEFAULT_TTL.total_seconds()))
+
+
+def get_metadata_ttl():
+    """
+    Return how long temporary upload metadata is kept, in seconds.
+
+    Longer than the upload TTL, so that the metadata is still there when
+    cleanup expires the upload and deletes its file.
+    """
+    grace = getattr(settings, 'TEMP_UPLOAD_METADATA_GRACE', DEFAULT_METADATA_GRACE.total_seconds())
+    return get_upload_ttl() + int(grace)
+
+
+def register_temporary_upload(redis_client, temp_id, metadata):
+    """
+    Store a temporary upload's metadata and add it to the index.
+
+    Args:
+        redis_client: Redis client
+        temp_id: The temporary upload ID
+        metadata: JSON-serializable metadata; ``created_at`` (a timestamp) and
+            ``tenant_id`` are used for the index when present
+    """
+    created_at = float(metadata.get('created_at') or time.time())
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.set(METADATA_KEY.format(temp_id=temp_id), json.dumps(metadata), ex=get_metadata_ttl())
+    pipe.zadd(INDEX_KEY, {str(temp_id): created_at})
+    if metadata.get('tenant_id') is not None:
+        pipe.zadd(TENANT_INDEX_KEY.format(tenant_id=metadata['tenant_id']), {str(temp_id): created_at})
+        pipe.sadd(TENANTS_KEY, metadata['tenant_id'])
+    pipe.execute()
+
+
+def unregister_temporary_uploads(redis_client, metadata_by_id):
+    """
+    Delete the metadata of temporary uploads and remove them from the index.
+
+    Args:
+        redis_client: Redis client
+        metadata_by_id: {temp_id: metadata or None}
+    """
+    if not metadata_by_id:
+        return
+    temp_ids = [str(temp_id) for temp_id in metadata_by_id]
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.delete(*[METADATA_KEY.format(temp_id=temp_id) for temp_id in temp_ids])
+    pipe.zrem(INDEX_KEY, *temp_ids)
+    by_tenant = {}
+    for temp_id, metadata in metadata_by_id.items():
+        tenant_id = (metadata or {}).get('tenant_id')
+        if tenant_id is not None:
+            by_tenant.setdefault(tenant_id, []).append(str(temp_id))
+    for tenant_id, tenant_temp_ids in by_tenant.items():
+        pipe.zrem(TENANT_INDEX_KEY.format(tenant_id=tenant_id), *tenant_temp_ids)
+    pipe.execute()
+
+
+def remove_files(paths, workers):
+    """
+    Delete files concurrently, ignoring files that are already gone.
+
+    Returns:
+        tuple: (number deleted, list of error messages)
+    """
+    def remove(path):
+        try:
+            os.remove(path)
+            return None
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            return f"File deletion error for {path}: {str(e)}"
+
+    paths = [path for path in paths if path]
+    if not paths:
+        return 0, []
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(paths)))) as pool:
+        results = list(pool.map(remove, paths))
+    return results.count(None), [result for result in results if result]
+
+
+def expire_indexed_uploads(redis_client, cutoff, batch_size, workers, stats):
+    """
+    Delete uploads indexed before cutoff, one batch at a time.
+
+    Each batch costs a ZRANGEBYSCORE, an MGET and one pipeline, whatever the
+    size of the keyspace.
+    """
+    while True:
+        temp_ids = redis_client.zrangebyscore(INDEX_KEY, '-inf', cutoff, start=0, num=batch_size)
+        if not temp_ids:
+            return
+        stats['scanned'] += len(temp_ids)
+        values = redis_client.mget([METADATA_KEY.format(temp_id=temp_id) for temp_id in temp_ids])
+
+        metadata_by_id = {}
+        for temp_id, raw in zip(temp_ids, values):
+            try:
+                metadata_by_id[temp_id] = json.loads(raw) if raw else None
+            except ValueError:
+                metadata_by_id[temp_id] = None
+
+        deleted_files, errors = remove_files(
+            [(metadata or {}).get('file_path') for metadata in metadata_by_id.values()], workers
+        )
+        unregister_temporary_uploads(redis_client, metadata_by_id)
+        stats['deleted'] += len(temp_ids)
+        stats['deleted_files'] += deleted_files
+        stats['errors'] += len(errors)
+        stats['error_details'].extend(errors)
+        if len(temp_ids) < batch_size:
+            return
+
+
+def expire_tenant_indexes(redis_client, cutoff):
+    """
+    Remove entries indexed before cutoff from every tenant's index.
+
+    Catches entries whose metadata was already gone when their upload was
+    expired, which unregister_temporary_uploads cannot attribute to a tenant.
+    Costs one pipeline with a ZREMRANGEBYSCORE per tenant that ever uploaded.
+    """
+    tenant_ids = list(redis_client.smembers(TENANTS_KEY))
+    if not tenant_ids:
+        return
+    pipe = redis_client.pipeline(transaction=False)
+    for tenant_id in tenant_ids:
+        pipe.zremrangebyscore(TENANT_INDEX_KEY.format(tenant_id=tenant_id), '-inf', cutoff)
+    pipe.execute()
+
+
+def sweep_orphaned_files(cutoff, workers, stats):
+    """
+    Delete files older than cutoff from the temporary directories.
+
+    Uploads that are still indexed are younger than cutoff, so anything older
+    is an orphan. Chunked uploads have their own directory and are purged by
+    assets.chunked.purge_stale_chunk_dirs.
+    """
+    paths = []
+    for directory in TEMP_DIRECTORIES:
+        root = os.path.join(settings.MEDIA_ROOT, directory)
+        if not os.path.isdir(root):
+            continue
+        with os.scandir(root) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file(follow_symlinks=False) and entry.stat().st_mtime < cutoff:
+                        paths.append(entry.path)
+                except OSError:
+                    continue
+    deleted, errors = remove_files(paths, workers)
+    stats['orphans_deleted'] += deleted
+    stats['errors'] += len(errors)
+    stats['error_details'].extend(errors)
+
+
+def cleanup_expired_uploads(redis_client, max_age=None, batch_size=None, workers=None):
+    """
+    Delete expired temporary uploads and orphaned temporary files.
+
+    Runs under a lock so that overlapping runs (e.g. a slow run and the next
+    beat) never process the same entries.
+
+    Args:
+        redis_client: Redis client
+        max_age: Age in seconds after which uploads are deleted (TEMP_UPLOAD_TTL by default)
+        batch_size: Index entries handled per round trip (TEMP_UPLOAD_CLEANUP_BATCH_SIZE)
+        workers: Threads deleting files (TEMP_UPLOAD_CLEANUP_WORKERS)
+
+    Returns:
+        dict: Statistics about the run, or None if another run holds the lock
+    """
+    max_age = get_upload_ttl() if max_age is None else max_age
+    batch_size = batch_size or getattr(settings, 'TEMP_UPLOAD_CLEANUP_BATCH_SIZE', 500)
+    workers = workers or getattr(settings, 'TEMP_UPLOAD_CLEANUP_WORKERS', 8)
+
+    cache = caches['default']
+    token = uuid.uuid4().hex
+    if not cache.add(CLEANUP_LOCK_KEY, token, getattr(settings, 'TEMP_UPLOAD_CLEANUP_LOCK_TIMEOUT', 3600)):
+        logger.info("Temporary upload cleanup is already running, skipping")
+        return None
+
+    stats = {
+        'scanned': 0,
+        'deleted': 0,
+        'deleted_files': 0,
+        'orphans_deleted': 0,
+        'errors': 0,
+        'error_details': [],
+    }
+    started = time.monotonic()
+    cutoff = time.time() - max_age
+    try:
+        try:
+            expire_indexed_uploads(redis_client, cutoff, batch_size, workers, stats)
+            expire_tenant_indexes(redis_client, cutoff)
+        except Exception as e:
+            logger.error("Failed to expire indexed temporary uploads: %s", e)
+            stats['errors'] += 1
+            stats['error_details'].append(f"Redis error: {str(e)}")
+        sweep_orphaned_files(cutoff, workers, stats)
+    finally:
+        if cache.get(CLEANUP_LOCK_KEY) == token:
+            cache.delete(CLEANUP_LOCK_KEY)
+
+    stats['duration_ms'] = round((time.monotonic() - started) * 1000, 1)
+    logger.info(
+        "Temporary upload cleanup: %s uploads expired, %s files and %s orphans deleted, %s errors in %sms",
+        stats['deleted'], stats['deleted_files'], stats['orphans_deleted'], stats['errors'], stats['duration_ms'],
+        extra={'temp_upload_cleanup': {key: value for key, value in stats.items() if key != 'error_details'}}
+    )
+    return stats
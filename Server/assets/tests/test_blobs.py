@@ -0,0 +1,162 @@
+"""
+Tests for content-addressed image storage.
+"""
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import caches
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from assets.blobs import blob_path, collect_unreferenced_blobs, get_or_create_blob
+from assets.models import ImageBlob
+from products.bulk import bulk_delete_images
+from products.catalogue.models import Category, Division
+from products.models import Product
+from products.utils import link_temporary_images
+
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'blob-tests',
+    }
+}
+
+CONTENT = b'\x89PNG supplier image bytes'
+
+
+class ImageBlobTests(TestCase):
+    """Tests for blob deduplication and reference counting."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            CACHES=LOCMEM_CACHES,
+            MEDIA_ROOT=self.media_root,
+            DEFAULT_FILE_STORAGE='django.core.files.storage.FileSystemStorage',
+        )
+        self.settings_override.enable()
+        caches['default'].clear()
+        division = Division.objects.create(name='Division')
+        category = Category.objects.create(name='Category', division=division)
+        self.product = Product.objects.create(name='Product', slug='product', category=category)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def write_temp_file(self, name='photo.png', content=CONTENT):
+        path = os.path.join(self.media_root, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def link(self, metadata):
+        redis_client = MagicMock()
+        redis_client.mget.return_value = [json.dumps(metadata)]
+        return link_temporary_images(
+            owner_instance=self.product, owner_type='product',
+            temp_image_data=[{'id': 'temp-1'}], tenant=MagicMock(id=1, client_id=1, company_id=1),
+            redis_client=redis_client,
+        )[0]
+
+    def test_identical_content_is_stored_once(self):
+        first, created = get_or_create_blob(file_path=self.write_temp_file('a.PNG'), filename='a.PNG')
+
+        with patch.object(type(default_storage._wrapped), 'save') as save:
+            second, created_again = get_or_create_blob(file_path=self.write_temp_file('b.png'), filename='b.png')
+
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(first, second)
+        save.assert_not_called()
+        self.assertEqual(first.file.name, blob_path(first.sha256, 'a.png'))
+
+    def test_linked_images_share_a_blob_and_count_references(self):
+        first = self.link({'file_path': self.write_temp_file('a.png'), 'original_filename': 'a.png'})
+        second = self.link({'file_path': self.write_temp_file('b.png'), 'original_filename': 'b.png'})
+
+        blob = ImageBlob.objects.get()
+        self.assertEqual(blob.ref_count, 2)
+        self.assertEqual(first.image.name, blob.file.name)
+        self.assertEqual(second.image.name, blob.file.name)
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'b.png')))
+
+        first.delete()
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 1)
+
+        bulk_delete_images(1, [second.id])
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 0)
+
+    def test_unreferenced_blobs_are_collected_after_grace_period(self):
+        image = self.link({'file_path': self.write_temp_file(), 'original_filename': 'photo.png'})
+        blob = image.blob
+
+        self.assertEqual(collect_unreferenced_blobs(grace_period=timedelta(0)), 0)
+
+        image.delete()
+        self.assertEqual(collect_unreferenced_blobs(), 0)
+        self.assertEqual(collect_unreferenced_blobs(grace_period=timedelta(0)), 1)
+        self.assertFalse(ImageBlob.objects.exists())
+        self.assertFalse(default_storage.exists(blob.file.name))
+
+    def test_blobs_claimed_by_uploads_are_kept(self):
+        blob, _ = get_or_create_blob(file_path=self.write_temp_file(), filename='photo.png')
+        ImageBlob.objects.filter(pk=blob.pk).update(created_at=blob.created_at - timedelta(days=3))
+
+        # A fresh upload is deduplicated to the old, unreferenced blob before it is linked
+        response = APIClient().post(
+            reverse('temporary-upload'),
+            {'file': SimpleUploadedFile('copy.png', CONTENT, content_type='image/png')},
+            format='multipart'
+        )
+        self.assertTrue(response.data['deduplicated'])
+
+        self.assertEqual(collect_unreferenced_blobs(), 0)
+        self.assertEqual(collect_unreferenced_blobs(grace_period=timedelta(0)), 1)
+
+    def test_upload_of_stored_content_is_deduplicated(self):
+        self.link({'file_path': self.write_temp_file(), 'original_filename': 'photo.png'})
+        client = APIClient()
+
+        response = client.post(
+            reverse('temporary-upload'),
+            {'file': SimpleUploadedFile('copy.png', CONTENT, content_type='image/png')},
+            format='multipart'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(response.data['deduplicated'])
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'temp_uploads')), [])
+
+        response = client.post(reverse('temporary-upload'), {'sha256': response.data['sha256']})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = client.post(reverse('temporary-upload'), {'sha256': '0' * 64})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_hash_only_upload_is_scoped_to_client(self):
+        sha256 = self.link({'file_path': self.write_temp_file(), 'original_filename': 'photo.png'}).blob.sha256
+        client = APIClient()
+
+        with patch('assets.views_simple.get_request_client_id', return_value=2):
+            response = client.post(reverse('temporary-upload'), {'sha256': sha256})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        # Uploading the bytes is still deduplicated
+        response = client.post(
+            reverse('temporary-upload'),
+            {'file': SimpleUploadedFile('copy.png', CONTENT, content_type='image/png')},
+            format='multipart'
+        )
+        self.assertTrue(response.data['deduplicated'])
@@ -0,0 +1,176 @@
+"""
+Tests for chunked, resumable temporary uploads.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from assets import chunked
+from assets.blobs import get_or_create_blob
+from core.redis_client import get_redis
+
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'chunked-upload-tests',
+    }
+}
+
+CHUNK_SIZE = 256 * 1024
+
+
+class ChunkedUploadTests(TestCase):
+    """Tests for the chunked upload endpoints."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            CACHES=LOCMEM_CACHES, MEDIA_ROOT=self.media_root, REDIS_CLIENT_BACKEND='memory'
+        )
+        self.settings_override.enable()
+        caches['default'].clear()
+        self.user = get_user_model().objects.create_user(username='uploader', email='uploader@example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.data = os.urandom(CHUNK_SIZE * 2 + 1000)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def start(self, size=None):
+        response = self.client.post(
+            reverse('chunked-upload-list'),
+            {'filename': 'video.mp4', 'size': size or len(self.data), 'content_type': 'video/mp4',
+             'chunk_size': CHUNK_SIZE},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['upload_id']
+
+    def put_chunk(self, upload_id, offset, checksum=None):
+        chunk = self.data[offset:offset + CHUNK_SIZE]
+        return self.client.generic(
+            'PUT', reverse('chunked-upload-detail', args=[upload_id]), chunk,
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f"bytes {offset}-{offset + len(chunk) - 1}/{len(self.data)}",
+            HTTP_X_CHUNK_SHA256=checksum or hashlib.sha256(chunk).hexdigest(),
+        )
+
+    def test_upload_in_any_order_and_complete(self):
+        upload_id = self.start()
+
+        # A retried chunk replaces the first copy
+        for offset in (CHUNK_SIZE * 2, 0, 0, CHUNK_SIZE):
+            response = self.put_chunk(upload_id, offset)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['received_bytes'], len(self.data))
+        self.assertEqual(response.data['received_chunks'], [0, 1, 2])
+        self.assertEqual(response.data['missing_offsets'], [])
+
+        response = self.client.post(reverse('chunked-upload-complete', args=[upload_id]))
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        metadata = json.loads(get_redis().get(f"temp_upload:{response.data['temp_id']}"))
+        with open(metadata['file_path'], 'rb') as f:
+            self.assertEqual(f.read(), self.data)
+        self.assertEqual(metadata['size_bytes'], len(self.data))
+        self.assertFalse(os.path.exists(os.path.join(chunked.get_chunk_root(), upload_id)))
+        self.assertFalse(get_redis().exists(chunked.CHUNKS_KEY.format(upload_id=upload_id)))
+
+    @override_settings(DEFAULT_FILE_STORAGE='django.core.files.storage.FileSystemStorage')
+    def test_stored_content_is_deduplicated(self):
+        path = os.path.join(self.media_root, 'stored.mp4')
+        with open(path, 'wb') as f:
+            f.write(self.data)
+        blob, _ = get_or_create_blob(file_path=path, filename='stored.mp4')
+
+        upload_id = self.start()
+        for offset in (0, CHUNK_SIZE, CHUNK_SIZE * 2):
+            self.put_chunk(upload_id, offset)
+        response = self.client.post(reverse('chunked-upload-complete', args=[upload_id]))
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(response.data['deduplicated'])
+        self.assertEqual(response.data['sha256'], blob.sha256)
+        metadata = json.loads(get_redis().get(f"temp_upload:{response.data['temp_id']}"))
+        self.assertEqual((metadata['file_path'], metadata['blob_id']), (None, blob.id))
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'temp_uploads', f'{upload_id}.mp4')))
+
+    def test_sessions_belong_to_their_user(self):
+        upload_id = self.start()
+        other = get_user_model().objects.create_user(username='other', email='other@example.com')
+
+        self.client.force_authenticate(other)
+        self.assertEqual(self.put_chunk(upload_id, 0).status_code, status.HTTP_404_NOT_FOUND)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.put_chunk(upload_id, 0).status_code, status.HTTP_403_FORBIDDEN)
+
+        # Same user, another tenant
+        self.client.force_authenticate(self.user)
+        with patch('assets.views.get_request_client_id', return_value=2):
+            response = self.client.get(reverse('chunked-upload-detail', args=[upload_id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_progress_reports_missing_chunks_for_resume(self):
+        upload_id = self.start()
+        self.put_chunk(upload_id, CHUNK_SIZE)
+
+        response = self.client.get(reverse('chunked-upload-detail', args=[upload_id]))
+
+        self.assertEqual(response.data['received_chunks'], [1])
+        self.assertEqual(response.data['missing_offsets'], [0, CHUNK_SIZE * 2])
+
+    def test_checksum_mismatch_is_rejected(self):
+        upload_id = self.start()
+
+        response = self.put_chunk(upload_id, 0, checksum='0' * 64)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(os.listdir(os.path.join(chunked.get_chunk_root(), upload_id)), [])
+        progress = self.client.get(reverse('chunked-upload-detail', args=[upload_id])).data
+        self.assertEqual(progress['received_bytes'], 0)
+
+    def test_misaligned_offset_is_rejected(self):
+        upload_id = self.start()
+
+        response = self.put_chunk(upload_id, 10)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_complete_with_missing_chunks_conflicts(self):
+        upload_id = self.start()
+        self.put_chunk(upload_id, 0)
+
+        response = self.client.post(reverse('chunked-upload-complete', args=[upload_id]))
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    def test_unknown_upload_is_not_found(self):
+        response = self.client.get(reverse('chunked-upload-detail', args=['missing']))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_append_file_falls_back_without_kernel_copy(self):
+        source = os.path.join(self.media_root, 'source')
+        with open(source, 'wb') as f:
+            f.write(self.data)
+        target = os.path.join(self.media_root, 'target')
+
+        with open(target, 'wb') as destination:
+            chunked.append_file(destination, source)
+            with patch('assets.chunked.os.copy_file_range', side_effect=OSError, create=True):
+                chunked.append_file(destination, source)
+
+        with open(target, 'rb') as f:
+            self.assertEqual(f.read(), self.data * 2)
@@ -7,155 +7,195 @@ particularly focusing on the temporary file cleanup task.
 
 import os
 import json
+import shutil
 import tempfile
-from datetime import datetime, timedelta
+import time
+from datetime import timedelta
 from unittest.mock import patch, MagicMock
 
-from django.test import TestCase
+from django.core.cache import caches
+from django.test import TestCase, override_settings
 from django.utils import timezone
-from django.conf import settings
 
 from assets.tasks import cleanup_temporary_uploads
+from assets.temp_uploads import (
+    CLEANUP_LOCK_KEY, INDEX_KEY, TENANTS_KEY, cleanup_expired_uploads, register_temporary_upload,
+)
+from core.redis_client import InMemoryRedis
+
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'assets-task-tests',
+    }
+}
 
 
 class CleanupTemporaryUploadsTaskTests(TestCase):
     """Tests for the cleanup_temporary_uploads task."""
     
-    @patch('assets.tasks.redis.Redis.from_url')
-    def test_cleanup_old_files(self, mock_redis_from_url):
-        """Test that old temporary files are cleaned up."""
-        # Create a temporary file for testing
-        temp_file = tempfile.NamedTemporaryFile(delete=False)
-        temp_file_path = temp_file.name
-        temp_file.close()
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(CACHES=LOCMEM_CACHES, MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        caches['default'].clear()
         
         # Setup mock Redis client
-        mock_redis = MagicMock()
-        mock_redis_from_url.return_value = mock_redis
-        
-        # Create test data
-        old_time = (timezone.now() - timedelta(hours=49)).timestamp()
-        temp_id = "test-temp-id"
-        key = f"temp_upload:{temp_id}"
-        
-        # Setup Redis scan to return our test key
-        mock_redis.scan.return_value = (0, [key])
-        
-        # Setup Redis get to return our test metadata
-        metadata = {
-            'file_path': temp_file_path,
-            'created_at': old_time,
-            'original_filename': 'test.jpg',
-            'tenant_id': 1
-        }
-        mock_redis.get.return_value = json.dumps(metadata)
-        
-        # Run the task
+        patcher = patch('assets.tasks.get_redis')
+        self.addCleanup(patcher.stop)
+        self.mock_redis = MagicMock()
+        patcher.start().return_value = self.mock_redis
+        self.pipeline = self.mock_redis.pipeline.return_value
+    
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+    
+    def index(self, *entries):
+        """Make the index return the given (temp_id, metadata) entries once."""
+        self.mock_redis.zrangebyscore.side_effect = [[temp_id for temp_id, _ in entries], []]
+        self.mock_redis.mget.return_value = [json.dumps(metadata) for _, metadata in entries]
+    
+    def test_cleanup_old_files(self):
+        """Test that expired temporary uploads are cleaned up without scanning keys."""
+        temp_file = tempfile.NamedTemporaryFile(dir=self.media_root, delete=False)
+        temp_file.close()
+        self.index(('test-temp-id', {'file_path': temp_file.name, 'tenant_id': 1}))
+        
         result = cleanup_temporary_uploads()
         
         # Verify the file was deleted
-        self.assertFalse(os.path.exists(temp_file_path))
+        self.assertFalse(os.path.exists(temp_file.name))
         
-        # Verify Redis key was deleted
-        mock_redis.delete.assert_called_once_with(key)
+        # Verify the key and index entries were deleted in one pipeline
+        self.mock_redis.scan.assert_not_called()
+        self.pipeline.delete.assert_called_once_with('temp_upload:test-temp-id')
+        self.pipeline.zrem.assert_any_call(INDEX_KEY, 'test-temp-id')
+        self.pipeline.zrem.assert_any_call('temp_uploads:index:1', 'test-temp-id')
+        self.pipeline.execute.assert_called_once()
         
         # Verify the statistics
         self.assertEqual(result['scanned'], 1)
         self.assertEqual(result['deleted'], 1)
+        self.assertEqual(result['deleted_files'], 1)
         self.assertEqual(result['errors'], 0)
     
-    @patch('assets.tasks.redis.Redis.from_url')
-    def test_skip_recent_files(self, mock_redis_from_url):
-        """Test that recent temporary files are not cleaned up."""
-        # Create a temporary file for testing
-        temp_file = tempfile.NamedTemporaryFile(delete=False)
-        temp_file_path = temp_file.name
-        temp_file.close()
+    def test_only_expired_entries_are_queried(self):
+        """Test that the index is range-queried up to the expiry threshold."""
+        self.index()
         
-        # Setup mock Redis client
-        mock_redis = MagicMock()
-        mock_redis_from_url.return_value = mock_redis
-        
-        # Create test data
-        recent_time = (timezone.now() - timedelta(hours=24)).timestamp()
-        temp_id = "test-temp-id"
-        key = f"temp_upload:{temp_id}"
-        
-        # Setup Redis scan to return our test key
-        mock_redis.scan.return_value = (0, [key])
-        
-        # Setup Redis get to return our test metadata
-        metadata = {
-            'file_path': temp_file_path,
-            'created_at': recent_time,
-            'original_filename': 'test.jpg',
-            'tenant_id': 1
-        }
-        mock_redis.get.return_value = json.dumps(metadata)
-        
-        # Run the task
         result = cleanup_temporary_uploads()
         
-        # Verify the file was not deleted
-        self.assertTrue(os.path.exists(temp_file_path))
-        
-        # Verify Redis key was not deleted
-        mock_redis.delete.assert_not_called()
-        
-        # Verify the statistics
-        self.assertEqual(result['scanned'], 1)
+        _, minimum, maximum = self.mock_redis.zrangebyscore.call_args[0]
+        self.assertEqual(minimum, '-inf')
+        threshold = (timezone.now() - timedelta(hours=48)).timestamp()
+        self.assertAlmostEqual(maximum, threshold, delta=5)
+        self.pipeline.execute.assert_not_called()
         self.assertEqual(result['deleted'], 0)
         self.assertEqual(result['errors'], 0)
-        
-        # Clean up the test file
-        os.unlink(temp_file_path)
     
-    @patch('assets.tasks.redis.Redis.from_url')
-    def test_handle_missing_file(self, mock_redis_from_url):
-        """Test that the task handles missing files gracefully."""
-        # Setup mock Redis client
-        mock_redis = MagicMock()
-        mock_redis_from_url.return_value = mock_redis
-        
-        # Create test data with non-existent file path
-        old_time = (timezone.now() - timedelta(hours=49)).timestamp()
-        temp_id = "test-temp-id"
-        key = f"temp_upload:{temp_id}"
-        
-        # Setup Redis scan to return our test key
-        mock_redis.scan.return_value = (0, [key])
-        
-        # Setup Redis get to return our test metadata
-        metadata = {
-            'file_path': '/path/to/nonexistent/file.jpg',
-            'created_at': old_time,
-            'original_filename': 'test.jpg',
-            'tenant_id': 1
-        }
-        mock_redis.get.return_value = json.dumps(metadata)
-        
-        # Run the task
+    def test_handle_missing_file(self):
+        """Test that the task handles missing files and metadata gracefully."""
+        self.mock_redis.zrangebyscore.side_effect = [['gone', 'no-metadata'], []]
+        self.mock_redis.mget.return_value = [json.dumps({'file_path': '/path/to/nonexistent/file.jpg'}), None]
+        
         result = cleanup_temporary_uploads()
         
-        # Verify Redis key was still deleted
-        mock_redis.delete.assert_called_once_with(key)
+        # Verify Redis keys were still deleted
+        self.pipeline.delete.assert_called_once_with('temp_upload:gone', 'temp_upload:no-metadata')
         
         # Verify the statistics
-        self.assertEqual(result['scanned'], 1)
-        self.assertEqual(result['deleted'], 1)
+        self.assertEqual(result['scanned'], 2)
+        self.assertEqual(result['deleted'], 2)
+        self.assertEqual(result['deleted_files'], 0)
         self.assertEqual(result['errors'], 0)
     
-    @patch('assets.tasks.redis.Redis.from_url')
-    def test_handle_redis_connection_error(self, mock_redis_from_url):
-        """Test that the task handles Redis connection errors gracefully."""
-        # Setup mock Redis client to raise an exception
-        mock_redis_from_url.side_effect = Exception("Connection error")
+    def test_orphaned_files_are_swept(self):
+        """Test that old files without an index entry are deleted and recent ones kept."""
+        self.index()
+        temp_dir = os.path.join(self.media_root, 'temp_uploads')
+        os.makedirs(os.path.join(temp_dir, 'chunked'))
+        old_path = os.path.join(temp_dir, 'old.jpg')
+        recent_path = os.path.join(temp_dir, 'recent.jpg')
+        for path in (old_path, recent_path):
+            open(path, 'wb').close()
+        old_time = time.time() - timedelta(hours=49).total_seconds()
+        os.utime(old_path, (old_time, old_time))
+        
+        result = cleanup_temporary_uploads()
+        
+        self.assertFalse(os.path.exists(old_path))
+        self.assertTrue(os.path.exists(recent_path))
+        self.assertTrue(os.path.isdir(os.path.join(temp_dir, 'chunked')))
+        self.assertEqual(result['orphans_deleted'], 1)
+    
+    def test_overlapping_runs_are_skipped(self):
+        """Test that a run is skipped while another one holds the lock."""
+        caches['default'].add(CLEANUP_LOCK_KEY, 'other-run')
         
-        # Run the task
         result = cleanup_temporary_uploads()
         
+        self.assertTrue(result['skipped'])
+        self.mock_redis.zrangebyscore.assert_not_called()
+        self.assertEqual(caches['default'].get(CLEANUP_LOCK_KEY), 'other-run')
+    
+    def test_registration_indexes_uploads(self):
+        """Test that registered uploads are indexed by creation time, per tenant too."""
+        register_temporary_upload(self.mock_redis, 'new-id', {'created_at': 100.0, 'tenant_id': 7})
+        
+        self.pipeline.set.assert_called_once_with(
+            'temp_upload:new-id', json.dumps({'created_at': 100.0, 'tenant_id': 7}), ex=(48 + 6) * 60 * 60
+        )
+        self.pipeline.zadd.assert_any_call(INDEX_KEY, {'new-id': 100.0})
+        self.pipeline.zadd.assert_any_call('temp_uploads:index:7', {'new-id': 100.0})
+        self.pipeline.sadd.assert_called_once_with(TENANTS_KEY, 7)
+    
+    def test_handle_redis_connection_error(self):
+        """Test that the task handles Redis connection errors gracefully."""
+        with patch('assets.tasks.get_redis', side_effect=Exception("Connection error")):
+            result = cleanup_temporary_uploads()
+        
         # Verify the statistics
         self.assertEqual(result['scanned'], 0)
         self.assertEqual(result['deleted'], 0)
         self.assertEqual(result['errors'], 1)
         self.assertIn("Redis connection error", result['error_details'][0])
+
+
+class TemporaryUploadExpiryTests(TestCase):
+    """Tests for cleanup of uploads whose Redis keys expire on their own."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            CACHES=LOCMEM_CACHES, MEDIA_ROOT=self.media_root, TEMP_UPLOAD_TTL=1
+        )
+        self.settings_override.enable()
+        caches['default'].clear()
+        self.redis = InMemoryRedis()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def add_upload(self, temp_id):
+        path = os.path.join(self.media_root, f'{temp_id}.jpg')
+        open(path, 'wb').close()
+        register_temporary_upload(self.redis, temp_id, {'file_path': path, 'tenant_id': 3})
+        return path
+
+    def test_expired_uploads_leave_no_files_or_index_entries(self):
+        """Test that cleanup after the TTL finds the metadata and empties the tenant index."""
+        path = self.add_upload('kept-metadata')
+        self.add_upload('lost-metadata')
+        self.redis.delete('temp_upload:lost-metadata')
+        time.sleep(1.1)
+
+        result = cleanup_expired_uploads(self.redis)
+
+        # The metadata outlives the TTL, so the file is found through the index
+        self.assertEqual(result['deleted'], 2)
+        self.assertEqual(result['deleted_files'], 1)
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(self.redis.keys(), [TENANTS_KEY])
+        self.assertEqual(self.redis.zcard('temp_uploads:index:3'), 0)
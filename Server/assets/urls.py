@@ -5,6 +5,7 @@ from . import views
 from .views_simple import SimpleTemporaryUploadView
 
 router = DefaultRouter()
+router.register(r'chunked-uploads', views.ChunkedUploadViewSet, basename='chunked-upload')
 
 urlpatterns = [
     # Direct path for the temporary upload endpoint using the simplified view
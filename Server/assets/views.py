@@ -1,25 +1,23 @@
+import io
 import os
 import uuid
-import json
-from datetime import timedelta
+import time
 
 from django.conf import settings
 from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
-import redis
-
-from .serializers import TemporaryUploadSerializer
-
-
-# Connect to Redis
-redis_client = redis.Redis.from_url(
-    settings.CELERY_BROKER_URL,
-    decode_responses=True
-)
+from core.redis_client import get_redis
+from core.utils import get_request_client_id
+from . import chunked
+from .blobs import claim_blob, find_blob, save_temporary_upload
+from .serializers import ChunkedUploadStartSerializer, TemporaryUploadSerializer
+from .temp_uploads import register_temporary_upload
 
 
 class TemporaryUploadView(GenericViewSet):
@@ -38,62 +36,198 @@ class TemporaryUploadView(GenericViewSet):
         Handle file upload to temporary storage.
         
         Steps:
-        1. Validate the uploaded file
+        1. Validate the uploaded file (or the hash of an already stored one)
         2. Generate a unique ID
-        3. Save the file to temporary storage
+        3. Save the file to temporary storage, hashing it as it is written;
+           content that is already stored as an ImageBlob is not kept
         4. Store metadata in Redis
         5. Return the unique ID
         
         Returns:
-            Response with the temporary ID
+            Response with the temporary ID and whether the content was deduplicated
         """
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
         # Get the uploaded file
-        uploaded_file = serializer.validated_data['file']
+        uploaded_file = serializer.validated_data.get('file')
         
         # Generate a unique ID
         temp_id = uuid.uuid4()
         
-        # Get file extension
-        _, file_extension = os.path.splitext(uploaded_file.name)
-        
-        # Create temporary uploads directory if it doesn't exist
-        temp_dir = os.path.join(settings.MEDIA_ROOT, 'temp_uploads')
-        if not os.path.exists(temp_dir):
-            os.makedirs(temp_dir)
-        
-        # Determine file path
-        file_path = os.path.join(temp_dir, f"{temp_id}{file_extension}")
-        
-        # Save the file
-        try:
-            with open(file_path, 'wb+') as destination:
-                for chunk in uploaded_file.chunks():
-                    destination.write(chunk)
-        except Exception as e:
-            return Response(
-                {"error": f"Failed to save file: {str(e)}"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        if uploaded_file is None:
+            # Hash-only request: succeed without a transfer if the client already stored the content
+            blob = find_blob(serializer.validated_data['sha256'], client_id=get_request_client_id(request))
+            if blob is None:
+                return Response(
+                    {"error": "Unknown content hash; upload the file itself."},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            claim_blob(blob)
+            file_path, sha256 = None, blob.sha256
+            original_filename = serializer.validated_data.get('filename') or os.path.basename(blob.file.name)
+            mime_type, size_bytes = blob.mime_type, blob.size_bytes
+        else:
+            # Get file extension
+            _, file_extension = os.path.splitext(uploaded_file.name)
+            
+            # Create temporary uploads directory if it doesn't exist
+            temp_dir = os.path.join(settings.MEDIA_ROOT, 'temp_uploads')
+            if not os.path.exists(temp_dir):
+                os.makedirs(temp_dir)
+            
+            # Save the file
+            try:
+                file_path, sha256, blob = save_temporary_upload(
+                    uploaded_file, os.path.join(temp_dir, f"{temp_id}{file_extension}")
+                )
+            except Exception as e:
+                return Response(
+                    {"error": f"Failed to save file: {str(e)}"},
+                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                )
+            original_filename = uploaded_file.name
+            mime_type, size_bytes = uploaded_file.content_type, uploaded_file.size
         
         # Store metadata in Redis
         metadata = {
             "file_path": file_path,
-            "original_filename": uploaded_file.name,
-            "mime_type": uploaded_file.content_type,
-            "size_bytes": uploaded_file.size,
-            "tenant_id": request.tenant.id if hasattr(request, 'tenant') else None,
-            "user_id": request.user.id
+            "original_filename": original_filename,
+            "mime_type": mime_type,
+            "size_bytes": size_bytes,
+            "sha256": sha256,
+            "blob_id": blob.id if blob is not None else None,
+            "tenant_id": get_request_client_id(request, default=None),
+            "user_id": request.user.id,
+            "created_at": time.time()
         }
         
-        # Set Redis key with expiry (48 hours)
-        redis_key = f"temp_upload:{temp_id}"
-        redis_client.set(redis_key, json.dumps(metadata))
-        redis_client.expire(redis_key, timedelta(hours=48))
+        # Set Redis key with expiry (48 hours) and index it for cleanup
+        register_temporary_upload(get_redis(), temp_id, metadata)
+        
+        return Response(
+            {"temp_id": str(temp_id), "sha256": sha256, "deduplicated": blob is not None},
+            status=status.HTTP_201_CREATED
+        )
+
+
+def parse_content_range(header):
+    """
+    Parse a ``Content-Range: bytes start-end/total`` request header.
+    
+    Returns:
+        tuple: (start, length, total) as integers
+        
+    Raises:
+        ValidationError: If the header is missing or malformed
+    """
+    try:
+        unit, _, byte_range = header.strip().partition(' ')
+        span, _, total = byte_range.partition('/')
+        start, _, end = span.partition('-')
+        start, end, total = int(start), int(end), int(total)
+        if unit != 'bytes' or end < start:
+            raise ValueError(header)
+    except ValueError:
+        raise ValidationError({"content_range": "Expected a 'Content-Range: bytes start-end/total' header."})
+    return start, end - start + 1, total
+
+
+class ChunkedUploadViewSet(GenericViewSet):
+    """
+    ViewSet for chunked, resumable temporary file uploads.
+    
+    Protocol:
+        POST   /chunked-uploads/                  Start a session, returns upload_id and chunk_size
+        PUT    /chunked-uploads/{id}/             Upload one chunk; the raw request body is the chunk,
+                                                  with Content-Range and X-Chunk-SHA256 headers
+        GET    /chunked-uploads/{id}/             Progress, including the offsets still missing
+        POST   /chunked-uploads/{id}/complete/    Assemble the file, returns the temp_id
+    
+    The returned temp_id is used exactly like one from TemporaryUploadView.
+    Sessions belong to the user and tenant that started them.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = ChunkedUploadStartSerializer
+    lookup_field = 'upload_id'
+    
+    def create(self, request, *args, **kwargs):
+        """
+        Start a chunked upload session.
+        
+        Returns:
+            Response with the upload_id, chunk_size and chunk_count
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        session = chunked.start_upload(
+            filename=serializer.validated_data['filename'],
+            size=serializer.validated_data['size'],
+            content_type=serializer.validated_data['content_type'],
+            chunk_size=serializer.validated_data.get('chunk_size'),
+            user_id=request.user.id,
+            tenant_id=get_request_client_id(request, default=None),
+        )
+        return Response(
+            {key: session[key] for key in ('upload_id', 'chunk_size', 'chunk_count', 'size_bytes')},
+            status=status.HTTP_201_CREATED
+        )
+    
+    def get_session(self, upload_id):
+        return chunked.get_session(
+            upload_id, user_id=self.request.user.id, tenant_id=get_request_client_id(self.request, default=None)
+        )
+    
+    def retrieve(self, request, upload_id=None):
+        """
+        Return the progress of an upload so that an interrupted client can resume it.
+        """
+        session = self.get_session(upload_id)
+        return Response(chunked.get_progress(session))
+    
+    def update(self, request, upload_id=None):
+        """
+        Store one chunk of an upload.
+        
+        Returns:
+            Response with the upload progress
+        """
+        session = self.get_session(upload_id)
+        start, length, total = parse_content_range(request.headers.get('Content-Range', ''))
+        if total != session['size_bytes']:
+            raise ValidationError({"content_range": f"Total size must be {session['size_bytes']}."})
+        
+        progress = chunked.write_chunk(
+            session,
+            offset=start,
+            # Read from the raw stream; request.data is never touched, so the chunk is not parsed
+            # (request.stream is None for an empty body)
+            stream=request.stream or io.BytesIO(),
+            length=length,
+            sha256=request.headers.get('X-Chunk-SHA256', ''),
+        )
+        return Response(progress)
+    
+    @action(detail=True, methods=['post'])
+    def complete(self, request, upload_id=None):
+        """
+        Assemble the uploaded chunks and register the file as a temporary upload.
+        
+        Returns:
+            Response with the temporary ID
+        """
+        session = self.get_session(upload_id)
+        metadata = chunked.complete_upload(session)
+        
+        # Same key, expiry and index as single-request uploads
+        register_temporary_upload(get_redis(), metadata['temp_id'], metadata)
         
         return Response(
-            {"temp_id": str(temp_id)},
+            {
+                "temp_id": metadata['temp_id'],
+                "sha256": metadata['sha256'],
+                "deduplicated": metadata['blob_id'] is not None,
+            },
             status=status.HTTP_201_CREATED
         )
@@ -15,6 +15,8 @@ from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
 from django.conf import settings
 
+from core.utils import get_request_client_id
+from .blobs import claim_blob, find_blob, save_temporary_upload
 from .serializers import TemporaryUploadSerializer
 
 class SimpleTemporaryUploadView(APIView):
@@ -40,31 +42,47 @@ class SimpleTemporaryUploadView(APIView):
         
         if serializer.is_valid():
             # Get the uploaded file
-            uploaded_file = request.FILES['file']
+            uploaded_file = serializer.validated_data.get('file')
             
             # Generate a unique ID for the temporary upload
             temp_id = str(uuid.uuid4())
             
-            # Create a path for the temporary file
-            temp_dir = os.path.join(settings.MEDIA_ROOT, 'temp_uploads')
-            os.makedirs(temp_dir, exist_ok=True)
-            
-            # Save the file with a unique name
-            file_path = os.path.join(temp_dir, f"{temp_id}_{uploaded_file.name}")
-            
-            with open(file_path, 'wb+') as destination:
-                for chunk in uploaded_file.chunks():
-                    destination.write(chunk)
+            if uploaded_file is None:
+                # Hash-only request: succeed without a transfer if the client already stored the content
+                blob = find_blob(serializer.validated_data['sha256'], client_id=get_request_client_id(request))
+                if blob is None:
+                    return Response(
+                        {'error': 'Unknown content hash; upload the file itself.'},
+                        status=status.HTTP_404_NOT_FOUND
+                    )
+                claim_blob(blob)
+                file_path, sha256 = None, blob.sha256
+                original_filename = serializer.validated_data.get('filename') or os.path.basename(blob.file.name)
+                file_size, content_type = blob.size_bytes, blob.mime_type
+            else:
+                # Create a path for the temporary file
+                temp_dir = os.path.join(settings.MEDIA_ROOT, 'temp_uploads')
+                os.makedirs(temp_dir, exist_ok=True)
+                
+                # Save the file with a unique name, hashing it on the way; content that
+                # is already stored is not kept
+                file_path, sha256, blob = save_temporary_upload(
+                    uploaded_file, os.path.join(temp_dir, f"{temp_id}_{uploaded_file.name}")
+                )
+                original_filename = uploaded_file.name
+                file_size, content_type = uploaded_file.size, uploaded_file.content_type
             
             # Create metadata
             metadata = {
                 'temp_id': temp_id,
-                'original_filename': uploaded_file.name,
+                'original_filename': original_filename,
                 'file_path': file_path,
-                'file_size': uploaded_file.size,
-                'content_type': uploaded_file.content_type,
+                'file_size': file_size,
+                'content_type': content_type,
+                'sha256': sha256,
+                'blob_id': blob.id if blob is not None else None,
                 'created_at': datetime.now().timestamp(),
-                'tenant_id': getattr(request, 'tenant_id', 1)  # Default to tenant 1 if not available
+                'tenant_id': get_request_client_id(request)
             }
             
             # Save metadata to a JSON file
@@ -78,9 +96,11 @@ class SimpleTemporaryUploadView(APIView):
             # Return the temporary ID and other relevant information
             return Response({
                 'temp_id': temp_id,
-                'original_filename': uploaded_file.name,
-                'file_size': uploaded_file.size,
-                'content_type': uploaded_file.content_type
+                'original_filename': original_filename,
+                'file_size': file_size,
+                'content_type': content_type,
+                'sha256': sha256,
+                'deduplicated': blob is not None
             }, status=status.HTTP_201_CREATED)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
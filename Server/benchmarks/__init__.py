@@ -0,0 +1,17 @@
+"""
+Performance benchmarks for the ERP backend.
+
+Each module can be run on its own, e.g.::
+
+    python -m benchmarks.bench_json_rendering
+"""
+import os
+
+
+def setup_django():
+    """
+    Configure Django so benchmarks can import project code.
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'erp_backend.settings')
+    import django
+    django.setup()
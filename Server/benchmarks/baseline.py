@@ -0,0 +1,128 @@
+"""
+Saved benchmark baselines and comparison reports.
+
+A baseline is a JSON file holding the results of a benchmark run (one entry
+of timings and query counts per scenario) with metadata about the run::
+
+    {"metadata": {"revision": "3c7c9c5", ...},
+     "results": {"product_list": {"median_ms": 41.2, "p95_ms": 55.0, "queries": 8, ...}}}
+
+``compare`` lines current results up against a baseline and flags scenarios
+whose median time grew by more than a threshold, or whose query count grew
+at all.
+"""
+import datetime
+import json
+import os
+import platform
+import subprocess
+
+
+def collect_metadata(**extra):
+    """
+    Describe the environment of a benchmark run.
+
+    Args:
+        **extra: Additional entries (dataset size, options...)
+    """
+    try:
+        revision = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        revision = None
+    return {
+        'revision': revision,
+        'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.node(),
+        **extra,
+    }
+
+
+def save_baseline(path, results, metadata=None):
+    """
+    Write results and metadata to a baseline file, creating its directory.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({'metadata': metadata or {}, 'results': results}, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def load_baseline(path):
+    """
+    Read a baseline file.
+
+    Returns:
+        dict: {'metadata': ..., 'results': ...}
+    """
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline, current, threshold=0.10):
+    """
+    Compare scenario results with a baseline.
+
+    Args:
+        baseline: {scenario: result} of the baseline
+        current: {scenario: result} of the current run
+        threshold: Relative growth of the median time counted as a regression
+
+    Returns:
+        list: One dict per scenario with the baseline and current medians and
+            query counts, the relative change and a status among
+            ``regression``, ``improvement``, ``ok``, ``new`` and ``missing``
+    """
+    rows = []
+    for scenario in sorted(set(baseline) | set(current)):
+        before, after = baseline.get(scenario), current.get(scenario)
+        row = {
+            'scenario': scenario,
+            'baseline_ms': before['median_ms'] if before else None,
+            'current_ms': after['median_ms'] if after else None,
+            'baseline_queries': before.get('queries') if before else None,
+            'current_queries': after.get('queries') if after else None,
+            'change': None,
+        }
+        if before is None:
+            row['status'] = 'new'
+        elif after is None:
+            row['status'] = 'missing'
+        else:
+            row['change'] = (after['median_ms'] - before['median_ms']) / before['median_ms'] if before['median_ms'] else 0.0
+            more_queries = (
+                row['baseline_queries'] is not None and row['current_queries'] is not None
+                and row['current_queries'] > row['baseline_queries']
+            )
+            if row['change'] > threshold or more_queries:
+                row['status'] = 'regression'
+            elif row['change'] < -threshold:
+                row['status'] = 'improvement'
+            else:
+                row['status'] = 'ok'
+        rows.append(row)
+    return rows
+
+
+def format_report(rows):
+    """
+    Render comparison rows as a text table.
+    """
+    def number(value, pattern):
+        return '-' if value is None else pattern.format(value)
+
+    lines = [f"{'scenario':<22}{'base ms':>10}{'now ms':>10}{'change':>9}{'queries':>12}  status"]
+    for row in rows:
+        queries = f"{number(row['baseline_queries'], '{}')}->{number(row['current_queries'], '{}')}"
+        lines.append(
+            f"{row['scenario']:<22}{number(row['baseline_ms'], '{:.2f}'):>10}"
+            f"{number(row['current_ms'], '{:.2f}'):>10}{number(row['change'], '{:+.1%}'):>9}"
+            f"{queries:>12}  {row['status']}"
+        )
+    regressions = sum(1 for row in rows if row['status'] == 'regression')
+    lines.append(f"{regressions} regression(s)")
+    return '\n'.join(lines)
@@ -0,0 +1,259 @@
+"""
+Benchmark the product API against a synthetic catalog.
+
+Times product list, detail, search and create, variant creation and a bulk
+import of products, with the number of queries of each, through the full
+middleware and DRF stack. Writes are rolled back so runs can be repeated on
+the same data.
+
+Usage:
+    python manage.py generate_synthetic_catalog --products 100000 --variants 500000
+    python -m benchmarks.bench_api --tenant 2 --save benchmarks/baselines/main.json
+    python -m benchmarks.bench_api --tenant 2 --compare benchmarks/baselines/main.json
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+
+from benchmarks import setup_django
+from benchmarks.baseline import collect_metadata, compare, format_report, load_baseline, save_baseline
+
+SCENARIOS = ('product_list', 'product_detail', 'product_search', 'product_create', 'variant_create', 'import')
+
+# Imports are much slower than requests; they run once per this many repeats
+IMPORT_REPEAT_DIVISOR = 5
+
+
+class BenchmarkContext:
+    """
+    Client, tenant host and sample rows shared by the scenarios.
+    """
+
+    def __init__(self, tenant_id, seed=0, import_size=200):
+        from django.db.models import Max, Min
+        from rest_framework.test import APIClient
+
+        from products.catalogue.models import Category
+        from products.models import Product
+        from products.synthetic import NOUNS
+        from tenants.models import Domain, Tenant
+
+        self.tenant_id = tenant_id
+        # Catalog rows are scoped by the tenant's client_id, not its primary key
+        self.client_id = Tenant.objects.values_list('client_id', flat=True).get(id=tenant_id)
+        self.import_size = import_size
+        self.rng = random.Random(seed)
+        domain = Domain.objects.filter(tenant_id=tenant_id).order_by('-is_primary', 'id').first()
+        # Hostnames without a Domain are served as the default client
+        self.host = domain.domain if domain else 'localhost'
+        self.client = APIClient(HTTP_HOST=self.host)
+        self.search_terms = NOUNS
+
+        products = Product.objects.filter(client_id=self.client_id)
+        self.product_count = products.count()
+        bounds = products.aggregate(low=Min('id'), high=Max('id'))
+        self.product_ids = self.sample_ids(products, bounds)
+        self.parent_ids = self.sample_ids(products.filter(product_type='PARENT'), bounds)
+        # New products reuse the classification of an existing one
+        self.classification = products.filter(uom__isnull=False, productstatus__isnull=False).values(
+            'category', 'subcategory', 'division', 'uom', 'productstatus'
+        ).first() or {'category': Category.objects.filter(client_id=self.client_id).values_list('id', flat=True).first()}
+        self.variant_options = {}
+
+    def sample_ids(self, queryset, bounds, size=200):
+        """
+        Pick up to size IDs of a queryset without sorting the whole table.
+        """
+        if bounds['low'] is None:
+            return []
+        candidates = {self.rng.randint(bounds['low'], bounds['high']) for _ in range(size * 5)}
+        ids = list(queryset.filter(id__in=candidates).values_list('id', flat=True)[:size])
+        return ids or list(queryset.values_list('id', flat=True)[:size])
+
+    def options_for(self, product_id):
+        """
+        Return an option ID of each variant-defining attribute of a product.
+
+        The last option of each attribute is picked: generated variants use
+        the first combinations, so this one is free unless a product has
+        every combination.
+        """
+        if product_id not in self.variant_options:
+            from attributes.models import AttributeOption
+            options = {}
+            for option in AttributeOption.objects.filter(
+                attribute__defines_variants_for=product_id
+            ).order_by('sort_order'):
+                options[option.attribute_id] = option.id
+            self.variant_options[product_id] = list(options.values())
+        return self.variant_options[product_id]
+
+
+def product_list(context):
+    pages = max(1, min(50, context.product_count // 50))
+    return context.client.get('/api/v1/products/products/', {'page': context.rng.randint(1, pages)})
+
+
+def product_detail(context):
+    return context.client.get(f'/api/v1/products/products/{context.rng.choice(context.product_ids)}/')
+
+
+def product_search(context):
+    return context.client.get('/api/v1/products/products/', {'search': context.rng.choice(context.search_terms)})
+
+
+def product_create(context):
+    number = context.rng.randrange(10 ** 9)
+    return context.client.post('/api/v1/products/products/', {
+        'name': f'Benchmark product {number}',
+        'sku': f'BENCH-{number}',
+        'product_type': 'REGULAR',
+        **context.classification,
+        'display_price': '19.99',
+        'description': 'Created by the API benchmark',
+    }, format='json')
+
+
+def variant_create(context):
+    product_id = context.rng.choice(context.parent_ids)
+    return context.client.post(f'/api/v1/products/products/{product_id}/variants/', {
+        'sku': f'BENCH-V-{context.rng.randrange(10 ** 9)}',
+        'display_price': '24.99',
+        'options': context.options_for(product_id),
+    }, format='json')
+
+
+def bulk_import(context):
+    from products.synthetic import CatalogSpec, generate_catalog
+    spec = CatalogSpec(
+        products=context.import_size, variants=context.import_size * 2, variants_per_product=4,
+        kits=context.import_size // 20, attributes=20, images_per_product=1,
+    )
+    return generate_catalog(context.client_id, spec, prefix='bench-import', seed=context.rng.random())
+
+
+SCENARIO_FUNCTIONS = {
+    'product_list': product_list,
+    'product_detail': product_detail,
+    'product_search': product_search,
+    'product_create': product_create,
+    'variant_create': variant_create,
+    'import': bulk_import,
+}
+
+
+def percentile(values, fraction):
+    """
+    Return the value at a fraction of the sorted values (nearest rank).
+    """
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+def measure(func, context, repeat, warmup=1):
+    """
+    Run a scenario repeatedly, rolling back its writes.
+
+    Returns:
+        dict: runs, median/p95/mean/min milliseconds and median query count
+    """
+    from django.db import transaction
+
+    from core.instrumentation import QueryRecorder
+
+    durations, queries = [], []
+    for run in range(warmup + repeat):
+        with transaction.atomic():
+            with QueryRecorder() as recorder:
+                started = time.perf_counter()
+                response = func(context)
+                elapsed = (time.perf_counter() - started) * 1000
+            transaction.set_rollback(True)
+        status_code = getattr(response, 'status_code', 200)
+        if status_code >= 400:
+            raise RuntimeError(f"{func.__name__} failed with status {status_code}: {response.content[:500]!r}")
+        if run >= warmup:
+            durations.append(elapsed)
+            queries.append(recorder.count)
+    return {
+        'runs': repeat,
+        'median_ms': round(statistics.median(durations), 3),
+        'p95_ms': round(percentile(durations, 0.95), 3),
+        'mean_ms': round(statistics.fmean(durations), 3),
+        'min_ms': round(min(durations), 3),
+        'queries': int(statistics.median(queries)),
+    }
+
+
+def run(tenant_id, scenarios=SCENARIOS, repeat=20, seed=0, import_size=200):
+    """
+    Run benchmark scenarios against a tenant's catalog.
+
+    Args:
+        tenant_id: Tenant whose catalog is used
+        scenarios: Names of the scenarios to run
+        repeat: Timed runs of each request scenario
+        seed: Random seed picking pages, products and search terms
+        import_size: Products per import run
+
+    Returns:
+        tuple: ({scenario: result}, BenchmarkContext)
+    """
+    from django.conf import settings
+    from django.test.utils import override_settings
+
+    context = BenchmarkContext(tenant_id, seed=seed, import_size=import_size)
+    if not context.product_ids:
+        raise RuntimeError(f"Tenant {tenant_id} has no products; run generate_synthetic_catalog first")
+
+    results = {}
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, context.host]):
+        for name in scenarios:
+            if name == 'variant_create' and not context.parent_ids:
+                continue
+            runs = max(1, repeat // IMPORT_REPEAT_DIVISOR) if name == 'import' else repeat
+            results[name] = measure(SCENARIO_FUNCTIONS[name], context, runs)
+    return results, context
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--tenant', type=int, default=1, help='Tenant whose catalog is benchmarked')
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS, help='Scenario to run (repeatable)')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--import-size', type=int, default=200, help='Products per import run')
+    parser.add_argument('--save', metavar='PATH', help='Save the results as a baseline')
+    parser.add_argument('--compare', metavar='PATH', help='Compare the results with a saved baseline')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Slowdown counted as a regression (0.10 = 10%%)')
+    args = parser.parse_args()
+
+    setup_django()
+    results, context = run(args.tenant, args.scenario or SCENARIOS, args.repeat, args.seed, args.import_size)
+
+    print(f"Tenant {args.tenant} ({context.product_count} products), {args.repeat} runs per scenario")
+    print(f"{'scenario':<22}{'median ms':>11}{'p95 ms':>10}{'mean ms':>10}{'queries':>9}")
+    for name, result in results.items():
+        print(
+            f"{name:<22}{result['median_ms']:>11.2f}{result['p95_ms']:>10.2f}"
+            f"{result['mean_ms']:>10.2f}{result['queries']:>9}"
+        )
+
+    if args.save:
+        save_baseline(args.save, results, collect_metadata(
+            tenant=args.tenant, products=context.product_count, repeat=args.repeat
+        ))
+        print(f"\nSaved baseline to {args.save}")
+    if args.compare:
+        baseline = load_baseline(args.compare)
+        rows = compare(baseline['results'], results, args.threshold)
+        print(f"\nCompared with {args.compare} (revision {baseline['metadata'].get('revision')})")
+        print(format_report(rows))
+        if any(row['status'] == 'regression' for row in rows):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+"""
+Benchmark concurrent requests to the sync and async read endpoints under ASGI.
+
+Requests are sent through the project's ASGI application in-process (the
+full middleware stack, without a server in front), a fixed number at a time,
+to the sync DRF routes and to their async versions under /api/v1/async/.
+Throughput and latency are reported per route and concurrency level.
+
+``--storage-latency-ms`` delays every file URL that is built, emulating
+remotely signed URLs (e.g. GCS signed URLs without a local key), which block
+a worker thread per sync request.
+
+Usage:
+    python -m benchmarks.bench_asgi --tenant 2 --concurrency 1 --concurrency 16 --requests 200
+    python -m benchmarks.bench_asgi --tenant 2 --storage-latency-ms 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from contextlib import contextmanager
+
+from benchmarks import setup_django
+from benchmarks.bench_api import percentile
+
+# Route name -> (sync path, async path); {product} and {parent} are sampled IDs
+ROUTES = {
+    'product_list': ('/api/v1/products/products/', '/api/v1/async/products/products/'),
+    'product_detail': ('/api/v1/products/products/{product}/', '/api/v1/async/products/products/{product}/'),
+    'variant_list': (
+        '/api/v1/products/products/{parent}/variants/', '/api/v1/async/products/products/{parent}/variants/'
+    ),
+    'catalogue_tree': (None, '/api/v1/async/products/catalogue/tree/'),
+    'reference_data': ('/api/v1/reference-data/', '/api/v1/async/reference-data/'),
+}
+
+
+async def asgi_get(application, path, host):
+    """
+    Send a GET request through an ASGI application.
+
+    Returns:
+        int: The response status code
+    """
+    path, _, query_string = path.partition('?')
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query_string.encode(),
+        'root_path': '',
+        'headers': [(b'host', host.encode()), (b'accept', b'application/json')],
+        'client': ('127.0.0.1', 0),
+        'server': (host, 80),
+    }
+    status = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    await application(scope, receive, send)
+    return status[0]
+
+
+async def run_level(application, paths, host, concurrency, total):
+    """
+    Send total requests, concurrency at a time, cycling through paths.
+
+    Returns:
+        dict: requests, concurrency, errors, throughput and median/p95 milliseconds
+    """
+    durations, errors = [], 0
+
+    async def worker(indices):
+        nonlocal errors
+        for index in indices:
+            started = time.perf_counter()
+            status = await asgi_get(application, paths[index % len(paths)], host)
+            durations.append((time.perf_counter() - started) * 1000)
+            errors += status >= 400
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(range(offset, total, concurrency)) for offset in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        'requests': total,
+        'concurrency': concurrency,
+        'errors': errors,
+        'throughput_rps': round(total / elapsed, 1),
+        'median_ms': round(statistics.median(durations), 3),
+        'p95_ms': round(percentile(durations, 0.95), 3),
+    }
+
+
+@contextmanager
+def storage_latency(delay_ms):
+    """
+    Delay every url() call of the storages serving product and catalogue images.
+    """
+    from products.catalogue.models import Division
+    from products.models import ProductImage
+
+    classes = set()
+    for model in (ProductImage, Division) if delay_ms else ():
+        storage = model._meta.get_field('image').storage
+        storage.url  # Sets up default_storage, which is a lazy wrapper
+        classes.add(type(getattr(storage, '_wrapped', storage)))
+    originals = {cls: cls.url for cls in classes}
+
+    def delayed(original):
+        def url(self, name):
+            time.sleep(delay_ms / 1000)
+            return original(self, name)
+        return url
+
+    for cls, original in originals.items():
+        cls.url = delayed(original)
+    try:
+        yield
+    finally:
+        for cls, original in originals.items():
+            cls.url = original
+
+
+def run(tenant_id, routes=tuple(ROUTES), concurrency_levels=(1, 8, 32), requests=100, storage_latency_ms=0, seed=0):
+    """
+    Benchmark the sync and async version of each route at each concurrency level.
+
+    Returns:
+        list: One result dict per (route, mode, concurrency), with 'route' and 'mode' keys
+    """
+    from django.conf import settings
+    from django.test.utils import override_settings
+
+    from benchmarks.bench_api import BenchmarkContext
+    from erp_backend.asgi import application
+
+    context = BenchmarkContext(tenant_id, seed=seed)
+    samples = {
+        'product': context.product_ids or [0],
+        'parent': context.parent_ids or context.product_ids or [0],
+    }
+
+    def expand(template):
+        size = max(len(samples['product']), len(samples['parent']))
+        return [
+            template.format(product=samples['product'][i % len(samples['product'])],
+                            parent=samples['parent'][i % len(samples['parent'])])
+            for i in range(size if '{' in template else 1)
+        ]
+
+    results = []
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, context.host]), storage_latency(storage_latency_ms):
+        for route in routes:
+            for mode, template in zip(('sync', 'async'), ROUTES[route]):
+                if template is None:
+                    continue
+                paths = expand(template)
+                # Warm up caches, connections and the tenant lookup
+                asyncio.run(run_level(application, paths, context.host, 1, 2))
+                for concurrency in concurrency_levels:
+                    result = asyncio.run(run_level(application, paths, context.host, concurrency, requests))
+                    results.append({'route': route, 'mode': mode, **result})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--tenant', type=int, default=1, help='Tenant whose catalog is requested')
+    parser.add_argument('--route', action='append', choices=tuple(ROUTES), help='Route to run (repeatable)')
+    parser.add_argument('--concurrency', type=int, action='append', help='Requests in flight (repeatable)')
+    parser.add_argument('--requests', type=int, default=100, help='Requests per route and concurrency level')
+    parser.add_argument('--storage-latency-ms', type=float, default=0, help='Delay added to every file URL built')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    setup_django()
+    results = run(
+        args.tenant, args.route or tuple(ROUTES), args.concurrency or (1, 8, 32),
+        args.requests, args.storage_latency_ms, args.seed,
+    )
+
+    print(f"{'route':<16}{'mode':<7}{'conc':>5}{'req/s':>9}{'median ms':>11}{'p95 ms':>10}{'errors':>8}")
+    for result in results:
+        print(
+            f"{result['route']:<16}{result['mode']:<7}{result['concurrency']:>5}{result['throughput_rps']:>9.1f}"
+            f"{result['median_ms']:>11.2f}{result['p95_ms']:>10.2f}{result['errors']:>8}"
+        )
+
+
+if __name__ == '__main__':
+    main()
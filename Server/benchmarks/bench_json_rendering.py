@@ -0,0 +1,200 @@
+"""
+Benchmark the stock DRF JSON path against the orjson-backed renderer and parser.
+
+Renders and parses pages of synthetic products shaped like ProductSerializer
+output, and reports gzip/brotli sizes and timings for the rendered page.
+
+Usage:
+    python -m benchmarks.bench_json_rendering [--page-size 100] [--repeat 50]
+"""
+import argparse
+import datetime
+import gzip
+import io
+import statistics
+import time
+from decimal import Decimal
+
+from benchmarks import setup_django
+
+
+def build_product(index, typed=False):
+    """
+    Build one product in the shape of ProductSerializer output.
+    
+    Args:
+        index: Sequence number used to vary values
+        typed: Use Decimal/datetime objects (as values() querysets return)
+            instead of the strings DRF fields produce
+    """
+    created = datetime.datetime(2024, 1, 1, 12, 0, tzinfo=datetime.timezone.utc) + datetime.timedelta(minutes=index)
+    price = Decimal('19.99') + index
+    return {
+        'id': index,
+        'client_id': 1,
+        'company_id': 1,
+        'product_type': 'REGULAR',
+        'name': f'Product {index} – Ünïcode name',
+        'slug': f'product-{index}',
+        'sku': f'SKU-{index:06d}',
+        'description': 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. ' * 4,
+        'short_description': 'Short description',
+        'category': 3,
+        'category_details': {'id': 3, 'name': 'Category', 'description': '', 'image': None, 'image_alt_text': ''},
+        'subcategory': None,
+        'subcategory_details': None,
+        'division': 1,
+        'division_details': {'id': 1, 'name': 'Division', 'description': '', 'image': None, 'image_alt_text': ''},
+        'uom': 1,
+        'uom_details': {'name': 'Pieces', 'symbol': 'PCS', 'description': ''},
+        'productstatus': 1,
+        'productstatus_details': {'name': 'Active', 'description': ''},
+        'currency_code': 'USD',
+        'default_tax_rate_profile': None,
+        'is_tax_exempt': False,
+        'display_price': price if typed else str(price),
+        'compare_at_price': (price + 5) if typed else str(price + 5),
+        'is_active': True,
+        'allow_reviews': True,
+        'inventory_tracking_enabled': True,
+        'backorders_allowed': False,
+        'quantity_on_hand': index * 3,
+        'is_serialized': False,
+        'is_lotted': False,
+        'pre_order_available': False,
+        'pre_order_date': None,
+        'publication_status': 'ACTIVE',
+        'attribute_groups': [1, 2],
+        'variant_defining_attributes': [],
+        'seo_title': f'Product {index}',
+        'seo_description': 'SEO description',
+        'seo_keywords': 'product, catalogue',
+        'tags': ['new', 'sale'],
+        'faqs': [{'question': 'Is it good?', 'answer': 'Yes.'}],
+        'images': [
+            {
+                'id': index * 10 + n,
+                'image': f'https://storage.example.com/products/{index}-{n}.jpg',
+                'alt_text': f'Image {n}',
+                'sort_order': n,
+                'is_default': n == 0,
+                'created_at': created if typed else created.isoformat().replace('+00:00', 'Z'),
+            }
+            for n in range(3)
+        ],
+        'attribute_values': [
+            {
+                'id': index * 10 + n,
+                'attribute': n,
+                'attribute_name': f'Attribute {n}',
+                'attribute_code': f'attr_{n}',
+                'attribute_type': 'TEXT',
+                'value': f'Value {n}',
+            }
+            for n in range(4)
+        ],
+        'created_at': created if typed else created.isoformat().replace('+00:00', 'Z'),
+        'updated_at': created if typed else created.isoformat().replace('+00:00', 'Z'),
+        'created_by': 1,
+        'created_by_details': {'id': 1, 'username': 'admin', 'email': 'admin@example.com'},
+    }
+
+
+def build_page(page_size, typed=False):
+    """
+    Build a paginated response body as CustomPageNumberPagination returns it.
+    """
+    return {
+        'count': page_size * 20,
+        'next': 'http://localhost:8000/api/v1/products/products/?page=2',
+        'previous': None,
+        'results': [build_product(i, typed) for i in range(page_size)],
+    }
+
+
+def timed(func, repeat):
+    """
+    Run func repeat times and return the median duration in milliseconds.
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+    return statistics.median(durations)
+
+
+def run(page_size=100, repeat=50):
+    """
+    Run the benchmark and return the results.
+    
+    Returns:
+        list: (label, stock_ms, fast_ms) rows
+    """
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+    from core.parsers import FastJSONParser
+    from core.renderers import FastJSONRenderer
+    
+    stock_renderer, fast_renderer = JSONRenderer(), FastJSONRenderer()
+    stock_parser, fast_parser = JSONParser(), FastJSONParser()
+    
+    results = []
+    for label, typed in (('render (serializer output)', False), ('render (typed values)', True)):
+        page = build_page(page_size, typed)
+        results.append((
+            label,
+            timed(lambda: stock_renderer.render(page), repeat),
+            timed(lambda: fast_renderer.render(page), repeat),
+        ))
+    
+    body = stock_renderer.render(build_page(page_size))
+    results.append((
+        'parse',
+        timed(lambda: stock_parser.parse(io.BytesIO(body)), repeat),
+        timed(lambda: fast_parser.parse(io.BytesIO(body)), repeat),
+    ))
+    return results, body
+
+
+def compression_report(body, repeat):
+    """
+    Return (coding, size, ms) rows for the rendered page.
+    """
+    rows = [('identity', len(body), 0.0)]
+    rows.append(('gzip', len(gzip.compress(body, 6)), timed(lambda: gzip.compress(body, 6), repeat)))
+    try:
+        import brotli
+    except ImportError:
+        return rows
+    for quality in (4, 11):
+        rows.append((
+            f'br (q={quality})',
+            len(brotli.compress(body, quality=quality)),
+            timed(lambda: brotli.compress(body, quality=quality), max(1, repeat // 10)),
+        ))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+    
+    setup_django()
+    results, body = run(args.page_size, args.repeat)
+    
+    print(f"JSON, {args.page_size} products per page, median of {args.repeat} runs")
+    print(f"{'operation':<30}{'stock ms':>12}{'fast ms':>12}{'speedup':>10}")
+    for label, stock_ms, fast_ms in results:
+        print(f"{label:<30}{stock_ms:>12.2f}{fast_ms:>12.2f}{stock_ms / fast_ms:>9.1f}x")
+    
+    print()
+    print(f"{'coding':<30}{'bytes':>12}{'ms':>12}")
+    for coding, size, ms in compression_report(body, args.repeat):
+        print(f"{coding:<30}{size:>12}{ms:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""
+Benchmark the CPU cost of logging on product requests.
+
+Runs product API scenarios (see benchmarks.bench_api) under several logging
+configurations and reports CPU time per request, so the effect of log levels,
+lazy formatting and sampling on hot paths is measured rather than guessed:
+
+- ``debug``: products loggers at DEBUG, every record written (the tracing
+  the hot paths used to do at INFO/CRITICAL)
+- ``info``: products loggers at INFO (the default)
+- ``info+sampled``: INFO with 10% of the remaining INFO records kept
+
+A micro-benchmark of eager f-string versus lazy %-style calls on a disabled
+level is printed first.
+
+Usage:
+    python -m benchmarks.bench_logging --tenant 2 [--repeat 30]
+"""
+import argparse
+import io
+import logging
+import statistics
+import time
+import timeit
+from contextlib import contextmanager
+
+from benchmarks import setup_django
+
+CONFIGURATIONS = (
+    ('debug', logging.DEBUG, {}),
+    ('info', logging.INFO, {}),
+    ('info+sampled', logging.INFO, {'products': 0.1, 'assets': 0.1}),
+)
+
+SCENARIOS = ('product_list', 'product_detail', 'product_search', 'product_create', 'variant_create')
+
+
+@contextmanager
+def logging_configuration(level, rates):
+    """
+    Route the products and assets loggers to an in-memory handler at a level.
+
+    The handler formats records like the production file handler, so the cost
+    of rendering and writing them is included.
+    """
+    from core.structured_logging import SamplingFilter
+
+    handler = logging.StreamHandler(io.StringIO())
+    handler.setFormatter(logging.Formatter('{levelname} {asctime} {module} {process:d} {thread:d} {message}', style='{'))
+    handler.addFilter(SamplingFilter(rates))
+    saved = {}
+    for name in ('products', 'assets'):
+        logger = logging.getLogger(name)
+        saved[name] = (logger.level, logger.handlers, logger.propagate)
+        logger.setLevel(level)
+        logger.handlers = [handler]
+        logger.propagate = False
+    try:
+        yield handler
+    finally:
+        for name, (level, handlers, propagate) in saved.items():
+            logger = logging.getLogger(name)
+            logger.setLevel(level)
+            logger.handlers = handlers
+            logger.propagate = propagate
+
+
+def cpu_per_request(func, context, repeat, warmup=2):
+    """
+    Return the median CPU milliseconds of a scenario, rolling back its writes.
+    """
+    from django.db import transaction
+
+    durations = []
+    for run in range(warmup + repeat):
+        with transaction.atomic():
+            started = time.process_time()
+            func(context)
+            elapsed = (time.process_time() - started) * 1000
+            transaction.set_rollback(True)
+        if run >= warmup:
+            durations.append(elapsed)
+    return statistics.median(durations)
+
+
+def micro_benchmark(number=200000):
+    """
+    Return (label, nanoseconds per call) of logging calls on a disabled level.
+    """
+    logger = logging.getLogger('benchmarks.logging.micro')
+    logger.setLevel(logging.INFO)
+    payload = {'id': 1, 'name': 'Product', 'tags': ['a', 'b'], 'price': '19.99'}
+    calls = (
+        ('eager f-string', lambda: logger.debug(f"Payload: {payload}")),
+        ('lazy %-style', lambda: logger.debug("Payload: %s", payload)),
+    )
+    return [(label, timeit.timeit(call, number=number) / number * 1e9) for label, call in calls]
+
+
+def run(tenant_id, scenarios=SCENARIOS, repeat=20, seed=0):
+    """
+    Measure CPU time per request of each scenario under each configuration.
+
+    Returns:
+        dict: {scenario: {configuration: cpu ms}}
+    """
+    from django.conf import settings
+    from django.test.utils import override_settings
+
+    from benchmarks.bench_api import SCENARIO_FUNCTIONS, BenchmarkContext
+
+    context = BenchmarkContext(tenant_id, seed=seed)
+    results = {}
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, context.host]):
+        for name in scenarios:
+            if name == 'variant_create' and not context.parent_ids:
+                continue
+            results[name] = {}
+            for label, level, rates in CONFIGURATIONS:
+                with logging_configuration(level, rates):
+                    results[name][label] = cpu_per_request(SCENARIO_FUNCTIONS[name], context, repeat)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--tenant', type=int, default=1)
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    print("Disabled-level logging call, ns per call")
+    for label, ns in micro_benchmark():
+        print(f"  {label:<20}{ns:>10.0f}")
+
+    results = run(args.tenant, args.scenario or SCENARIOS, args.repeat)
+    labels = [label for label, _, _ in CONFIGURATIONS]
+    print(f"\nCPU ms per request (median of {args.repeat})")
+    print(f"{'scenario':<18}" + ''.join(f"{label:>14}" for label in labels) + f"{'saved':>10}")
+    for name, timings in results.items():
+        baseline, best = timings[labels[0]], min(timings.values())
+        print(
+            f"{name:<18}" + ''.join(f"{timings[label]:>14.2f}" for label in labels)
+            + f"{(baseline - best) / baseline if baseline else 0:>10.0%}"
+        )
+
+
+if __name__ == '__main__':
+    main()
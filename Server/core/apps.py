@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        # Keep reference-data snapshots in step with writes to the source models
+        from core.reference_data import connect_signals
+        connect_signals()
@@ -0,0 +1,147 @@
+"""
+Helpers for async (ASGI) read endpoints, and the async reference-data view.
+
+Async endpoints are plain Django ``async def`` views mounted under
+``/api/v1/async/`` next to the sync DRF routes. DRF 3.14 views are sync only
+and, under ASGI, each request holds a worker thread while it waits on the
+database or on storage URL signing. The async views return the same documents
+as their sync counterparts by reusing the viewsets' querysets, filters,
+pagination and serializers, and read through Django's async ORM.
+
+Django 4.2 still runs async ORM queries on the request's database thread, one
+after another, so awaiting independent queries together does not run them in
+parallel on one connection. It does keep the event loop free while they run,
+and work that only waits on I/O, such as signing file URLs, is moved to worker
+threads where it overlaps with other requests.
+"""
+import functools
+import hashlib
+import logging
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse, HttpResponseNotAllowed, HttpResponseNotModified
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from core import reference_data
+from core.conditional import apply_validators, get_change_counters, is_not_modified
+from core.renderers import FastJSONRenderer
+from core.utils import get_request_client_id
+
+logger = logging.getLogger(__name__)
+
+_renderer = FastJSONRenderer()
+
+
+def json_response(data, status=200):
+    """
+    Render data as a JSON response, encoded like the API's JSON renderer.
+    """
+    return HttpResponse(_renderer.render(data), status=status, content_type='application/json')
+
+
+def error_response(exc):
+    """
+    Build the error response the sync API returns for an exception.
+    """
+    response = api_settings.EXCEPTION_HANDLER(exc, {})
+    return json_response(response.data, status=response.status_code)
+
+
+def async_api_view(view):
+    """
+    Decorate an async read-only view: allow GET and HEAD, and answer API
+    exceptions and Http404 with the API's error responses.
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return HttpResponseNotAllowed(['GET', 'HEAD'])
+        try:
+            return await view(request, *args, **kwargs)
+        except (APIException, Http404) as exc:
+            return error_response(exc)
+    return wrapper
+
+
+def drf_request(request):
+    """
+    Wrap a Django request for DRF filters, paginators and serializers.
+    """
+    return Request(request)
+
+
+def viewset_for(request, viewset_class, action, **kwargs):
+    """
+    Instantiate a sync viewset without dispatching, to reuse its querysets,
+    filters and serializers.
+
+    Args:
+        request: The Django request
+        viewset_class: The viewset class
+        action: The action the viewset would run, e.g. 'list'
+        **kwargs: URL keyword arguments
+
+    Returns:
+        The viewset instance
+    """
+    return viewset_class(request=drf_request(request), args=(), kwargs=kwargs, format_kwarg=None, action=action)
+
+
+def build_etag(*parts):
+    """
+    Hash ETag parts like ConditionalGetMixin does for JSON responses.
+    """
+    raw = '|'.join(str(part) for part in parts + ('json',))
+    return hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+
+async def list_etag(request, client_id, scopes):
+    """
+    Compute the ETag of a list response from the client's change counters.
+
+    Returns:
+        str: The ETag, or None if the counters are unavailable
+    """
+    counters = await sync_to_async(get_change_counters)(scopes, client_id)
+    if counters is None:
+        return None
+    return build_etag(scopes[0], client_id, request.get_full_path(), *counters)
+
+
+async def respond_conditionally(request, etag, build_response, last_modified=None):
+    """
+    Answer with 304 if the client's copy is current, else build the response.
+
+    Args:
+        request: The Django request
+        etag: ETag of the requested resource, or None
+        build_response: Coroutine function producing the full response
+        last_modified: Last-Modified timestamp, or None
+
+    Returns:
+        HttpResponse: The 304 response or the built response with validators attached
+    """
+    if etag and is_not_modified(request, etag, last_modified):
+        return apply_validators(HttpResponseNotModified(), etag, last_modified)
+
+    response = await build_response()
+    if etag and response.status_code == 200:
+        apply_validators(response, etag, last_modified)
+    return response
+
+
+@async_api_view
+async def reference_data_view(request):
+    """
+    Async equivalent of core.views.ReferenceDataView.
+    """
+    client_id = get_request_client_id(request)
+    version = await sync_to_async(reference_data.get_version)(client_id)
+    etag = f'refdata-{client_id}-{version}' if version else None
+
+    async def build():
+        return json_response(await reference_data.aget_snapshot(client_id, version))
+
+    return await respond_conditionally(request, etag, build)
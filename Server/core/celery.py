@@ -23,11 +23,31 @@ app.autodiscover_tasks()
 
 # Configure periodic tasks
 app.conf.beat_schedule = {
-    'cleanup-temp-uploads-daily': {
-        'task': 'products.tasks.cleanup_temporary_uploads',
-        'schedule': crontab(hour=3, minute=0),  # Run daily at 3 AM
+    'cleanup-temp-uploads-hourly': {
+        'task': 'assets.tasks.cleanup_temporary_uploads',
+        'schedule': crontab(minute=0),  # Run hourly; runs are cheap and never overlap
         'options': {'expires': 3600}  # Task expires after 1 hour
     },
+    'collect-unreferenced-image-blobs-daily': {
+        'task': 'assets.tasks.collect_unreferenced_image_blobs',
+        'schedule': crontab(hour=3, minute=30),  # Run daily at 3:30 AM
+        'options': {'expires': 3600}
+    },
+    'resume-stalled-bulk-jobs': {
+        'task': 'core.tasks.resume_stalled_bulk_jobs',
+        'schedule': crontab(minute='*/10'),  # Well within BULK_JOB_STALL_TIMEOUT
+        'options': {'expires': 600}
+    },
+    'compact-stock-counters': {
+        'task': 'inventory.tasks.compact_stock_counters',
+        'schedule': crontab(),  # Every minute; pending shard deltas are not shown in product stock until then
+        'options': {'expires': 60}
+    },
+    'expire-stock-reservations': {
+        'task': 'inventory.tasks.expire_stock_reservations',
+        'schedule': crontab(),  # Every minute; expired holds already stop counting, this only marks them
+        'options': {'expires': 60}
+    },
 }
 
 
@@ -0,0 +1,178 @@
+"""
+Helpers for HTTP conditional requests.
+
+These helpers let API views answer ``If-None-Match`` and ``If-Modified-Since``
+before doing any expensive work, returning a bodiless 304 response when the
+client's cached copy is still current.
+"""
+import logging
+import time
+
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+# Validators are revalidated on every use; clients may store but not reuse blindly
+DEFAULT_CACHE_CONTROL = 'private, no-cache'
+
+CHANGE_COUNTER_KEY = 'changes:{scope}:{client_id}'
+
+
+def _strip_weak(etag):
+    """Return the opaque part of an ETag for weak comparison."""
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def etag_matches(request, etag):
+    """
+    Check whether the request's If-None-Match header matches an ETag.
+    
+    Uses the weak comparison function from RFC 7232, which is the one
+    required for If-None-Match.
+    
+    Args:
+        request: The current request
+        etag: The current ETag of the resource, quoted or unquoted
+        
+    Returns:
+        bool: True if the client already holds the current representation
+    """
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header or not etag:
+        return False
+    
+    client_etags = parse_etags(header)
+    if '*' in client_etags:
+        return True
+    
+    current = _strip_weak(quote_etag(etag))
+    return any(_strip_weak(candidate) == current for candidate in client_etags)
+
+
+def is_not_modified(request, etag=None, last_modified=None):
+    """
+    Decide whether a GET or HEAD request can be answered with 304.
+    
+    If-None-Match takes precedence; If-Modified-Since is only evaluated when
+    the client did not send an ETag.
+    
+    Args:
+        request: The current request
+        etag: The current ETag of the resource
+        last_modified: The last modification time as a POSIX timestamp
+        
+    Returns:
+        bool: True if a 304 Not Modified response should be sent
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    
+    if request.META.get('HTTP_IF_NONE_MATCH'):
+        return etag_matches(request, etag)
+    
+    if last_modified is not None:
+        since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+        if since is not None and int(last_modified) <= since:
+            return True
+    
+    return False
+
+
+def apply_validators(response, etag=None, last_modified=None, cache_control=DEFAULT_CACHE_CONTROL):
+    """
+    Attach ETag, Last-Modified and Cache-Control headers to a response.
+    
+    Args:
+        response: The response to decorate
+        etag: The current ETag of the resource
+        last_modified: The last modification time as a POSIX timestamp
+        cache_control: Value for the Cache-Control header, or None to leave it unset
+        
+    Returns:
+        The same response object
+    """
+    if etag:
+        response['ETag'] = quote_etag(etag)
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(int(last_modified))
+    if cache_control and not response.has_header('Cache-Control'):
+        response['Cache-Control'] = cache_control
+    return response
+
+
+def not_modified_response(etag=None, last_modified=None, cache_control=DEFAULT_CACHE_CONTROL):
+    """
+    Build a bodiless 304 response carrying the current validators.
+    """
+    response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    return apply_validators(response, etag, last_modified, cache_control)
+
+
+def initial_counter():
+    """
+    Return the value a missing version counter starts at.
+    
+    Counters are seeded from the clock so that a counter lost to eviction never
+    restarts at a value that a client may still hold in an old ETag.
+    """
+    return int(time.time() * 1000)
+
+
+def get_change_counters(scopes, client_id):
+    """
+    Read the per-client change counters for one or more scopes.
+    
+    A change counter is bumped whenever anything in its scope is written for a
+    client, which makes it a cheap validator for list endpoints.
+    
+    Args:
+        scopes: Iterable of scope names, e.g. ['products']
+        client_id: The client ID
+        
+    Returns:
+        list: Counter values in the order of scopes, or None if the cache is unavailable
+    """
+    cache = caches['default']
+    keys = [CHANGE_COUNTER_KEY.format(scope=scope, client_id=client_id) for scope in scopes]
+    try:
+        counters = cache.get_many(keys)
+        for key in keys:
+            if key not in counters:
+                cache.add(key, initial_counter(), timeout=None)
+                counters[key] = cache.get(key)
+    except Exception as e:
+        logger.warning("Change counter lookup failed: %s", e)
+        return None
+    return [counters[key] for key in keys]
+
+
+def bump_change_counter(scope, client_id):
+    """
+    Record a write in a scope, invalidating validators derived from its counter.
+    
+    Model signals call this for ORM writes; code that writes with raw SQL or
+    QuerySet.update() must call it explicitly.
+    
+    Inside a transaction the bump waits for the commit (and is dropped on
+    rollback), so a client cannot revalidate against the new counter while
+    the old rows are still the visible ones and keep a stale copy under it.
+    
+    Args:
+        scope: The scope name, e.g. 'products'
+        client_id: The client ID
+    """
+    key = CHANGE_COUNTER_KEY.format(scope=scope, client_id=client_id)
+    transaction.on_commit(lambda: _increment_counter(key))
+
+
+def _increment_counter(key):
+    cache = caches['default']
+    try:
+        if not cache.add(key, initial_counter(), timeout=None):
+            cache.incr(key)
+    except Exception as e:
+        logger.warning("Failed to bump change counter %s: %s", key, e)
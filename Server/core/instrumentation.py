@@ -0,0 +1,126 @@
+"""
+Database query instrumentation.
+
+``QueryRecorder`` hooks into every database connection through
+``connection.execute_wrapper`` and records, for a block of code, how many
+queries ran, how long they took and how often each query *shape* repeated.
+Query shapes are fingerprints of the SQL with literals and ``IN`` lists
+collapsed, so the same query issued once per row (an N+1) shows up as one
+fingerprint with a high count.
+
+It backs ``core.middleware.QueryInstrumentationMiddleware`` (Server-Timing
+header and logs per request) and the query budget helpers in ``core.testing``.
+"""
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+_WHITESPACE = re.compile(r'\s+')
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*(?:%s|\?|[-\d.]+|\'(?:[^\']|\'\')*\')\s*,?)+\)', re.IGNORECASE)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w"$])-?\d+(?:\.\d+)?\b')
+_SAVEPOINT = re.compile(r'^(?:SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO SAVEPOINT)\b', re.IGNORECASE)
+
+
+def fingerprint(sql):
+    """
+    Normalize SQL into a fingerprint identifying the query shape.
+
+    Args:
+        sql: SQL text, with placeholders or literal values
+
+    Returns:
+        str: The SQL with whitespace collapsed and literals replaced by ``?``
+    """
+    sql = _WHITESPACE.sub(' ', sql.strip())
+    sql = _IN_LIST.sub('IN (...)', sql)
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    return sql.replace('%s', '?')
+
+
+class QueryRecorder:
+    """
+    Records the queries executed while active.
+
+    Usage::
+
+        with QueryRecorder() as recorder:
+            ...
+        recorder.count, recorder.duration_ms, recorder.duplicates
+
+    Attributes:
+        count: Number of queries executed
+        duration_ms: Total time spent executing them
+        fingerprints: Counter of query fingerprints
+        queries: (sql, duration_ms) of each query, when keep_queries is set
+    """
+
+    def __init__(self, using=None, keep_queries=False):
+        self.using = using
+        self.keep_queries = keep_queries
+        self.count = 0
+        self.duration_ms = 0.0
+        self.fingerprints = Counter()
+        self.queries = []
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            # Savepoints are transaction bookkeeping, not queries anyone wrote
+            if not _SAVEPOINT.match(sql):
+                self.count += 1
+                self.duration_ms += elapsed_ms
+                self.fingerprints[fingerprint(sql)] += 1
+                if self.keep_queries:
+                    self.queries.append((sql, elapsed_ms))
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        aliases = [self.using] if self.using else list(connections)
+        for alias in aliases:
+            self._stack.enter_context(connections[alias].execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+        self._stack = None
+
+    @property
+    def duplicates(self):
+        """
+        Return {fingerprint: count} of the query shapes executed more than once.
+        """
+        return {sql: count for sql, count in self.fingerprints.items() if count > 1}
+
+    @property
+    def duplicate_count(self):
+        """
+        Return how many queries repeated an earlier query shape.
+        """
+        return sum(count - 1 for count in self.fingerprints.values() if count > 1)
+
+    def summary(self, limit=5):
+        """
+        Describe the recorded queries, most repeated shapes first.
+        """
+        lines = [f"{self.count} queries ({self.duplicate_count} duplicate) in {self.duration_ms:.1f}ms"]
+        for sql, count in sorted(self.duplicates.items(), key=lambda item: -item[1])[:limit]:
+            lines.append(f"  {count}x {sql}")
+        return '\n'.join(lines)
+
+
+@contextmanager
+def record_queries(using=None, keep_queries=False):
+    """
+    Shortcut for ``with QueryRecorder(...) as recorder``.
+    """
+    with QueryRecorder(using=using, keep_queries=keep_queries) as recorder:
+        yield recorder
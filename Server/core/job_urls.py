@@ -0,0 +1,11 @@
+from django.urls import path, include
+from rest_framework.routers import SimpleRouter
+
+from core.views import BulkJobViewSet
+
+router = SimpleRouter()
+router.register(r'jobs', BulkJobViewSet, basename='bulk-job')
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
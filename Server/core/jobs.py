@@ -0,0 +1,509 @@
+"""
+Background bulk jobs: chunked, resumable operations run on Celery.
+
+Large imports, exports, price updates and deletes run as a BulkJob instead of
+inside the request. The kinds of job are JobOperation subclasses registered
+with @register_operation (see products.jobs). A job is planned on its first
+run: the operation lists the items to work on and they are stored as
+BulkJobChunks of BULK_JOB_CHUNK_SIZE items. Chunks are then processed in
+order, each in one transaction together with the bookkeeping that marks it
+done, so committed work is never repeated when a job is retried, resumed after
+a worker crash, or queued twice.
+
+Between chunks the worker records a heartbeat and checks whether the job was
+cancelled. A chunk failing with a transient database or connection error is
+retried by re-queueing the task with exponential backoff, up to
+BULK_JOB_MAX_RETRIES times; any other error fails the chunk and the job moves
+on to the next one. Failed and cancelled jobs can be resumed, which re-runs
+their failed and pending chunks only; jobs whose worker stopped reporting for
+BULK_JOB_STALL_TIMEOUT seconds are resumed by a periodic task.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, InterfaceError, OperationalError, transaction
+from django.db.models import F, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from rest_framework import serializers
+
+from core.models.jobs import BulkJob, BulkJobChunk, JobStatus
+
+logger = logging.getLogger(__name__)
+
+_operations = {}
+
+
+class RetryChunk(Exception):
+    """
+    Raised by execute_job when a chunk should be retried after countdown seconds.
+    """
+    def __init__(self, countdown):
+        super().__init__(f"Retry in {countdown}s")
+        self.countdown = countdown
+
+
+class JobOperation:
+    """
+    A kind of bulk job: how its parameters are validated, how it is split
+    into chunks and how each chunk is processed.
+
+    Subclasses define name and either get_items() or plan(), and
+    process_chunk(). Database writes made by process_chunk() are committed
+    together with the chunk's status, so they happen exactly once; other side
+    effects, such as writing files, must be safe to repeat.
+
+    Attributes:
+        name: Operation name used by the API, e.g. 'products.delete'
+        chunk_size: Items per chunk; BULK_JOB_CHUNK_SIZE if None
+        stop_on_error: Whether the job stops at the first failed chunk
+        retryable_errors: Exceptions after which a chunk is retried
+    """
+    name = None
+    chunk_size = None
+    stop_on_error = False
+    retryable_errors = (OperationalError, InterfaceError, ConnectionError, TimeoutError)
+
+    def validate(self, params, client_id):
+        """
+        Validate the job parameters when the job is created.
+
+        Raises:
+            serializers.ValidationError: If the parameters are invalid
+
+        Returns:
+            dict: The parameters to store with the job
+        """
+        return params
+
+    def get_items(self, job):
+        """
+        Return the items the job works on, e.g. product IDs. Must be JSON serializable.
+        """
+        raise NotImplementedError
+
+    def plan(self, job):
+        """
+        Split the job's items into chunks. May update job.params, which is saved afterwards.
+
+        Returns:
+            list: One list of items per chunk
+        """
+        items = list(self.get_items(job))
+        size = self.chunk_size or settings.BULK_JOB_CHUNK_SIZE
+        return [items[start:start + size] for start in range(0, len(items), size)]
+
+    def process_chunk(self, job, chunk):
+        """
+        Process the items of a chunk (chunk.items).
+
+        Returns:
+            dict: The chunk's result. Numbers are summed and lists concatenated
+            across chunks; 'failed' counts items that were rejected and
+            'errors' lists why, e.g. [{'row': 3, 'errors': {...}}]
+        """
+        raise NotImplementedError
+
+    def summarize(self, job, results):
+        """
+        Combine the results of the succeeded chunks into the job's result.
+        """
+        return merge_results(results)
+
+    def finalize(self, job, results):
+        """
+        Build the result of a job whose chunks all succeeded.
+
+        Runs once, after the last chunk. Defaults to summarize().
+        """
+        return self.summarize(job, results)
+
+
+def register_operation(cls):
+    """
+    Class decorator registering a JobOperation under its name.
+    """
+    if not cls.name:
+        raise ValueError(f"{cls.__name__} must define a name")
+    _operations[cls.name] = cls()
+    return cls
+
+
+def get_operation(name):
+    """
+    Return the registered operation called name.
+
+    Raises:
+        KeyError: If no operation is registered under that name
+    """
+    return _operations[name]
+
+
+def operation_names():
+    return sorted(_operations)
+
+
+def merge_results(results):
+    """
+    Merge chunk result dicts: numbers are summed, lists concatenated and
+    nested dicts merged; item errors are left out (see BulkJob.errors).
+    """
+    merged = {}
+    for result in results:
+        for key, value in (result or {}).items():
+            if key == 'errors':
+                continue
+            if isinstance(value, bool) or not isinstance(value, (int, float, list, dict)):
+                merged[key] = value
+            elif isinstance(value, dict):
+                merged[key] = merge_results([merged.get(key) or {}, value])
+            elif key in merged:
+                merged[key] = merged[key] + value
+            else:
+                merged[key] = list(value) if isinstance(value, list) else value
+    return merged
+
+
+def create_job(client_id, operation, params, user=None, idempotency_key=None):
+    """
+    Create a bulk job and queue it once the current transaction commits.
+
+    Args:
+        client_id: The client the job runs for
+        operation: Name of a registered operation
+        params: Operation parameters, validated by the operation
+        user: The user requesting the job, if authenticated
+        idempotency_key: Optional client key; if a job with this key exists it is returned instead
+
+    Raises:
+        serializers.ValidationError: If the operation is unknown or the parameters are invalid
+
+    Returns:
+        tuple: (job, created)
+    """
+    try:
+        handler = get_operation(operation)
+    except KeyError:
+        raise serializers.ValidationError({'operation': [f'Unknown operation "{operation}".']})
+
+    if idempotency_key:
+        existing = _job_for_key(client_id, idempotency_key, operation)
+        if existing is not None:
+            return existing, False
+
+    params = handler.validate(params, client_id)
+    try:
+        with transaction.atomic():
+            job = BulkJob.objects.create(
+                client_id=client_id,
+                operation=operation,
+                params=params,
+                idempotency_key=idempotency_key or None,
+                created_by=user if user is not None and user.is_authenticated else None,
+            )
+    except IntegrityError:
+        # A concurrent request with the same key created the job first
+        if not idempotency_key:
+            raise
+        return _job_for_key(client_id, idempotency_key, operation), False
+
+    logger.info("Created bulk job %s (%s) for client %s", job.pk, operation, client_id)
+    enqueue_job(job)
+    return job, True
+
+
+def _job_for_key(client_id, idempotency_key, operation):
+    job = BulkJob.objects.filter(client_id=client_id, idempotency_key=idempotency_key).first()
+    if job is not None and job.operation != operation:
+        raise serializers.ValidationError(
+            {'idempotency_key': ['This key was already used for a different operation.']}
+        )
+    return job
+
+
+def enqueue_job(job):
+    """
+    Queue a job's task once the current transaction commits.
+
+    A job whose task could not be queued stays pending and is picked up by
+    resume_stalled_jobs().
+    """
+    from core.tasks import run_bulk_job
+
+    job_id = job.pk
+
+    def dispatch():
+        try:
+            run_bulk_job.delay(job_id)
+        except Exception as e:
+            logger.error("Failed to queue bulk job %s: %s", job_id, e)
+
+    transaction.on_commit(dispatch)
+
+
+def execute_job(job_id, task_id=''):
+    """
+    Run a job's pending chunks; the body of core.tasks.run_bulk_job.
+
+    Args:
+        job_id: ID of the BulkJob
+        task_id: ID of the running task; a retried task keeps its ID and may
+            take over the job it was running
+
+    Raises:
+        RetryChunk: If a chunk failed with a transient error and should be retried
+
+    Returns:
+        BulkJob: The job, or None if it does not exist
+    """
+    job, claimed = _claim(job_id, task_id)
+    if not claimed:
+        return job
+
+    try:
+        operation = get_operation(job.operation)
+    except KeyError:
+        logger.error("Bulk job %s has unknown operation %s", job.pk, job.operation)
+        _add_errors(job.pk, [{'error': f'Unknown operation "{job.operation}".'}])
+        return _finish(job, None, JobStatus.FAILED)
+
+    if job.total_chunks is None:
+        _plan(job, operation)
+
+    pending = job.chunks.filter(status=JobStatus.PENDING).order_by('index').values_list('pk', flat=True)
+    for chunk_id in list(pending):
+        if BulkJob.objects.filter(pk=job.pk, cancel_requested=True).exists():
+            return _finish(job, operation, JobStatus.CANCELLED)
+        if not _run_chunk(job, operation, chunk_id) and operation.stop_on_error:
+            break
+    return _finish(job, operation)
+
+
+def _claim(job_id, task_id):
+    now = timezone.now()
+    with transaction.atomic():
+        job = BulkJob.objects.select_for_update().filter(pk=job_id).first()
+        if job is None:
+            logger.warning("Bulk job %s no longer exists", job_id)
+            return None, False
+        if job.is_finished:
+            logger.info("Bulk job %s is already %s", job_id, job.status)
+            return job, False
+        if job.status == JobStatus.RUNNING and job.task_id != task_id and not is_stalled(job, now):
+            logger.info("Bulk job %s is already running in task %s", job_id, job.task_id)
+            return job, False
+        job.status = JobStatus.RUNNING
+        job.task_id = task_id or ''
+        job.started_at = job.started_at or now
+        job.heartbeat_at = now
+        job.save(update_fields=['status', 'task_id', 'started_at', 'heartbeat_at', 'updated_at'])
+    return job, True
+
+
+def _plan(job, operation):
+    with transaction.atomic():
+        chunks = operation.plan(job)
+        BulkJobChunk.objects.bulk_create([
+            BulkJobChunk(job=job, index=index, payload={'items': items}, item_count=len(items))
+            for index, items in enumerate(chunks)
+        ])
+        job.total_chunks = len(chunks)
+        job.total_items = sum(len(items) for items in chunks)
+        job.save(update_fields=['params', 'total_chunks', 'total_items', 'updated_at'])
+    logger.info("Planned bulk job %s: %s items in %s chunks", job.pk, job.total_items, job.total_chunks)
+
+
+def _run_chunk(job, operation, chunk_id):
+    """
+    Process one chunk and record the outcome.
+
+    Returns:
+        bool: False if the chunk failed
+    """
+    try:
+        with transaction.atomic():
+            chunk = BulkJobChunk.objects.select_for_update().get(pk=chunk_id)
+            if chunk.status != JobStatus.PENDING:
+                return True
+            result = operation.process_chunk(job, chunk) or {}
+            failed = result.get('failed', 0)
+
+            now = timezone.now()
+            chunk.status = JobStatus.SUCCEEDED
+            chunk.attempts += 1
+            chunk.result = result
+            chunk.error = ''
+            chunk.finished_at = now
+            chunk.save(update_fields=['status', 'attempts', 'result', 'error', 'finished_at'])
+            BulkJob.objects.filter(pk=job.pk).update(
+                completed_chunks=F('completed_chunks') + 1,
+                processed_items=F('processed_items') + chunk.item_count,
+                failed_items=F('failed_items') + failed,
+                heartbeat_at=now,
+                updated_at=now,
+            )
+            _add_errors(job.pk, result.get('errors', []))
+        return True
+    except operation.retryable_errors as e:
+        attempts = _record_attempt(job, chunk_id, e)
+        if attempts <= settings.BULK_JOB_MAX_RETRIES:
+            countdown = settings.BULK_JOB_RETRY_DELAY * 2 ** (attempts - 1)
+            logger.warning(
+                "Chunk %s of bulk job %s failed (attempt %s), retrying in %ss: %s",
+                chunk_id, job.pk, attempts, countdown, e
+            )
+            raise RetryChunk(countdown)
+        _fail_chunk(job, chunk_id, e)
+        return False
+    except Exception as e:
+        logger.exception("Chunk %s of bulk job %s failed", chunk_id, job.pk)
+        _record_attempt(job, chunk_id, e)
+        _fail_chunk(job, chunk_id, e)
+        return False
+
+
+def _record_attempt(job, chunk_id, error):
+    now = timezone.now()
+    BulkJobChunk.objects.filter(pk=chunk_id).update(attempts=F('attempts') + 1, error=str(error)[:1000])
+    BulkJob.objects.filter(pk=job.pk).update(heartbeat_at=now, updated_at=now)
+    return BulkJobChunk.objects.values_list('attempts', flat=True).get(pk=chunk_id)
+
+
+def _fail_chunk(job, chunk_id, error):
+    now = timezone.now()
+    with transaction.atomic():
+        chunk = BulkJobChunk.objects.select_for_update().get(pk=chunk_id)
+        chunk.status = JobStatus.FAILED
+        chunk.finished_at = now
+        chunk.save(update_fields=['status', 'finished_at'])
+        BulkJob.objects.filter(pk=job.pk).update(
+            failed_chunks=F('failed_chunks') + 1,
+            failed_items=F('failed_items') + chunk.item_count,
+            heartbeat_at=now,
+            updated_at=now,
+        )
+        _add_errors(job.pk, [{'chunk': chunk.index, 'error': str(error)[:1000]}])
+
+
+def _add_errors(job_id, errors):
+    # Keep the first BULK_JOB_MAX_ERRORS errors; chunk results hold the rest
+    if not errors:
+        return
+    with transaction.atomic():
+        current = BulkJob.objects.select_for_update().values_list('errors', flat=True).get(pk=job_id)
+        room = settings.BULK_JOB_MAX_ERRORS - len(current)
+        if room > 0:
+            BulkJob.objects.filter(pk=job_id).update(errors=current + list(errors[:room]))
+
+
+def _finish(job, operation, status=None):
+    job.refresh_from_db()
+    if status is None:
+        status = JobStatus.FAILED if job.failed_chunks else JobStatus.SUCCEEDED
+
+    if operation is not None:
+        results = list(
+            job.chunks.filter(status=JobStatus.SUCCEEDED).order_by('index').values_list('result', flat=True)
+        )
+        try:
+            if status == JobStatus.SUCCEEDED:
+                job.result = operation.finalize(job, results)
+            else:
+                job.result = operation.summarize(job, results)
+        except Exception as e:
+            logger.exception("Finalizing bulk job %s failed", job.pk)
+            status = JobStatus.FAILED
+            _add_errors(job.pk, [{'error': str(e)[:1000]}])
+            job.refresh_from_db(fields=['errors'])
+
+    now = timezone.now()
+    job.status = status
+    job.finished_at = now
+    job.heartbeat_at = now
+    job.save(update_fields=['status', 'result', 'finished_at', 'heartbeat_at', 'updated_at'])
+    logger.info(
+        "Bulk job %s (%s) %s: %s items processed, %s failed",
+        job.pk, job.operation, status, job.processed_items, job.failed_items
+    )
+    return job
+
+
+def is_stalled(job, now=None):
+    """
+    Whether a pending or running job's worker has not reported for BULK_JOB_STALL_TIMEOUT seconds.
+    """
+    if job.status not in (JobStatus.PENDING, JobStatus.RUNNING):
+        return False
+    now = now or timezone.now()
+    last_seen = job.heartbeat_at or job.created_at
+    return last_seen < now - timedelta(seconds=settings.BULK_JOB_STALL_TIMEOUT)
+
+
+def cancel_job(job):
+    """
+    Cancel a job. A job that has not started is cancelled at once; a running
+    job stops before its next chunk.
+
+    Returns:
+        BulkJob: The updated job; unchanged if it had already finished
+    """
+    with transaction.atomic():
+        job = BulkJob.objects.select_for_update().get(pk=job.pk)
+        if job.is_finished:
+            return job
+        job.cancel_requested = True
+        if job.status == JobStatus.PENDING:
+            job.status = JobStatus.CANCELLED
+            job.finished_at = timezone.now()
+        job.save(update_fields=['cancel_requested', 'status', 'finished_at', 'updated_at'])
+    logger.info("Cancellation of bulk job %s requested", job.pk)
+    return job
+
+
+def resume_job(job):
+    """
+    Resume a failed, cancelled or stalled job: its failed chunks are reset
+    and the job is queued again to run them and any pending chunks.
+
+    Returns:
+        bool: Whether the job was queued
+    """
+    with transaction.atomic():
+        job = BulkJob.objects.select_for_update().get(pk=job.pk)
+        if job.status not in (JobStatus.FAILED, JobStatus.CANCELLED) and not is_stalled(job):
+            return False
+
+        failed = job.chunks.filter(status=JobStatus.FAILED)
+        failed_items = failed.aggregate(total=Coalesce(Sum('item_count'), 0))['total']
+        failed.update(status=JobStatus.PENDING, attempts=0, error='', finished_at=None)
+
+        BulkJob.objects.filter(pk=job.pk).update(
+            status=JobStatus.PENDING,
+            failed_chunks=0,
+            failed_items=F('failed_items') - failed_items,
+            cancel_requested=False,
+            task_id='',
+            finished_at=None,
+            heartbeat_at=timezone.now(),
+            updated_at=timezone.now(),
+        )
+        enqueue_job(job)
+    logger.info("Resumed bulk job %s", job.pk)
+    return True
+
+
+def resume_stalled_jobs():
+    """
+    Queue again the jobs whose worker stopped reporting progress, or whose
+    task was never queued.
+
+    Returns:
+        int: The number of jobs resumed
+    """
+    threshold = timezone.now() - timedelta(seconds=settings.BULK_JOB_STALL_TIMEOUT)
+    stalled = BulkJob.objects.filter(
+        Q(heartbeat_at__lt=threshold) | Q(heartbeat_at__isnull=True, created_at__lt=threshold),
+        status__in=[JobStatus.PENDING, JobStatus.RUNNING],
+    )
+    return sum(resume_job(job) for job in stalled)
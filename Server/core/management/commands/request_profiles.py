@@ -0,0 +1,51 @@
+"""
+Management command to list and summarize stored request profiles.
+
+Profiles are recorded by RequestProfilingMiddleware for staff requests
+carrying ``X-Profile: 1`` (see core.profiling).
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from core.profiling import get_profile_dir, list_profiles, prune_profiles, summarize_profile
+
+
+class Command(BaseCommand):
+    help = 'List stored request profiles, or summarize one (hottest functions and SQL timeline)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('profile_id', nargs='?', help='Profile to summarize (default: list profiles)')
+        parser.add_argument(
+            '--sort', default='cumulative',
+            help='pstats sort key for the summary: cumulative, tottime, ncalls... (default: cumulative)'
+        )
+        parser.add_argument('--limit', type=int, default=25, help='Functions and queries shown')
+        parser.add_argument('--prune', action='store_true', help='Apply the retention policy and exit')
+
+    def handle(self, *args, **options):
+        if options['prune']:
+            deleted = prune_profiles()
+            self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} profiles'))
+            return
+
+        if options['profile_id']:
+            try:
+                self.stdout.write(summarize_profile(
+                    options['profile_id'], limit=options['limit'], sort=options['sort']
+                ))
+            except (FileNotFoundError, ValueError) as e:
+                raise CommandError(f"Profile {options['profile_id']} not found: {str(e)}")
+            except KeyError as e:
+                raise CommandError(f"Unknown sort key {options['sort']!r}: {str(e)}")
+            return
+
+        profiles = list_profiles()
+        if not profiles:
+            self.stdout.write(f'No profiles in {get_profile_dir()}')
+            return
+        self.stdout.write(f"{'id':<32}{'status':>7}{'ms':>10}{'queries':>9}{'dup':>6}  request")
+        for profile in profiles[:options['limit']]:
+            self.stdout.write(
+                f"{profile['id']:<32}{profile['status_code']:>7}{profile['duration_ms']:>10.1f}"
+                f"{profile['query_count']:>9}{profile['duplicate_count']:>6}  "
+                f"{profile['method']} {profile['path']} ({profile['user']})"
+            )
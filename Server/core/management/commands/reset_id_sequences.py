@@ -0,0 +1,55 @@
+"""
+Management command to reset auto-increment ID sequences.
+
+Sequences are no longer reset after every delete; run this during maintenance
+windows when compact IDs are wanted, e.g. after large bulk deletes.
+"""
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models
+
+from core.utils import reset_id_sequence
+
+
+class Command(BaseCommand):
+    help = 'Reset ID sequences so that new rows continue after the highest existing ID'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'labels', nargs='*',
+            help='App labels or app_label.ModelName to reset (default: all local apps)'
+        )
+        parser.add_argument(
+            '--database', default='default',
+            help='Database alias to run against'
+        )
+
+    def get_models(self, labels):
+        if not labels:
+            return [
+                model for model in apps.get_models()
+                if model._meta.app_config.path.startswith(str(settings.BASE_DIR))
+            ]
+
+        selected = []
+        for label in labels:
+            try:
+                if '.' in label:
+                    selected.append(apps.get_model(label))
+                else:
+                    selected.extend(apps.get_app_config(label).get_models())
+            except LookupError as e:
+                raise CommandError(str(e))
+        return selected
+
+    def handle(self, *args, **options):
+        for model in self.get_models(options['labels']):
+            if model._meta.proxy or not model._meta.managed:
+                continue
+            if not isinstance(model._meta.pk, models.AutoField):
+                continue
+            next_id = reset_id_sequence(model, using=options['database'])
+            self.stdout.write(self.style.SUCCESS(
+                f'Reset sequence for {model._meta.db_table} (next id {next_id})'
+            ))
@@ -0,0 +1,208 @@
+"""
+Middleware for the ERP backend.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+from core.instrumentation import QueryRecorder
+from core.profiling import PROFILE_ID_HEADER, can_profile, profile_request, profiling_requested, save_profile
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - exercised only without brotli installed
+    brotli = None
+
+# Responses of other types (images, archives) are already compressed
+COMPRESSIBLE_CONTENT_TYPES = (
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'text/',
+)
+
+
+def parse_accept_encoding(header):
+    """
+    Parse an Accept-Encoding header into a mapping of coding to quality.
+    
+    Args:
+        header: The raw header value
+        
+    Returns:
+        dict: Content-coding names (lowercase) mapped to their q-values
+    """
+    codings = {}
+    for item in header.split(','):
+        parts = [part.strip() for part in item.split(';')]
+        coding = parts[0].lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in parts[1:]:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        codings[coding] = quality
+    return codings
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Compress large responses with brotli or gzip, negotiated via Accept-Encoding.
+    
+    Brotli is preferred when the client accepts it with at least the same
+    quality as gzip and the brotli package is installed; otherwise this behaves
+    like Django's GZipMiddleware (including its BREACH mitigation). Streaming
+    responses are only ever gzipped.
+    
+    Settings:
+        RESPONSE_COMPRESSION_MIN_SIZE: Smallest body, in bytes, worth compressing
+        RESPONSE_COMPRESSION_BROTLI_QUALITY: Brotli quality, 0-11
+    """
+    
+    def choose_encoding(self, request, streaming=False):
+        """
+        Pick the content-coding to use for a response.
+        
+        Returns:
+            str: 'br', 'gzip' or None
+        """
+        codings = parse_accept_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        wildcard = codings.get('*', 0.0)
+        gzip_q = codings.get('gzip', wildcard)
+        br_q = codings.get('br', wildcard) if brotli is not None and not streaming else 0.0
+        
+        if br_q > 0 and br_q >= gzip_q:
+            return 'br'
+        if gzip_q > 0:
+            return 'gzip'
+        return None
+    
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return response
+        
+        content_type = response.get('Content-Type', '')
+        if not content_type.startswith(COMPRESSIBLE_CONTENT_TYPES):
+            return response
+        
+        min_size = getattr(settings, 'RESPONSE_COMPRESSION_MIN_SIZE', 1024)
+        if not response.streaming and len(response.content) < min_size:
+            return response
+        
+        encoding = self.choose_encoding(request, streaming=response.streaming)
+        if encoding == 'gzip':
+            return super().process_response(request, response)
+        
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if encoding is None:
+            return response
+        
+        quality = getattr(settings, 'RESPONSE_COMPRESSION_BROTLI_QUALITY', 4)
+        compressed_content = brotli.compress(response.content, quality=quality)
+        if len(compressed_content) >= len(response.content):
+            return response
+        response.content = compressed_content
+        response.headers['Content-Length'] = str(len(response.content))
+        
+        # The body changed, so a strong ETag must become weak (RFC 9110 8.8.1)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Record the database queries of each request.
+    
+    Adds a Server-Timing header (``db`` with the query count, duplicates and
+    SQL time, ``app`` with the total time) that browser dev tools display, logs
+    a summary at DEBUG level and warns when a query shape repeats often enough
+    to suggest an N+1 query.
+    
+    Settings:
+        QUERY_INSTRUMENTATION_ENABLED: Install the middleware (defaults to DEBUG)
+        QUERY_INSTRUMENTATION_DUPLICATE_THRESHOLD: Repeats of one query shape that trigger the warning
+    """
+    
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_INSTRUMENTATION_ENABLED', settings.DEBUG):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.duplicate_threshold = getattr(settings, 'QUERY_INSTRUMENTATION_DUPLICATE_THRESHOLD', 5)
+    
+    def __call__(self, request):
+        started = time.perf_counter()
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - started) * 1000
+        
+        timing = (
+            f'db;dur={recorder.duration_ms:.1f};desc="{recorder.count} queries, '
+            f'{recorder.duplicate_count} duplicate", app;dur={total_ms:.1f}'
+        )
+        existing = response.get('Server-Timing')
+        response.headers['Server-Timing'] = f"{existing}, {timing}" if existing else timing
+        
+        logger.debug("%s %s: %s", request.method, request.path, recorder.summary())
+        repeated = {sql: count for sql, count in recorder.duplicates.items() if count >= self.duplicate_threshold}
+        if repeated:
+            sql, count = max(repeated.items(), key=lambda item: item[1])
+            logger.warning(
+                "Possible N+1 queries on %s %s: %sx %s (%s queries in total)",
+                request.method, request.path, count, sql, recorder.count
+            )
+        return response
+
+
+class RequestProfilingMiddleware:
+    """
+    Profile single requests on demand (see core.profiling).
+    
+    Requests carrying ``X-Profile: 1`` or ``?_profile=1`` are run under
+    cProfile with a SQL timeline. The profile is stored only for staff users,
+    whether authenticated by the session (checked before the view) or by DRF
+    (checked after it), and its ID is returned in the X-Profile-Id header.
+    Other requests pay one header lookup.
+    
+    Settings:
+        REQUEST_PROFILING_ENABLED: Install the middleware (off by default)
+    """
+    
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        if not profiling_requested(request):
+            return self.get_response(request)
+        
+        user = getattr(request, 'user', None)
+        if getattr(user, 'is_authenticated', False) and not can_profile(user):
+            return self.get_response(request)
+        
+        response, profiler, timeline, duration_ms = profile_request(self.get_response, request)
+        if not (can_profile(user) or can_profile(getattr(request, 'user', None))):
+            return response
+        
+        try:
+            profile_id = save_profile(profiler, timeline, request, response, duration_ms)
+        except OSError as e:
+            logger.error("Failed to store request profile for %s: %s", request.path, e)
+            return response
+        response.headers[PROFILE_ID_HEADER] = profile_id
+        logger.info("Stored request profile %s for %s %s (%.1fms)", profile_id, request.method, request.path, duration_ms)
+        return response
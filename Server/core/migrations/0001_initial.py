@@ -0,0 +1,174 @@
+# Generated by Django 4.2.20 on 2026-10-19 13:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BulkJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, editable=False
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("client_id", models.IntegerField(db_index=True)),
+                ("operation", models.CharField(max_length=64)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDING", "Pending"),
+                            ("RUNNING", "Running"),
+                            ("SUCCEEDED", "Succeeded"),
+                            ("FAILED", "Failed"),
+                            ("CANCELLED", "Cancelled"),
+                        ],
+                        db_index=True,
+                        default="PENDING",
+                        max_length=10,
+                    ),
+                ),
+                ("params", models.JSONField(blank=True, default=dict)),
+                (
+                    "idempotency_key",
+                    models.CharField(
+                        blank=True,
+                        help_text="Client-supplied key; a repeated request with the same key returns the existing job",
+                        max_length=100,
+                        null=True,
+                    ),
+                ),
+                ("total_chunks", models.PositiveIntegerField(blank=True, null=True)),
+                ("completed_chunks", models.PositiveIntegerField(default=0)),
+                ("failed_chunks", models.PositiveIntegerField(default=0)),
+                ("total_items", models.PositiveIntegerField(blank=True, null=True)),
+                ("processed_items", models.PositiveIntegerField(default=0)),
+                ("failed_items", models.PositiveIntegerField(default=0)),
+                ("result", models.JSONField(blank=True, null=True)),
+                (
+                    "errors",
+                    models.JSONField(
+                        blank=True,
+                        default=list,
+                        help_text="First errors reported by the job's chunks",
+                    ),
+                ),
+                ("cancel_requested", models.BooleanField(default=False)),
+                ("task_id", models.CharField(blank=True, max_length=255)),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "heartbeat_at",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="Last time a worker reported progress; used to find stalled jobs",
+                        null=True,
+                    ),
+                ),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        editable=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="bulk_jobs",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.CreateModel(
+            name="BulkJobChunk",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("index", models.PositiveIntegerField()),
+                ("payload", models.JSONField(default=dict)),
+                ("item_count", models.PositiveIntegerField(default=0)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDING", "Pending"),
+                            ("RUNNING", "Running"),
+                            ("SUCCEEDED", "Succeeded"),
+                            ("FAILED", "Failed"),
+                            ("CANCELLED", "Cancelled"),
+                        ],
+                        default="PENDING",
+                        max_length=10,
+                    ),
+                ),
+                ("attempts", models.PositiveSmallIntegerField(default=0)),
+                ("result", models.JSONField(blank=True, null=True)),
+                ("error", models.TextField(blank=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "job",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="chunks",
+                        to="core.bulkjob",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["job", "index"],
+                "unique_together": {("job", "index")},
+            },
+        ),
+        migrations.AddIndex(
+            model_name="bulkjob",
+            index=models.Index(
+                fields=["client_id", "-created_at"],
+                name="core_bulkjo_client__5c844c_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="bulkjob",
+            index=models.Index(
+                fields=["status", "heartbeat_at"], name="core_bulkjo_status_f32caf_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="bulkjob",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("idempotency_key__isnull", False)),
+                fields=("client_id", "idempotency_key"),
+                name="core_bulkjob_unique_idempotency_key",
+            ),
+        ),
+    ]
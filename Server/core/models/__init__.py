@@ -5,5 +5,6 @@ This package contains abstract base models and other model-related utilities
 that can be used throughout the application.
 """
 from core.models.base import TimestampedModel, AuditableModel, SoftDeleteModel
+from core.models.jobs import BulkJob, BulkJobChunk, JobStatus
 
-__all__ = ['TimestampedModel', 'AuditableModel', 'SoftDeleteModel']
+__all__ = ['TimestampedModel', 'AuditableModel', 'SoftDeleteModel', 'BulkJob', 'BulkJobChunk', 'JobStatus']
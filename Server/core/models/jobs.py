@@ -0,0 +1,120 @@
+"""
+Models tracking background bulk jobs (core.jobs).
+
+A BulkJob is one bulk operation requested by a client, e.g. a product import.
+Its work is split into BulkJobChunks when the job first runs; each chunk is
+processed and marked done in one transaction, so progress survives worker
+restarts and a resumed job continues with the chunks that are still pending.
+"""
+from django.db import models
+
+from core.models.base import TimestampedModel
+
+
+class JobStatus(models.TextChoices):
+    PENDING = 'PENDING', 'Pending'
+    RUNNING = 'RUNNING', 'Running'
+    SUCCEEDED = 'SUCCEEDED', 'Succeeded'
+    FAILED = 'FAILED', 'Failed'
+    CANCELLED = 'CANCELLED', 'Cancelled'
+
+
+FINISHED_STATUSES = (JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+
+class BulkJob(TimestampedModel):
+    """
+    A bulk operation run in the background, with its progress and result.
+    
+    Counters are updated as chunks finish: total_chunks and total_items are
+    set when the job is planned (null until then), processed_items counts the
+    items of succeeded chunks and failed_items the items that were rejected,
+    whether individually or as part of a failed chunk.
+    """
+    client_id = models.IntegerField(db_index=True)
+    operation = models.CharField(max_length=64)
+    status = models.CharField(max_length=10, choices=JobStatus.choices, default=JobStatus.PENDING, db_index=True)
+    params = models.JSONField(default=dict, blank=True)
+    idempotency_key = models.CharField(
+        max_length=100, blank=True, null=True,
+        help_text='Client-supplied key; a repeated request with the same key returns the existing job'
+    )
+    
+    total_chunks = models.PositiveIntegerField(null=True, blank=True)
+    completed_chunks = models.PositiveIntegerField(default=0)
+    failed_chunks = models.PositiveIntegerField(default=0)
+    total_items = models.PositiveIntegerField(null=True, blank=True)
+    processed_items = models.PositiveIntegerField(default=0)
+    failed_items = models.PositiveIntegerField(default=0)
+    
+    result = models.JSONField(null=True, blank=True)
+    errors = models.JSONField(default=list, blank=True, help_text='First errors reported by the job\'s chunks')
+    cancel_requested = models.BooleanField(default=False)
+    
+    task_id = models.CharField(max_length=255, blank=True)
+    created_by = models.ForeignKey(
+        'auth.User', on_delete=models.SET_NULL, null=True, blank=True, related_name='bulk_jobs', editable=False
+    )
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(
+        null=True, blank=True, help_text='Last time a worker reported progress; used to find stalled jobs'
+    )
+    
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['client_id', 'idempotency_key'],
+                condition=models.Q(idempotency_key__isnull=False),
+                name='core_bulkjob_unique_idempotency_key'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['client_id', '-created_at']),
+            models.Index(fields=['status', 'heartbeat_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.operation} #{self.pk} ({self.status})"
+    
+    @property
+    def is_finished(self):
+        return self.status in FINISHED_STATUSES
+    
+    @property
+    def percent_complete(self):
+        """
+        Share of chunks finished (succeeded or failed), from 0 to 100.
+        """
+        if self.status == JobStatus.SUCCEEDED:
+            return 100.0
+        if not self.total_chunks:
+            return 0.0
+        return round(100.0 * (self.completed_chunks + self.failed_chunks) / self.total_chunks, 1)
+
+
+class BulkJobChunk(models.Model):
+    """
+    One unit of work of a BulkJob: a slice of its items and how it went.
+    """
+    job = models.ForeignKey(BulkJob, on_delete=models.CASCADE, related_name='chunks')
+    index = models.PositiveIntegerField()
+    payload = models.JSONField(default=dict)
+    item_count = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=JobStatus.choices, default=JobStatus.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['job', 'index']
+        unique_together = [('job', 'index')]
+    
+    def __str__(self):
+        return f"Chunk {self.index} of job {self.job_id} ({self.status})"
+    
+    @property
+    def items(self):
+        return self.payload.get('items', [])
@@ -5,6 +5,8 @@ This module provides custom pagination classes that can be used with Django REST
 to customize the pagination behavior for API responses.
 """
 
+from django.core.paginator import InvalidPage
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 
@@ -41,3 +43,43 @@ class CustomPageNumberPagination(PageNumberPagination):
             'previous': self.get_previous_link(),
             'results': data
         })
+
+
+class AsyncPageNumberPagination(CustomPageNumberPagination):
+    """
+    CustomPageNumberPagination for async views.
+    
+    Counts and reads the page with the async ORM; the response envelope is the
+    one get_paginated_response() builds for the sync views.
+    
+    Example:
+        paginator = AsyncPageNumberPagination()
+        page = await paginator.apaginate_queryset(queryset, request)
+        data = paginator.get_paginated_response(serialize(page)).data
+    """
+    
+    async def apaginate_queryset(self, queryset, request):
+        """
+        Return the rows of the requested page.
+        
+        Args:
+            queryset: The filtered and ordered queryset
+            request: The DRF request
+            
+        Returns:
+            list: The rows of the page
+            
+        Raises:
+            NotFound: If the page number is invalid
+        """
+        self.request = request
+        paginator = self.django_paginator_class(queryset, self.get_page_size(request))
+        # Paginator.count is a cached property; filling it in keeps page() from counting synchronously
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        self.page.object_list = [row async for row in self.page.object_list]
+        return self.page.object_list
@@ -0,0 +1,295 @@
+"""
+Opt-in profiling of single requests.
+
+When REQUEST_PROFILING_ENABLED is set, a staff user can ask for a profile of
+one request with an ``X-Profile: 1`` header or a ``?_profile=1`` query
+parameter. ``core.middleware.RequestProfilingMiddleware`` then runs the
+request under cProfile while recording a SQL timeline (offset, duration and
+calling line of every query), and stores both under REQUEST_PROFILE_DIR:
+
+- ``<id>.prof``: cProfile statistics, readable with pstats or snakeviz
+- ``<id>.json``: request metadata, query summary and SQL timeline
+
+Profiles are pruned by count and age after each save. The
+``request_profiles`` management command lists and summarizes them.
+"""
+import cProfile
+import datetime
+import io
+import json
+import logging
+import os
+import pstats
+import re
+import sys
+import time
+import uuid
+
+from django.conf import settings
+
+from core.instrumentation import QueryRecorder
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_QUERY_PARAM = '_profile'
+PROFILE_ID_HEADER = 'X-Profile-Id'
+
+_TRUE_VALUES = ('1', 'true', 'yes', 'on')
+_PROFILE_ID = re.compile(r'^[\w-]+$')
+
+# Frames from these files are never reported as the source of a query
+_INTERNAL_FILES = (__file__, sys.modules[QueryRecorder.__module__].__file__)
+
+
+def get_profile_dir():
+    """
+    Return the directory holding request profiles.
+    """
+    return getattr(settings, 'REQUEST_PROFILE_DIR', None) or os.path.join(settings.BASE_DIR, 'logs', 'profiles')
+
+
+def profiling_requested(request):
+    """
+    Return whether a request asks to be profiled.
+    """
+    flag = request.META.get(PROFILE_HEADER) or request.GET.get(PROFILE_QUERY_PARAM) or ''
+    return flag.lower() in _TRUE_VALUES
+
+
+def can_profile(user):
+    """
+    Return whether a user may have requests profiled (staff only).
+    """
+    return bool(user is not None and getattr(user, 'is_authenticated', False) and getattr(user, 'is_staff', False))
+
+
+class SQLTimeline(QueryRecorder):
+    """
+    QueryRecorder that also keeps when each query ran and which project line issued it.
+    """
+
+    def __init__(self, using=None, max_queries=1000):
+        super().__init__(using=using)
+        self.max_queries = max_queries
+        self.timeline = []
+        self.origin = time.perf_counter()
+        self.base_dir = str(settings.BASE_DIR)
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        count = self.count
+        try:
+            return super().__call__(execute, sql, params, many, context)
+        finally:
+            if self.count > count and len(self.timeline) < self.max_queries:
+                self.timeline.append({
+                    'offset_ms': round((started - self.origin) * 1000, 3),
+                    'duration_ms': round((time.perf_counter() - started) * 1000, 3),
+                    'sql': sql[:2000],
+                    'source': self.find_source(),
+                })
+
+    def find_source(self):
+        """
+        Return "file:line in function" of the innermost project frame on the stack.
+        """
+        frame = sys._getframe(2)
+        while frame is not None:
+            filename = frame.f_code.co_filename
+            if (
+                filename.startswith(self.base_dir) and 'site-packages' not in filename
+                and filename not in _INTERNAL_FILES
+            ):
+                return f"{os.path.relpath(filename, self.base_dir)}:{frame.f_lineno} in {frame.f_code.co_name}"
+            frame = frame.f_back
+        return None
+
+
+def new_profile_id():
+    """
+    Return a new profile ID; IDs sort by creation time.
+    """
+    return f"{datetime.datetime.now(datetime.timezone.utc):%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}"
+
+
+def profile_paths(profile_id, directory=None):
+    """
+    Return the (stats, metadata) file paths of a profile.
+
+    Raises:
+        ValueError: If the ID is not a valid profile ID
+    """
+    if not _PROFILE_ID.match(profile_id or ''):
+        raise ValueError(f"Invalid profile ID: {profile_id!r}")
+    directory = directory or get_profile_dir()
+    return os.path.join(directory, f'{profile_id}.prof'), os.path.join(directory, f'{profile_id}.json')
+
+
+def profile_request(get_response, request):
+    """
+    Run a request under cProfile and a SQL timeline.
+
+    Returns:
+        tuple: (response, cProfile.Profile, SQLTimeline, duration in milliseconds)
+    """
+    profiler = cProfile.Profile()
+    timeline = SQLTimeline(max_queries=getattr(settings, 'REQUEST_PROFILE_MAX_QUERIES', 1000))
+    started = time.perf_counter()
+    with timeline:
+        profiler.enable()
+        try:
+            response = get_response(request)
+        finally:
+            profiler.disable()
+    return response, profiler, timeline, (time.perf_counter() - started) * 1000
+
+
+def save_profile(profiler, timeline, request, response, duration_ms, directory=None):
+    """
+    Store a request profile and apply the retention policy.
+
+    Returns:
+        str: The profile ID
+    """
+    directory = directory or get_profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    profile_id = new_profile_id()
+    stats_path, metadata_path = profile_paths(profile_id, directory)
+
+    profiler.dump_stats(stats_path)
+    user = getattr(request, 'user', None)
+    metadata = {
+        'id': profile_id,
+        'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'method': request.method,
+        'path': request.path,
+        'query_string': request.META.get('QUERY_STRING', ''),
+        'status_code': response.status_code,
+        'user': getattr(user, 'username', None),
+        'duration_ms': round(duration_ms, 3),
+        'query_count': timeline.count,
+        'query_duration_ms': round(timeline.duration_ms, 3),
+        'duplicate_count': timeline.duplicate_count,
+        'duplicates': timeline.duplicates,
+        'timeline': timeline.timeline,
+    }
+    with open(metadata_path, 'w') as f:
+        json.dump(metadata, f, indent=1)
+
+    prune_profiles(directory)
+    return profile_id
+
+
+def list_profiles(directory=None):
+    """
+    Return the metadata of the stored profiles, newest first.
+    """
+    directory = directory or get_profile_dir()
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, name)) as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError) as e:
+            logger.warning("Unreadable request profile %s: %s", name, e)
+    return profiles
+
+
+def load_profile(profile_id, directory=None):
+    """
+    Load a stored profile.
+
+    Returns:
+        tuple: (metadata dict, pstats.Stats)
+
+    Raises:
+        FileNotFoundError: If the profile does not exist
+    """
+    stats_path, metadata_path = profile_paths(profile_id, directory)
+    with open(metadata_path) as f:
+        metadata = json.load(f)
+    return metadata, pstats.Stats(stats_path, stream=io.StringIO())
+
+
+def summarize_profile(profile_id, limit=25, sort='cumulative', directory=None):
+    """
+    Describe a stored profile: request, hottest functions and SQL timeline.
+
+    Args:
+        profile_id: The profile ID
+        limit: Functions and queries listed
+        sort: pstats sort key ('cumulative', 'tottime', 'ncalls'...)
+        directory: Profile directory (REQUEST_PROFILE_DIR by default)
+
+    Returns:
+        str: The summary
+    """
+    metadata, stats = load_profile(profile_id, directory)
+    output = io.StringIO()
+    output.write(
+        f"{metadata['method']} {metadata['path']}"
+        f"{'?' + metadata['query_string'] if metadata['query_string'] else ''} -> {metadata['status_code']} "
+        f"in {metadata['duration_ms']:.1f}ms (user {metadata['user']}, {metadata['created_at']})\n"
+        f"SQL: {metadata['query_count']} queries ({metadata['duplicate_count']} duplicate) "
+        f"in {metadata['query_duration_ms']:.1f}ms\n\n"
+    )
+
+    stats.stream = output
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+
+    output.write("SQL timeline (offset, duration, source):\n")
+    for entry in metadata['timeline'][:limit]:
+        output.write(
+            f"  +{entry['offset_ms']:9.2f}ms {entry['duration_ms']:8.2f}ms  {entry['source'] or '-'}\n"
+            f"      {entry['sql'][:200]}\n"
+        )
+    if len(metadata['timeline']) > limit:
+        output.write(f"  ... {len(metadata['timeline']) - limit} more\n")
+    if metadata['duplicates']:
+        output.write("\nRepeated query shapes:\n")
+        for sql, count in sorted(metadata['duplicates'].items(), key=lambda item: -item[1])[:limit]:
+            output.write(f"  {count}x {sql[:200]}\n")
+    return output.getvalue()
+
+
+def prune_profiles(directory=None, max_files=None, max_age=None):
+    """
+    Delete profiles beyond the retention policy.
+
+    Args:
+        directory: Profile directory (REQUEST_PROFILE_DIR by default)
+        max_files: Profiles kept, newest first (REQUEST_PROFILE_MAX_FILES)
+        max_age: Age in seconds after which profiles are deleted (REQUEST_PROFILE_MAX_AGE)
+
+    Returns:
+        int: Number of profiles deleted
+    """
+    directory = directory or get_profile_dir()
+    max_files = getattr(settings, 'REQUEST_PROFILE_MAX_FILES', 200) if max_files is None else max_files
+    max_age = getattr(settings, 'REQUEST_PROFILE_MAX_AGE', 7 * 24 * 3600) if max_age is None else max_age
+    if not os.path.isdir(directory):
+        return 0
+
+    profile_ids = sorted(
+        {os.path.splitext(name)[0] for name in os.listdir(directory) if name.endswith(('.prof', '.json'))},
+        reverse=True
+    )
+    cutoff = time.time() - max_age
+    deleted = 0
+    for index, profile_id in enumerate(profile_ids):
+        paths = [path for path in profile_paths(profile_id, directory) if os.path.exists(path)]
+        expired = index >= max_files or any(os.path.getmtime(path) < cutoff for path in paths)
+        if not expired:
+            continue
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        deleted += 1
+    return deleted
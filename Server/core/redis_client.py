@@ -0,0 +1,738 @@
+"""
+Shared Redis access for the project.
+
+All direct Redis use (temporary upload metadata, cleanup indexes, tenant
+routing invalidation...) goes through ``get_redis()`` instead of building
+clients at import time:
+
+- Connection pools are created lazily, once per process and URL, and shared
+  by every caller. redis-py resets pools in forked children by itself.
+- ``pipeline()`` and ``transaction()`` batch commands into a single round trip.
+- Every command and pipeline is timed; ``get_command_metrics()`` returns
+  per-command counts and latencies and commands slower than
+  REDIS_SLOW_COMMAND_MS are logged.
+- With ``REDIS_CLIENT_BACKEND = 'memory'`` an in-process implementation
+  (``InMemoryRedis``) is used instead, for tests and local benchmarks without a
+  Redis server. It follows Redis semantics for the commands the project uses:
+  expiry, glob patterns, sorted sets, hashes, pipelines and pub/sub.
+"""
+import fnmatch
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+import redis
+from django.conf import settings
+from redis.client import Pipeline
+from redis.exceptions import ResponseError, WatchError
+
+logger = logging.getLogger(__name__)
+
+WRONGTYPE = 'WRONGTYPE Operation against a key holding the wrong kind of value'
+
+
+class CommandMetrics:
+    """
+    Per-command call counts and latencies, shared by all clients of a process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = defaultdict(lambda: {'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+
+    def record(self, command, elapsed_ms):
+        with self._lock:
+            stats = self._stats[command]
+            stats['calls'] += 1
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+
+    def snapshot(self):
+        """
+        Return {command: {'calls', 'total_ms', 'max_ms', 'avg_ms'}}.
+        """
+        with self._lock:
+            return {
+                command: dict(stats, avg_ms=stats['total_ms'] / stats['calls'])
+                for command, stats in self._stats.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+metrics = CommandMetrics()
+
+
+def record_command(command, started, detail=''):
+    """
+    Record the latency of a command started at ``started`` (perf_counter).
+    """
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    metrics.record(command, elapsed_ms)
+    if elapsed_ms >= getattr(settings, 'REDIS_SLOW_COMMAND_MS', 50):
+        logger.warning("Slow Redis command %s%s: %.1fms", command, detail, elapsed_ms)
+
+
+class InstrumentedPipeline(Pipeline):
+    """Pipeline recording the latency of each execute() as PIPELINE or MULTI."""
+
+    def execute(self, raise_on_error=True):
+        size = len(self.command_stack)
+        started = time.perf_counter()
+        try:
+            return super().execute(raise_on_error)
+        finally:
+            record_command('MULTI' if self.transaction else 'PIPELINE', started, f" ({size} commands)")
+
+
+class InstrumentedRedis(redis.Redis):
+    """Redis client recording the latency of every command."""
+
+    def execute_command(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            return super().execute_command(*args, **options)
+        finally:
+            record_command(str(args[0]).upper(), started)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+class InMemoryPubSub:
+    """
+    Subscriber side of InMemoryRedis pub/sub.
+    """
+
+    def __init__(self, server, ignore_subscribe_messages=False):
+        self._server = server
+        self._messages = queue.Queue()
+        self._ignore_subscribe_messages = ignore_subscribe_messages
+        self.channels = set()
+
+    def subscribe(self, *channels):
+        for channel in channels:
+            self.channels.add(channel)
+            self._server._subscribe(channel, self)
+            if not self._ignore_subscribe_messages:
+                self._messages.put({'type': 'subscribe', 'pattern': None, 'channel': channel, 'data': len(self.channels)})
+
+    def unsubscribe(self, *channels):
+        for channel in channels or list(self.channels):
+            self.channels.discard(channel)
+            self._server._unsubscribe(channel, self)
+
+    def deliver(self, channel, message):
+        self._messages.put({'type': 'message', 'pattern': None, 'channel': channel, 'data': message})
+
+    def get_message(self, ignore_subscribe_messages=False, timeout=0.0):
+        try:
+            return self._messages.get(timeout=timeout) if timeout else self._messages.get_nowait()
+        except queue.Empty:
+            return None
+
+    def listen(self):
+        while True:
+            yield self._messages.get()
+
+    def close(self):
+        self.unsubscribe()
+
+    reset = close
+
+
+class InMemoryPipeline:
+    """
+    Queues commands and runs them on an InMemoryRedis, atomically, on execute().
+    """
+
+    def __init__(self, server, transaction=True):
+        self._server = server
+        self.transaction = transaction
+        self.command_stack = []
+        # Like redis-py, commands run immediately between watch() and multi()
+        self._immediate = False
+
+    def __getattr__(self, name):
+        method = getattr(self._server, name)
+        if self._immediate:
+            return method
+
+        def queue_command(*args, **kwargs):
+            self.command_stack.append((method, args, kwargs))
+            return self
+        return queue_command
+
+    def __len__(self):
+        return len(self.command_stack)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.reset()
+
+    def watch(self, *names):
+        self._immediate = True
+
+    def multi(self):
+        self._immediate = False
+
+    def reset(self):
+        self.command_stack = []
+        self._immediate = False
+
+    def execute(self, raise_on_error=True):
+        results = []
+        with self._server._lock:
+            for method, args, kwargs in self.command_stack:
+                try:
+                    results.append(method(*args, **kwargs))
+                except ResponseError as e:
+                    if raise_on_error:
+                        self.reset()
+                        raise
+                    results.append(e)
+        self.reset()
+        return results
+
+
+class InMemoryRedis:
+    """
+    In-process Redis with ``decode_responses=True`` semantics.
+
+    Values are stored as strings like Redis stores them. Keys expire lazily on
+    access. Operations against a key of the wrong type raise ResponseError.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._data = {}
+        self._expiry = {}
+        self._subscribers = defaultdict(set)
+
+    # Internals
+
+    def _alive(self, name):
+        deadline = self._expiry.get(name)
+        if deadline is not None and time.monotonic() >= deadline:
+            self._data.pop(name, None)
+            self._expiry.pop(name, None)
+        return name in self._data
+
+    def _get(self, name, kind):
+        if not self._alive(name):
+            return None
+        stored_kind, value = self._data[name]
+        if stored_kind != kind:
+            raise ResponseError(WRONGTYPE)
+        return value
+
+    def _get_or_create(self, name, kind, factory):
+        value = self._get(name, kind)
+        if value is None:
+            value = factory()
+            self._data[name] = (kind, value)
+        return value
+
+    def _drop_if_empty(self, name):
+        if name in self._data and not self._data[name][1]:
+            self._data.pop(name, None)
+            self._expiry.pop(name, None)
+
+    @staticmethod
+    def _encode(value):
+        if isinstance(value, bytes):
+            return value.decode('utf-8')
+        return str(value)
+
+    @staticmethod
+    def _flatten(names):
+        flat = []
+        for name in names:
+            flat.extend(name if isinstance(name, (list, tuple, set)) else [name])
+        return flat
+
+    @staticmethod
+    def _score_bound(bound):
+        bound = str(bound)
+        exclusive = bound.startswith('(')
+        return float(bound[1:] if exclusive else bound), exclusive
+
+    # Connection
+
+    def ping(self):
+        return True
+
+    def close(self):
+        pass
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return InMemoryPipeline(self, transaction)
+
+    def transaction(self, func, *watches, **kwargs):
+        # Runs under the lock, so watched keys cannot change and WatchError never occurs
+        with self._lock:
+            pipe = self.pipeline()
+            if watches:
+                pipe.watch(*watches)
+            func_value = func(pipe)
+            results = pipe.execute()
+        return func_value if kwargs.get('value_from_callable', False) else results
+
+    def flushdb(self, asynchronous=False):
+        with self._lock:
+            self._data.clear()
+            self._expiry.clear()
+        return True
+
+    flushall = flushdb
+
+    def dbsize(self):
+        with self._lock:
+            return sum(1 for name in list(self._data) if self._alive(name))
+
+    # Keys
+
+    def delete(self, *names):
+        with self._lock:
+            deleted = 0
+            for name in self._flatten(names):
+                if self._alive(name):
+                    del self._data[name]
+                    self._expiry.pop(name, None)
+                    deleted += 1
+            return deleted
+
+    unlink = delete
+
+    def exists(self, *names):
+        with self._lock:
+            return sum(1 for name in self._flatten(names) if self._alive(name))
+
+    def type(self, name):
+        with self._lock:
+            return self._data[name][0] if self._alive(name) else 'none'
+
+    def expire(self, name, time_seconds):
+        if hasattr(time_seconds, 'total_seconds'):
+            time_seconds = time_seconds.total_seconds()
+        with self._lock:
+            if not self._alive(name):
+                return False
+            self._expiry[name] = time.monotonic() + float(time_seconds)
+            return True
+
+    def pexpire(self, name, time_ms):
+        return self.expire(name, float(time_ms) / 1000)
+
+    def persist(self, name):
+        with self._lock:
+            return self._alive(name) and self._expiry.pop(name, None) is not None
+
+    def ttl(self, name):
+        with self._lock:
+            if not self._alive(name):
+                return -2
+            if name not in self._expiry:
+                return -1
+            return max(0, round(self._expiry[name] - time.monotonic()))
+
+    def keys(self, pattern='*'):
+        with self._lock:
+            return [name for name in list(self._data) if self._alive(name) and fnmatch.fnmatchcase(name, pattern)]
+
+    def scan(self, cursor=0, match=None, count=None, _type=None):
+        names = self.keys(match or '*')
+        if _type is not None:
+            names = [name for name in names if self.type(name) == _type]
+        return 0, names
+
+    def scan_iter(self, match=None, count=None, _type=None):
+        yield from self.scan(match=match, _type=_type)[1]
+
+    # Strings
+
+    def get(self, name):
+        with self._lock:
+            return self._get(name, 'string')
+
+    def set(self, name, value, ex=None, px=None, nx=False, xx=False, keepttl=False, get=False):
+        with self._lock:
+            previous = self._get(name, 'string') if get else None
+            exists = self._alive(name)
+            if (nx and exists) or (xx and not exists):
+                return previous if get else None
+            self._data[name] = ('string', self._encode(value))
+            if not keepttl:
+                self._expiry.pop(name, None)
+            if ex is not None:
+                self.expire(name, ex)
+            elif px is not None:
+                self.pexpire(name, px)
+            return previous if get else True
+
+    def setex(self, name, time_seconds, value):
+        return self.set(name, value, ex=time_seconds)
+
+    def setnx(self, name, value):
+        return bool(self.set(name, value, nx=True))
+
+    def getdel(self, name):
+        with self._lock:
+            value = self._get(name, 'string')
+            self.delete(name)
+            return value
+
+    def mget(self, keys, *args):
+        with self._lock:
+            return [self._get(name, 'string') if self.type(name) == 'string' else None
+                    for name in self._flatten([keys, *args])]
+
+    def mset(self, mapping):
+        with self._lock:
+            for name, value in mapping.items():
+                self.set(name, value)
+            return True
+
+    def incrby(self, name, amount=1):
+        with self._lock:
+            value = self._get(name, 'string')
+            try:
+                value = int(value or 0) + int(amount)
+            except ValueError:
+                raise ResponseError('value is not an integer or out of range')
+            self._data[name] = ('string', str(value))
+            return value
+
+    incr = incrby
+
+    def decrby(self, name, amount=1):
+        return self.incrby(name, -amount)
+
+    decr = decrby
+
+    # Hashes
+
+    def hset(self, name, key=None, value=None, mapping=None, items=None):
+        with self._lock:
+            fields = self._get_or_create(name, 'hash', dict)
+            pairs = dict(mapping or {})
+            if key is not None:
+                pairs[key] = value
+            if items:
+                pairs.update(zip(items[::2], items[1::2]))
+            added = len(set(map(self._encode, pairs)) - set(fields))
+            fields.update({self._encode(k): self._encode(v) for k, v in pairs.items()})
+            return added
+
+    def hget(self, name, key):
+        with self._lock:
+            return (self._get(name, 'hash') or {}).get(self._encode(key))
+
+    def hmget(self, name, keys, *args):
+        with self._lock:
+            fields = self._get(name, 'hash') or {}
+            return [fields.get(self._encode(key)) for key in self._flatten([keys, *args])]
+
+    def hgetall(self, name):
+        with self._lock:
+            return dict(self._get(name, 'hash') or {})
+
+    def hdel(self, name, *keys):
+        with self._lock:
+            fields = self._get(name, 'hash') or {}
+            deleted = sum(fields.pop(self._encode(key), None) is not None for key in keys)
+            self._drop_if_empty(name)
+            return deleted
+
+    def hincrby(self, name, key, amount=1):
+        with self._lock:
+            fields = self._get_or_create(name, 'hash', dict)
+            value = int(fields.get(self._encode(key), 0)) + int(amount)
+            fields[self._encode(key)] = str(value)
+            return value
+
+    def hlen(self, name):
+        with self._lock:
+            return len(self._get(name, 'hash') or {})
+
+    # Sets
+
+    def sadd(self, name, *values):
+        with self._lock:
+            members = self._get_or_create(name, 'set', set)
+            values = {self._encode(value) for value in values}
+            added = len(values - members)
+            members.update(values)
+            return added
+
+    def srem(self, name, *values):
+        with self._lock:
+            members = self._get(name, 'set') or set()
+            removed = sum(self._encode(value) in members for value in values)
+            members.difference_update(self._encode(value) for value in values)
+            self._drop_if_empty(name)
+            return removed
+
+    def smembers(self, name):
+        with self._lock:
+            return set(self._get(name, 'set') or set())
+
+    def sismember(self, name, value):
+        with self._lock:
+            return self._encode(value) in (self._get(name, 'set') or set())
+
+    def scard(self, name):
+        with self._lock:
+            return len(self._get(name, 'set') or set())
+
+    # Lists
+
+    def rpush(self, name, *values):
+        with self._lock:
+            items = self._get_or_create(name, 'list', list)
+            items.extend(self._encode(value) for value in values)
+            return len(items)
+
+    def lpush(self, name, *values):
+        with self._lock:
+            items = self._get_or_create(name, 'list', list)
+            for value in values:
+                items.insert(0, self._encode(value))
+            return len(items)
+
+    def lrange(self, name, start, end):
+        with self._lock:
+            items = self._get(name, 'list') or []
+            end = len(items) if end == -1 else end + 1
+            return items[start:end]
+
+    def llen(self, name):
+        with self._lock:
+            return len(self._get(name, 'list') or [])
+
+    # Sorted sets
+
+    def zadd(self, name, mapping, nx=False, xx=False, ch=False, incr=False, gt=False, lt=False):
+        with self._lock:
+            members = self._get_or_create(name, 'zset', dict)
+            changed = added = 0
+            for member, score in mapping.items():
+                member, score = self._encode(member), float(score)
+                current = members.get(member)
+                if (nx and current is not None) or (xx and current is None):
+                    continue
+                if current is not None and ((gt and score <= current) or (lt and score >= current)):
+                    continue
+                if incr:
+                    score += current or 0
+                added += current is None
+                changed += current != score
+                members[member] = score
+            self._drop_if_empty(name)
+            return changed if ch else added
+
+    def zrem(self, name, *values):
+        with self._lock:
+            members = self._get(name, 'zset') or {}
+            removed = sum(members.pop(self._encode(value), None) is not None for value in values)
+            self._drop_if_empty(name)
+            return removed
+
+    def zscore(self, name, value):
+        with self._lock:
+            return (self._get(name, 'zset') or {}).get(self._encode(value))
+
+    def zcard(self, name):
+        with self._lock:
+            return len(self._get(name, 'zset') or {})
+
+    def _ordered(self, name):
+        members = self._get(name, 'zset') or {}
+        return sorted(members.items(), key=lambda item: (item[1], item[0]))
+
+    def _in_range(self, name, min, max):
+        (low, low_exclusive), (high, high_exclusive) = self._score_bound(min), self._score_bound(max)
+        return [
+            (member, score) for member, score in self._ordered(name)
+            if (score > low if low_exclusive else score >= low)
+            and (score < high if high_exclusive else score <= high)
+        ]
+
+    def zrangebyscore(self, name, min, max, start=None, num=None, withscores=False, score_cast_func=float):
+        with self._lock:
+            entries = self._in_range(name, min, max)
+            if start is not None and num is not None:
+                entries = entries[start:] if num < 0 else entries[start:start + num]
+            return [(member, score_cast_func(score)) for member, score in entries] if withscores else [
+                member for member, _ in entries
+            ]
+
+    def zcount(self, name, min, max):
+        with self._lock:
+            return len(self._in_range(name, min, max))
+
+    def zremrangebyscore(self, name, min, max):
+        with self._lock:
+            entries = self._in_range(name, min, max)
+            return self.zrem(name, *[member for member, _ in entries]) if entries else 0
+
+    def zrange(self, name, start, end, desc=False, withscores=False, score_cast_func=float):
+        with self._lock:
+            entries = self._ordered(name)
+            if desc:
+                entries.reverse()
+            end = len(entries) if end == -1 else end + 1
+            entries = entries[start:end]
+            return [(member, score_cast_func(score)) for member, score in entries] if withscores else [
+                member for member, _ in entries
+            ]
+
+    # Pub/sub
+
+    def pubsub(self, ignore_subscribe_messages=False, **kwargs):
+        return InMemoryPubSub(self, ignore_subscribe_messages=ignore_subscribe_messages)
+
+    def _subscribe(self, channel, pubsub):
+        with self._lock:
+            self._subscribers[channel].add(pubsub)
+
+    def _unsubscribe(self, channel, pubsub):
+        with self._lock:
+            self._subscribers[channel].discard(pubsub)
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscriber in subscribers:
+            subscriber.deliver(channel, self._encode(message))
+        return len(subscribers)
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_redis(url=None):
+    """
+    Return the shared Redis client for a URL (REDIS_URL by default).
+
+    Clients and their connection pools are created on first use and reused by
+    every caller in the process. Responses are decoded to str.
+
+    Args:
+        url: Redis URL, e.g. to reach a different database
+
+    Returns:
+        InstrumentedRedis, or InMemoryRedis if REDIS_CLIENT_BACKEND is 'memory'
+    """
+    backend = getattr(settings, 'REDIS_CLIENT_BACKEND', 'redis')
+    url = url or settings.REDIS_URL
+    key = (backend, url)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            if backend == 'memory':
+                client = InMemoryRedis()
+            else:
+                pool = redis.ConnectionPool.from_url(
+                    url,
+                    decode_responses=True,
+                    max_connections=getattr(settings, 'REDIS_MAX_CONNECTIONS', 50),
+                    socket_timeout=getattr(settings, 'REDIS_SOCKET_TIMEOUT', 5),
+                    socket_connect_timeout=getattr(settings, 'REDIS_SOCKET_TIMEOUT', 5),
+                    health_check_interval=30,
+                )
+                client = InstrumentedRedis(connection_pool=pool)
+            _clients[key] = client
+    return client
+
+
+def reset_redis():
+    """
+    Drop the shared clients, closing their pools (e.g. between tests).
+    """
+    with _clients_lock:
+        for client in _clients.values():
+            pool = getattr(client, 'connection_pool', None)
+            if pool is not None:
+                pool.disconnect()
+        _clients.clear()
+
+
+@contextmanager
+def pipeline(client=None, transaction=False):
+    """
+    Batch commands into one round trip, executed when the block exits without error.
+
+    Usage::
+
+        with pipeline() as pipe:
+            pipe.set(key, value, ex=ttl)
+            pipe.zadd(index, {member: score})
+
+    Args:
+        client: Client to use (the shared client by default)
+        transaction: Wrap the commands in MULTI/EXEC
+
+    Yields:
+        The pipeline; ``pipe.results`` holds the replies after the block
+    """
+    pipe = (client or get_redis()).pipeline(transaction=transaction)
+    try:
+        yield pipe
+        pipe.results = pipe.execute()
+    finally:
+        pipe.reset()
+
+
+def transaction(func, *watches, client=None, retries=10):
+    """
+    Run func(pipe) as an optimistic transaction, retrying when a watched key changes.
+
+    func may read the watched keys through the pipeline (immediate mode), then
+    call ``pipe.multi()`` and queue its writes.
+
+    Args:
+        func: Callable taking the pipeline; its return value is returned
+        watches: Keys to WATCH
+        client: Client to use (the shared client by default)
+        retries: Attempts before giving up
+
+    Returns:
+        The value returned by func
+
+    Raises:
+        WatchError: If the watched keys kept changing
+    """
+    client = client or get_redis()
+    for attempt in range(retries):
+        try:
+            return client.transaction(func, *watches, value_from_callable=True)
+        except WatchError:
+            logger.debug("Redis transaction on %s retried (%s/%s)", watches, attempt + 1, retries)
+    raise WatchError(f"Watched keys {watches} kept changing")
+
+
+def get_command_metrics():
+    """
+    Return per-command latency metrics for this process.
+
+    Returns:
+        dict: {command: {'calls', 'total_ms', 'max_ms', 'avg_ms'}}
+    """
+    return metrics.snapshot()
+
+
+def reset_command_metrics():
+    metrics.reset()
@@ -0,0 +1,473 @@
+"""
+Versioned reference-data snapshots.
+
+Units of measure, product statuses, currencies, countries, customer groups and
+selling channels change rarely but are read on nearly every admin screen. This
+module builds one snapshot payload per client, caches it in-process and in
+Redis, and bumps a version counter whenever any of the underlying models is
+written so that stale copies are never served.
+
+Versions are tracked as two counters: a global one for shared models
+(currencies, countries) and a per-client one for tenant models. The snapshot
+version, and therefore its ETag, is the pair of both.
+"""
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+from rest_framework import serializers
+
+from core.conditional import initial_counter
+from core.utils import get_request_client_id
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_VERSION_KEY = 'refdata:version:global'
+CLIENT_VERSION_KEY = 'refdata:version:client:{client_id}'
+SNAPSHOT_KEY = 'refdata:snapshot:{client_id}:{version}'
+
+SCOPE_GLOBAL = 'global'
+SCOPE_CLIENT = 'client'
+
+
+class ReferenceSection:
+    """
+    Description of one section of the reference-data snapshot.
+
+    Attributes:
+        key: Name of the section in the snapshot payload
+        model_label: Django model label, e.g. 'shared.Currency'
+        fields: Model fields exported for each row
+        scope: SCOPE_GLOBAL for shared models, SCOPE_CLIENT for tenant models
+        lookup_fields: Fields rows can be looked up by from serializers
+    """
+
+    def __init__(self, key, model_label, fields, scope, lookup_fields=('id',)):
+        self.key = key
+        self.model_label = model_label
+        self.fields = fields
+        self.scope = scope
+        self.lookup_fields = lookup_fields
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    def get_queryset(self, client_id):
+        queryset = self.model._default_manager.all()
+        if self.scope == SCOPE_CLIENT:
+            queryset = queryset.filter(client_id=client_id)
+        return queryset.order_by('id')
+
+
+SECTIONS = [
+    ReferenceSection(
+        'units_of_measure', 'products.UnitOfMeasure',
+        ['id', 'name', 'symbol', 'description', 'unit_type', 'associated_value', 'is_active'],
+        SCOPE_CLIENT,
+    ),
+    ReferenceSection(
+        'product_statuses', 'products.ProductStatus',
+        ['id', 'name', 'description', 'is_active', 'is_orderable'],
+        SCOPE_CLIENT,
+    ),
+    ReferenceSection(
+        'customer_groups', 'pricing.CustomerGroup',
+        ['id', 'name', 'code', 'description', 'is_active'],
+        SCOPE_CLIENT,
+    ),
+    ReferenceSection(
+        'selling_channels', 'pricing.SellingChannel',
+        ['id', 'name', 'code', 'description', 'is_active'],
+        SCOPE_CLIENT,
+    ),
+    ReferenceSection(
+        'currencies', 'shared.Currency',
+        ['id', 'code', 'name', 'symbol', 'exchange_rate_to_usd', 'is_active'],
+        SCOPE_GLOBAL,
+        lookup_fields=('id', 'code'),
+    ),
+    ReferenceSection(
+        'countries', 'shared.Country',
+        ['id', 'iso_code', 'iso_code_3', 'name', 'flag_url', 'phone_code', 'is_active'],
+        SCOPE_GLOBAL,
+        lookup_fields=('id', 'iso_code'),
+    ),
+]
+
+SECTIONS_BY_KEY = {section.key: section for section in SECTIONS}
+
+
+class _Snapshot:
+    """A built snapshot together with its lookup indexes."""
+
+    def __init__(self, version, payload):
+        self.version = version
+        self.payload = payload
+        self.indexes = {}
+        for section in SECTIONS:
+            rows = payload[section.key]
+            self.indexes[section.key] = {
+                field: {str(row[field]): row for row in rows if row.get(field) is not None}
+                for field in section.lookup_fields
+            }
+
+
+# Per-process snapshot cache: client_id -> _Snapshot, least recently used first
+_local_snapshots = OrderedDict()
+_local_lock = threading.Lock()
+
+
+def _get_cache():
+    return caches[getattr(settings, 'REFERENCE_DATA_CACHE_ALIAS', 'default')]
+
+
+def _local_cache_size():
+    return getattr(settings, 'REFERENCE_DATA_LOCAL_CACHE_SIZE', 64)
+
+
+def _snapshot_timeout():
+    return getattr(settings, 'REFERENCE_DATA_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+def get_version(client_id):
+    """
+    Get the current snapshot version for a client.
+
+    Args:
+        client_id (int): The client ID
+
+    Returns:
+        str: The snapshot version, or None if the cache is unavailable
+    """
+    cache = _get_cache()
+    client_key = CLIENT_VERSION_KEY.format(client_id=client_id)
+    try:
+        versions = cache.get_many([GLOBAL_VERSION_KEY, client_key])
+        for key in (GLOBAL_VERSION_KEY, client_key):
+            if key not in versions:
+                cache.add(key, initial_counter(), timeout=None)
+                versions[key] = cache.get(key)
+    except Exception as e:
+        logger.warning("Reference data version lookup failed: %s", e)
+        return None
+
+    return f"{versions[GLOBAL_VERSION_KEY]}.{versions[client_key]}"
+
+
+def bump_version(client_id=None):
+    """
+    Invalidate reference-data snapshots after a write.
+
+    Bulk writes that bypass model signals (``QuerySet.update()``, raw SQL) must
+    call this explicitly. Inside a transaction the bump waits for the commit,
+    so no snapshot of the uncommitted rows' predecessors is cached under the
+    new version.
+
+    Args:
+        client_id (int, optional): Client whose tenant data changed. When None,
+            the global version is bumped, invalidating every client's snapshot.
+    """
+    transaction.on_commit(lambda: _bump_version(client_id))
+
+
+def _bump_version(client_id):
+    key = GLOBAL_VERSION_KEY if client_id is None else CLIENT_VERSION_KEY.format(client_id=client_id)
+    cache = _get_cache()
+    try:
+        if not cache.add(key, initial_counter(), timeout=None):
+            cache.incr(key)
+    except Exception as e:
+        logger.warning("Failed to bump reference data version for %s: %s", key, e)
+
+    with _local_lock:
+        if client_id is None:
+            _local_snapshots.clear()
+        else:
+            _local_snapshots.pop(client_id, None)
+
+
+def _export_value(value):
+    # Decimals are exported as strings, matching DRF's DecimalField output
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def build_snapshot(client_id, version=None):
+    """
+    Build the reference-data payload for a client from the database.
+
+    Args:
+        client_id (int): The client ID
+        version (str, optional): The version this payload represents
+
+    Returns:
+        dict: The snapshot payload
+    """
+    payload = {
+        'version': version,
+        'generated_at': timezone.now().isoformat(),
+    }
+    for section in SECTIONS:
+        rows = section.get_queryset(client_id).values(*section.fields)
+        payload[section.key] = [
+            {field: _export_value(value) for field, value in row.items()}
+            for row in rows
+        ]
+    return payload
+
+
+def _remember(client_id, snapshot):
+    with _local_lock:
+        _local_snapshots[client_id] = snapshot
+        _local_snapshots.move_to_end(client_id)
+        while len(_local_snapshots) > _local_cache_size():
+            _local_snapshots.popitem(last=False)
+
+
+def _local_snapshot(client_id, version):
+    with _local_lock:
+        snapshot = _local_snapshots.get(client_id)
+        if snapshot is not None and snapshot.version == version:
+            _local_snapshots.move_to_end(client_id)
+            return snapshot
+    return None
+
+
+def _get_snapshot(client_id, version=None):
+    """
+    Get the snapshot for a client, consulting the process and Redis caches.
+
+    Returns:
+        _Snapshot: The snapshot, with version None if the cache is unavailable
+    """
+    if version is None:
+        version = get_version(client_id)
+
+    if version is None:
+        # Cache unavailable: serve straight from the database, never cache
+        return _Snapshot(None, build_snapshot(client_id))
+
+    snapshot = _local_snapshot(client_id, version)
+    if snapshot is not None:
+        return snapshot
+
+    cache = _get_cache()
+    cache_key = SNAPSHOT_KEY.format(client_id=client_id, version=version)
+    payload = None
+    try:
+        payload = cache.get(cache_key)
+    except Exception as e:
+        logger.warning("Reference data snapshot read failed: %s", e)
+
+    if payload is None:
+        payload = build_snapshot(client_id, version)
+        try:
+            cache.set(cache_key, payload, timeout=_snapshot_timeout())
+        except Exception as e:
+            logger.warning("Reference data snapshot write failed: %s", e)
+
+    snapshot = _Snapshot(version, payload)
+    _remember(client_id, snapshot)
+    return snapshot
+
+
+def get_snapshot(client_id, version=None):
+    """
+    Get the reference-data payload for a client.
+
+    Args:
+        client_id (int): The client ID
+        version (str, optional): A version already obtained from get_version()
+
+    Returns:
+        dict: The snapshot payload
+    """
+    return _get_snapshot(client_id, version).payload
+
+
+async def abuild_snapshot(client_id, version=None):
+    """
+    Async equivalent of build_snapshot(); the sections are queried together
+    through the async ORM.
+    """
+    async def export(section):
+        return [
+            {field: _export_value(value) for field, value in row.items()}
+            async for row in section.get_queryset(client_id).values(*section.fields)
+        ]
+
+    payload = {
+        'version': version,
+        'generated_at': timezone.now().isoformat(),
+    }
+    sections = await asyncio.gather(*(export(section) for section in SECTIONS))
+    payload.update(zip((section.key for section in SECTIONS), sections))
+    return payload
+
+
+async def aget_snapshot(client_id, version=None):
+    """
+    Async equivalent of get_snapshot() for async views.
+    """
+    if version is None:
+        version = await sync_to_async(get_version)(client_id)
+    if version is None:
+        return await abuild_snapshot(client_id)
+
+    snapshot = _local_snapshot(client_id, version)
+    if snapshot is not None:
+        return snapshot.payload
+
+    cache = _get_cache()
+    cache_key = SNAPSHOT_KEY.format(client_id=client_id, version=version)
+    payload = None
+    try:
+        payload = await cache.aget(cache_key)
+    except Exception as e:
+        logger.warning("Reference data snapshot read failed: %s", e)
+
+    if payload is None:
+        payload = await abuild_snapshot(client_id, version)
+        try:
+            await cache.aset(cache_key, payload, timeout=_snapshot_timeout())
+        except Exception as e:
+            logger.warning("Reference data snapshot write failed: %s", e)
+
+    _remember(client_id, _Snapshot(version, payload))
+    return payload
+
+
+def get_object(section_key, client_id, value, lookup_field='id'):
+    """
+    Resolve a reference-data row to an unsaved-looking model instance.
+
+    The instance is hydrated from the cached snapshot instead of the database,
+    so it only carries the fields exported in the snapshot (plus client_id for
+    tenant models). It is suitable for assigning to foreign keys and for the
+    simple nested serializers used in product responses.
+
+    Args:
+        section_key (str): Snapshot section, e.g. 'units_of_measure'
+        client_id (int): The client ID
+        value: The lookup value
+        lookup_field (str): Field to look up by; must be one of the section's
+            lookup_fields
+
+    Returns:
+        Model instance or None if no row matches
+    """
+    section = SECTIONS_BY_KEY[section_key]
+    snapshot = _get_snapshot(client_id)
+
+    if snapshot.version is None:
+        return section.get_queryset(client_id).filter(**{lookup_field: value}).first()
+
+    row = snapshot.indexes[section_key][lookup_field].get(str(value))
+    if row is None:
+        return None
+
+    model = section.model
+    attrs = {
+        field: model._meta.get_field(field).to_python(row[field])
+        for field in section.fields
+    }
+    if section.scope == SCOPE_CLIENT:
+        attrs['client_id'] = client_id
+    instance = model(**attrs)
+    instance._state.adding = False
+    return instance
+
+
+def clear_local_cache():
+    """Drop every snapshot held by this process."""
+    with _local_lock:
+        _local_snapshots.clear()
+
+
+def _handle_reference_write(sender, instance, **kwargs):
+    section = _sections_by_model.get(sender)
+    if section is None:
+        return
+    if section.scope == SCOPE_GLOBAL:
+        bump_version()
+    else:
+        bump_version(instance.client_id)
+
+
+_sections_by_model = {}
+
+
+def connect_signals():
+    """
+    Connect save/delete signals that bump snapshot versions.
+
+    Called from CoreConfig.ready().
+    """
+    for section in SECTIONS:
+        model = section.model
+        _sections_by_model[model] = section
+        post_save.connect(_handle_reference_write, sender=model, dispatch_uid=f'refdata_save_{section.key}')
+        post_delete.connect(_handle_reference_write, sender=model, dispatch_uid=f'refdata_delete_{section.key}')
+
+
+class ReferenceDataField(serializers.RelatedField):
+    """
+    Related field that resolves reference data from the cached snapshot.
+
+    Behaves like PrimaryKeyRelatedField (or SlugRelatedField when lookup_field
+    is not 'id'), but validating input does not query the database while the
+    snapshot is warm.
+
+    Example:
+        uom = ReferenceDataField('units_of_measure', required=False, allow_null=True)
+        currency_code = ReferenceDataField('currencies', lookup_field='code')
+    """
+    default_error_messages = {
+        'does_not_exist': 'Invalid {lookup_field} "{value}" - object does not exist.',
+        'incorrect_type': 'Incorrect type. Expected {lookup_field} value, received {data_type}.',
+    }
+
+    def __init__(self, section_key, lookup_field='id', **kwargs):
+        self.section_key = section_key
+        self.lookup_field = lookup_field
+        section = SECTIONS_BY_KEY[section_key]
+        if lookup_field not in section.lookup_fields:
+            raise ValueError(f"'{lookup_field}' is not a lookup field of reference section '{section_key}'")
+        if not kwargs.get('read_only'):
+            kwargs.setdefault('queryset', section.model._default_manager.all())
+        super().__init__(**kwargs)
+
+    def _get_client_id(self):
+        request = self.context.get('request')
+        return get_request_client_id(request)
+
+    def get_queryset(self):
+        section = SECTIONS_BY_KEY[self.section_key]
+        return section.get_queryset(self._get_client_id())
+
+    def use_pk_only_optimization(self):
+        return self.lookup_field == 'id'
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool) or not isinstance(data, (str, int)):
+            self.fail('incorrect_type', lookup_field=self.lookup_field, data_type=type(data).__name__)
+        instance = get_object(self.section_key, self._get_client_id(), data, self.lookup_field)
+        if instance is None:
+            self.fail('does_not_exist', lookup_field=self.lookup_field, value=data)
+        return instance
+
+    def to_representation(self, value):
+        if self.lookup_field == 'id':
+            return value.pk
+        return getattr(value, self.lookup_field)
@@ -0,0 +1,109 @@
+"""
+Renderers for the ERP backend API.
+
+FastJSONRenderer is a drop-in replacement for DRF's JSONRenderer that encodes
+with orjson when it is installed. orjson handles datetimes, dates, UUIDs and
+dict subclasses natively, which removes most of the per-value Python overhead
+of the stock encoder on large product pages.
+"""
+import datetime
+import decimal
+import logging
+
+from django.db.models.query import QuerySet
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson installed
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+ORJSON_OPTIONS = 0
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+def orjson_default(obj):
+    """
+    Encode values orjson does not support natively.
+    
+    Mirrors rest_framework.utils.encoders.JSONEncoder so that both renderers
+    produce the same document.
+    
+    Args:
+        obj: The value to encode
+        
+    Returns:
+        A JSON-compatible representation of obj
+        
+    Raises:
+        TypeError: If obj cannot be encoded
+    """
+    if isinstance(obj, Promise):
+        return force_str(obj)
+    elif isinstance(obj, decimal.Decimal):
+        # Serializers coerce decimals to strings by default; raw values become floats
+        return float(obj)
+    elif isinstance(obj, datetime.timedelta):
+        return str(obj.total_seconds())
+    elif isinstance(obj, QuerySet):
+        return list(obj)
+    elif isinstance(obj, bytes):
+        return obj.decode()
+    elif hasattr(obj, 'tolist'):
+        # Numpy arrays and array scalars
+        return obj.tolist()
+    elif hasattr(obj, '__getitem__'):
+        try:
+            return dict(obj)
+        except Exception:
+            pass
+    elif hasattr(obj, '__iter__'):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes with orjson when available.
+    
+    Falls back to the stock DRF encoder when orjson is not installed, when an
+    indent other than 2 is requested, or when orjson rejects the data (for
+    example integers wider than 64 bits).
+    """
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """
+        Render `data` into JSON, returning a bytestring.
+        """
+        if data is None:
+            return b''
+        
+        # orjson always emits compact UTF-8; other output styles use the stock encoder
+        if orjson is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        
+        renderer_context = renderer_context or {}
+        indent = self.get_indent(accepted_media_type, renderer_context)
+        
+        options = ORJSON_OPTIONS
+        if indent == 2:
+            options |= orjson.OPT_INDENT_2
+        elif indent is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        
+        try:
+            ret = orjson.dumps(data, default=orjson_default, option=options)
+        except orjson.JSONEncodeError as e:
+            logger.debug("orjson could not encode response, falling back to json: %s", e)
+            return super().render(data, accepted_media_type, renderer_context)
+        
+        # Match JSONRenderer: always escape \u2028 and \u2029 so the output is
+        # a strict javascript subset
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
@@ -0,0 +1,54 @@
+"""
+Serializers for the core app's API: background bulk jobs.
+"""
+from rest_framework import serializers
+
+from core.jobs import operation_names
+from core.models.jobs import BulkJob
+
+
+class BulkJobSerializer(serializers.ModelSerializer):
+    """
+    Serializer reporting a bulk job's status, progress and result.
+    """
+    progress = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = BulkJob
+        fields = [
+            'id', 'operation', 'status', 'progress', 'params', 'result', 'errors',
+            'cancel_requested', 'idempotency_key', 'created_at', 'started_at', 'finished_at', 'updated_at'
+        ]
+        read_only_fields = fields
+    
+    def get_progress(self, job):
+        return {
+            'percent': job.percent_complete,
+            'chunks': {
+                'total': job.total_chunks,
+                'completed': job.completed_chunks,
+                'failed': job.failed_chunks,
+            },
+            'items': {
+                'total': job.total_items,
+                'processed': job.processed_items,
+                'failed': job.failed_items,
+            },
+        }
+
+
+class BulkJobCreateSerializer(serializers.Serializer):
+    """
+    Serializer validating requests to start a bulk job.
+    
+    Expects {"operation": "products.delete", "params": {...}, "idempotency_key": "..."};
+    the parameters are validated by the operation.
+    """
+    operation = serializers.CharField(max_length=64)
+    params = serializers.DictField(required=False, default=dict)
+    idempotency_key = serializers.CharField(max_length=100, required=False)
+    
+    def validate_operation(self, value):
+        if value not in operation_names():
+            raise serializers.ValidationError(f'Unknown operation "{value}".')
+        return value
@@ -0,0 +1,126 @@
+"""
+Logging filters and formatters for structured, sampled logs.
+
+- ``SamplingFilter`` keeps a configurable fraction of DEBUG/INFO records per
+  logger (LOG_SAMPLING_RATES), so chatty hot paths can stay instrumented
+  without paying for every record. Warnings and errors are never sampled.
+  Records are dropped before they are formatted, so lazily formatted calls
+  (``logger.info("... %s", value)``) never render their arguments.
+- ``JSONFormatter`` writes one JSON object per record, including the fields
+  passed with ``extra=`` and the sample rate, for log pipelines that index
+  fields rather than grep messages.
+
+Both are wired into LOGGING in settings; LOG_FORMAT=json switches the
+handlers to JSON.
+"""
+import datetime
+import json
+import logging
+import random
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson installed
+    orjson = None
+
+# Attributes every LogRecord has; anything else came from ``extra=``
+RESERVED_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+def parse_sampling_rates(value):
+    """
+    Parse "logger=rate,..." (e.g. "products.views=0.1,assets=0.5") into a dict.
+
+    Raises:
+        ValueError: If an entry is malformed or a rate is outside [0, 1]
+    """
+    rates = {}
+    for entry in filter(None, (part.strip() for part in (value or '').split(','))):
+        name, _, rate = entry.partition('=')
+        rate = float(rate)
+        if not 0 <= rate <= 1:
+            raise ValueError(f"Sampling rate for {name!r} must be between 0 and 1")
+        rates[name.strip()] = rate
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep a fraction of the records at or below max_level, per logger.
+
+    Rates apply to a logger and its children; the most specific configured
+    name wins (``products.views`` over ``products``). Loggers without a rate
+    keep every record.
+
+    Args:
+        rates: {logger name: fraction of records kept}
+        max_level: Most severe level that may be sampled (INFO by default)
+    """
+
+    def __init__(self, rates=None, max_level=logging.INFO, name=''):
+        super().__init__(name)
+        self.rates = dict(rates or {})
+        self.max_level = max_level if isinstance(max_level, int) else logging.getLevelName(max_level)
+        self._resolved = {}
+
+    def rate_for(self, logger_name):
+        """
+        Return the sampling rate of a logger.
+        """
+        rate = self._resolved.get(logger_name)
+        if rate is None:
+            rate, name = 1.0, logger_name
+            while True:
+                if name in self.rates:
+                    rate = self.rates[name]
+                    break
+                if '.' not in name:
+                    break
+                name = name.rsplit('.', 1)[0]
+            self._resolved[logger_name] = rate
+        return rate
+
+    def filter(self, record):
+        if record.levelno > self.max_level:
+            return True
+        rate = self.rate_for(record.name)
+        if rate >= 1:
+            return True
+        if rate <= 0 or random.random() >= rate:
+            return False
+        record.sample_rate = rate
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Format records as single-line JSON objects.
+
+    Output keys: timestamp, level, logger, message, module, line, process,
+    thread, the record's ``extra`` fields and, for exceptions, exception.
+    """
+
+    def format(self, record):
+        entry = {
+            'timestamp': datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(
+                timespec='milliseconds'
+            ),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'line': record.lineno,
+            'process': record.process,
+            'thread': record.thread,
+        }
+        for key, value in vars(record).items():
+            if key not in RESERVED_ATTRS and key not in entry:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+
+        if orjson is not None:
+            return orjson.dumps(entry, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+        return json.dumps(entry, default=str)
@@ -0,0 +1,47 @@
+"""
+Celery tasks for the core app: running and resuming background bulk jobs.
+"""
+import logging
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, acks_late=True, max_retries=None)
+def run_bulk_job(self, job_id):
+    """
+    Run the pending chunks of a bulk job (see core.jobs).
+    
+    Acknowledged late, so a job whose worker died is redelivered; chunks that
+    were already committed are skipped. Chunks failing with transient errors
+    are retried by retrying this task, which core.jobs limits per chunk.
+    
+    Args:
+        job_id: ID of the BulkJob
+        
+    Returns:
+        dict: The job ID and its status
+    """
+    from core.jobs import RetryChunk, execute_job
+    
+    try:
+        job = execute_job(job_id, task_id=self.request.id or '')
+    except RetryChunk as retry:
+        raise self.retry(countdown=retry.countdown)
+    return {'job_id': job_id, 'status': job.status if job else None}
+
+
+@shared_task
+def resume_stalled_bulk_jobs():
+    """
+    Queue again bulk jobs whose worker stopped reporting progress.
+    
+    Returns:
+        dict: The number of jobs resumed
+    """
+    from core.jobs import resume_stalled_jobs
+    
+    resumed = resume_stalled_jobs()
+    if resumed:
+        logger.info("Resumed %s stalled bulk jobs", resumed)
+    return {'resumed': resumed}
@@ -0,0 +1,80 @@
+"""
+Test helpers.
+
+``query_budget`` fails a test when the code under it runs more queries (or
+more repeated query shapes) than allowed, printing the offending queries.
+Budgets are meant to be fixed numbers checked against several rows, so that
+a query issued once per row breaks them::
+
+    def test_list_budget(self):
+        with query_budget(8, max_duplicates=0):
+            self.client.get(url)
+
+or, for an endpoint, ``assert_endpoint_budget(client, url, 8)``. Both work
+in Django TestCases and plain pytest tests alike.
+"""
+from contextlib import contextmanager
+
+from core.instrumentation import QueryRecorder
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a block runs more queries than its budget allows."""
+
+
+@contextmanager
+def query_budget(max_queries, max_duplicates=None, using=None, label='block'):
+    """
+    Enforce a query budget on a block of code.
+
+    Args:
+        max_queries: Maximum number of queries
+        max_duplicates: Maximum number of queries repeating an earlier query
+            shape (None to only check the total)
+        using: Database alias to watch (all by default)
+        label: Name of the checked code in the failure message
+
+    Yields:
+        QueryRecorder: The recorder, for further assertions
+
+    Raises:
+        QueryBudgetExceeded: If the budget is exceeded
+    """
+    with QueryRecorder(using=using, keep_queries=True) as recorder:
+        yield recorder
+
+    problems = []
+    if recorder.count > max_queries:
+        problems.append(f"{recorder.count} queries, budget is {max_queries}")
+    if max_duplicates is not None and recorder.duplicate_count > max_duplicates:
+        problems.append(f"{recorder.duplicate_count} duplicate queries, budget is {max_duplicates}")
+    if problems:
+        queries = '\n'.join(f"  {index}. {sql}" for index, (sql, _) in enumerate(recorder.queries, 1))
+        raise QueryBudgetExceeded(
+            f"Query budget exceeded for {label}: {'; '.join(problems)}\n"
+            f"{recorder.summary()}\nQueries:\n{queries}"
+        )
+
+
+def assert_endpoint_budget(client, url, max_queries, max_duplicates=0, method='get', status_code=200, **kwargs):
+    """
+    Request an endpoint and enforce its query budget.
+
+    Args:
+        client: Django or DRF test client
+        url: URL to request
+        max_queries: Maximum number of queries for the request
+        max_duplicates: Maximum number of repeated query shapes
+        method: HTTP method
+        status_code: Expected response status
+        **kwargs: Passed on to the client method
+
+    Returns:
+        The response
+    """
+    with query_budget(max_queries, max_duplicates, label=f"{method.upper()} {url}"):
+        response = getattr(client, method)(url, **kwargs)
+    assert response.status_code == status_code, (
+        f"{method.upper()} {url} returned {response.status_code}, expected {status_code}"
+    )
+    return response
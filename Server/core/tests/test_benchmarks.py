@@ -0,0 +1,94 @@
+"""
+Tests for the benchmark suite and baseline comparison.
+"""
+import asyncio
+import json
+import os
+import tempfile
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from benchmarks import bench_api, bench_asgi
+from benchmarks.baseline import compare, format_report, load_baseline, save_baseline
+from products.models import Product
+from products.synthetic import CatalogSpec, generate_catalog
+from tenants.models import Domain, Tenant
+
+
+class BaselineTests(SimpleTestCase):
+    def test_compare_flags_slowdowns_and_extra_queries(self):
+        baseline = {
+            'list': {'median_ms': 10.0, 'queries': 8},
+            'detail': {'median_ms': 10.0, 'queries': 7},
+            'search': {'median_ms': 10.0, 'queries': 8},
+            'gone': {'median_ms': 1.0, 'queries': 1},
+        }
+        current = {
+            'list': {'median_ms': 12.0, 'queries': 8},
+            'detail': {'median_ms': 10.5, 'queries': 9},
+            'search': {'median_ms': 5.0, 'queries': 8},
+            'new': {'median_ms': 1.0, 'queries': 1},
+        }
+
+        statuses = {row['scenario']: row['status'] for row in compare(baseline, current, threshold=0.1)}
+
+        self.assertEqual(statuses, {
+            'list': 'regression', 'detail': 'regression', 'search': 'improvement',
+            'gone': 'missing', 'new': 'new',
+        })
+        report = format_report(compare(baseline, current))
+        self.assertIn('+20.0%', report)
+        self.assertIn('7->9', report)
+        self.assertTrue(report.endswith('2 regression(s)'))
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'baselines', 'main.json')
+            save_baseline(path, {'list': {'median_ms': 1.5}}, {'revision': 'abc'})
+
+            self.assertEqual(load_baseline(path)['results'], {'list': {'median_ms': 1.5}})
+            with open(path) as f:
+                self.assertEqual(json.load(f)['metadata'], {'revision': 'abc'})
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench-tests'}},
+    REDIS_CLIENT_BACKEND='memory',
+)
+class BenchApiTests(TestCase):
+    def test_runs_every_scenario_and_rolls_back_writes(self):
+        caches['default'].clear()
+        tenant = Tenant.objects.create(name='Bench', schema_name='bench', client_id=1000)
+        Domain.objects.create(domain='bench.localhost', tenant=tenant)
+        generate_catalog(tenant.client_id, CatalogSpec(products=30, variants=40, variants_per_product=4, attributes=6))
+        products = Product.objects.count()
+
+        results, context = bench_api.run(tenant.id, repeat=2, import_size=10)
+
+        self.assertEqual(context.host, 'bench.localhost')
+        self.assertEqual(context.client_id, 1000)
+        self.assertEqual(set(results), set(bench_api.SCENARIOS))
+        for result in results.values():
+            self.assertGreater(result['queries'], 0)
+            self.assertLessEqual(result['min_ms'], result['median_ms'])
+        self.assertEqual(Product.objects.count(), products)
+
+
+class BenchAsgiTests(SimpleTestCase):
+    def test_run_level_counts_requests_and_errors(self):
+        paths = []
+
+        async def application(scope, receive, send):
+            paths.append(scope['path'])
+            status = 404 if scope['path'] == '/missing/' else 200
+            await send({'type': 'http.response.start', 'status': status, 'headers': []})
+            await send({'type': 'http.response.body', 'body': b''})
+
+        result = asyncio.run(bench_asgi.run_level(application, ['/ok/', '/missing/'], 'localhost', 3, 10))
+
+        self.assertEqual(len(paths), 10)
+        self.assertEqual(paths.count('/missing/'), 5)
+        self.assertEqual((result['requests'], result['concurrency'], result['errors']), (10, 3, 5))
+        self.assertGreater(result['throughput_rps'], 0)
+        self.assertLessEqual(result['median_ms'], result['p95_ms'])
@@ -0,0 +1,81 @@
+"""
+Tests for query instrumentation, the Server-Timing middleware and query budgets.
+"""
+from django.contrib.auth import get_user_model
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from core.instrumentation import QueryRecorder, fingerprint
+from core.middleware import QueryInstrumentationMiddleware
+from core.testing import QueryBudgetExceeded, query_budget
+
+User = get_user_model()
+
+
+class FingerprintTests(TestCase):
+    def test_literals_and_in_lists_are_collapsed(self):
+        self.assertEqual(
+            fingerprint("SELECT *  FROM t\n WHERE id = 42 AND name = 'it''s' AND x IN (1, 2, 3)"),
+            'SELECT * FROM t WHERE id = ? AND name = ? AND x IN (...)',
+        )
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id IN (%s, %s)'),
+            fingerprint('SELECT * FROM t WHERE id IN (%s)'),
+        )
+
+    def test_identifiers_with_digits_are_kept(self):
+        self.assertEqual(fingerprint('SELECT "t1"."col2" FROM t1'), 'SELECT "t1"."col2" FROM t1')
+
+
+class QueryRecorderTests(TestCase):
+    def test_counts_queries_and_duplicates(self):
+        users = [User.objects.create(username=f'user{index}') for index in range(3)]
+
+        with QueryRecorder(keep_queries=True) as recorder:
+            for user in users:
+                User.objects.get(pk=user.pk)
+            User.objects.count()
+
+        self.assertEqual(recorder.count, 4)
+        self.assertEqual(recorder.duplicate_count, 2)
+        self.assertEqual(list(recorder.duplicates.values()), [3])
+        self.assertEqual(len(recorder.queries), 4)
+        self.assertIn('3x SELECT', recorder.summary())
+
+    def test_query_budget(self):
+        with query_budget(1, max_duplicates=0) as recorder:
+            User.objects.count()
+        self.assertEqual(recorder.count, 1)
+
+        with self.assertRaisesMessage(QueryBudgetExceeded, '2 queries, budget is 1'):
+            with query_budget(1, label='two counts'):
+                User.objects.count()
+                User.objects.count()
+
+
+class QueryInstrumentationMiddlewareTests(TestCase):
+    def view(self, request):
+        for _ in range(3):
+            User.objects.count()
+        response = HttpResponse('ok')
+        response['Server-Timing'] = 'cache;desc="hit"'
+        return response
+
+    @override_settings(QUERY_INSTRUMENTATION_ENABLED=True, QUERY_INSTRUMENTATION_DUPLICATE_THRESHOLD=3)
+    def test_adds_server_timing_and_warns_about_repeated_queries(self):
+        middleware = QueryInstrumentationMiddleware(self.view)
+
+        with self.assertLogs('core.middleware', 'WARNING') as logs:
+            response = middleware(RequestFactory().get('/api/things/'))
+
+        timing = response['Server-Timing']
+        self.assertTrue(timing.startswith('cache;desc="hit", db;dur='))
+        self.assertIn('desc="3 queries, 2 duplicate"', timing)
+        self.assertIn('app;dur=', timing)
+        self.assertIn('Possible N+1 queries on GET /api/things/: 3x', logs.output[0])
+
+    @override_settings(QUERY_INSTRUMENTATION_ENABLED=False)
+    def test_disabled(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            QueryInstrumentationMiddleware(self.view)
@@ -0,0 +1,297 @@
+"""
+Tests for background bulk jobs (core.jobs).
+"""
+from datetime import timedelta
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.test import APIClient
+
+from core import jobs
+from core.jobs import (
+    JobOperation, RetryChunk, cancel_job, create_job, execute_job, merge_results, resume_job, resume_stalled_jobs
+)
+from core.models.jobs import BulkJob, BulkJobChunk, JobStatus
+
+
+class SumOperation(JobOperation):
+    """
+    Test operation summing numbers; negative numbers are rejected one by one,
+    and chunks containing 'fail' or 'flaky' raise.
+    """
+    name = 'tests.sum'
+    chunk_size = 2
+    calls = []
+    flaky_failures = 0
+
+    def validate(self, params, client_id):
+        if not isinstance(params.get('numbers'), list):
+            raise serializers.ValidationError({'numbers': ['A list is required.']})
+        return params
+
+    def get_items(self, job):
+        return job.params['numbers']
+
+    def process_chunk(self, job, chunk):
+        SumOperation.calls.append(chunk.index)
+        if 'fail' in chunk.items:
+            raise ValueError('broken chunk')
+        if 'flaky' in chunk.items and SumOperation.flaky_failures:
+            SumOperation.flaky_failures -= 1
+            raise OperationalError('connection lost')
+        numbers = [item for item in chunk.items if isinstance(item, int)]
+        rejected = [number for number in numbers if number < 0]
+        return {
+            'total': sum(number for number in numbers if number >= 0),
+            'failed': len(rejected),
+            'errors': [{'number': number} for number in rejected],
+        }
+
+
+@override_settings(BULK_JOB_MAX_RETRIES=2, BULK_JOB_RETRY_DELAY=5, BULK_JOB_STALL_TIMEOUT=600, BULK_JOB_MAX_ERRORS=3)
+class BulkJobTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(jobs._operations, {'tests.sum': SumOperation()})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        SumOperation.calls = []
+        SumOperation.flaky_failures = 0
+
+    def create(self, numbers, **kwargs):
+        with mock.patch('core.tasks.run_bulk_job.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                job, created = create_job(1, 'tests.sum', {'numbers': numbers}, **kwargs)
+        return job, created, delay
+
+    def test_create_job_queues_task_after_commit(self):
+        job, created, delay = self.create([1, 2])
+
+        self.assertTrue(created)
+        self.assertEqual(job.status, JobStatus.PENDING)
+        delay.assert_called_once_with(job.pk)
+
+    def test_create_job_validates_operation_and_params(self):
+        with self.assertRaises(serializers.ValidationError):
+            create_job(1, 'tests.unknown', {})
+        with self.assertRaises(serializers.ValidationError):
+            create_job(1, 'tests.sum', {'numbers': 'many'})
+        self.assertFalse(BulkJob.objects.exists())
+
+    def test_idempotency_key_returns_existing_job(self):
+        job, _, _ = self.create([1], idempotency_key='abc')
+        again, created, delay = self.create([1, 2, 3], idempotency_key='abc')
+
+        self.assertFalse(created)
+        self.assertEqual(again.pk, job.pk)
+        delay.assert_not_called()
+        with mock.patch.dict(jobs._operations, {'tests.other': SumOperation()}):
+            with self.assertRaises(serializers.ValidationError):
+                create_job(1, 'tests.other', {'numbers': []}, idempotency_key='abc')
+
+    def test_executes_chunks_and_tracks_progress(self):
+        job, _, _ = self.create([1, 2, 3, 4, 5])
+
+        job = execute_job(job.pk, task_id='task-1')
+
+        self.assertEqual(job.status, JobStatus.SUCCEEDED)
+        self.assertEqual((job.total_chunks, job.completed_chunks, job.failed_chunks), (3, 3, 0))
+        self.assertEqual((job.total_items, job.processed_items, job.failed_items), (5, 5, 0))
+        self.assertEqual(job.result, {'total': 15, 'failed': 0})
+        self.assertEqual(job.percent_complete, 100.0)
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(SumOperation.calls, [0, 1, 2])
+
+    def test_finished_chunks_are_not_run_again(self):
+        job, _, _ = self.create([1, 2, 3])
+        execute_job(job.pk)
+        BulkJob.objects.filter(pk=job.pk).update(status=JobStatus.RUNNING, task_id='')
+
+        job = execute_job(job.pk)
+
+        self.assertEqual(SumOperation.calls, [0, 1])
+        self.assertEqual(job.status, JobStatus.SUCCEEDED)
+        self.assertEqual(job.result['total'], 6)
+
+    def test_job_running_in_another_task_is_left_alone(self):
+        job, _, _ = self.create([1])
+        BulkJob.objects.filter(pk=job.pk).update(
+            status=JobStatus.RUNNING, task_id='task-1', heartbeat_at=timezone.now()
+        )
+
+        self.assertEqual(execute_job(job.pk, task_id='task-2').status, JobStatus.RUNNING)
+        self.assertEqual(SumOperation.calls, [])
+        self.assertEqual(execute_job(job.pk, task_id='task-1').status, JobStatus.SUCCEEDED)
+
+    def test_item_failures_are_counted_and_errors_capped(self):
+        job, _, _ = self.create([-1, -2, 3, -4, -5])
+
+        job = execute_job(job.pk)
+
+        self.assertEqual(job.status, JobStatus.SUCCEEDED)
+        self.assertEqual((job.processed_items, job.failed_items), (5, 4))
+        self.assertEqual(job.errors, [{'number': -1}, {'number': -2}, {'number': -4}])
+        self.assertEqual(job.result, {'total': 3, 'failed': 4})
+
+    def test_failed_chunk_fails_job_and_resume_reruns_it(self):
+        job, _, _ = self.create([1, 'fail', 3, 4])
+
+        job = execute_job(job.pk)
+
+        self.assertEqual(job.status, JobStatus.FAILED)
+        self.assertEqual((job.completed_chunks, job.failed_chunks, job.failed_items), (1, 1, 2))
+        self.assertEqual(job.errors, [{'chunk': 0, 'error': 'broken chunk'}])
+        self.assertEqual(job.result, {'total': 7, 'failed': 0})
+
+        BulkJobChunk.objects.filter(job=job, index=0).update(payload={'items': [1, 2]})
+        with mock.patch('core.tasks.run_bulk_job.delay') as delay, self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(resume_job(job))
+        delay.assert_called_once_with(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.failed_chunks, job.failed_items), (JobStatus.PENDING, 0, 0))
+
+        SumOperation.calls = []
+        job = execute_job(job.pk)
+        self.assertEqual(SumOperation.calls, [0])
+        self.assertEqual(job.status, JobStatus.SUCCEEDED)
+        self.assertEqual(job.result['total'], 10)
+        self.assertFalse(resume_job(job))
+
+    def test_transient_errors_are_retried_with_backoff(self):
+        SumOperation.flaky_failures = 2
+        job, _, _ = self.create([1, 2, 'flaky'])
+
+        with self.assertRaises(RetryChunk) as first:
+            execute_job(job.pk, task_id='task-1')
+        with self.assertRaises(RetryChunk) as second:
+            execute_job(job.pk, task_id='task-1')
+        job = execute_job(job.pk, task_id='task-1')
+
+        self.assertEqual((first.exception.countdown, second.exception.countdown), (5, 10))
+        self.assertEqual(job.status, JobStatus.SUCCEEDED)
+        self.assertEqual(job.chunks.get(index=1).attempts, 3)
+
+    def test_chunk_fails_after_max_retries(self):
+        SumOperation.flaky_failures = 10
+        job, _, _ = self.create(['flaky'])
+
+        for _ in range(2):
+            with self.assertRaises(RetryChunk):
+                execute_job(job.pk, task_id='task-1')
+        job = execute_job(job.pk, task_id='task-1')
+
+        self.assertEqual(job.status, JobStatus.FAILED)
+        self.assertEqual(job.errors[0]['error'], 'connection lost')
+
+    def test_cancel_pending_job(self):
+        job, _, _ = self.create([1, 2])
+
+        job = cancel_job(job)
+
+        self.assertEqual(job.status, JobStatus.CANCELLED)
+        self.assertEqual(execute_job(job.pk).status, JobStatus.CANCELLED)
+        self.assertEqual(SumOperation.calls, [])
+
+    def test_cancel_running_job_stops_before_next_chunk(self):
+        job, _, _ = self.create([1, 2, 3, 4])
+        original = SumOperation.process_chunk
+
+        def process_and_cancel(operation, job, chunk):
+            BulkJob.objects.filter(pk=job.pk).update(cancel_requested=True)
+            return original(operation, job, chunk)
+
+        with mock.patch.object(SumOperation, 'process_chunk', process_and_cancel):
+            job = execute_job(job.pk)
+
+        self.assertEqual(job.status, JobStatus.CANCELLED)
+        self.assertEqual(job.completed_chunks, 1)
+        self.assertEqual(job.result, {'total': 3, 'failed': 0})
+
+    def test_resume_stalled_jobs(self):
+        stalled, _, _ = self.create([1])
+        fresh, _, _ = self.create([2])
+        BulkJob.objects.filter(pk=stalled.pk).update(
+            status=JobStatus.RUNNING, heartbeat_at=timezone.now() - timedelta(hours=1)
+        )
+        BulkJob.objects.filter(pk=fresh.pk).update(status=JobStatus.RUNNING, heartbeat_at=timezone.now())
+
+        with mock.patch('core.tasks.run_bulk_job.delay') as delay, self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(resume_stalled_jobs(), 1)
+
+        delay.assert_called_once_with(stalled.pk)
+
+    def test_merge_results(self):
+        merged = merge_results([
+            {'deleted': {'products': 2}, 'protected': [1], 'errors': [{'row': 1}], 'format': 'csv'},
+            {'deleted': {'products': 3, 'images': 1}, 'protected': [4], 'format': 'csv'},
+        ])
+
+        self.assertEqual(merged, {'deleted': {'products': 5, 'images': 1}, 'protected': [1, 4], 'format': 'csv'})
+
+
+@override_settings(BULK_JOB_STALL_TIMEOUT=600)
+class BulkJobAPITests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(jobs._operations, {'tests.sum': SumOperation()})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+
+    def post(self, url, data=None, **extra):
+        with mock.patch('core.tasks.run_bulk_job.delay'), self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(url, data, format='json', **extra)
+
+    def test_start_job_and_report_progress(self):
+        response = self.post(reverse('bulk-job-list'), {'operation': 'tests.sum', 'params': {'numbers': [1, 2, 3]}})
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response['Location'], reverse('bulk-job-detail', args=[response.data['id']]))
+        self.assertEqual(response.data['status'], JobStatus.PENDING)
+
+        execute_job(response.data['id'])
+        detail = self.client.get(reverse('bulk-job-detail', args=[response.data['id']])).json()
+
+        self.assertEqual(detail['status'], JobStatus.SUCCEEDED)
+        self.assertEqual(detail['progress'], {
+            'percent': 100.0,
+            'chunks': {'total': 2, 'completed': 2, 'failed': 0},
+            'items': {'total': 3, 'processed': 3, 'failed': 0},
+        })
+        self.assertEqual(detail['result'], {'total': 6, 'failed': 0})
+
+    def test_idempotency_key_header(self):
+        data = {'operation': 'tests.sum', 'params': {'numbers': [1]}}
+        first = self.post(reverse('bulk-job-list'), data, HTTP_IDEMPOTENCY_KEY='key-1')
+        second = self.post(reverse('bulk-job-list'), data, HTTP_IDEMPOTENCY_KEY='key-1')
+
+        self.assertEqual((first.status_code, second.status_code), (202, 200))
+        self.assertEqual(first.data['id'], second.data['id'])
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.post(reverse('bulk-job-list'), {'operation': 'tests.unknown'}).status_code, 400)
+        response = self.post(reverse('bulk-job-list'), {'operation': 'tests.sum', 'params': {}})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('numbers', response.data)
+
+    def test_cancel_and_resume(self):
+        job_id = self.post(reverse('bulk-job-list'), {'operation': 'tests.sum', 'params': {'numbers': [1]}}).data['id']
+
+        response = self.post(reverse('bulk-job-cancel', args=[job_id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], JobStatus.CANCELLED)
+        self.assertEqual(self.post(reverse('bulk-job-cancel', args=[job_id])).status_code, 409)
+
+        response = self.post(reverse('bulk-job-resume', args=[job_id]))
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], JobStatus.PENDING)
+        execute_job(job_id)
+        self.assertEqual(self.post(reverse('bulk-job-resume', args=[job_id])).status_code, 409)
+
+    def test_jobs_are_scoped_to_client(self):
+        other = BulkJob.objects.create(client_id=2, operation='tests.sum')
+
+        self.assertEqual(self.client.get(reverse('bulk-job-detail', args=[other.pk])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('bulk-job-list')).json()['count'], 0)
@@ -0,0 +1,102 @@
+"""
+Tests for opt-in request profiling.
+"""
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from core.middleware import RequestProfilingMiddleware
+from core.profiling import list_profiles, profile_paths, prune_profiles
+
+User = get_user_model()
+
+
+def slow_view(request):
+    for _ in range(2):
+        User.objects.count()
+    return HttpResponse('ok')
+
+
+class RequestProfilingTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            REQUEST_PROFILING_ENABLED=True, REQUEST_PROFILE_DIR=self.directory, REQUEST_PROFILE_MAX_FILES=3
+        )
+        self.settings_override.enable()
+        self.middleware = RequestProfilingMiddleware(slow_view)
+        self.staff = User.objects.create(username='staff', is_staff=True)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def request(self, user, path='/api/v1/products/products/', **extra):
+        request = RequestFactory().get(path, **extra)
+        request.user = user
+        return request
+
+    def test_staff_request_with_header_is_profiled(self):
+        response = self.middleware(self.request(self.staff, HTTP_X_PROFILE='1'))
+
+        profile_id = response['X-Profile-Id']
+        stats_path, metadata_path = profile_paths(profile_id)
+        self.assertTrue(os.path.exists(stats_path))
+        with open(metadata_path) as f:
+            metadata = json.load(f)
+        self.assertEqual(metadata['path'], '/api/v1/products/products/')
+        self.assertEqual(metadata['user'], 'staff')
+        self.assertEqual(metadata['query_count'], 2)
+        self.assertEqual(metadata['duplicate_count'], 1)
+        self.assertEqual(len(metadata['timeline']), 2)
+        self.assertIn('core/tests/test_profiling.py', metadata['timeline'][0]['source'])
+        self.assertIn('in slow_view', metadata['timeline'][0]['source'])
+
+    def test_query_flag_and_permissions(self):
+        self.assertIn('X-Profile-Id', self.middleware(self.request(self.staff, path='/x/?_profile=1')))
+        self.assertNotIn('X-Profile-Id', self.middleware(self.request(self.staff)))
+
+        member = User.objects.create(username='member')
+        self.assertNotIn('X-Profile-Id', self.middleware(self.request(member, HTTP_X_PROFILE='1')))
+        self.assertNotIn('X-Profile-Id', self.middleware(self.request(AnonymousUser(), HTTP_X_PROFILE='1')))
+        self.assertEqual(len(list_profiles()), 1)
+
+    def test_retention_keeps_newest_profiles(self):
+        ids = [self.middleware(self.request(self.staff, HTTP_X_PROFILE='1'))['X-Profile-Id'] for _ in range(5)]
+
+        self.assertEqual([profile['id'] for profile in list_profiles()], sorted(ids, reverse=True)[:3])
+        self.assertEqual(prune_profiles(max_age=-1), 3)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_management_command(self):
+        profile_id = self.middleware(self.request(self.staff, HTTP_X_PROFILE='1'))['X-Profile-Id']
+
+        out = io.StringIO()
+        call_command('request_profiles', stdout=out)
+        self.assertIn(profile_id, out.getvalue())
+        self.assertIn('GET /api/v1/products/products/ (staff)', out.getvalue())
+
+        out = io.StringIO()
+        call_command('request_profiles', profile_id, '--sort=tottime', '--limit=5', stdout=out)
+        summary = out.getvalue()
+        self.assertIn('SQL: 2 queries (1 duplicate)', summary)
+        self.assertIn('slow_view', summary)
+        self.assertIn('SQL timeline', summary)
+
+        with self.assertRaises(CommandError):
+            call_command('request_profiles', '../etc', stdout=io.StringIO())
+
+    @override_settings(REQUEST_PROFILING_ENABLED=False)
+    def test_disabled_by_default(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            RequestProfilingMiddleware(slow_view)
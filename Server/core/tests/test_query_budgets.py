@@ -0,0 +1,93 @@
+"""
+Query budgets of the list and detail endpoints.
+
+Budgets are fixed, and every endpoint is checked with several rows, so a query
+issued once per row (an N+1) fails the test.
+"""
+from decimal import Decimal
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.testing import assert_endpoint_budget
+from pricing.models import CustomerGroup, SellingChannel, TaxRate, TaxRateProfile, TaxRegion
+from products.catalogue.models import Category, Division, ProductStatus, Subcategory, UnitOfMeasure
+from products.models import Product, ProductImage, ProductVariant
+from shared.models import Country
+from tenants.models import Tenant
+
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'query-budget-tests',
+    }
+}
+
+ROWS = 5
+
+
+@override_settings(CACHES=LOCMEM_CACHES, REDIS_CLIENT_BACKEND='memory')
+class EndpointQueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        tenant, _ = Tenant.objects.get_or_create(id=1, defaults={'name': 'Tenant', 'schema_name': 'tenant'})
+        for index in range(ROWS):
+            division = Division.objects.create(name=f'Division {index}')
+            category = Category.objects.create(name=f'Category {index}', division=division)
+            Subcategory.objects.create(name=f'Subcategory {index}', category=category)
+            UnitOfMeasure.objects.create(name=f'Unit {index}', symbol=f'U{index}')
+            ProductStatus.objects.create(name=f'Status {index}')
+
+            product = Product.objects.create(
+                name=f'Product {index}', slug=f'product-{index}', category=category, product_type='PARENT'
+            )
+            for variant in range(2):
+                ProductVariant.objects.create(product=product, sku=f'SKU-{index}-{variant}', display_price='1.00')
+            ProductImage.objects.create(product=product, alt_text=f'Image {index}')
+
+            CustomerGroup.objects.create(client=tenant, name=f'Group {index}')
+            SellingChannel.objects.create(client=tenant, name=f'Channel {index}', code=f'CH{index}')
+            country = Country.objects.create(iso_code=f'Q{index}', name=f'Country {index}')
+            region = TaxRegion.objects.create(client=tenant, name=f'Region {index}', code=f'R{index}')
+            region.countries.add(country)
+            rate = TaxRate.objects.create(
+                client=tenant, tax_type='VAT', tax_code=f'VAT{index}',
+                tax_percentage=Decimal('5'), category_id=category.id
+            )
+            rate.tax_regions.add(region)
+            profile = TaxRateProfile.objects.create(client=tenant, name=f'Profile {index}')
+            profile.tax_rates.add(rate)
+        cls.product = product
+
+    def setUp(self):
+        caches['default'].clear()
+        self.client = APIClient()
+        # Resolve the tenant once; later requests use the per-worker cache
+        self.client.get(reverse('division-list'))
+
+    def test_product_endpoints(self):
+        assert_endpoint_budget(self.client, reverse('product-list'), 8)
+        assert_endpoint_budget(self.client, reverse('product-detail', args=[self.product.id]), 7)
+        # Attribute options are fetched once per prefetch lookup, not per variant
+        assert_endpoint_budget(
+            self.client, reverse('product-variant-list', args=[self.product.id]), 8, max_duplicates=2
+        )
+
+    def test_catalogue_endpoints(self):
+        for name in ('division-list', 'category-list', 'subcategory-list', 'unitofmeasure-list', 'productstatus-list'):
+            with self.subTest(name=name):
+                assert_endpoint_budget(self.client, reverse(name), 2)
+
+    def test_pricing_endpoints(self):
+        budgets = {
+            'customer-group-list': 2,
+            'selling-channel-list': 2,
+            'tax-region-list': 3,
+            'tax-rate-list': 5,
+            'tax-rate-profile-list': 3,
+        }
+        for name, max_queries in budgets.items():
+            with self.subTest(name=name):
+                assert_endpoint_budget(self.client, reverse(name), max_queries)
@@ -0,0 +1,103 @@
+"""
+Tests for the shared Redis client and its in-memory backend.
+"""
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from redis.exceptions import ResponseError
+
+from core import redis_client
+from core.redis_client import (
+    InMemoryRedis, InstrumentedRedis, get_command_metrics, get_redis, pipeline,
+    reset_command_metrics, transaction
+)
+
+
+class InMemoryRedisTests(SimpleTestCase):
+    def setUp(self):
+        self.redis = InMemoryRedis()
+
+    def test_strings_and_expiry(self):
+        self.assertTrue(self.redis.set('a', 1, ex=10))
+        self.assertIsNone(self.redis.set('a', 2, nx=True))
+        self.assertEqual(self.redis.get('a'), '1')
+        self.assertEqual(self.redis.ttl('a'), 10)
+        self.assertEqual(self.redis.mget(['a', 'missing']), ['1', None])
+        self.assertEqual(self.redis.incr('a'), 2)
+
+        with mock.patch('core.redis_client.time.monotonic', return_value=10 ** 9):
+            self.assertIsNone(self.redis.get('a'))
+            self.assertEqual(self.redis.ttl('a'), -2)
+
+    def test_glob_patterns(self):
+        for name in ('temp_upload:1', 'temp_upload:2', 'temp_uploads:index', 'other'):
+            self.redis.set(name, 'x')
+
+        self.assertEqual(sorted(self.redis.keys('temp_upload:*')), ['temp_upload:1', 'temp_upload:2'])
+        self.assertEqual(self.redis.keys('temp_upload?:*'), ['temp_uploads:index'])
+        self.assertEqual(sorted(self.redis.scan_iter(match='temp_upload:[1]')), ['temp_upload:1'])
+
+    def test_sorted_sets(self):
+        self.redis.zadd('index', {'b': 2, 'a': 1, 'c': 3})
+
+        self.assertEqual(self.redis.zrangebyscore('index', '-inf', 2), ['a', 'b'])
+        self.assertEqual(self.redis.zrangebyscore('index', '(1', '+inf', start=0, num=1), ['b'])
+        self.assertEqual(self.redis.zrem('index', 'a', 'missing'), 1)
+        self.assertEqual(self.redis.zrange('index', 0, -1, withscores=True), [('b', 2.0), ('c', 3.0)])
+
+    def test_wrong_type(self):
+        self.redis.zadd('index', {'a': 1})
+
+        with self.assertRaises(ResponseError):
+            self.redis.get('index')
+        self.assertEqual(self.redis.mget(['index']), [None])
+
+    def test_pipeline_and_transaction(self):
+        with pipeline(self.redis) as pipe:
+            pipe.set('a', 1)
+            pipe.incr('a')
+        self.assertEqual(pipe.results, [True, 2])
+
+        def double(pipe):
+            value = int(pipe.get('a'))
+            pipe.multi()
+            pipe.set('a', value * 2)
+            return value * 2
+
+        self.assertEqual(transaction(double, 'a', client=self.redis), 4)
+        self.assertEqual(self.redis.get('a'), '4')
+
+    def test_pubsub(self):
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe('channel')
+
+        self.assertEqual(self.redis.publish('channel', 'hello'), 1)
+        self.assertEqual(pubsub.get_message()['data'], 'hello')
+        self.assertIsNone(pubsub.get_message())
+
+
+class SharedClientTests(SimpleTestCase):
+    def tearDown(self):
+        redis_client.reset_redis()
+
+    def test_clients_are_shared_and_lazy(self):
+        with override_settings(REDIS_CLIENT_BACKEND='memory'):
+            self.assertIs(get_redis(), get_redis())
+            self.assertIsInstance(get_redis(), InMemoryRedis)
+
+        client = get_redis('redis://localhost:6399/3')
+        self.assertIsInstance(client, InstrumentedRedis)
+        self.assertIs(client, get_redis('redis://localhost:6399/3'))
+        self.assertEqual(client.connection_pool.connection_kwargs['db'], 3)
+
+    def test_commands_are_timed(self):
+        client = get_redis('redis://localhost:6399/0')
+        reset_command_metrics()
+
+        with mock.patch('redis.Redis.execute_command', return_value='OK'):
+            client.set('a', 1)
+            client.set('b', 2)
+
+        metrics = get_command_metrics()
+        self.assertEqual(metrics['SET']['calls'], 2)
+        self.assertGreaterEqual(metrics['SET']['max_ms'], 0)
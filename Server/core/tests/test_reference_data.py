@@ -0,0 +1,137 @@
+"""
+Tests for the versioned reference-data snapshot and its endpoint.
+"""
+from decimal import Decimal
+
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import reference_data
+from products.catalogue.models import UnitOfMeasure, ProductStatus
+from shared.models import Currency
+
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'reference-data-tests',
+    }
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ReferenceDataSnapshotTests(TestCase):
+    def setUp(self):
+        reference_data.clear_local_cache()
+        caches['default'].clear()
+
+        self.uom = UnitOfMeasure.objects.create(name='Pieces', symbol='PCS', client_id=1)
+        self.other_uom = UnitOfMeasure.objects.create(name='Kilograms', symbol='KG', client_id=2)
+        self.status = ProductStatus.objects.create(name='Active', client_id=1)
+        self.currency = Currency.objects.create(
+            code='USD', name='US Dollar', symbol='$', exchange_rate_to_usd=Decimal('1.000000')
+        )
+
+    def test_snapshot_is_scoped_to_client(self):
+        payload = reference_data.get_snapshot(1)
+
+        self.assertEqual([row['symbol'] for row in payload['units_of_measure']], ['PCS'])
+        self.assertEqual([row['name'] for row in payload['product_statuses']], ['Active'])
+        self.assertEqual(payload['currencies'][0]['exchange_rate_to_usd'], '1.000000')
+
+    def test_snapshot_is_served_from_cache(self):
+        reference_data.get_snapshot(1)
+
+        with CaptureQueriesContext(connection) as ctx:
+            reference_data.get_snapshot(1)
+            reference_data.get_object('units_of_measure', 1, self.uom.id)
+
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_write_bumps_only_the_affected_client(self):
+        version_1 = reference_data.get_version(1)
+        version_2 = reference_data.get_version(2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductStatus.objects.create(name='Discontinued', client_id=1)
+
+        self.assertNotEqual(reference_data.get_version(1), version_1)
+        self.assertEqual(reference_data.get_version(2), version_2)
+        names = [row['name'] for row in reference_data.get_snapshot(1)['product_statuses']]
+        self.assertIn('Discontinued', names)
+
+    def test_global_write_bumps_every_client(self):
+        version_1 = reference_data.get_version(1)
+        version_2 = reference_data.get_version(2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.currency.delete()
+
+        self.assertNotEqual(reference_data.get_version(1), version_1)
+        self.assertNotEqual(reference_data.get_version(2), version_2)
+
+    def test_write_bumps_version_only_when_committed(self):
+        version = reference_data.get_version(1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                ProductStatus.objects.create(name='Draft', client_id=1)
+                transaction.set_rollback(True)
+            with transaction.atomic():
+                ProductStatus.objects.create(name='Discontinued', client_id=1)
+                self.assertEqual(reference_data.get_version(1), version)
+            self.assertEqual(reference_data.get_version(1), version)
+
+        self.assertNotEqual(reference_data.get_version(1), version)
+        names = [row['name'] for row in reference_data.get_snapshot(1)['product_statuses']]
+        self.assertEqual(names, ['Active', 'Discontinued'])
+
+    def test_get_object_hydrates_instance(self):
+        uom = reference_data.get_object('units_of_measure', 1, self.uom.id)
+        currency = reference_data.get_object('currencies', 1, 'USD', lookup_field='code')
+
+        self.assertEqual(uom.pk, self.uom.pk)
+        self.assertEqual(uom.client_id, 1)
+        self.assertEqual(currency.exchange_rate_to_usd, Decimal('1.000000'))
+        self.assertIsNone(reference_data.get_object('units_of_measure', 1, self.other_uom.id))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ReferenceDataViewTests(TestCase):
+    def setUp(self):
+        reference_data.clear_local_cache()
+        caches['default'].clear()
+
+        self.client = APIClient()
+        self.url = reverse('reference-data')
+        UnitOfMeasure.objects.create(name='Pieces', symbol='PCS', client_id=1)
+
+    def test_returns_payload_with_etag(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('ETag', response)
+        self.assertEqual(len(response.data['units_of_measure']), 1)
+
+    def test_matching_etag_returns_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_etag_changes_after_write(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            UnitOfMeasure.objects.create(name='Litres', symbol='LTR', client_id=1)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.data['units_of_measure']), 2)
@@ -0,0 +1,116 @@
+"""
+Tests for the orjson-backed renderer/parser and the compression middleware.
+"""
+import gzip
+import io
+import json
+import unittest
+import uuid
+from decimal import Decimal
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from benchmarks.bench_json_rendering import build_page
+from core.middleware import CompressionMiddleware, brotli, parse_accept_encoding
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    def test_matches_stock_renderer_byte_for_byte(self):
+        page = build_page(20)
+
+        self.assertEqual(FastJSONRenderer().render(page), JSONRenderer().render(page))
+
+    def test_typed_values_match_stock_renderer(self):
+        page = build_page(5, typed=True)
+        page['extra'] = {
+            1: uuid.UUID('12345678-1234-5678-1234-567812345678'),
+            'label': gettext_lazy('Active'),
+            'amount': Decimal('10.50'),
+            'separator': 'a b',
+        }
+
+        fast = FastJSONRenderer().render(page)
+        stock = JSONRenderer().render(page)
+
+        self.assertEqual(json.loads(fast), json.loads(stock))
+        self.assertIn(b'\\u2028', fast)
+
+    def test_none_renders_empty_body(self):
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_indent_falls_back_to_stock_encoder(self):
+        data = {'a': [1, 2]}
+        media_type = 'application/json; indent=4'
+
+        self.assertEqual(
+            FastJSONRenderer().render(data, media_type),
+            JSONRenderer().render(data, media_type),
+        )
+
+
+class FastJSONParserTests(SimpleTestCase):
+    def test_parses_like_stock_parser(self):
+        body = JSONRenderer().render(build_page(5))
+
+        self.assertEqual(
+            FastJSONParser().parse(io.BytesIO(body)),
+            JSONParser().parse(io.BytesIO(body)),
+        )
+
+    def test_invalid_json_raises_parse_error(self):
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"name": '))
+
+
+@override_settings(RESPONSE_COMPRESSION_MIN_SIZE=100)
+class CompressionMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.body = JSONRenderer().render(build_page(5))
+
+    def get_response(self, accept_encoding, body=None, content_type='application/json'):
+        request = self.factory.get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        response = HttpResponse(self.body if body is None else body, content_type=content_type)
+        response['ETag'] = '"abc"'
+        middleware = CompressionMiddleware(lambda request: response)
+        return middleware(request)
+
+    def test_parse_accept_encoding(self):
+        self.assertEqual(
+            parse_accept_encoding('gzip;q=0.5, br, identity;q=0'),
+            {'gzip': 0.5, 'br': 1.0, 'identity': 0.0},
+        )
+
+    def test_gzip_when_only_gzip_accepted(self):
+        response = self.get_response('gzip')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), self.body)
+        self.assertEqual(response['ETag'], 'W/"abc"')
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_refused_codings_are_not_used(self):
+        response = self.get_response('gzip;q=0, br;q=0')
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, self.body)
+
+    def test_small_and_binary_responses_are_untouched(self):
+        self.assertFalse(self.get_response('gzip', body=b'{}').has_header('Content-Encoding'))
+        self.assertFalse(
+            self.get_response('gzip', content_type='image/png').has_header('Content-Encoding')
+        )
+
+    @unittest.skipIf(brotli is None, 'brotli is not installed')
+    def test_brotli_preferred_when_accepted(self):
+        response = self.get_response('gzip, br')
+
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), self.body)
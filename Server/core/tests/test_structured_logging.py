@@ -0,0 +1,131 @@
+"""
+Tests for sampled, structured logging.
+"""
+import json
+import logging
+import sys
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from benchmarks import bench_logging
+from core.structured_logging import JSONFormatter, SamplingFilter, parse_sampling_rates
+
+
+def make_record(name='products.views', level=logging.INFO, msg='Loaded %s products', args=(3,), **extra):
+    record = logging.LogRecord(name, level, __file__, 10, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+class ParseSamplingRatesTests(SimpleTestCase):
+    def test_parses_logger_rates(self):
+        self.assertEqual(
+            parse_sampling_rates(' products.views=0.1, assets=1 ,'),
+            {'products.views': 0.1, 'assets': 1.0}
+        )
+        self.assertEqual(parse_sampling_rates(''), {})
+        self.assertEqual(parse_sampling_rates(None), {})
+
+    def test_rejects_invalid_rates(self):
+        for value in ('products=2', 'products=-0.5', 'products', 'products=often'):
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                parse_sampling_rates(value)
+
+
+class SamplingFilterTests(SimpleTestCase):
+    def test_most_specific_logger_rate_applies(self):
+        sampling = SamplingFilter({'products': 0.5, 'products.views': 0.1})
+
+        self.assertEqual(sampling.rate_for('products.views'), 0.1)
+        self.assertEqual(sampling.rate_for('products.views.detail'), 0.1)
+        self.assertEqual(sampling.rate_for('products.serializers'), 0.5)
+        self.assertEqual(sampling.rate_for('productsx'), 1.0)
+        self.assertEqual(sampling.rate_for('assets'), 1.0)
+
+    def test_drops_and_keeps_records_by_rate(self):
+        sampling = SamplingFilter({'products': 0, 'assets': 0.25})
+
+        self.assertFalse(sampling.filter(make_record('products.views')))
+        self.assertTrue(sampling.filter(make_record('core.middleware')))
+        with mock.patch('core.structured_logging.random.random', return_value=0.9):
+            self.assertFalse(sampling.filter(make_record('assets.tasks')))
+        with mock.patch('core.structured_logging.random.random', return_value=0.1):
+            record = make_record('assets.tasks')
+            self.assertTrue(sampling.filter(record))
+        self.assertEqual(record.sample_rate, 0.25)
+
+    def test_warnings_and_errors_are_never_sampled(self):
+        sampling = SamplingFilter({'products': 0})
+
+        self.assertTrue(sampling.filter(make_record(level=logging.WARNING)))
+        self.assertTrue(sampling.filter(make_record(level=logging.ERROR)))
+        self.assertFalse(SamplingFilter({'products': 0}, max_level='WARNING').filter(
+            make_record(level=logging.WARNING)
+        ))
+
+    def test_sampled_out_records_are_not_formatted(self):
+        class Payload:
+            rendered = False
+
+            def __str__(self):
+                Payload.rendered = True
+                return 'payload'
+
+        logger = logging.getLogger('structured_logging_tests')
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        handler = logging.StreamHandler(mock.Mock())
+        handler.addFilter(SamplingFilter({'structured_logging_tests': 0}))
+        logger.addHandler(handler)
+        try:
+            logger.info("Payload %s", Payload())
+            self.assertFalse(Payload.rendered)
+            logger.warning("Payload %s", Payload())
+            self.assertTrue(Payload.rendered)
+        finally:
+            logger.removeHandler(handler)
+
+
+class JSONFormatterTests(SimpleTestCase):
+    def test_formats_record_with_extra_fields(self):
+        record = make_record(product_id=7, sample_rate=0.5)
+
+        entry = json.loads(JSONFormatter().format(record))
+
+        self.assertEqual(entry['message'], 'Loaded 3 products')
+        self.assertEqual(entry['level'], 'INFO')
+        self.assertEqual(entry['logger'], 'products.views')
+        self.assertEqual(entry['product_id'], 7)
+        self.assertEqual(entry['sample_rate'], 0.5)
+        self.assertNotIn('args', entry)
+        self.assertTrue(entry['timestamp'].endswith('+00:00'))
+
+    def test_includes_exception(self):
+        try:
+            raise ValueError('broken')
+        except ValueError:
+            record = logging.LogRecord('assets', logging.ERROR, __file__, 1, 'Failed', (), sys.exc_info())
+
+        entry = json.loads(JSONFormatter().format(record))
+
+        self.assertIn('ValueError: broken', entry['exception'])
+
+
+class LoggingBenchmarkTests(SimpleTestCase):
+    def test_logging_configuration_is_restored(self):
+        logger = logging.getLogger('products')
+        level, handlers = logger.level, list(logger.handlers)
+
+        with bench_logging.logging_configuration(logging.DEBUG, {'products': 0.5}) as handler:
+            self.assertEqual(logger.level, logging.DEBUG)
+            self.assertEqual(logger.handlers, [handler])
+            logger.debug("Captured %s", 'record')
+
+        self.assertEqual(logger.level, level)
+        self.assertEqual(logger.handlers, handlers)
+
+    def test_micro_benchmark_reports_both_call_styles(self):
+        labels = [label for label, _ in bench_logging.micro_benchmark(number=100)]
+
+        self.assertEqual(labels, ['eager f-string', 'lazy %-style'])
@@ -5,6 +5,8 @@ This module contains utility functions used throughout the application,
 including custom exception handling for consistent error responses.
 """
 
+from django.core.management.color import no_style
+from django.db import connections
 from rest_framework.views import exception_handler
 from rest_framework.response import Response
 from rest_framework import status
@@ -65,3 +67,84 @@ def custom_exception_handler(exc, context):
     
     # Return the formatted error response
     return Response(error_response, status=response.status_code)
+
+
+def get_request_client_id(request, default=1):
+    """
+    Resolve the client ID for the current request.
+    
+    Depending on how the request was routed, ``request.tenant`` may hold a tenant
+    object, a bare client ID, or be missing entirely during development.
+    Tenants (``tenants.Tenant`` or the TenantRoute attached by
+    tenants.middleware.TenantMiddleware) are scoped by their ``client_id``,
+    not by their primary key (see get_tenant_client_id).
+    
+    Args:
+        request: The current request, or None
+        default: Client ID to use when no tenant is attached to the request
+        
+    Returns:
+        int: The client ID
+    """
+    tenant = getattr(request, 'tenant', None) if request is not None else None
+    return get_tenant_client_id(tenant, default)
+
+
+def get_tenant_client_id(tenant, default=1):
+    """
+    Resolve the client ID of a tenant.
+    
+    Tenants (``tenants.Tenant`` or a TenantRoute) are scoped by their
+    ``client_id``, not by their primary key; other objects by their ``id``,
+    and bare client IDs are returned as they are.
+    
+    Args:
+        tenant: A tenant, tenant-like object or client ID, or None
+        default: Client ID to use when tenant is None
+        
+    Returns:
+        int: The client ID
+    """
+    if tenant is None:
+        return default
+    client_id = getattr(tenant, 'client_id', None)
+    if client_id is not None:
+        return client_id
+    return getattr(tenant, 'id', tenant)
+
+
+def reset_id_sequence(model, using='default'):
+    """
+    Reset the ID sequence of a model's table to follow the maximum existing ID.
+    
+    If the table is empty the next ID will be 1. This scans the table and, on
+    PostgreSQL, takes a lock on the sequence, so it is meant for maintenance
+    (see the reset_id_sequences management command), never for request paths.
+    
+    Args:
+        model: The model whose table sequence is reset
+        using: The database alias
+        
+    Returns:
+        int: The next ID the sequence will hand out
+    """
+    connection = connections[using]
+    table_name = model._meta.db_table
+    pk_column = model._meta.pk.column
+    quote = connection.ops.quote_name
+    
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT MAX({quote(pk_column)}) FROM {quote(table_name)}")
+        max_id = cursor.fetchone()[0]
+        next_id = max_id + 1 if max_id else 1
+        
+        if connection.vendor == 'postgresql':
+            for sql in connection.ops.sequence_reset_sql(no_style(), [model]):
+                cursor.execute(sql)
+        elif connection.vendor == 'sqlite':
+            # SQLite doesn't have sequences, but we can update the sqlite_sequence table
+            cursor.execute("UPDATE sqlite_sequence SET seq = %s WHERE name = %s", [next_id - 1, table_name])
+        elif connection.vendor == 'mysql':
+            cursor.execute(f"ALTER TABLE {quote(table_name)} AUTO_INCREMENT = {int(next_id)}")
+    
+    return next_id
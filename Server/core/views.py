@@ -1,5 +1,17 @@
 from django.shortcuts import render
 from django.http import JsonResponse
+from django.urls import reverse
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core import reference_data
+from core.conditional import apply_validators, is_not_modified, not_modified_response
+from core.jobs import cancel_job, create_job, resume_job
+from core.models.jobs import BulkJob
+from core.serializers import BulkJobCreateSerializer, BulkJobSerializer
+from core.utils import get_request_client_id
 
 # Create your views here.
 
@@ -11,3 +23,91 @@ def health_check(request):
         'status': 'ok',
         'message': 'Server is running'
     })
+
+
+class ReferenceDataView(APIView):
+    """
+    API endpoint returning all reference data for the current client in one payload.
+    
+    Includes units of measure, product statuses, customer groups, selling channels,
+    currencies and countries. The response carries an ETag derived from the snapshot
+    version, so clients can revalidate with If-None-Match and receive a 304 without
+    the payload being built or transferred.
+    """
+    permission_classes = []  # Authentication temporarily disabled
+    
+    def get(self, request, *args, **kwargs):
+        client_id = get_request_client_id(request)
+        version = reference_data.get_version(client_id)
+        
+        # Without a version (cache unavailable) the payload is served uncached
+        etag = f'refdata-{client_id}-{version}' if version else None
+        if etag and is_not_modified(request, etag=etag):
+            return not_modified_response(etag=etag)
+        
+        payload = reference_data.get_snapshot(client_id, version)
+        response = Response(payload)
+        return apply_validators(response, etag=etag)
+
+
+def start_bulk_job(request, operation, params):
+    """
+    Create a bulk job for the current client and answer with its status.
+    
+    An Idempotency-Key header (or an "idempotency_key" in the body) makes
+    repeated requests return the job created by the first one.
+    
+    Returns:
+        Response: 202 with the new job, or 200 with the job created earlier for the same key
+    """
+    idempotency_key = request.headers.get('Idempotency-Key') or request.data.get('idempotency_key')
+    job, created = create_job(
+        get_request_client_id(request), operation, params,
+        user=request.user, idempotency_key=idempotency_key
+    )
+    return Response(
+        BulkJobSerializer(job).data,
+        status=status.HTTP_202_ACCEPTED if created else status.HTTP_200_OK,
+        headers={'Location': reverse('bulk-job-detail', args=[job.pk])}
+    )
+
+
+class BulkJobViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    API endpoint for background bulk jobs of the current client.
+    
+    GET /api/v1/jobs/ lists jobs, newest first; GET /api/v1/jobs/{id}/ reports
+    a job's status, progress and result; POST /api/v1/jobs/ starts a job:
+    
+        {"operation": "products.price_update", "params": {...}}
+    
+    POST /api/v1/jobs/{id}/cancel/ stops a job before its next chunk and
+    POST /api/v1/jobs/{id}/resume/ re-runs the failed and remaining chunks of
+    a failed, cancelled or stalled job.
+    """
+    serializer_class = BulkJobSerializer
+    permission_classes = []  # Authentication temporarily disabled
+    
+    def get_queryset(self):
+        return BulkJob.objects.filter(client_id=get_request_client_id(self.request))
+    
+    def create(self, request, *args, **kwargs):
+        serializer = BulkJobCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return start_bulk_job(request, serializer.validated_data['operation'], serializer.validated_data['params'])
+    
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        job = self.get_object()
+        if job.is_finished:
+            return Response({'detail': f'Job is already {job.status.lower()}.'}, status=status.HTTP_409_CONFLICT)
+        return Response(BulkJobSerializer(cancel_job(job)).data)
+    
+    @action(detail=True, methods=['post'])
+    def resume(self, request, pk=None):
+        job = self.get_object()
+        if not resume_job(job):
+            return Response({'detail': f'Job is {job.status.lower()} and cannot be resumed.'},
+                            status=status.HTTP_409_CONFLICT)
+        job.refresh_from_db()
+        return Response(BulkJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
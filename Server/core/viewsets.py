@@ -4,13 +4,144 @@ Base viewsets for client-aware API views.
 This module provides base viewset classes that automatically filter querysets
 by the current client and assign the client during object creation.
 """
+import hashlib
+
 from rest_framework import viewsets, permissions
 from django.contrib.auth import get_user_model
-from django.db import connection
+
+from core.conditional import (
+    apply_validators, get_change_counters, is_not_modified, not_modified_response
+)
+from core.utils import get_request_client_id
 
 User = get_user_model()
 
 
+class ConditionalGetMixin:
+    """
+    Mixin adding ETag/Last-Modified support to the list and retrieve actions.
+    
+    Detail validators come from the row version (``updated_at``) of the object,
+    list validators from the per-client change counter of ``change_scope``. Both
+    are computed with a single lightweight lookup, and a matching If-None-Match
+    or If-Modified-Since is answered with 304 before anything is serialized.
+    
+    Models whose representation includes related rows must keep ``updated_at``
+    current when those rows change, and every write in the scope must bump the
+    change counter (see core.conditional.bump_change_counter).
+    
+    Attributes:
+        change_scope: Change counter scope used for list validators
+        dependent_scopes: Further change counter scopes whose data is embedded
+            in responses; they are folded into both list and detail validators
+        row_version_field: Model field used as the row version
+    """
+    change_scope = None
+    dependent_scopes = ()
+    row_version_field = 'updated_at'
+    
+    def get_validator_dependencies(self, client_id):
+        """
+        Return values, besides the row version, that a response depends on.
+        
+        Args:
+            client_id: The client ID of the current request
+            
+        Returns:
+            list: Values folded into the ETag, or None if they are unavailable
+        """
+        if not self.dependent_scopes:
+            return []
+        return get_change_counters(self.dependent_scopes, client_id)
+    
+    def _build_etag(self, *parts):
+        # The representation differs per renderer (JSON vs. browsable API)
+        renderer = getattr(self.request, 'accepted_renderer', None)
+        parts = parts + (getattr(renderer, 'format', ''),)
+        raw = '|'.join(str(part) for part in parts)
+        return hashlib.md5(raw.encode('utf-8')).hexdigest()
+    
+    def get_list_validators(self):
+        """
+        Compute the ETag for the list action.
+        
+        Returns:
+            tuple: (etag, last_modified); etag is None when validators are unavailable
+        """
+        if self.change_scope is None:
+            return None, None
+        
+        client_id = get_request_client_id(self.request)
+        counters = get_change_counters([self.change_scope], client_id)
+        dependencies = self.get_validator_dependencies(client_id)
+        if counters is None or dependencies is None:
+            return None, None
+        
+        etag = self._build_etag(
+            self.change_scope, client_id, self.request.get_full_path(), *counters, *dependencies
+        )
+        return etag, None
+    
+    def get_object_validators(self):
+        """
+        Compute the ETag and Last-Modified time for the retrieve action.
+        
+        Looks up only the primary key and row version of the requested object,
+        through the same queryset that get_object() would use.
+        
+        Returns:
+            tuple: (etag, last_modified); both None if the object does not exist
+        """
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset())
+        row = queryset.select_related(None).prefetch_related(None).order_by().filter(
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        ).values_list('pk', self.row_version_field).first()
+        if row is None or row[1] is None:
+            return None, None
+        
+        dependencies = self.get_validator_dependencies(get_request_client_id(self.request))
+        if dependencies is None:
+            return None, None
+        
+        pk, row_version = row
+        etag = self._build_etag(
+            self.get_queryset().model._meta.label, pk, row_version.isoformat(), *dependencies
+        )
+        return etag, row_version.timestamp()
+    
+    def respond_conditionally(self, validators, build_response):
+        """
+        Answer with 304 if the client's copy is current, else build the response.
+        
+        Args:
+            validators: (etag, last_modified) tuple for the requested resource
+            build_response: Callable producing the full response
+            
+        Returns:
+            Response: The 304 response or the built response with validators attached
+        """
+        etag, last_modified = validators
+        if etag and is_not_modified(self.request, etag, last_modified):
+            return not_modified_response(etag, last_modified)
+        
+        response = build_response()
+        if etag and response.status_code == 200:
+            apply_validators(response, etag, last_modified)
+        return response
+    
+    def list(self, request, *args, **kwargs):
+        return self.respond_conditionally(
+            self.get_list_validators(),
+            lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs)
+        )
+    
+    def retrieve(self, request, *args, **kwargs):
+        return self.respond_conditionally(
+            self.get_object_validators(),
+            lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs)
+        )
+
 class TenantModelViewSet(viewsets.ModelViewSet):
     """
     Base ModelViewSet that automatically filters querysets by the current client
@@ -64,38 +195,3 @@ class TenantModelViewSet(viewsets.ModelViewSet):
             client_id=1,
             updated_by=default_user
         )
-        
-    def perform_destroy(self, instance):
-        """
-        After deleting an instance, reset the ID sequence for the table.
-        """
-        # Get the table name
-        table_name = instance._meta.db_table
-        
-        # Delete the instance
-        super().perform_destroy(instance)
-        
-        # Reset the sequence
-        self.reset_sequence(table_name)
-    
-    def reset_sequence(self, table_name):
-        """
-        Reset the ID sequence for a table to the next value after the maximum ID.
-        If the table is empty, reset to 1.
-        """
-        with connection.cursor() as cursor:
-            # Get the maximum ID from the table
-            cursor.execute(f"SELECT MAX(id) FROM {table_name}")
-            max_id = cursor.fetchone()[0]
-            
-            # If there are no records, set the next ID to 1
-            next_id = max_id + 1 if max_id else 1
-            
-            # Reset the sequence
-            if connection.vendor == 'postgresql':
-                cursor.execute(f"ALTER SEQUENCE {table_name}_id_seq RESTART WITH {next_id}")
-            elif connection.vendor == 'sqlite':
-                # SQLite doesn't have sequences, but we can update the sqlite_sequence table
-                cursor.execute(f"UPDATE sqlite_sequence SET seq = {next_id - 1} WHERE name = '{table_name}'")
-            elif connection.vendor == 'mysql':
-                cursor.execute(f"ALTER TABLE {table_name} AUTO_INCREMENT = {next_id}")
@@ -16,6 +16,8 @@ from pathlib import Path
 from google.oauth2 import service_account
 from dotenv import load_dotenv
 
+from core.structured_logging import parse_sampling_rates
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -127,12 +129,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.QueryInstrumentationMiddleware',  # Query counts in Server-Timing and N+1 warnings
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.CompressionMiddleware',  # Compress large API responses (gzip/brotli)
+    'tenants.middleware.TenantMiddleware',  # Resolve request.tenant from the hostname (cached per worker)
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # Add CORS middleware (must be before CommonMiddleware)
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.RequestProfilingMiddleware',  # Opt-in per-request profiles for staff (X-Profile: 1)
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -236,6 +242,12 @@ if GS_CREDENTIALS:
 TEMP_UPLOAD_EXPIRY_SECONDS = 60 * 60 * 24  # 24 hours
 REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
 
+# Shared Redis client (core.redis_client); 'memory' runs an in-process Redis for tests and benchmarks
+REDIS_CLIENT_BACKEND = os.getenv('REDIS_CLIENT_BACKEND', 'redis')
+REDIS_MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', 50))
+REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', 5))
+REDIS_SLOW_COMMAND_MS = float(os.getenv('REDIS_SLOW_COMMAND_MS', 50))
+
 # Cache settings using Redis
 CACHES = {
     'default': {
@@ -249,12 +261,13 @@ CACHES = {
 
 # Rest Framework settings
 REST_FRAMEWORK = {
+    # orjson-backed drop-ins for JSONRenderer/JSONParser (stock encoder used if orjson is missing)
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'core.renderers.FastJSONRenderer',
         'rest_framework.renderers.BrowsableAPIRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
-        'rest_framework.parsers.JSONParser',
+        'core.parsers.FastJSONParser',
     ],
     # Authentication temporarily disabled
     # 'DEFAULT_AUTHENTICATION_CLASSES': [
@@ -266,6 +279,81 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 10,
 }
 
+# Response compression (core.middleware.CompressionMiddleware)
+RESPONSE_COMPRESSION_MIN_SIZE = int(os.getenv('RESPONSE_COMPRESSION_MIN_SIZE', 1024))
+RESPONSE_COMPRESSION_BROTLI_QUALITY = int(os.getenv('RESPONSE_COMPRESSION_BROTLI_QUALITY', 4))
+
+# Per-request query instrumentation (core.middleware.QueryInstrumentationMiddleware)
+QUERY_INSTRUMENTATION_ENABLED = os.getenv('QUERY_INSTRUMENTATION_ENABLED', str(DEBUG)).lower() in ('true', '1', 'yes')
+QUERY_INSTRUMENTATION_DUPLICATE_THRESHOLD = int(os.getenv('QUERY_INSTRUMENTATION_DUPLICATE_THRESHOLD', 5))
+
+# Opt-in request profiling (core.profiling)
+REQUEST_PROFILING_ENABLED = os.getenv('REQUEST_PROFILING_ENABLED', 'False').lower() in ('true', '1', 'yes')
+REQUEST_PROFILE_DIR = os.getenv('REQUEST_PROFILE_DIR', os.path.join(BASE_DIR, 'logs', 'profiles'))
+REQUEST_PROFILE_MAX_FILES = int(os.getenv('REQUEST_PROFILE_MAX_FILES', 200))
+REQUEST_PROFILE_MAX_AGE = int(os.getenv('REQUEST_PROFILE_MAX_AGE', 7 * 24 * 3600))
+REQUEST_PROFILE_MAX_QUERIES = int(os.getenv('REQUEST_PROFILE_MAX_QUERIES', 1000))
+
+# Chunked temporary uploads (assets.chunked)
+ASSET_CHUNKED_UPLOAD_CHUNK_SIZE = int(os.getenv('ASSET_CHUNKED_UPLOAD_CHUNK_SIZE', 5 * 1024 * 1024))
+ASSET_CHUNKED_UPLOAD_MAX_CHUNK_SIZE = int(os.getenv('ASSET_CHUNKED_UPLOAD_MAX_CHUNK_SIZE', 8 * 1024 * 1024))
+ASSET_CHUNKED_UPLOAD_MAX_SIZE = int(os.getenv('ASSET_CHUNKED_UPLOAD_MAX_SIZE', 2 * 1024 * 1024 * 1024))
+ASSET_CHUNKED_UPLOAD_TTL = int(os.getenv('ASSET_CHUNKED_UPLOAD_TTL', 48 * 60 * 60))
+
+# Resized product image renditions (products.derivatives): name -> longest edge in pixels
+PRODUCT_IMAGE_DERIVATIVES = {
+    'thumbnail': 150,
+    'card': 480,
+    'zoom': 1600,
+}
+PRODUCT_IMAGE_DERIVATIVE_FORMATS = ['webp', 'jpeg']
+PRODUCT_IMAGE_DERIVATIVE_QUALITY = int(os.getenv('PRODUCT_IMAGE_DERIVATIVE_QUALITY', 80))
+
+# Temporary uploads (assets.temp_uploads): lifetime and cleanup batching
+TEMP_UPLOAD_TTL = int(os.getenv('TEMP_UPLOAD_TTL', 48 * 60 * 60))
+TEMP_UPLOAD_METADATA_GRACE = int(os.getenv('TEMP_UPLOAD_METADATA_GRACE', 6 * 60 * 60))
+TEMP_UPLOAD_CLEANUP_BATCH_SIZE = int(os.getenv('TEMP_UPLOAD_CLEANUP_BATCH_SIZE', 500))
+TEMP_UPLOAD_CLEANUP_WORKERS = int(os.getenv('TEMP_UPLOAD_CLEANUP_WORKERS', 8))
+
+# Placeholder images (products.placeholder_images): rendered placeholders kept per process,
+# and whether images without files reference one shared placeholder file per size
+PRODUCT_PLACEHOLDER_CACHE_SIZE = int(os.getenv('PRODUCT_PLACEHOLDER_CACHE_SIZE', 256))
+PRODUCT_PLACEHOLDER_SHARED = os.getenv('PRODUCT_PLACEHOLDER_SHARED', 'False').lower() in ('true', '1', 'yes')
+
+# Threads uploading new image content to storage while linking temporary images
+PRODUCT_IMAGE_LINK_WORKERS = int(os.getenv('PRODUCT_IMAGE_LINK_WORKERS', 8))
+
+# Serve product list pages with products.fast_serializers instead of ProductSerializer
+PRODUCT_FAST_READ_ENABLED = os.getenv('PRODUCT_FAST_READ_ENABLED', 'True').lower() in ('true', '1', 'yes')
+
+# Background bulk jobs (core.jobs): items per chunk, retries of chunks failing with transient
+# errors (delay doubles per attempt), seconds without progress before a job counts as stalled,
+# and how many errors are kept on the job
+BULK_JOB_CHUNK_SIZE = int(os.getenv('BULK_JOB_CHUNK_SIZE', 500))
+BULK_JOB_MAX_RETRIES = int(os.getenv('BULK_JOB_MAX_RETRIES', 3))
+BULK_JOB_RETRY_DELAY = int(os.getenv('BULK_JOB_RETRY_DELAY', 10))
+BULK_JOB_STALL_TIMEOUT = int(os.getenv('BULK_JOB_STALL_TIMEOUT', 30 * 60))
+BULK_JOB_MAX_ERRORS = int(os.getenv('BULK_JOB_MAX_ERRORS', 200))
+# Bulk product requests above this many items run as background jobs; where export files are written
+BULK_JOB_SYNC_LIMIT = int(os.getenv('BULK_JOB_SYNC_LIMIT', 1000))
+BULK_JOB_EXPORT_DIR = os.getenv('BULK_JOB_EXPORT_DIR', 'exports')
+
+# Inventory ledger (inventory.ledger): counter shards given to a balance marked as a hot SKU,
+# and how many shards one compaction pass drains
+INVENTORY_HOT_SKU_SHARDS = int(os.getenv('INVENTORY_HOT_SKU_SHARDS', 8))
+INVENTORY_COMPACTION_BATCH_SIZE = int(os.getenv('INVENTORY_COMPACTION_BATCH_SIZE', 1000))
+# Stock reservations (inventory.reservations): default and maximum hold lifetime in seconds,
+# retries of a batch colliding with concurrent reservations, and holds expired per sweep batch
+INVENTORY_RESERVATION_TTL = int(os.getenv('INVENTORY_RESERVATION_TTL', 15 * 60))
+INVENTORY_RESERVATION_MAX_TTL = int(os.getenv('INVENTORY_RESERVATION_MAX_TTL', 24 * 60 * 60))
+INVENTORY_RESERVATION_RETRIES = int(os.getenv('INVENTORY_RESERVATION_RETRIES', 3))
+INVENTORY_RESERVATION_SWEEP_BATCH_SIZE = int(os.getenv('INVENTORY_RESERVATION_SWEEP_BATCH_SIZE', 1000))
+# Batch availability checks (inventory.availability): most SKUs per request, and per-client
+# SKU indexes kept in each process
+INVENTORY_AVAILABILITY_MAX_SKUS = int(os.getenv('INVENTORY_AVAILABILITY_MAX_SKUS', 5000))
+INVENTORY_SKU_INDEX_LOCAL_CACHE_SIZE = int(os.getenv('INVENTORY_SKU_INDEX_LOCAL_CACHE_SIZE', 16))
+INVENTORY_SKU_INDEX_TIMEOUT = int(os.getenv('INVENTORY_SKU_INDEX_TIMEOUT', 24 * 60 * 60))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -274,6 +362,13 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Tenant configuration
 TENANT_MODEL = 'tenants.Tenant'
 
+# Hostname -> tenant routing cache (tenants.routing)
+TENANT_ROUTING_CACHE_SIZE = int(os.getenv('TENANT_ROUTING_CACHE_SIZE', 1024))
+TENANT_ROUTING_CACHE_TTL = int(os.getenv('TENANT_ROUTING_CACHE_TTL', 300))
+TENANT_ROUTING_NEGATIVE_TTL = int(os.getenv('TENANT_ROUTING_NEGATIVE_TTL', 30))
+# Switch the connection's search_path to the tenant schema; off until tenant schemas are provisioned
+TENANT_SCHEMA_ROUTING_ENABLED = os.getenv('TENANT_SCHEMA_ROUTING_ENABLED', 'False').lower() in ('true', '1', 'yes')
+
 # Celery Configuration
 CELERY_BROKER_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
@@ -284,6 +379,12 @@ CELERY_TIMEZONE = TIME_ZONE
 
 # Structured Logging Configuration
 LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+# Level of the products loggers; DEBUG traces every request (and compiles the SQL of product queries)
+PRODUCTS_LOG_LEVEL = os.environ.get('PRODUCTS_LOG_LEVEL', LOG_LEVEL).upper()
+# "verbose" text lines or "json" objects (core.structured_logging.JSONFormatter)
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'verbose')
+# Fraction of DEBUG/INFO records kept per logger, e.g. "products.views=0.1,assets=0.5"
+LOG_SAMPLING_RATES = parse_sampling_rates(os.environ.get('LOG_SAMPLING_RATES', ''))
 
 # Create logs directory if it doesn't exist
 LOGS_DIR = os.path.join(BASE_DIR, 'logs')
@@ -293,6 +394,12 @@ if not os.path.exists(LOGS_DIR):
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'filters': {
+        'sampling': {
+            '()': 'core.structured_logging.SamplingFilter',
+            'rates': LOG_SAMPLING_RATES,
+        },
+    },
     'formatters': {
         'verbose': {
             'format': '{levelname} {asctime} {module} {process:d} {thread:d} {message}',
@@ -302,18 +409,23 @@ LOGGING = {
             'format': '{levelname} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'core.structured_logging.JSONFormatter',
+        },
     },
     'handlers': {
         'file': {
             'level': 'DEBUG',
             'class': 'logging.FileHandler',
             'filename': 'debug.log',
-            'formatter': 'verbose',
+            'formatter': 'json' if LOG_FORMAT == 'json' else 'verbose',
+            'filters': ['sampling'],
         },
         'console': {
             'level': 'DEBUG',
             'class': 'logging.StreamHandler',
-            'formatter': 'simple',
+            'formatter': 'json' if LOG_FORMAT == 'json' else 'simple',
+            'filters': ['sampling'],
         },
     },
     'loggers': {
@@ -321,14 +433,14 @@ LOGGING = {
             'handlers': ['console', 'file'],
             'level': 'INFO',
         },
-        'products.serializers': {
+        'products': {
             'handlers': ['console', 'file'],
-            'level': 'DEBUG',
+            'level': PRODUCTS_LOG_LEVEL,
             'propagate': True,
         },
-        'products': {
+        'assets': {
             'handlers': ['console', 'file'],
-            'level': 'DEBUG',
+            'level': LOG_LEVEL,
             'propagate': True,
         },
     },
@@ -9,6 +9,8 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.views import ReferenceDataView
+
 # Tenant-specific URL patterns
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -16,9 +18,11 @@ urlpatterns = [
     # API endpoints
     path('api/v1/', include([
         path('products/', include('products.urls')),
+        path('inventory/', include('inventory.urls')),
         path('pricing/', include('pricing.urls')),
         path('attributes/', include('attributes.urls')),
         path('shared/', include('shared.urls')),  # Add shared app URLs
+        path('reference-data/', ReferenceDataView.as_view(), name='reference-data'),
         path('', include('tenants.urls')),
         # Add other API endpoints here
     ])),
@@ -19,6 +19,9 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.async_views import reference_data_view
+from core.views import ReferenceDataView
+
 # This file is not used directly - see public_urls.py and tenant_urls.py
 # This is just a placeholder for Django's URL system
 
@@ -29,9 +32,17 @@ urlpatterns = [
     path('api/v1/', include([
         path('assets/', include('assets.urls')),
         path('products/', include('products.urls')),
+        path('inventory/', include('inventory.urls')),
         path('products/attributes/', include('attributes.urls')),  # Add attributes app URLs
         path('pricing/', include('pricing.urls')),
         path('shared/', include('shared.urls')),  # Add shared app URLs
+        path('reference-data/', ReferenceDataView.as_view(), name='reference-data'),
+        path('', include('core.job_urls')),  # Background bulk jobs
+        # Async (ASGI) versions of the high-traffic read endpoints
+        path('async/', include([
+            path('products/', include('products.async_urls')),
+            path('reference-data/', reference_data_view, name='async-reference-data'),
+        ])),
         # Add other API endpoints here
     ])),
 ]
@@ -1,3 +1,38 @@
 from django.contrib import admin
 
-# Register your models here.
+from inventory.models import StockBalance, StockLocation, StockMovement, StockReservation
+
+
+@admin.register(StockLocation)
+class StockLocationAdmin(admin.ModelAdmin):
+    list_display = ('code', 'name', 'client_id', 'is_active')
+    list_filter = ('is_active',)
+    search_fields = ('code', 'name')
+
+
+@admin.register(StockBalance)
+class StockBalanceAdmin(admin.ModelAdmin):
+    list_display = ('product', 'variant', 'on_hand', 'shard_count', 'compacted_at')
+    list_filter = ('shard_count',)
+    raw_id_fields = ('product', 'variant')
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'product', 'variant', 'location', 'quantity', 'reason', 'reference')
+    list_filter = ('reason',)
+    raw_id_fields = ('balance', 'product', 'variant', 'location', 'created_by')
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ('reference', 'product', 'variant', 'quantity', 'status', 'expires_at')
+    list_filter = ('status',)
+    search_fields = ('reference',)
+    raw_id_fields = ('balance', 'product', 'variant', 'movement', 'created_by')
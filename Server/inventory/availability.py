@@ -0,0 +1,213 @@
+"""
+Batch availability checks by SKU.
+
+Cart and POS clients ask whether many SKUs can be ordered at once. A SKU
+resolves to a product or variant through a per-client SKU index
+({sku: (product_id, variant_id)}) cached in Redis and in each process and
+versioned by the SKUS change counter, so resolving thousands of SKUs does
+not touch the database while the index is warm. The items are then read by
+primary key, one query for products and one for variants, and their
+availability in one more (inventory.reservations.available_to_sell). Product
+statuses come from the reference-data snapshot.
+
+The index is a hint: rows are checked against the requested SKUs, and SKUs
+it does not resolve (or resolves to rows whose SKU changed, e.g. after a bulk
+write that bypassed the signals) are looked up in the database, which also
+refreshes the index. Variant SKUs are unique per client and take precedence
+over product SKUs; of products sharing a SKU, the oldest one is used.
+"""
+import logging
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+from core.conditional import bump_change_counter, get_change_counters
+from core.reference_data import get_snapshot
+from inventory.reservations import available_to_sell, is_stock_limited
+from products.models import SKUS_CHANGE_SCOPE, Product, ProductVariant
+
+logger = logging.getLogger(__name__)
+
+SKU_INDEX_KEY = 'skuindex:{client_id}:{version}'
+
+_PRODUCT_FIELDS = (
+    'id', 'client_id', 'sku', 'is_active', 'quantity_on_hand', 'inventory_tracking_enabled', 'backorders_allowed',
+    'pre_order_available', 'pre_order_date', 'productstatus_id'
+)
+
+# Per-process index cache: client_id -> (version, index), least recently used first
+_local_indexes = OrderedDict()
+_local_lock = threading.Lock()
+
+
+def _lookup_skus(client_id, skus=None):
+    """
+    Map SKUs to (product_id, variant_id) from the database; all SKUs of the client when skus is None.
+    """
+    products = Product.objects.filter(client_id=client_id, sku__isnull=False).exclude(sku='')
+    variants = ProductVariant.objects.filter(client_id=client_id)
+    if skus is not None:
+        products = products.filter(sku__in=skus)
+        variants = variants.filter(sku__in=skus)
+
+    index = {}
+    for product_id, sku in products.order_by('-pk').values_list('pk', 'sku'):
+        index[sku] = (product_id, None)
+    for variant_id, product_id, sku in variants.values_list('pk', 'product_id', 'sku'):
+        index[sku] = (product_id, variant_id)
+    return index
+
+
+def _local_index(client_id, version):
+    with _local_lock:
+        entry = _local_indexes.get(client_id)
+        if entry is not None and entry[0] == version:
+            _local_indexes.move_to_end(client_id)
+            return entry[1]
+    return None
+
+
+def _remember(client_id, version, index):
+    with _local_lock:
+        _local_indexes[client_id] = (version, index)
+        _local_indexes.move_to_end(client_id)
+        while len(_local_indexes) > settings.INVENTORY_SKU_INDEX_LOCAL_CACHE_SIZE:
+            _local_indexes.popitem(last=False)
+
+
+def get_sku_index(client_id):
+    """
+    Get the SKU index of a client, building it on first use after a change.
+
+    Returns:
+        dict: {sku: (product_id, variant_id)}, or None if the cache is unavailable
+    """
+    counters = get_change_counters([SKUS_CHANGE_SCOPE], client_id)
+    if counters is None:
+        return None
+    version = counters[0]
+
+    index = _local_index(client_id, version)
+    if index is not None:
+        return index
+
+    cache = caches['default']
+    cache_key = SKU_INDEX_KEY.format(client_id=client_id, version=version)
+    try:
+        index = cache.get(cache_key)
+    except Exception as e:
+        logger.warning("SKU index read failed: %s", e)
+
+    if index is None:
+        index = _lookup_skus(client_id)
+        try:
+            cache.set(cache_key, index, timeout=settings.INVENTORY_SKU_INDEX_TIMEOUT)
+        except Exception as e:
+            logger.warning("SKU index write failed: %s", e)
+
+    _remember(client_id, version, index)
+    return index
+
+
+def clear_local_cache():
+    """Drop every SKU index held by this process."""
+    with _local_lock:
+        _local_indexes.clear()
+
+
+def _read_items(client_id, resolved):
+    """
+    Read the products and variants of resolved SKUs, keeping those whose SKU still matches.
+
+    Returns:
+        dict: {sku: (product, variant or None)}
+    """
+    product_ids = {product_id for product_id, variant_id in resolved.values() if variant_id is None}
+    variant_ids = {variant_id for _, variant_id in resolved.values() if variant_id is not None}
+    products = {}
+    if product_ids:
+        products = Product.objects.filter(client_id=client_id, pk__in=product_ids).only(*_PRODUCT_FIELDS).in_bulk()
+    variants = {}
+    if variant_ids:
+        variants = ProductVariant.objects.filter(client_id=client_id, pk__in=variant_ids).select_related(
+            'product'
+        ).only(
+            'id', 'sku', 'product_id', 'is_active', 'quantity_on_hand', 'status_override_id',
+            *(f'product__{field}' for field in _PRODUCT_FIELDS)
+        ).in_bulk()
+
+    items = {}
+    for sku, (product_id, variant_id) in resolved.items():
+        if variant_id is None:
+            product = products.get(product_id)
+            if product is not None and product.sku == sku:
+                items[sku] = (product, None)
+        else:
+            variant = variants.get(variant_id)
+            if variant is not None and variant.sku == sku and variant.product_id == product_id:
+                items[sku] = (variant.product, variant)
+    return items
+
+
+def check_availability(client_id, skus):
+    """
+    Tell whether SKUs can be ordered, and how many are available.
+
+    Orderable means the product (and variant) is active, its status (the
+    variant's status_override, else the product's) allows orders, and
+    either stock is available or orders are not limited by stock (tracking
+    off, backorders or pre-orders allowed).
+
+    Args:
+        client_id: The client ID
+        skus: Product or variant SKUs
+
+    Returns:
+        tuple: ({sku: {'product': id, 'variant': id or None, 'orderable': bool,
+        'available': n or None when stock is not tracked, 'eta': pre-order date or None}},
+        [SKUs that match no product or variant])
+    """
+    skus = set(skus)
+    index = get_sku_index(client_id)
+    if index is None:
+        # Cache unavailable: resolve straight from the database
+        index = _lookup_skus(client_id, skus)
+    items = _read_items(client_id, {sku: index[sku] for sku in skus if sku in index})
+
+    unresolved = skus - items.keys()
+    if unresolved:
+        found = _lookup_skus(client_id, unresolved)
+        if found:
+            items.update(_read_items(client_id, found))
+            # The index missed existing SKUs; have it rebuilt
+            bump_change_counter(SKUS_CHANGE_SCOPE, client_id)
+
+    keys = {sku: (product.pk, variant and variant.pk) for sku, (product, variant) in items.items()}
+    levels = available_to_sell(client_id, keys.values(), on_hand={
+        keys[sku]: (variant or product).quantity_on_hand for sku, (product, variant) in items.items()
+    })
+    statuses = {row['id']: row for row in get_snapshot(client_id)['product_statuses']}
+    today = timezone.localdate()
+
+    results = {}
+    for sku, (product, variant) in items.items():
+        available = levels[keys[sku]]
+        status_id = (variant and variant.status_override_id) or product.productstatus_id
+        status = statuses.get(status_id)
+        active = product.is_active and (variant is None or variant.is_active)
+        results[sku] = {
+            'product': product.pk,
+            'variant': variant and variant.pk,
+            'orderable': bool(
+                active and (status is None or status['is_orderable'])
+                and (available > 0 or not is_stock_limited(product))
+            ),
+            'available': available if product.inventory_tracking_enabled else None,
+            'eta': product.pre_order_date if (
+                product.pre_order_available and product.pre_order_date and product.pre_order_date > today
+            ) else None,
+        }
+    return results, sorted(skus - results.keys())
@@ -0,0 +1,402 @@
+"""
+Stock ledger operations.
+
+Every stock change is a StockMovement appended to the ledger together with
+atomic increments (F() expressions) of the item's stock, in one transaction,
+so concurrent movements never overwrite each other. A movement increments
+the item's balance (its total over all locations), its stock at the
+movement's location, if any, and the product's rollup (the total of the
+product and its variants), so totals are materialized as they change rather
+than summed when read.
+
+Ordinary balances are incremented in place, which holds the balance and
+rollup row locks until the transaction commits. Balances of hot SKUs (see
+set_counter_shards) add their increments to one of several counter shards
+picked at random instead, so a burst of sales of one variant does not queue
+on a single row lock; compact_counters folds the shard deltas into the
+balances, location stock and rollups, and sync_product_stock copies the
+quantities to the quantity_on_hand fields of products and variants.
+
+Product.quantity_on_hand and ProductVariant.quantity_on_hand are a mirror of
+the ledger once an item has a balance: its opening movement takes over the
+value they held, and they are refreshed by the periodic compaction.
+"""
+import logging
+import random
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from core.conditional import bump_change_counter
+from inventory.models import (
+    LocationStock, MovementReason, ProductStockRollup, StockBalance, StockCounterShard, StockLocation, StockMovement
+)
+from products.models import PRODUCTS_CHANGE_SCOPE, Product, ProductVariant
+
+logger = logging.getLogger(__name__)
+
+
+def _table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def _by_key(rows):
+    """
+    Build a CASE expression mapping primary keys to values, for one UPDATE of many rows.
+    """
+    return Case(*[When(pk=pk, then=Value(value)) for pk, value in rows.items()], output_field=IntegerField())
+
+
+def get_balance(client_id, product_id, variant_id=None):
+    """
+    Return the stock balance of a product or variant, creating it on first use.
+
+    The balances of a product and its variants are opened together, so the
+    product's rollup covers all of them: each opens with the item's
+    quantity_on_hand, recorded as an OPENING movement, so stock kept before
+    the ledger carries over.
+
+    Raises:
+        Product.DoesNotExist / ProductVariant.DoesNotExist: If the item does
+        not exist for the client (or the variant is not one of the product's)
+    """
+    try:
+        return StockBalance.objects.get(client_id=client_id, product_id=product_id, variant_id=variant_id)
+    except StockBalance.DoesNotExist:
+        pass
+
+    if variant_id is not None and not ProductVariant.objects.filter(
+        client_id=client_id, pk=variant_id, product_id=product_id
+    ).exists():
+        raise ProductVariant.DoesNotExist(f"No variant {variant_id} of product {product_id}")
+    _open_balances(client_id, product_id)
+    return StockBalance.objects.get(client_id=client_id, product_id=product_id, variant_id=variant_id)
+
+
+def _open_balances(client_id, product_id):
+    with transaction.atomic():
+        # Locking the product serializes concurrent openings
+        product = Product.objects.select_for_update().only('quantity_on_hand', 'company_id').get(
+            client_id=client_id, pk=product_id
+        )
+        opened = set(StockBalance.objects.filter(product_id=product_id).values_list('variant_id', flat=True))
+        items = [(None, product.company_id, product.quantity_on_hand)] + list(
+            ProductVariant.objects.filter(client_id=client_id, product_id=product_id).values_list(
+                'pk', 'company_id', 'quantity_on_hand'
+            )
+        )
+        balances = StockBalance.objects.bulk_create([
+            StockBalance(
+                client_id=client_id, company_id=company_id, product_id=product_id,
+                variant_id=variant_id, on_hand=quantity
+            )
+            for variant_id, company_id, quantity in items if variant_id not in opened
+        ])
+        StockMovement.objects.bulk_create([
+            StockMovement(
+                client_id=client_id, company_id=balance.company_id, balance=balance,
+                product_id=product_id, variant_id=balance.variant_id,
+                quantity=balance.on_hand, reason=MovementReason.OPENING
+            )
+            for balance in balances if balance.on_hand
+        ])
+        ProductStockRollup.objects.get_or_create(product_id=product_id, defaults={'client_id': client_id})
+        ProductStockRollup.objects.filter(product_id=product_id).update(
+            quantity_on_hand=F('quantity_on_hand') + sum(balance.on_hand for balance in balances)
+        )
+
+
+def _check_location(client_id, location_id):
+    if location_id is not None and not StockLocation.objects.filter(
+        client_id=client_id, pk=location_id, is_active=True
+    ).exists():
+        raise StockLocation.DoesNotExist(f"No active stock location {location_id}")
+
+
+def record_movement(client_id, product_id, quantity, reason, variant_id=None, location_id=None,
+                    reference='', note='', user=None):
+    """
+    Append a movement to the ledger and apply it to the item's stock.
+
+    Args:
+        client_id: The client ID
+        product_id: The product
+        quantity: Signed quantity; positive adds stock
+        reason: A MovementReason
+        variant_id: The variant, for variant stock
+        location_id: The StockLocation the stock is added to or taken from
+
+    Returns:
+        StockMovement: The recorded movement
+
+    Raises:
+        StockLocation.DoesNotExist: If the location is not an active location of the client
+    """
+    if not quantity:
+        raise ValueError("A stock movement needs a non-zero quantity.")
+    _check_location(client_id, location_id)
+    balance = get_balance(client_id, product_id, variant_id)
+
+    with transaction.atomic():
+        movement = _create_movement(balance, quantity, reason, location_id, reference, note, user)
+        _apply(balance, quantity, location_id)
+    return movement
+
+
+def transfer_stock(client_id, product_id, quantity, from_location_id, to_location_id, variant_id=None,
+                   reference='', note='', user=None):
+    """
+    Move stock of an item from one location to another.
+
+    Records a pair of TRANSFER movements in one transaction; the item's
+    total stock does not change.
+
+    Returns:
+        tuple: (outgoing movement, incoming movement)
+    """
+    if quantity <= 0:
+        raise ValueError("A transfer needs a positive quantity.")
+    if from_location_id == to_location_id:
+        raise ValueError("A transfer needs two different locations.")
+    _check_location(client_id, from_location_id)
+    _check_location(client_id, to_location_id)
+    balance = get_balance(client_id, product_id, variant_id)
+
+    with transaction.atomic():
+        movements = []
+        for location_id, signed in ((from_location_id, -quantity), (to_location_id, quantity)):
+            movements.append(
+                _create_movement(balance, signed, MovementReason.TRANSFER, location_id, reference, note, user)
+            )
+            _apply_at_location(balance, signed, location_id)
+    return tuple(movements)
+
+
+def _create_movement(balance, quantity, reason, location_id, reference, note, user):
+    return StockMovement.objects.create(
+        client_id=balance.client_id, company_id=balance.company_id, balance=balance,
+        product_id=balance.product_id, variant_id=balance.variant_id, location_id=location_id,
+        quantity=quantity, reason=reason, reference=reference, note=note,
+        created_by=user if user and user.is_authenticated else None
+    )
+
+
+def _apply(balance, quantity, location_id=None):
+    if balance.is_sharded:
+        _add_to_shard(balance, quantity, location_id)
+        return
+
+    now = timezone.now()
+    StockBalance.objects.filter(pk=balance.pk).update(
+        on_hand=F('on_hand') + quantity, version=F('version') + 1, updated_at=now
+    )
+    ProductStockRollup.objects.filter(product_id=balance.product_id).update(
+        quantity_on_hand=F('quantity_on_hand') + quantity, updated_at=now
+    )
+    if location_id is not None:
+        _add_at_location(balance.pk, location_id, quantity)
+    # Product lists show the rollup
+    bump_change_counter(PRODUCTS_CHANGE_SCOPE, balance.client_id)
+
+
+def _apply_at_location(balance, quantity, location_id):
+    # One leg of a transfer: the stock at the location changes, the balance
+    # total does not. Shard deltas of sharded balances count towards the
+    # total, but the two legs of a transfer cancel out.
+    if balance.is_sharded:
+        _add_to_shard(balance, quantity, location_id)
+    else:
+        _add_at_location(balance.pk, location_id, quantity)
+
+
+def _add_at_location(balance_id, location_id, quantity):
+    rows = LocationStock.objects.filter(balance_id=balance_id, location_id=location_id)
+    if not rows.update(quantity=F('quantity') + quantity, updated_at=timezone.now()):
+        LocationStock.objects.get_or_create(balance_id=balance_id, location_id=location_id)
+        rows.update(quantity=F('quantity') + quantity)
+
+
+def _add_to_shard(balance, quantity, location_id=None):
+    shard = random.randrange(balance.shard_count)
+    shards = StockCounterShard.objects.filter(balance_id=balance.pk, location_id=location_id, shard=shard)
+    if not shards.update(delta=F('delta') + quantity, version=F('version') + 1):
+        # Shards without location are created with the sharding, shards at a location on first use
+        StockCounterShard.objects.get_or_create(balance_id=balance.pk, location_id=location_id, shard=shard)
+        shards.update(delta=F('delta') + quantity, version=F('version') + 1)
+
+
+def set_counter_shards(balance, shard_count):
+    """
+    Set how many counter shards a balance spreads its increments over.
+
+    Use more than one shard for hot SKUs; 1 goes back to updating the
+    balance in place. Deltas held by shards that are no longer used are
+    still compacted.
+    """
+    with transaction.atomic():
+        StockCounterShard.objects.bulk_create(
+            [StockCounterShard(balance=balance, shard=shard) for shard in range(shard_count)],
+            ignore_conflicts=True
+        )
+        StockBalance.objects.filter(pk=balance.pk).update(shard_count=shard_count, updated_at=timezone.now())
+    balance.shard_count = shard_count
+    return balance
+
+
+def _shard_total(field):
+    return Coalesce(Subquery(
+        StockCounterShard.objects.filter(balance=OuterRef('pk')).order_by().values('balance').annotate(
+            total=Sum(field)
+        ).values('total'),
+        output_field=IntegerField()
+    ), 0)
+
+
+def with_quantity_on_hand(queryset):
+    """
+    Annotate stock balances with quantity_on_hand, their current quantity.
+
+    The quantity is the compacted on_hand plus the deltas pending in the shards.
+    """
+    return queryset.annotate(quantity_on_hand=F('on_hand') + _shard_total('delta'))
+
+
+def with_shard_version(queryset):
+    """
+    Annotate stock balances with shard_version, the sum of the versions of their counter shards.
+
+    It changes with every sharded movement, as version does with in-place ones.
+    """
+    return queryset.annotate(shard_version=_shard_total('version'))
+
+
+def compact_counters(batch_size=None):
+    """
+    Fold pending shard deltas into their balances, location stock and rollups.
+
+    Shards locked by movements in flight are skipped (SKIP LOCKED) and left
+    for the next run, so compaction never waits on sales and overlapping runs
+    do not block each other.
+
+    Returns:
+        dict: {'shards': shards drained, 'balances': balances updated}
+    """
+    batch_size = batch_size or settings.INVENTORY_COMPACTION_BATCH_SIZE
+    with transaction.atomic():
+        shards = list(
+            StockCounterShard.objects.select_for_update(skip_locked=True, of=('self',)).exclude(delta=0)
+            .order_by('pk').values_list(
+                'pk', 'balance_id', 'balance__client_id', 'balance__product_id', 'location_id', 'delta'
+            )[:batch_size]
+        )
+        if not shards:
+            return {'shards': 0, 'balances': 0}
+
+        balances, products, locations = defaultdict(int), defaultdict(int), defaultdict(int)
+        client_ids = set()
+        for _, balance_id, client_id, product_id, location_id, delta in shards:
+            client_ids.add(client_id)
+            balances[balance_id] += delta
+            products[product_id] += delta
+            if location_id is not None:
+                locations[(balance_id, location_id)] += delta
+        StockCounterShard.objects.filter(pk__in=[shard[0] for shard in shards]).update(delta=0)
+
+        now = timezone.now()
+        StockBalance.objects.filter(pk__in=balances).update(
+            on_hand=F('on_hand') + _by_key(balances), compacted_at=now, updated_at=now
+        )
+        ProductStockRollup.objects.filter(pk__in=products).update(
+            quantity_on_hand=F('quantity_on_hand') + _by_key(products), updated_at=now
+        )
+        if locations:
+            LocationStock.objects.bulk_create(
+                [LocationStock(balance_id=balance_id, location_id=location) for balance_id, location in locations],
+                ignore_conflicts=True
+            )
+            rows = {
+                pk: locations[(balance_id, location_id)]
+                for pk, balance_id, location_id in LocationStock.objects.filter(
+                    balance_id__in={balance_id for balance_id, _ in locations},
+                    location_id__in={location_id for _, location_id in locations},
+                ).values_list('pk', 'balance_id', 'location_id')
+                if (balance_id, location_id) in locations
+            }
+            LocationStock.objects.filter(pk__in=rows).update(quantity=F('quantity') + _by_key(rows), updated_at=now)
+    for client_id in client_ids:
+        bump_change_counter(PRODUCTS_CHANGE_SCOPE, client_id)
+    return {'shards': len(shards), 'balances': len(balances)}
+
+
+def rebuild_rollups(client_id=None):
+    """
+    Recompute product rollups from the balances, e.g. after repairing data by hand.
+
+    Returns:
+        int: The number of rollups created or corrected
+    """
+    client_filter, params = ('WHERE b.client_id = %s', [client_id]) if client_id is not None else ('', [])
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {_table(ProductStockRollup)} AS r (product_id, client_id, quantity_on_hand, updated_at)
+            SELECT b.product_id, MIN(b.client_id), SUM(b.on_hand), NOW()
+            FROM {_table(StockBalance)} b {client_filter}
+            GROUP BY b.product_id
+            ON CONFLICT (product_id) DO UPDATE
+            SET quantity_on_hand = EXCLUDED.quantity_on_hand, updated_at = EXCLUDED.updated_at
+            WHERE r.quantity_on_hand IS DISTINCT FROM EXCLUDED.quantity_on_hand
+            """,
+            params
+        )
+        return cursor.rowcount
+
+
+def sync_product_stock():
+    """
+    Copy current balance quantities to Product/ProductVariant.quantity_on_hand.
+
+    Runs one UPDATE per table, writing only rows whose quantity differs, and
+    bumps the product change counter of the clients concerned.
+
+    Returns:
+        dict: {'products': rows updated, 'variants': rows updated}
+    """
+    counts = {}
+    clients = set()
+    now = timezone.now()
+    with connection.cursor() as cursor:
+        for model, link, variant_filter, parent in (
+            (Product, 'product_id', 'IS NULL', 'id'),
+            (ProductVariant, 'variant_id', 'IS NOT NULL', 'product_id'),
+        ):
+            cursor.execute(
+                f"""
+                WITH levels AS (
+                    SELECT b.{link} AS item_id, b.on_hand + COALESCE(SUM(s.delta), 0) AS quantity
+                    FROM {_table(StockBalance)} b
+                    LEFT JOIN {_table(StockCounterShard)} s ON s.balance_id = b.id
+                    WHERE b.variant_id {variant_filter}
+                    GROUP BY b.id
+                )
+                UPDATE {_table(model)} item SET quantity_on_hand = levels.quantity, updated_at = %s
+                FROM levels
+                WHERE item.id = levels.item_id AND item.quantity_on_hand IS DISTINCT FROM levels.quantity
+                RETURNING item.client_id, item.{parent}
+                """,
+                [now]
+            )
+            rows = cursor.fetchall()
+            counts['products' if model is Product else 'variants'] = len(rows)
+            clients.update(row[0] for row in rows)
+            if model is ProductVariant and rows:
+                # Product responses embed their variants
+                Product.objects.filter(pk__in={row[1] for row in rows}).update(updated_at=now)
+
+    for client_id in clients:
+        bump_change_counter(PRODUCTS_CHANGE_SCOPE, client_id)
+    return counts
@@ -0,0 +1,17 @@
+"""
+Management command to recompute the per-product stock rollups from the balances.
+"""
+from django.core.management.base import BaseCommand
+
+from inventory.ledger import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute product stock rollups from the stock balances'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--client', type=int, help='Only rebuild the rollups of this client')
+
+    def handle(self, *args, **options):
+        count = rebuild_rollups(options['client'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} stock rollup(s)"))
@@ -0,0 +1,216 @@
+# Generated by Django 4.2.20 on 2026-10-19 13:38
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("products", "0011_publicationstatuschange"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StockBalance",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, editable=False
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("client_id", models.IntegerField(default=1)),
+                ("company_id", models.IntegerField(default=1)),
+                ("on_hand", models.IntegerField(default=0)),
+                (
+                    "shard_count",
+                    models.PositiveSmallIntegerField(
+                        default=1,
+                        help_text="Number of counter shards increments are spread over; 1 updates on_hand directly",
+                    ),
+                ),
+                ("compacted_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stock_balances",
+                        to="products.product",
+                    ),
+                ),
+                (
+                    "variant",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stock_balances",
+                        to="products.productvariant",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["product", "variant"],
+            },
+        ),
+        migrations.CreateModel(
+            name="StockMovement",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("client_id", models.IntegerField(default=1)),
+                ("company_id", models.IntegerField(default=1)),
+                ("quantity", models.IntegerField()),
+                (
+                    "reason",
+                    models.CharField(
+                        choices=[
+                            ("OPENING", "Opening balance"),
+                            ("RECEIPT", "Receipt"),
+                            ("SALE", "Sale"),
+                            ("RETURN", "Return"),
+                            ("ADJUSTMENT", "Adjustment"),
+                            ("WRITE_OFF", "Write-off"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "reference",
+                    models.CharField(
+                        blank=True,
+                        help_text="External reference, e.g. an order number",
+                        max_length=100,
+                    ),
+                ),
+                ("note", models.TextField(blank=True)),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, editable=False
+                    ),
+                ),
+                (
+                    "balance",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="movements",
+                        to="inventory.stockbalance",
+                    ),
+                ),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stock_movements",
+                        to="products.product",
+                    ),
+                ),
+                (
+                    "variant",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stock_movements",
+                        to="products.productvariant",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-created_at", "-id"],
+                "indexes": [
+                    models.Index(
+                        fields=["client_id", "product", "-created_at"],
+                        name="inventory_movement_product_idx",
+                    ),
+                    models.Index(
+                        fields=["balance", "-created_at"],
+                        name="inventory_movement_balance_idx",
+                    ),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="StockCounterShard",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("shard", models.PositiveSmallIntegerField()),
+                ("delta", models.IntegerField(default=0)),
+                (
+                    "balance",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="shards",
+                        to="inventory.stockbalance",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("delta", 0), _negated=True),
+                        fields=["balance"],
+                        name="inventory_shard_pending_idx",
+                    )
+                ],
+                "unique_together": {("balance", "shard")},
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="stockbalance",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("variant__isnull", True)),
+                fields=("client_id", "product"),
+                name="inventory_balance_product_uniq",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="stockbalance",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("variant__isnull", False)),
+                fields=("client_id", "variant"),
+                name="inventory_balance_variant_uniq",
+            ),
+        ),
+    ]
@@ -0,0 +1,136 @@
+# Generated by Django 4.2.20 on 2026-10-19 13:41
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0011_publicationstatuschange"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("inventory", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="stockbalance",
+            name="version",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Incremented by reservations and in-place movements; reservations check it optimistically",
+            ),
+        ),
+        migrations.CreateModel(
+            name="StockReservation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("client_id", models.IntegerField(default=1)),
+                ("company_id", models.IntegerField(default=1)),
+                ("quantity", models.PositiveIntegerField()),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("ACTIVE", "Active"),
+                            ("COMMITTED", "Committed"),
+                            ("RELEASED", "Released"),
+                            ("EXPIRED", "Expired"),
+                        ],
+                        default="ACTIVE",
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "reference",
+                    models.CharField(
+                        help_text="Checkout, cart or order the stock is held for",
+                        max_length=100,
+                    ),
+                ),
+                ("expires_at", models.DateTimeField()),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, editable=False
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "balance",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="reservations",
+                        to="inventory.stockbalance",
+                    ),
+                ),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "movement",
+                    models.ForeignKey(
+                        blank=True,
+                        help_text="The sale recorded when the hold was committed",
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="inventory.stockmovement",
+                    ),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stock_reservations",
+                        to="products.product",
+                    ),
+                ),
+                (
+                    "variant",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stock_reservations",
+                        to="products.productvariant",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-created_at", "-id"],
+                "indexes": [
+                    models.Index(
+                        fields=["client_id", "reference"],
+                        name="inventory_hold_reference_idx",
+                    ),
+                    models.Index(
+                        condition=models.Q(("status", "ACTIVE")),
+                        fields=["balance", "expires_at"],
+                        name="inventory_hold_active_idx",
+                    ),
+                    models.Index(
+                        condition=models.Q(("status", "ACTIVE")),
+                        fields=["expires_at"],
+                        name="inventory_hold_expiry_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,175 @@
+# Generated by Django 4.2.20 on 2026-10-19 13:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0011_publicationstatuschange"),
+        ("inventory", "0002_stockreservation"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LocationStock",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("quantity", models.IntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "ordering": ["location__name"],
+            },
+        ),
+        migrations.CreateModel(
+            name="ProductStockRollup",
+            fields=[
+                (
+                    "product",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stock_rollup",
+                        serialize=False,
+                        to="products.product",
+                    ),
+                ),
+                ("client_id", models.IntegerField(default=1)),
+                ("quantity_on_hand", models.IntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="StockLocation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, editable=False
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("client_id", models.IntegerField(default=1)),
+                ("company_id", models.IntegerField(default=1)),
+                ("code", models.CharField(max_length=50)),
+                ("name", models.CharField(max_length=100)),
+                ("is_active", models.BooleanField(default=True)),
+            ],
+            options={
+                "ordering": ["name"],
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name="stockcountershard",
+            unique_together=set(),
+        ),
+        migrations.AlterField(
+            model_name="stockmovement",
+            name="reason",
+            field=models.CharField(
+                choices=[
+                    ("OPENING", "Opening balance"),
+                    ("RECEIPT", "Receipt"),
+                    ("SALE", "Sale"),
+                    ("RETURN", "Return"),
+                    ("ADJUSTMENT", "Adjustment"),
+                    ("WRITE_OFF", "Write-off"),
+                    ("TRANSFER", "Transfer between locations"),
+                ],
+                max_length=20,
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="stocklocation",
+            unique_together={("client_id", "code")},
+        ),
+        migrations.AddField(
+            model_name="locationstock",
+            name="balance",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="locations",
+                to="inventory.stockbalance",
+            ),
+        ),
+        migrations.AddField(
+            model_name="locationstock",
+            name="location",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="stock",
+                to="inventory.stocklocation",
+            ),
+        ),
+        migrations.AddField(
+            model_name="stockcountershard",
+            name="location",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="+",
+                to="inventory.stocklocation",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="stockcountershard",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("location__isnull", True)),
+                fields=("balance", "shard"),
+                name="inventory_shard_uniq",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="stockcountershard",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("location__isnull", False)),
+                fields=("balance", "location", "shard"),
+                name="inventory_shard_location_uniq",
+            ),
+        ),
+        migrations.AddField(
+            model_name="stockmovement",
+            name="location",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="movements",
+                to="inventory.stocklocation",
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="locationstock",
+            unique_together={("balance", "location")},
+        ),
+        # Roll up the balances recorded before rollups existed
+        migrations.RunSQL(
+            """
+            INSERT INTO inventory_productstockrollup (product_id, client_id, quantity_on_hand, updated_at)
+            SELECT product_id, MIN(client_id), SUM(on_hand), NOW()
+            FROM inventory_stockbalance
+            GROUP BY product_id
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.20 on 2026-10-19 14:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("inventory", "0003_locations"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="stockcountershard",
+            name="version",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Incremented by the movements added to the shard; reservations check it optimistically",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="stockbalance",
+            name="version",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Incremented by reservations and in-place movements; reservations check it optimistically, together with the versions of the counter shards",
+            ),
+        ),
+    ]
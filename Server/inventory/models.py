@@ -1,3 +1,335 @@
+"""
+Models for the inventory app.
+
+Stock is kept per product (or variant) in a StockBalance, split by
+StockLocation in LocationStock rows, and totalled per product (own stock plus
+that of its variants) in a ProductStockRollup. Every change is recorded as a
+StockMovement in an append-only ledger and applied to these as atomic
+increments; balances of hot SKUs spread their increments over
+StockCounterShard rows, which are periodically compacted (see
+inventory.ledger). StockReservation holds set stock aside for a
+checkout until they are committed, released or expire (see
+inventory.reservations).
+"""
 from django.db import models
+from django.db.models import F, Q
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models.base import TimestampedModel
+
+
+class MovementReason(models.TextChoices):
+    OPENING = 'OPENING', 'Opening balance'
+    RECEIPT = 'RECEIPT', 'Receipt'
+    SALE = 'SALE', 'Sale'
+    RETURN = 'RETURN', 'Return'
+    ADJUSTMENT = 'ADJUSTMENT', 'Adjustment'
+    WRITE_OFF = 'WRITE_OFF', 'Write-off'
+    TRANSFER = 'TRANSFER', 'Transfer between locations'
+
+
+class StockLocation(TimestampedModel):
+    """
+    A place stock is kept, e.g. a warehouse or a store.
+    """
+    client_id = models.IntegerField(default=1)
+    company_id = models.IntegerField(default=1)
+    code = models.CharField(max_length=50)
+    name = models.CharField(max_length=100)
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        unique_together = ('client_id', 'code')
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
+class StockBalance(TimestampedModel):
+    """
+    The stock of a product, or of one of its variants.
+
+    on_hand holds the compacted quantity across all locations; increments
+    of sharded balances (shard_count > 1) are pending in their counter shards
+    until compaction. The current quantity is on_hand plus the shard deltas,
+    see inventory.ledger.with_quantity_on_hand. Stock recorded without a
+    location counts towards on_hand only.
+    """
+    client_id = models.IntegerField(default=1)
+    company_id = models.IntegerField(default=1)
+    product = models.ForeignKey(
+        'products.Product',
+        on_delete=models.CASCADE,
+        related_name='stock_balances'
+    )
+    variant = models.ForeignKey(
+        'products.ProductVariant',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='stock_balances'
+    )
+    on_hand = models.IntegerField(default=0)
+    shard_count = models.PositiveSmallIntegerField(
+        default=1,
+        help_text='Number of counter shards increments are spread over; 1 updates on_hand directly'
+    )
+    compacted_at = models.DateTimeField(null=True, blank=True)
+    version = models.PositiveIntegerField(
+        default=0,
+        help_text='Incremented by reservations and in-place movements; reservations check it optimistically, '
+                  'together with the versions of the counter shards'
+    )
+
+    class Meta:
+        ordering = ['product', 'variant']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['client_id', 'product'],
+                condition=Q(variant__isnull=True),
+                name='inventory_balance_product_uniq'
+            ),
+            models.UniqueConstraint(
+                fields=['client_id', 'variant'],
+                condition=Q(variant__isnull=False),
+                name='inventory_balance_variant_uniq'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.variant or self.product}: {self.on_hand}"
+
+    @property
+    def is_sharded(self):
+        return self.shard_count > 1
+
+
+class LocationStock(models.Model):
+    """
+    The compacted stock of a balance at one location.
+    """
+    balance = models.ForeignKey(StockBalance, on_delete=models.CASCADE, related_name='locations')
+    location = models.ForeignKey(StockLocation, on_delete=models.PROTECT, related_name='stock')
+    quantity = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('balance', 'location')
+        ordering = ['location__name']
+
+    def __str__(self):
+        return f"{self.balance_id}@{self.location_id}: {self.quantity}"
+
+
+class ProductStockRollup(models.Model):
+    """
+    The compacted stock of a product and all of its variants.
+
+    Maintained with the balances: in-place movements increment it in the same
+    transaction, compaction folds in the deltas of sharded balances. Product
+    lists read it instead of summing variant stock per request.
+    """
+    product = models.OneToOneField(
+        'products.Product',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stock_rollup'
+    )
+    client_id = models.IntegerField(default=1)
+    quantity_on_hand = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.product_id}: {self.quantity_on_hand}"
+
+
+class StockCounterShard(models.Model):
+    """
+    One of the counter rows of a sharded stock balance.
+
+    Increments go to a random shard, so concurrent movements of a hot SKU
+    lock different rows; delta accumulates until it is compacted into the
+    balance (and into its stock at location, for shards with a location).
+    Each movement also increments the shard's version, so reservations see
+    the sales of sharded balances without the balance row being written.
+    """
+    balance = models.ForeignKey(StockBalance, on_delete=models.CASCADE, related_name='shards')
+    location = models.ForeignKey(
+        StockLocation,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    shard = models.PositiveSmallIntegerField()
+    delta = models.IntegerField(default=0)
+    version = models.PositiveIntegerField(
+        default=0,
+        help_text='Incremented by the movements added to the shard; reservations check it optimistically'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['balance', 'shard'],
+                condition=Q(location__isnull=True),
+                name='inventory_shard_uniq'
+            ),
+            models.UniqueConstraint(
+                fields=['balance', 'location', 'shard'],
+                condition=Q(location__isnull=False),
+                name='inventory_shard_location_uniq'
+            ),
+        ]
+        indexes = [
+            # Compaction looks for shards holding a delta
+            models.Index(fields=['balance'], condition=~Q(delta=0), name='inventory_shard_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.balance_id}#{self.shard}: {self.delta}"
+
+
+class StockMovement(models.Model):
+    """
+    An entry of the append-only stock ledger.
+
+    quantity is signed: receipts and returns add stock, sales and write-offs
+    remove it. The movements of a balance sum to its current quantity.
+    """
+    client_id = models.IntegerField(default=1)
+    company_id = models.IntegerField(default=1)
+    balance = models.ForeignKey(StockBalance, on_delete=models.CASCADE, related_name='movements')
+    product = models.ForeignKey(
+        'products.Product',
+        on_delete=models.CASCADE,
+        related_name='stock_movements'
+    )
+    variant = models.ForeignKey(
+        'products.ProductVariant',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='stock_movements'
+    )
+    location = models.ForeignKey(
+        StockLocation,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='movements'
+    )
+    quantity = models.IntegerField()
+    reason = models.CharField(max_length=20, choices=MovementReason.choices)
+    reference = models.CharField(max_length=100, blank=True, help_text='External reference, e.g. an order number')
+    note = models.TextField(blank=True)
+    created_by = models.ForeignKey(
+        'auth.User',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['client_id', 'product', '-created_at'], name='inventory_movement_product_idx'),
+            models.Index(fields=['balance', '-created_at'], name='inventory_movement_balance_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.reason} {self.quantity:+d} ({self.balance_id})"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Stock movements are append-only; record a new movement instead.")
+        super().save(*args, **kwargs)
+
+
+class ReservationStatus(models.TextChoices):
+    ACTIVE = 'ACTIVE', 'Active'
+    COMMITTED = 'COMMITTED', 'Committed'
+    RELEASED = 'RELEASED', 'Released'
+    EXPIRED = 'EXPIRED', 'Expired'
+
+
+class StockReservation(models.Model):
+    """
+    A hold on stock of a product or variant, e.g. for a checkout in progress.
+
+    An ACTIVE hold counts against the available stock until expires_at;
+    committing it records the sale in the ledger, releasing it gives the
+    stock back, and the sweeper marks holds past their expiry as EXPIRED.
+    """
+    client_id = models.IntegerField(default=1)
+    company_id = models.IntegerField(default=1)
+    balance = models.ForeignKey(StockBalance, on_delete=models.CASCADE, related_name='reservations')
+    product = models.ForeignKey(
+        'products.Product',
+        on_delete=models.CASCADE,
+        related_name='stock_reservations'
+    )
+    variant = models.ForeignKey(
+        'products.ProductVariant',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='stock_reservations'
+    )
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=10, choices=ReservationStatus.choices, default=ReservationStatus.ACTIVE)
+    reference = models.CharField(max_length=100, help_text='Checkout, cart or order the stock is held for')
+    expires_at = models.DateTimeField()
+    movement = models.ForeignKey(
+        StockMovement,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        help_text='The sale recorded when the hold was committed'
+    )
+    created_by = models.ForeignKey(
+        'auth.User',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['client_id', 'reference'], name='inventory_hold_reference_idx'),
+            # Available-to-sell sums the unexpired active holds of a balance
+            models.Index(
+                fields=['balance', 'expires_at'],
+                condition=Q(status='ACTIVE'),
+                name='inventory_hold_active_idx'
+            ),
+            # The sweeper walks active holds in expiry order
+            models.Index(fields=['expires_at'], condition=Q(status='ACTIVE'), name='inventory_hold_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.reference}: {self.quantity} of {self.balance_id} ({self.status})"
+
+
+@receiver(pre_delete, sender=StockBalance)
+def stock_balance_deleted(sender, instance, **kwargs):
+    """
+    Take the stock of a deleted balance (e.g. of a deleted variant) out of its product's rollup.
 
-# Create your models here.
+    The rollup holds compacted stock only; deltas still pending in the
+    balance's counter shards were never added to it and go with the shards.
+    """
+    if instance.on_hand:
+        ProductStockRollup.objects.filter(product_id=instance.product_id).update(
+            quantity_on_hand=F('quantity_on_hand') - instance.on_hand, updated_at=timezone.now()
+        )
@@ -0,0 +1,311 @@
+"""
+Stock reservations: expiring holds on stock during checkout.
+
+Holds of a batch (e.g. all lines of a cart) are taken together or not at all.
+Availability is read in one query for the batch, without locking: on-hand
+quantity (see inventory.ledger) minus the unexpired ACTIVE holds. The holds
+are then written and the version of every balance involved is incremented,
+provided neither it nor the versions of its counter shards changed since they
+were read; if another reservation or a movement (in place, or added to a
+shard of a sharded balance) changed a balance in between, the transaction is
+rolled back and the batch is retried with fresh figures.
+
+Sales of sharded balances write their shards only, so they never wait on
+reservations. Reservations of one item still serialize on its balance row,
+held from the version check until the transaction commits (one UPDATE and
+the insert of the holds): holds are taken far less often than a hot SKU is
+sold, and a lock shared by every hold is what keeps two of them from both
+taking the last unit.
+
+Committing a hold records the sale in the ledger, releasing it returns the
+stock; holds past their expiry stop counting at once and are marked EXPIRED
+by expire_reservations, which walks the partial index on active holds.
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from inventory.ledger import get_balance, record_movement, with_quantity_on_hand, with_shard_version
+from inventory.models import MovementReason, ReservationStatus, StockBalance, StockReservation
+from products.models import Product, ProductVariant
+
+logger = logging.getLogger(__name__)
+
+
+class InsufficientStock(Exception):
+    """
+    Raised when a batch asks for more than is available of some items.
+
+    Attributes:
+        shortages: [{'product': id, 'variant': id or None, 'requested': n, 'available': n}]
+    """
+
+    def __init__(self, shortages):
+        super().__init__(f"Insufficient stock for {len(shortages)} item(s)")
+        self.shortages = shortages
+
+
+class ReservationConflict(Exception):
+    """
+    Raised when a batch kept colliding with concurrent reservations.
+    """
+
+
+class ReservationExpired(Exception):
+    """
+    Raised when committing holds of which some have expired.
+
+    Attributes:
+        reservation_ids: IDs of the expired holds
+    """
+
+    def __init__(self, reservation_ids):
+        super().__init__(f"{len(reservation_ids)} reservation(s) expired")
+        self.reservation_ids = reservation_ids
+
+
+class _VersionConflict(Exception):
+    pass
+
+
+def with_availability(queryset, now=None):
+    """
+    Annotate stock balances with reserved (unexpired active holds) and
+    available (quantity_on_hand minus reserved).
+    """
+    now = now or timezone.now()
+    holds = StockReservation.objects.filter(
+        balance=OuterRef('pk'), status=ReservationStatus.ACTIVE, expires_at__gt=now
+    ).order_by().values('balance').annotate(total=Sum('quantity')).values('total')
+    return with_quantity_on_hand(queryset).annotate(
+        reserved=Coalesce(Subquery(holds, output_field=IntegerField()), 0)
+    ).annotate(available=F('quantity_on_hand') - F('reserved'))
+
+
+def _balances(client_id, keys, now):
+    """
+    Read the balances of (product_id, variant_id) keys with their availability, in one query.
+    """
+    product_ids = {product_id for product_id, variant_id in keys if variant_id is None}
+    variant_ids = {variant_id for _, variant_id in keys if variant_id is not None}
+    queryset = StockBalance.objects.filter(client_id=client_id).filter(
+        Q(product_id__in=product_ids, variant__isnull=True) | Q(variant_id__in=variant_ids)
+    ).select_related('product').only(
+        'id', 'company_id', 'product_id', 'variant_id', 'on_hand', 'version',
+        'product__inventory_tracking_enabled', 'product__backorders_allowed', 'product__pre_order_available',
+    )
+    balances = {}
+    for balance in with_shard_version(with_availability(queryset, now)):
+        key = (balance.product_id, balance.variant_id)
+        if key in keys:
+            balances[key] = balance
+    return balances
+
+
+def is_stock_limited(product):
+    """
+    Whether orders of a product (or its variants) are limited by the stock available.
+    """
+    return product.inventory_tracking_enabled and not (product.backorders_allowed or product.pre_order_available)
+
+
+def available_to_sell(client_id, keys, on_hand=None):
+    """
+    Return the quantity available to sell of products and variants.
+
+    Args:
+        client_id: The client ID
+        keys: (product_id, variant_id) pairs; variant_id is None for product stock
+        on_hand: Optional {(product_id, variant_id): quantity_on_hand} of the
+            items, already read by the caller; saves looking up items the
+            ledger does not manage yet
+
+    Returns:
+        dict: {(product_id, variant_id): available}; items that do not exist
+        are left out, and items the ledger does not manage yet report their
+        quantity_on_hand
+    """
+    keys = set(keys)
+    levels = {key: balance.available for key, balance in _balances(client_id, keys, timezone.now()).items()}
+
+    missing = keys - levels.keys()
+    if on_hand is not None:
+        levels.update((key, on_hand[key]) for key in missing if key in on_hand)
+        missing = missing - on_hand.keys()
+    product_ids = {product_id for product_id, variant_id in missing if variant_id is None}
+    variant_ids = {variant_id for _, variant_id in missing if variant_id is not None}
+    if product_ids:
+        for product_id, quantity in Product.objects.filter(
+            client_id=client_id, pk__in=product_ids
+        ).values_list('pk', 'quantity_on_hand'):
+            levels[(product_id, None)] = quantity
+    if variant_ids:
+        for variant_id, product_id, quantity in ProductVariant.objects.filter(
+            client_id=client_id, pk__in=variant_ids
+        ).values_list('pk', 'product_id', 'quantity_on_hand'):
+            if (product_id, variant_id) in missing:
+                levels[(product_id, variant_id)] = quantity
+    return levels
+
+
+def reserve_stock(client_id, items, reference, ttl=None, user=None):
+    """
+    Hold stock for a batch of items, all or nothing.
+
+    Args:
+        client_id: The client ID
+        items: [{'product_id': id, 'variant_id': id or None, 'quantity': n}];
+            repeated items are added up
+        reference: The checkout, cart or order the stock is held for
+        ttl: Seconds the holds last; INVENTORY_RESERVATION_TTL by default
+
+    Returns:
+        list: The StockReservation holds created
+
+    Raises:
+        InsufficientStock: If stock-limited items are short
+        ReservationConflict: If concurrent reservations kept changing the balances
+        Product.DoesNotExist / ProductVariant.DoesNotExist: If an item does not exist
+    """
+    requested = defaultdict(int)
+    for item in items:
+        requested[(item['product_id'], item.get('variant_id'))] += item['quantity']
+    expires_in = timedelta(seconds=ttl or settings.INVENTORY_RESERVATION_TTL)
+
+    for attempt in range(settings.INVENTORY_RESERVATION_RETRIES + 1):
+        try:
+            with transaction.atomic():
+                return _reserve(client_id, requested, reference, expires_in, user)
+        except _VersionConflict:
+            logger.info("Reservation %s for client %s conflicted (attempt %s)", reference, client_id, attempt + 1)
+    raise ReservationConflict(f"Stock for {reference} kept changing; try again.")
+
+
+def _reserve(client_id, requested, reference, expires_in, user):
+    now = timezone.now()
+    balances = _balances(client_id, requested.keys(), now)
+    missing = requested.keys() - balances.keys()
+    if missing:
+        for product_id, variant_id in missing:
+            get_balance(client_id, product_id, variant_id)
+        balances = _balances(client_id, requested.keys(), now)
+
+    shortages = []
+    for (product_id, variant_id), quantity in requested.items():
+        balance = balances[(product_id, variant_id)]
+        if quantity > balance.available and is_stock_limited(balance.product):
+            shortages.append({
+                'product': product_id,
+                'variant': variant_id,
+                'requested': quantity,
+                'available': max(balance.available, 0),
+            })
+    if shortages:
+        raise InsufficientStock(shortages)
+
+    read_versions = Q()
+    for balance in balances.values():
+        read_versions |= Q(pk=balance.pk, version=balance.version, shard_version=balance.shard_version)
+    if with_shard_version(StockBalance.objects.all()).filter(read_versions).update(
+        version=F('version') + 1
+    ) != len(balances):
+        raise _VersionConflict()
+
+    return StockReservation.objects.bulk_create([
+        StockReservation(
+            client_id=client_id, company_id=balances[key].company_id,
+            balance_id=balances[key].pk, product_id=key[0], variant_id=key[1], quantity=quantity,
+            reference=reference, expires_at=now + expires_in,
+            created_by=user if user and user.is_authenticated else None,
+        )
+        for key, quantity in requested.items()
+    ])
+
+
+def _active_holds(client_id, reference):
+    return StockReservation.objects.filter(client_id=client_id, reference=reference, status=ReservationStatus.ACTIVE)
+
+
+def commit_reservations(client_id, reference, user=None):
+    """
+    Turn the active holds of a reference into sales recorded in the ledger.
+
+    Returns:
+        list: The committed holds
+
+    Raises:
+        ReservationExpired: If any of the holds has expired; nothing is committed
+    """
+    with transaction.atomic():
+        holds = list(_active_holds(client_id, reference).select_for_update().order_by('pk'))
+        now = timezone.now()
+        expired = [hold.pk for hold in holds if hold.expires_at <= now]
+        if expired:
+            raise ReservationExpired(expired)
+
+        for hold in holds:
+            hold.movement = record_movement(
+                client_id, hold.product_id, -hold.quantity, MovementReason.SALE,
+                variant_id=hold.variant_id, reference=reference, user=user
+            )
+            hold.status = ReservationStatus.COMMITTED
+            hold.updated_at = now
+        StockReservation.objects.bulk_update(holds, ['status', 'movement', 'updated_at'])
+    return holds
+
+
+def release_reservations(client_id, reference):
+    """
+    Give back the stock held by the active holds of a reference.
+
+    Returns:
+        int: The number of holds released
+    """
+    return _active_holds(client_id, reference).update(status=ReservationStatus.RELEASED, updated_at=timezone.now())
+
+
+def extend_reservations(client_id, reference, ttl=None):
+    """
+    Push back the expiry of the unexpired active holds of a reference.
+
+    Returns:
+        int: The number of holds extended
+    """
+    now = timezone.now()
+    return _active_holds(client_id, reference).filter(expires_at__gt=now).update(
+        expires_at=now + timedelta(seconds=ttl or settings.INVENTORY_RESERVATION_TTL), updated_at=now
+    )
+
+
+def expire_reservations(batch_size=None):
+    """
+    Mark active holds past their expiry as EXPIRED, in batches.
+
+    Expired holds already stop counting against availability; this keeps the
+    active set (and its partial indexes) small. Holds locked by a commit in
+    progress are skipped.
+
+    Returns:
+        int: The number of holds expired
+    """
+    batch_size = batch_size or settings.INVENTORY_RESERVATION_SWEEP_BATCH_SIZE
+    now = timezone.now()
+    expired = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                StockReservation.objects.select_for_update(skip_locked=True)
+                .filter(status=ReservationStatus.ACTIVE, expires_at__lte=now)
+                .order_by('expires_at').values_list('pk', flat=True)[:batch_size]
+            )
+            if ids:
+                StockReservation.objects.filter(pk__in=ids).update(status=ReservationStatus.EXPIRED, updated_at=now)
+        expired += len(ids)
+        if len(ids) < batch_size:
+            return expired
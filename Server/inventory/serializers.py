@@ -0,0 +1,184 @@
+"""
+Serializers for the inventory app's API: stock locations, balances, the
+movement ledger, stock reservations and availability checks.
+"""
+from django.conf import settings
+from rest_framework import serializers
+
+from core.utils import get_request_client_id
+from inventory.models import (
+    LocationStock, MovementReason, StockBalance, StockLocation, StockMovement, StockReservation
+)
+
+
+class StockLocationSerializer(serializers.ModelSerializer):
+    """
+    Serializer for stock locations (warehouses, stores...); codes are unique per client.
+    """
+
+    class Meta:
+        model = StockLocation
+        fields = ['id', 'code', 'name', 'is_active', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_at', 'updated_at']
+
+    def validate_code(self, value):
+        locations = StockLocation.objects.filter(
+            client_id=get_request_client_id(self.context['request']), code=value
+        )
+        if self.instance:
+            locations = locations.exclude(pk=self.instance.pk)
+        if locations.exists():
+            raise serializers.ValidationError("A location with this code already exists.")
+        return value
+
+
+class LocationStockSerializer(serializers.ModelSerializer):
+    code = serializers.CharField(source='location.code', read_only=True)
+
+    class Meta:
+        model = LocationStock
+        fields = ['location', 'code', 'quantity']
+        read_only_fields = fields
+
+
+class StockBalanceSerializer(serializers.ModelSerializer):
+    """
+    Serializer reporting a stock balance.
+
+    quantity_on_hand is the current quantity, including increments not yet
+    compacted; reserved is held by unexpired reservations and available is
+    the difference. They come from inventory.reservations.with_availability.
+    locations lists the compacted stock at each location.
+    """
+    quantity_on_hand = serializers.IntegerField(read_only=True)
+    reserved = serializers.IntegerField(read_only=True)
+    available = serializers.IntegerField(read_only=True)
+    locations = LocationStockSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = StockBalance
+        fields = [
+            'id', 'product', 'variant', 'quantity_on_hand', 'reserved', 'available', 'on_hand', 'locations',
+            'shard_count', 'compacted_at', 'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
+
+
+class StockMovementSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the stock ledger.
+
+    Movements are created with a product (and variant, for variant stock), a
+    signed non-zero quantity and a reason, optionally at a location; they
+    cannot be changed afterwards. Transfers are recorded with
+    StockTransferSerializer.
+    """
+    # Checked against the client's products and locations when the movement is recorded
+    product = serializers.IntegerField(min_value=1, source='product_id')
+    variant = serializers.IntegerField(min_value=1, source='variant_id', required=False, allow_null=True)
+    location = serializers.IntegerField(min_value=1, source='location_id', required=False, allow_null=True)
+    reason = serializers.ChoiceField(choices=[
+        choice for choice in MovementReason.choices
+        if choice[0] not in (MovementReason.OPENING, MovementReason.TRANSFER)
+    ])
+
+    class Meta:
+        model = StockMovement
+        fields = [
+            'id', 'balance', 'product', 'variant', 'location', 'quantity', 'reason', 'reference', 'note',
+            'created_by', 'created_at'
+        ]
+        read_only_fields = ['id', 'balance', 'created_by', 'created_at']
+
+    def validate_quantity(self, value):
+        if value == 0:
+            raise serializers.ValidationError("Quantity must not be zero.")
+        return value
+
+
+class StockTransferSerializer(serializers.Serializer):
+    """
+    Serializer validating a transfer of stock between two locations.
+    """
+    product = serializers.IntegerField(min_value=1, source='product_id')
+    variant = serializers.IntegerField(min_value=1, source='variant_id', required=False, allow_null=True)
+    quantity = serializers.IntegerField(min_value=1)
+    from_location = serializers.IntegerField(min_value=1, source='from_location_id')
+    to_location = serializers.IntegerField(min_value=1, source='to_location_id')
+    reference = serializers.CharField(max_length=100, required=False, allow_blank=True)
+    note = serializers.CharField(required=False, allow_blank=True)
+
+    def validate(self, data):
+        if data['from_location_id'] == data['to_location_id']:
+            raise serializers.ValidationError({'to_location': "Must differ from from_location."})
+        return data
+
+
+class CounterShardsSerializer(serializers.Serializer):
+    """
+    Serializer validating the counter shards to give a balance; use more
+    than one for hot SKUs.
+    """
+    shard_count = serializers.IntegerField(min_value=1, max_value=64, required=False)
+
+    def validate(self, data):
+        data.setdefault('shard_count', settings.INVENTORY_HOT_SKU_SHARDS)
+        return data
+
+
+class StockReservationSerializer(serializers.ModelSerializer):
+    """
+    Serializer reporting a stock reservation (hold).
+    """
+
+    class Meta:
+        model = StockReservation
+        fields = [
+            'id', 'reference', 'product', 'variant', 'quantity', 'status', 'expires_at', 'movement',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
+
+
+class ReservationItemSerializer(serializers.Serializer):
+    product = serializers.IntegerField(min_value=1, source='product_id')
+    variant = serializers.IntegerField(min_value=1, source='variant_id', required=False, allow_null=True)
+    quantity = serializers.IntegerField(min_value=1)
+
+
+def _ttl_field():
+    return serializers.IntegerField(min_value=1, max_value=settings.INVENTORY_RESERVATION_MAX_TTL, required=False)
+
+
+class ReserveStockSerializer(serializers.Serializer):
+    """
+    Serializer validating a batch of holds.
+
+    Expects {"reference": "cart-42", "ttl": 900, "items": [{"product": 1, "variant": 2, "quantity": 1}]};
+    ttl is in seconds and defaults to INVENTORY_RESERVATION_TTL.
+    """
+    reference = serializers.CharField(max_length=100)
+    ttl = _ttl_field()
+    items = serializers.ListField(child=ReservationItemSerializer(), allow_empty=False, max_length=1000)
+
+
+class ReservationReferenceSerializer(serializers.Serializer):
+    """
+    Serializer validating the reference whose holds are committed, released or extended.
+    """
+    reference = serializers.CharField(max_length=100)
+    ttl = _ttl_field()
+
+
+class AvailabilityCheckSerializer(serializers.Serializer):
+    """
+    Serializer validating a batch availability check: {"skus": ["KNIFE-RED", "PAN-24"]}.
+    """
+    skus = serializers.ListField(child=serializers.CharField(max_length=100), allow_empty=False)
+
+    def validate_skus(self, value):
+        if len(value) > settings.INVENTORY_AVAILABILITY_MAX_SKUS:
+            raise serializers.ValidationError(
+                f"At most {settings.INVENTORY_AVAILABILITY_MAX_SKUS} SKUs can be checked at once."
+            )
+        return value
@@ -0,0 +1,51 @@
+"""
+Tasks for the inventory app.
+"""
+import logging
+
+from celery import shared_task
+from django.conf import settings
+
+from .ledger import compact_counters, sync_product_stock
+from .reservations import expire_reservations
+
+logger = logging.getLogger(__name__)
+
+# Upper bound of compaction passes per run, so sustained traffic cannot keep a run going
+MAX_COMPACTION_PASSES = 50
+
+
+@shared_task
+def compact_stock_counters():
+    """
+    Fold the counter shards of hot SKUs into their balances and refresh the
+    quantity_on_hand of products and variants.
+
+    Shards are drained in batches until a batch comes back short (or after
+    MAX_COMPACTION_PASSES); overlapping runs skip each other's locked shards.
+
+    Returns:
+        dict: Shards drained, balances updated, and products/variants refreshed
+    """
+    batch_size = settings.INVENTORY_COMPACTION_BATCH_SIZE
+    stats = {'shards': 0, 'balances': 0}
+    for _ in range(MAX_COMPACTION_PASSES):
+        result = compact_counters(batch_size)
+        stats['shards'] += result['shards']
+        stats['balances'] += result['balances']
+        if result['shards'] < batch_size:
+            break
+    stats.update(sync_product_stock())
+    logger.info("Compacted stock counters: %s", stats)
+    return stats
+
+
+@shared_task
+def expire_stock_reservations():
+    """
+    Mark stock reservations past their expiry as expired.
+
+    Returns:
+        dict: The number of holds expired
+    """
+    return {'expired': expire_reservations()}
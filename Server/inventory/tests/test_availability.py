@@ -0,0 +1,203 @@
+"""
+Tests for batch availability checks by SKU (inventory.availability).
+"""
+from datetime import timedelta
+
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core import reference_data
+from core.conditional import get_change_counters
+from inventory import availability
+from inventory.availability import check_availability
+from inventory.ledger import record_movement
+from inventory.models import MovementReason
+from inventory.reservations import reserve_stock
+from products.catalogue.models import Category, Division, ProductStatus
+from products.models import SKUS_CHANGE_SCOPE, Product, ProductVariant
+
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'inventory-availability-tests',
+    }
+}
+
+
+def count_queries(ctx):
+    return len([query for query in ctx.captured_queries if 'SAVEPOINT' not in query['sql']])
+
+
+@override_settings(CACHES=LOCMEM_CACHES, REDIS_CLIENT_BACKEND='memory')
+class AvailabilityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        division = Division.objects.create(name='Home')
+        cls.category = Category.objects.create(name='Kitchen', division=division)
+        cls.discontinued = ProductStatus.objects.create(name='Discontinued', is_orderable=False)
+        cls.knife = Product.objects.create(
+            name='Knife', slug='knife', category=cls.category, product_type='PARENT', sku='KNIFE'
+        )
+        cls.red = ProductVariant.objects.create(
+            product=cls.knife, sku='KNIFE-RED', display_price='12.00', quantity_on_hand=5
+        )
+        cls.blue = ProductVariant.objects.create(
+            product=cls.knife, sku='KNIFE-BLUE', display_price='12.00', quantity_on_hand=3,
+            status_override=cls.discontinued
+        )
+        cls.green = ProductVariant.objects.create(
+            product=cls.knife, sku='KNIFE-GREEN', display_price='12.00', quantity_on_hand=3, is_active=False
+        )
+        cls.pan = Product.objects.create(
+            name='Pan', slug='pan', category=cls.category, sku='PAN', backorders_allowed=True
+        )
+        cls.pot = Product.objects.create(
+            name='Pot', slug='pot', category=cls.category, sku='POT', quantity_on_hand=9,
+            productstatus=cls.discontinued
+        )
+        cls.gift = Product.objects.create(
+            name='Gift card', slug='gift-card', category=cls.category, sku='GIFT', inventory_tracking_enabled=False
+        )
+        cls.release = timezone.localdate() + timedelta(days=30)
+        cls.wok = Product.objects.create(
+            name='Wok', slug='wok', category=cls.category, sku='WOK', pre_order_available=True,
+            pre_order_date=cls.release
+        )
+
+    def setUp(self):
+        caches['default'].clear()
+        availability.clear_local_cache()
+        reference_data.clear_local_cache()
+
+    def test_records(self):
+        record_movement(1, self.knife.id, -2, MovementReason.SALE, variant_id=self.red.id)
+        reserve_stock(1, [{'product_id': self.knife.id, 'variant_id': self.red.id, 'quantity': 1}], 'cart-1')
+
+        results, unknown = check_availability(1, [
+            'KNIFE', 'KNIFE-RED', 'KNIFE-BLUE', 'KNIFE-GREEN', 'PAN', 'POT', 'GIFT', 'WOK', 'NOPE'
+        ])
+
+        def record(sku):
+            return {key: results[sku][key] for key in ('orderable', 'available', 'eta')}
+
+        self.assertEqual(results['KNIFE-RED']['variant'], self.red.id)
+        self.assertEqual(record('KNIFE-RED'), {'orderable': True, 'available': 2, 'eta': None})
+        self.assertEqual(record('KNIFE'), {'orderable': False, 'available': 0, 'eta': None})
+        # Variant status override, inactive variant, product status
+        self.assertEqual(record('KNIFE-BLUE'), {'orderable': False, 'available': 3, 'eta': None})
+        self.assertEqual(record('KNIFE-GREEN'), {'orderable': False, 'available': 3, 'eta': None})
+        self.assertEqual(record('POT'), {'orderable': False, 'available': 9, 'eta': None})
+        # Backorders, untracked stock and pre-orders are orderable without stock
+        self.assertEqual(record('PAN'), {'orderable': True, 'available': 0, 'eta': None})
+        self.assertEqual(record('GIFT'), {'orderable': True, 'available': None, 'eta': None})
+        self.assertEqual(record('WOK'), {'orderable': True, 'available': 0, 'eta': self.release})
+        self.assertEqual(unknown, ['NOPE'])
+
+    def test_fixed_number_of_queries(self):
+        check_availability(1, ['PAN'])
+        ProductVariant.objects.bulk_create([
+            ProductVariant(product=self.knife, sku=f'KNIFE-{number}', display_price='12.00', quantity_on_hand=1)
+            for number in range(300)
+        ])
+        record_movement(1, self.knife.id, 4, MovementReason.RECEIPT, variant_id=self.red.id)
+        skus = [f'KNIFE-{number}' for number in range(300)] + ['KNIFE-RED', 'PAN', 'NOPE']
+
+        # The bulk-created variants are missing from the warm index: looked up, and the index is rebuilt
+        with self.captureOnCommitCallbacks(execute=True):
+            results, unknown = check_availability(1, skus)
+        self.assertEqual(len(results), 302)
+        self.assertEqual(results['KNIFE-RED']['available'], 9)
+
+        check_availability(1, skus)
+        with CaptureQueriesContext(connection) as ctx:
+            results, unknown = check_availability(1, skus)
+        # Products, variants, balances, and the database lookup of the unknown SKU
+        self.assertEqual(count_queries(ctx), 5)
+        self.assertEqual(unknown, ['NOPE'])
+
+        with CaptureQueriesContext(connection) as ctx:
+            check_availability(1, skus[:-1])
+        self.assertEqual(count_queries(ctx), 3)
+
+    def test_index_follows_sku_changes(self):
+        check_availability(1, ['KNIFE-RED'])
+        self.red.sku = 'KNIFE-CRIMSON'
+        self.red.save()
+
+        results, unknown = check_availability(1, ['KNIFE-RED', 'KNIFE-CRIMSON'])
+        self.assertEqual(list(results), ['KNIFE-CRIMSON'])
+        self.assertEqual(unknown, ['KNIFE-RED'])
+
+        # Renamed behind the signals' back: the stale entry is not trusted
+        Product.objects.filter(pk=self.pan.pk).update(sku='SKILLET')
+        results, unknown = check_availability(1, ['PAN', 'SKILLET'])
+        self.assertEqual(results['SKILLET']['product'], self.pan.id)
+        self.assertEqual(unknown, ['PAN'])
+
+    def test_only_sku_changes_invalidate_the_index(self):
+        def version():
+            return get_change_counters([SKUS_CHANGE_SCOPE], 1)[0]
+
+        start = version()
+        knife = Product.objects.get(pk=self.knife.pk)
+        knife.name = 'Chef knife'
+        red = ProductVariant.objects.get(pk=self.red.pk)
+        red.quantity_on_hand = 8
+        with self.captureOnCommitCallbacks(execute=True):
+            knife.save()
+            red.save()
+        self.assertEqual(version(), start)
+
+        red.sku = 'KNIFE-CRIMSON'
+        with self.captureOnCommitCallbacks(execute=True):
+            red.save()
+        self.assertEqual(version(), start + 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            red.save()
+            ProductVariant.objects.create(product=self.knife, sku='KNIFE-TEAL', display_price='12.00')
+            self.pot.delete()
+        self.assertEqual(version(), start + 3)
+
+    def test_skus_are_scoped_to_client(self):
+        Product.objects.create(name='Pan', slug='pan', category=self.category, sku='PAN', client_id=2)
+
+        results, unknown = check_availability(2, ['PAN', 'KNIFE-RED'])
+
+        self.assertNotEqual(results['PAN']['product'], self.pan.id)
+        self.assertEqual(unknown, ['KNIFE-RED'])
+
+
+@override_settings(CACHES=LOCMEM_CACHES, REDIS_CLIENT_BACKEND='memory')
+class AvailabilityApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        division = Division.objects.create(name='Home')
+        category = Category.objects.create(name='Kitchen', division=division)
+        Product.objects.create(name='Knife', slug='knife', category=category, sku='KNIFE', quantity_on_hand=3)
+
+    def setUp(self):
+        caches['default'].clear()
+        availability.clear_local_cache()
+        self.client = APIClient()
+
+    def post(self, data):
+        return self.client.post(reverse('stock-availability-list'), data, format='json')
+
+    def test_check(self):
+        response = self.post({'skus': ['KNIFE', 'NOPE']})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results']['KNIFE']['available'], 3)
+        self.assertTrue(response.data['results']['KNIFE']['orderable'])
+        self.assertEqual(response.data['unknown'], ['NOPE'])
+
+    @override_settings(INVENTORY_AVAILABILITY_MAX_SKUS=2)
+    def test_validation(self):
+        for data in ({}, {'skus': []}, {'skus': ['A', 'B', 'C']}, {'skus': 'KNIFE'}):
+            with self.subTest(data=data):
+                self.assertEqual(self.post(data).status_code, 400)
@@ -0,0 +1,249 @@
+"""
+Tests for the stock ledger, sharded counters and compaction (inventory.ledger).
+"""
+import threading
+
+from django.core.cache import caches
+from django.db import connection
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.conditional import get_change_counters
+from inventory.ledger import (
+    compact_counters, get_balance, record_movement, set_counter_shards, sync_product_stock, with_quantity_on_hand
+)
+from inventory.models import MovementReason, StockBalance, StockCounterShard, StockMovement
+from inventory.tasks import compact_stock_counters
+from products.catalogue.models import Category, Division
+from products.models import PRODUCTS_CHANGE_SCOPE, Product, ProductVariant
+from products.serializers import ProductSerializer
+
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'inventory-ledger-tests',
+    }
+}
+
+
+def quantity_on_hand(balance):
+    return with_quantity_on_hand(StockBalance.objects.filter(pk=balance.pk)).get().quantity_on_hand
+
+
+@override_settings(CACHES=LOCMEM_CACHES, REDIS_CLIENT_BACKEND='memory')
+class StockLedgerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        division = Division.objects.create(name='Home')
+        cls.category = Category.objects.create(name='Kitchen', division=division)
+        cls.product = Product.objects.create(
+            name='Knife', slug='knife', category=cls.category, product_type='PARENT', quantity_on_hand=10
+        )
+        cls.variant = ProductVariant.objects.create(
+            product=cls.product, sku='KNIFE-RED', display_price='12.00', quantity_on_hand=4
+        )
+        cls.other = Product.objects.create(name='Pan', slug='pan', category=cls.category)
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def test_movements_open_balance_and_increment_it(self):
+        record_movement(1, self.product.id, -3, MovementReason.SALE, reference='SO-1')
+        record_movement(1, self.product.id, 5, MovementReason.RECEIPT)
+
+        balance = StockBalance.objects.get(product=self.product, variant__isnull=True)
+        self.assertEqual(balance.on_hand, 12)
+        self.assertEqual(
+            list(balance.movements.order_by('id').values_list('reason', 'quantity')),
+            [('OPENING', 10), ('SALE', -3), ('RECEIPT', 5)]
+        )
+        self.assertEqual(balance.movements.aggregate(total=Sum('quantity'))['total'], balance.on_hand)
+
+    def test_item_without_stock_opens_without_movement(self):
+        balance = get_balance(1, self.other.id)
+
+        self.assertEqual(balance.on_hand, 0)
+        self.assertFalse(balance.movements.exists())
+        self.assertEqual(get_balance(1, self.other.id).pk, balance.pk)
+
+    def test_variant_must_belong_to_product_and_client(self):
+        with self.assertRaises(ProductVariant.DoesNotExist):
+            record_movement(1, self.other.id, 1, MovementReason.RECEIPT, variant_id=self.variant.id)
+        with self.assertRaises(Product.DoesNotExist):
+            record_movement(2, self.product.id, 1, MovementReason.RECEIPT)
+
+    def test_movements_are_append_only(self):
+        movement = record_movement(1, self.product.id, 1, MovementReason.RECEIPT)
+
+        movement.quantity = 100
+        with self.assertRaises(ValueError):
+            movement.save()
+
+    def test_sharded_balance_is_compacted_and_synced(self):
+        balance = set_counter_shards(get_balance(1, self.product.id, self.variant.id), 4)
+        for _ in range(20):
+            record_movement(1, self.product.id, -1, MovementReason.SALE, variant_id=self.variant.id)
+
+        balance.refresh_from_db()
+        self.assertEqual(balance.on_hand, 4)
+        self.assertEqual(quantity_on_hand(balance), -16)
+        self.assertEqual(balance.shards.count(), 4)
+
+        pending = balance.shards.exclude(delta=0).count()
+        self.assertEqual(compact_counters(), {'shards': pending, 'balances': 1})
+        balance.refresh_from_db()
+        self.assertEqual(balance.on_hand, -16)
+        self.assertIsNotNone(balance.compacted_at)
+        self.assertFalse(StockCounterShard.objects.exclude(delta=0).exists())
+        self.assertEqual(compact_counters(), {'shards': 0, 'balances': 0})
+
+        counter = get_change_counters([PRODUCTS_CHANGE_SCOPE], 1)
+        before = Product.objects.get(pk=self.product.pk).updated_at
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(sync_product_stock(), {'products': 0, 'variants': 1})
+        self.assertEqual(ProductVariant.objects.get(pk=self.variant.pk).quantity_on_hand, -16)
+        self.assertGreater(Product.objects.get(pk=self.product.pk).updated_at, before)
+        self.assertNotEqual(get_change_counters([PRODUCTS_CHANGE_SCOPE], 1), counter)
+        self.assertEqual(sync_product_stock(), {'products': 0, 'variants': 0})
+
+    def test_task_compacts_in_batches_and_syncs(self):
+        set_counter_shards(get_balance(1, self.product.id), 3)
+        set_counter_shards(get_balance(1, self.other.id), 3)
+        StockCounterShard.objects.update(delta=2)
+
+        with override_settings(INVENTORY_COMPACTION_BATCH_SIZE=4):
+            stats = compact_stock_counters()
+
+        self.assertEqual(stats, {'shards': 6, 'balances': 3, 'products': 2, 'variants': 0})
+        self.assertEqual(
+            dict(Product.objects.filter(pk__in=[self.product.pk, self.other.pk]).values_list('slug', 'quantity_on_hand')),
+            {'knife': 16, 'pan': 6}
+        )
+
+    def test_serializer_updates_keep_ledger_stock(self):
+        product = Product.objects.get(pk=self.other.pk)
+        serializer = ProductSerializer(product, data={'quantity_on_hand': 7}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        self.assertEqual(Product.objects.get(pk=product.pk).quantity_on_hand, 7)
+
+        record_movement(1, product.id, 1, MovementReason.RECEIPT)
+        serializer = ProductSerializer(product, data={'quantity_on_hand': 50, 'name': 'Frying pan'}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        product = Product.objects.get(pk=product.pk)
+        self.assertEqual(product.name, 'Frying pan')
+        self.assertEqual(product.quantity_on_hand, 7)
+        self.assertEqual(StockBalance.objects.get(product=product).on_hand, 8)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, REDIS_CLIENT_BACKEND='memory')
+class StockApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        division = Division.objects.create(name='Home')
+        category = Category.objects.create(name='Kitchen', division=division)
+        cls.product = Product.objects.create(
+            name='Knife', slug='knife', category=category, product_type='PARENT', quantity_on_hand=10
+        )
+        cls.variant = ProductVariant.objects.create(product=cls.product, sku='KNIFE-RED', display_price='12.00')
+        cls.other = Product.objects.create(name='Pan', slug='pan', category=category)
+
+    def setUp(self):
+        caches['default'].clear()
+        self.client = APIClient()
+
+    def post_movement(self, **data):
+        return self.client.post(reverse('stock-movement-list'), data, format='json')
+
+    def test_record_and_list_movements(self):
+        response = self.post_movement(product=self.product.id, quantity=-2, reason='SALE', reference='SO-1')
+
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['quantity_on_hand'], 8)
+        self.assertEqual(response.data['reference'], 'SO-1')
+        self.post_movement(product=self.other.id, quantity=3, reason='RECEIPT')
+
+        response = self.client.get(reverse('stock-movement-list'), {'product': self.product.id})
+        self.assertEqual([row['reason'] for row in response.data['results']], ['SALE', 'OPENING'])
+        response = self.client.get(reverse('stock-movement-list'), {'reason': 'RECEIPT'})
+        self.assertEqual(response.data['count'], 1)
+
+    def test_invalid_movements(self):
+        for data in (
+            {'product': self.product.id, 'quantity': 0, 'reason': 'SALE'},
+            {'product': self.product.id, 'quantity': 1, 'reason': 'OPENING'},
+            {'product': self.other.id, 'variant': self.variant.id, 'quantity': 1, 'reason': 'RECEIPT'},
+            {'product': 999999, 'quantity': 1, 'reason': 'RECEIPT'},
+        ):
+            with self.subTest(data=data):
+                self.assertEqual(self.post_movement(**data).status_code, 400)
+        self.assertFalse(StockMovement.objects.exists())
+
+    def test_balances_and_sharding(self):
+        self.post_movement(product=self.product.id, variant=self.variant.id, quantity=5, reason='RECEIPT')
+        balance = StockBalance.objects.get(variant=self.variant)
+
+        response = self.client.post(reverse('stock-balance-shards', args=[balance.pk]), {}, format='json')
+        self.assertEqual(response.data['shard_count'], 8)
+        self.post_movement(product=self.product.id, variant=self.variant.id, quantity=-1, reason='SALE')
+
+        response = self.client.get(reverse('stock-balance-list'), {'variant': self.variant.id})
+        self.assertEqual(response.data['count'], 1)
+        row = response.data['results'][0]
+        self.assertEqual((row['on_hand'], row['quantity_on_hand']), (5, 4))
+
+        response = self.client.post(reverse('stock-balance-shards', args=[balance.pk]), {'shard_count': 0}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class ConcurrentMovementTests(TransactionTestCase):
+    """
+    Concurrent movements must not lose increments, sharded or not.
+    """
+    threads = 6
+    movements_per_thread = 10
+
+    def setUp(self):
+        division = Division.objects.create(name='Home')
+        category = Category.objects.create(name='Kitchen', division=division)
+        self.product = Product.objects.create(name='Knife', slug='knife', category=category, quantity_on_hand=500)
+
+    def sell_concurrently(self):
+        errors = []
+
+        def sell():
+            try:
+                for _ in range(self.movements_per_thread):
+                    record_movement(1, self.product.id, -1, MovementReason.SALE)
+            except Exception as exc:  # pragma: no cover - reported below
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=sell) for _ in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(errors, [])
+
+    def test_in_place_increments(self):
+        balance = get_balance(1, self.product.id)
+
+        self.sell_concurrently()
+
+        self.assertEqual(quantity_on_hand(balance), 500 - self.threads * self.movements_per_thread)
+
+    def test_sharded_increments(self):
+        balance = set_counter_shards(get_balance(1, self.product.id), 4)
+
+        self.sell_concurrently()
+        compact_counters()
+
+        balance.refresh_from_db()
+        self.assertEqual(balance.on_hand, 500 - self.threads * self.movements_per_thread)
+        self.assertEqual(balance.movements.aggregate(total=Sum('quantity'))['total'], balance.on_hand)
@@ -0,0 +1,198 @@
+"""
+Tests for stock locations, transfers and the per-product stock rollups.
+"""
+import io
+
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from inventory.ledger import (
+    compact_counters, get_balance, rebuild_rollups, record_movement, set_counter_shards, transfer_stock
+)
+from inventory.models import LocationStock, MovementReason, ProductStockRollup, StockLocation
+from products.catalogue.models import Category, Division
+from products.bulk import bulk_delete_variants
+from products.fast_serializers import FastProductSerializer
+from products.models import Product, ProductVariant
+
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'inventory-location-tests',
+    }
+}
+
+
+def location_stock(balance):
+    return dict(LocationStock.objects.filter(balance=balance).values_list('location__code', 'quantity'))
+
+
+def rollup(product):
+    return ProductStockRollup.objects.get(product=product).quantity_on_hand
+
+
+@override_settings(CACHES=LOCMEM_CACHES, REDIS_CLIENT_BACKEND='memory')
+class StockLocationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        division = Division.objects.create(name='Home')
+        category = Category.objects.create(name='Kitchen', division=division)
+        cls.knife = Product.objects.create(
+            name='Knife', slug='knife', category=category, product_type='PARENT', quantity_on_hand=2
+        )
+        cls.red = ProductVariant.objects.create(
+            product=cls.knife, sku='KNIFE-RED', display_price='12.00', quantity_on_hand=5
+        )
+        cls.blue = ProductVariant.objects.create(product=cls.knife, sku='KNIFE-BLUE', display_price='12.00')
+        cls.north = StockLocation.objects.create(code='NORTH', name='North warehouse')
+        cls.south = StockLocation.objects.create(code='SOUTH', name='South store')
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def test_movements_maintain_location_stock_and_rollup(self):
+        record_movement(1, self.knife.id, 10, MovementReason.RECEIPT, variant_id=self.red.id, location_id=self.north.id)
+        record_movement(1, self.knife.id, 3, MovementReason.RECEIPT, variant_id=self.blue.id, location_id=self.south.id)
+        record_movement(1, self.knife.id, -4, MovementReason.SALE, variant_id=self.red.id, location_id=self.north.id)
+
+        red = get_balance(1, self.knife.id, self.red.id)
+        self.assertEqual(red.on_hand, 11)
+        self.assertEqual(location_stock(red), {'NORTH': 6})
+        # Product stock (2) plus that of the variants (5 + 10 - 4, and 3)
+        self.assertEqual(rollup(self.knife), 16)
+
+    def test_transfer_moves_stock_between_locations(self):
+        record_movement(1, self.knife.id, 10, MovementReason.RECEIPT, location_id=self.north.id)
+
+        outgoing, incoming = transfer_stock(1, self.knife.id, 4, self.north.id, self.south.id, reference='TR-1')
+
+        balance = get_balance(1, self.knife.id)
+        self.assertEqual((outgoing.quantity, incoming.quantity), (-4, 4))
+        self.assertEqual({outgoing.reason, incoming.reason}, {MovementReason.TRANSFER})
+        self.assertEqual(location_stock(balance), {'NORTH': 6, 'SOUTH': 4})
+        self.assertEqual(balance.on_hand, 12)
+        self.assertEqual(rollup(self.knife), 17)
+
+    def test_inactive_or_foreign_locations_are_rejected(self):
+        closed = StockLocation.objects.create(code='CLOSED', name='Closed', is_active=False)
+        foreign = StockLocation.objects.create(client_id=2, code='NORTH', name='Elsewhere')
+
+        for location in (closed, foreign):
+            with self.subTest(location=location.code):
+                with self.assertRaises(StockLocation.DoesNotExist):
+                    record_movement(1, self.knife.id, 1, MovementReason.RECEIPT, location_id=location.id)
+                with self.assertRaises(StockLocation.DoesNotExist):
+                    transfer_stock(1, self.knife.id, 1, self.north.id, location.id)
+
+    def test_sharded_balances_roll_up_at_compaction(self):
+        balance = set_counter_shards(get_balance(1, self.knife.id, self.red.id), 4)
+        for _ in range(5):
+            record_movement(
+                1, self.knife.id, -1, MovementReason.SALE, variant_id=self.red.id, location_id=self.north.id
+            )
+        transfer_stock(1, self.knife.id, 2, self.north.id, self.south.id, variant_id=self.red.id)
+
+        self.assertEqual(rollup(self.knife), 7)
+        self.assertEqual(location_stock(balance), {})
+
+        compact_counters()
+
+        self.assertEqual(rollup(self.knife), 2)
+        self.assertEqual(location_stock(balance), {'NORTH': -7, 'SOUTH': 2})
+        balance.refresh_from_db()
+        self.assertEqual(balance.on_hand, 0)
+
+    def test_rebuild_rollups(self):
+        record_movement(1, self.knife.id, 3, MovementReason.RECEIPT, variant_id=self.blue.id)
+        ProductStockRollup.objects.update(quantity_on_hand=0)
+
+        self.assertEqual(rebuild_rollups(), 1)
+        self.assertEqual(rollup(self.knife), 10)
+        self.assertEqual(rebuild_rollups(), 0)
+
+        ProductStockRollup.objects.all().delete()
+        call_command('rebuild_stock_rollups', stdout=io.StringIO())
+        self.assertEqual(rollup(self.knife), 10)
+
+    def test_deleted_balances_leave_the_rollup(self):
+        record_movement(1, self.knife.id, 3, MovementReason.RECEIPT, variant_id=self.blue.id)
+        set_counter_shards(get_balance(1, self.knife.id, self.red.id), 2)
+        record_movement(1, self.knife.id, -1, MovementReason.SALE, variant_id=self.red.id)
+        self.assertEqual(rollup(self.knife), 10)
+
+        # The pending sale of the red variant was never rolled up
+        self.red.delete()
+        self.assertEqual(rollup(self.knife), 5)
+
+        bulk_delete_variants(1, [self.blue.id])
+        self.assertEqual(rollup(self.knife), 2)
+        compact_counters()
+        self.assertEqual(rollup(self.knife), 2)
+        self.assertEqual(rebuild_rollups(), 0)
+
+    def test_product_list_reads_rollup(self):
+        record_movement(1, self.knife.id, 7, MovementReason.RECEIPT, variant_id=self.red.id)
+        plain = Product.objects.create(name='Pan', slug='pan', category=self.knife.category)
+
+        rows = {row['id']: row for row in FastProductSerializer().serialize([self.knife.id, plain.id])}
+        self.assertEqual(rows[self.knife.id]['total_quantity_on_hand'], 14)
+        self.assertIsNone(rows[plain.id]['total_quantity_on_hand'])
+
+        response = APIClient().get(reverse('product-list'))
+        totals = {row['id']: row['total_quantity_on_hand'] for row in response.data['results']}
+        self.assertEqual(totals, {self.knife.id: 14, plain.id: None})
+
+
+@override_settings(CACHES=LOCMEM_CACHES, REDIS_CLIENT_BACKEND='memory')
+class StockLocationApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        division = Division.objects.create(name='Home')
+        category = Category.objects.create(name='Kitchen', division=division)
+        cls.knife = Product.objects.create(name='Knife', slug='knife', category=category, quantity_on_hand=3)
+
+    def setUp(self):
+        caches['default'].clear()
+        self.client = APIClient()
+
+    def post(self, name, data):
+        return self.client.post(reverse(name), data, format='json')
+
+    def test_locations_movements_and_transfers(self):
+        north = self.post('stock-location-list', {'code': 'NORTH', 'name': 'North'}).data['id']
+        south = self.post('stock-location-list', {'code': 'SOUTH', 'name': 'South'}).data['id']
+        self.assertEqual(self.post('stock-location-list', {'code': 'NORTH', 'name': 'Again'}).status_code, 400)
+
+        response = self.post('stock-movement-list', {
+            'product': self.knife.id, 'location': north, 'quantity': 5, 'reason': 'RECEIPT'
+        })
+        self.assertEqual(response.status_code, 201, response.data)
+        response = self.post('stock-movement-transfer', {
+            'product': self.knife.id, 'quantity': 2, 'from_location': north, 'to_location': south
+        })
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual([row['quantity'] for row in response.data], [-2, 2])
+
+        response = self.client.get(reverse('stock-movement-list'), {'location': south})
+        self.assertEqual(response.data['count'], 1)
+        row = self.client.get(reverse('stock-balance-list')).data['results'][0]
+        self.assertEqual(row['quantity_on_hand'], 8)
+        self.assertEqual({entry['code']: entry['quantity'] for entry in row['locations']}, {'NORTH': 3, 'SOUTH': 2})
+
+    def test_validation(self):
+        north = StockLocation.objects.create(code='NORTH', name='North')
+        for name, data in (
+            ('stock-movement-list', {'product': self.knife.id, 'location': 999999, 'quantity': 1, 'reason': 'RECEIPT'}),
+            ('stock-movement-list', {'product': self.knife.id, 'quantity': 1, 'reason': 'TRANSFER'}),
+            ('stock-movement-transfer', {
+                'product': self.knife.id, 'quantity': 1, 'from_location': north.id, 'to_location': north.id
+            }),
+            ('stock-movement-transfer', {
+                'product': self.knife.id, 'quantity': 1, 'from_location': north.id, 'to_location': 999999
+            }),
+        ):
+            with self.subTest(data=data):
+                self.assertEqual(self.post(name, data).status_code, 400)
@@ -0,0 +1,307 @@
+"""
+Tests for stock reservations (inventory.reservations).
+"""
+import threading
+from datetime import timedelta
+from unittest import mock
+
+from django.db import connection
+from django.db.models import F, Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from inventory import reservations
+from inventory.ledger import get_balance, record_movement, set_counter_shards
+from inventory.models import MovementReason, ReservationStatus, StockBalance, StockReservation
+from inventory.reservations import (
+    InsufficientStock, ReservationConflict, ReservationExpired, available_to_sell, commit_reservations,
+    expire_reservations, extend_reservations, release_reservations, reserve_stock
+)
+from products.catalogue.models import Category, Division
+from products.models import Product, ProductVariant
+
+
+class StockReservationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        division = Division.objects.create(name='Home')
+        category = Category.objects.create(name='Kitchen', division=division)
+        cls.knife = Product.objects.create(
+            name='Knife', slug='knife', category=category, product_type='PARENT', quantity_on_hand=10
+        )
+        cls.red = ProductVariant.objects.create(
+            product=cls.knife, sku='KNIFE-RED', display_price='12.00', quantity_on_hand=5
+        )
+        cls.pan = Product.objects.create(
+            name='Pan', slug='pan', category=category, quantity_on_hand=1, backorders_allowed=True
+        )
+
+    def items(self, *lines):
+        return [{'product_id': product.id, 'variant_id': variant and variant.id, 'quantity': quantity}
+                for product, variant, quantity in lines]
+
+    def test_batch_holds_stock(self):
+        items = self.items((self.knife, None, 4), (self.knife, self.red, 1), (self.knife, self.red, 1))
+        holds = reserve_stock(1, items, 'cart-1', ttl=60)
+
+        self.assertEqual(sorted(hold.quantity for hold in holds), [2, 4])
+        self.assertTrue(all(hold.status == ReservationStatus.ACTIVE for hold in holds))
+        self.assertEqual(available_to_sell(1, [(self.knife.id, None), (self.knife.id, self.red.id)]), {
+            (self.knife.id, None): 6, (self.knife.id, self.red.id): 3
+        })
+        balance = StockBalance.objects.get(variant=self.red)
+        self.assertEqual((balance.on_hand, balance.version), (5, 1))
+
+    def test_shortage_takes_nothing(self):
+        reserve_stock(1, self.items((self.knife, self.red, 2)), 'cart-1')
+
+        with self.assertRaises(InsufficientStock) as raised:
+            reserve_stock(1, self.items((self.knife, None, 1), (self.knife, self.red, 4)), 'cart-2')
+
+        self.assertEqual(raised.exception.shortages, [
+            {'product': self.knife.id, 'variant': self.red.id, 'requested': 4, 'available': 3}
+        ])
+        self.assertFalse(StockReservation.objects.filter(reference='cart-2').exists())
+
+    def test_backorderable_items_are_not_limited(self):
+        holds = reserve_stock(1, self.items((self.pan, None, 5)), 'cart-1')
+
+        self.assertEqual(holds[0].quantity, 5)
+        self.assertEqual(available_to_sell(1, [(self.pan.id, None)]), {(self.pan.id, None): -4})
+
+    def test_expired_holds_stop_counting_and_are_swept(self):
+        reserve_stock(1, self.items((self.knife, self.red, 5)), 'cart-1')
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(available_to_sell(1, [(self.knife.id, self.red.id)]), {(self.knife.id, self.red.id): 5})
+        self.assertEqual(expire_reservations(batch_size=1), 1)
+        self.assertEqual(StockReservation.objects.get().status, ReservationStatus.EXPIRED)
+        self.assertEqual(expire_reservations(), 0)
+
+    def test_commit_records_sales(self):
+        reserve_stock(1, self.items((self.knife, None, 3), (self.knife, self.red, 2)), 'cart-1')
+
+        holds = commit_reservations(1, 'cart-1')
+
+        self.assertEqual({hold.status for hold in holds}, {ReservationStatus.COMMITTED})
+        self.assertEqual(
+            sorted(StockReservation.objects.values_list('movement__reason', 'movement__quantity')),
+            [('SALE', -3), ('SALE', -2)]
+        )
+        self.assertEqual(available_to_sell(1, [(self.knife.id, None), (self.knife.id, self.red.id)]), {
+            (self.knife.id, None): 7, (self.knife.id, self.red.id): 3
+        })
+        self.assertEqual(commit_reservations(1, 'cart-1'), [])
+
+    def test_commit_refuses_expired_holds(self):
+        reserve_stock(1, self.items((self.knife, None, 3), (self.knife, self.red, 2)), 'cart-1')
+        expired = StockReservation.objects.get(variant=self.red)
+        StockReservation.objects.filter(pk=expired.pk).update(expires_at=timezone.now())
+
+        with self.assertRaises(ReservationExpired) as raised:
+            commit_reservations(1, 'cart-1')
+
+        self.assertEqual(raised.exception.reservation_ids, [expired.pk])
+        self.assertFalse(StockReservation.objects.filter(status=ReservationStatus.COMMITTED).exists())
+        self.assertEqual(StockBalance.objects.get(product=self.knife, variant__isnull=True).on_hand, 10)
+
+    def test_release_and_extend(self):
+        reserve_stock(1, self.items((self.knife, None, 3)), 'cart-1', ttl=60)
+
+        self.assertEqual(extend_reservations(1, 'cart-1', ttl=3600), 1)
+        self.assertGreater(StockReservation.objects.get().expires_at, timezone.now() + timedelta(minutes=59))
+        self.assertEqual(release_reservations(1, 'cart-1'), 1)
+        self.assertEqual(available_to_sell(1, [(self.knife.id, None)]), {(self.knife.id, None): 10})
+        self.assertEqual(extend_reservations(1, 'cart-1'), 0)
+
+    def test_availability_is_one_query_per_batch(self):
+        get_balance(1, self.knife.id)
+        get_balance(1, self.knife.id, self.red.id)
+        keys = [(self.knife.id, None), (self.knife.id, self.red.id)]
+
+        with CaptureQueriesContext(connection) as ctx:
+            levels = available_to_sell(1, keys)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(levels, {keys[0]: 10, keys[1]: 5})
+
+        # Items without a balance report their quantity_on_hand; unknown items are left out
+        self.assertEqual(available_to_sell(1, [(self.pan.id, None), (self.pan.id, self.red.id), (999999, None)]), {
+            (self.pan.id, None): 1
+        })
+
+    def test_concurrent_change_is_retried(self):
+        read = reservations._balances
+        calls = []
+
+        def read_then_conflict(*args):
+            balances = read(*args)
+            calls.append(1)
+            if len(calls) == 1:
+                # Another reservation lands between the read and the write
+                StockBalance.objects.update(version=F('version') + 1)
+            return balances
+
+        get_balance(1, self.knife.id)
+        with mock.patch('inventory.reservations._balances', side_effect=read_then_conflict):
+            holds = reserve_stock(1, self.items((self.knife, None, 1)), 'cart-1')
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(len(holds), 1)
+
+    @override_settings(INVENTORY_RESERVATION_RETRIES=0)
+    def test_sale_of_sharded_balance_is_a_conflict(self):
+        read = reservations._balances
+
+        def read_then_sell(*args):
+            balances = read(*args)
+            # A sale lands between the read and the write, in a counter shard
+            record_movement(1, self.knife.id, -4, MovementReason.SALE, variant_id=self.red.id)
+            return balances
+
+        balance = set_counter_shards(get_balance(1, self.knife.id, self.red.id), 4)
+        with mock.patch('inventory.reservations._balances', side_effect=read_then_sell):
+            with self.assertRaises(ReservationConflict):
+                reserve_stock(1, self.items((self.knife, self.red, 2)), 'cart-1')
+
+        self.assertFalse(StockReservation.objects.exists())
+        balance.refresh_from_db()
+        self.assertEqual(balance.version, 0)
+
+    @override_settings(INVENTORY_RESERVATION_RETRIES=1)
+    def test_persistent_conflicts_give_up(self):
+        read = reservations._balances
+
+        def always_conflict(*args):
+            balances = read(*args)
+            StockBalance.objects.update(version=F('version') + 1)
+            return balances
+
+        get_balance(1, self.knife.id)
+        with mock.patch('inventory.reservations._balances', side_effect=always_conflict):
+            with self.assertRaises(ReservationConflict):
+                reserve_stock(1, self.items((self.knife, None, 1)), 'cart-1')
+        self.assertFalse(StockReservation.objects.exists())
+
+
+class StockReservationApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        division = Division.objects.create(name='Home')
+        category = Category.objects.create(name='Kitchen', division=division)
+        cls.knife = Product.objects.create(name='Knife', slug='knife', category=category, quantity_on_hand=3)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def post(self, name, data):
+        return self.client.post(reverse(name), data, format='json')
+
+    def test_reserve_commit_and_release(self):
+        response = self.post('stock-reservation-list', {
+            'reference': 'cart-1', 'items': [{'product': self.knife.id, 'quantity': 2}]
+        })
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data[0]['status'], 'ACTIVE')
+
+        response = self.post('stock-reservation-list', {
+            'reference': 'cart-2', 'items': [{'product': self.knife.id, 'quantity': 2}]
+        })
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['shortages'][0]['available'], 1)
+
+        response = self.client.get(reverse('stock-balance-list'), {'product': self.knife.id})
+        row = response.data['results'][0]
+        self.assertEqual((row['quantity_on_hand'], row['reserved'], row['available']), (3, 2, 1))
+
+        self.assertEqual(self.post('stock-reservation-commit', {'reference': 'cart-1'}).data, {'committed': 1})
+        self.assertEqual(StockBalance.objects.get().on_hand, 1)
+        self.assertEqual(self.post('stock-reservation-release', {'reference': 'cart-1'}).data, {'released': 0})
+        response = self.client.get(reverse('stock-reservation-list'), {'status': 'COMMITTED'})
+        self.assertEqual(response.data['count'], 1)
+
+    def test_validation(self):
+        for data in (
+            {'reference': 'cart-1', 'items': []},
+            {'items': [{'product': self.knife.id, 'quantity': 1}]},
+            {'reference': 'cart-1', 'items': [{'product': self.knife.id, 'quantity': 0}]},
+            {'reference': 'cart-1', 'ttl': 0, 'items': [{'product': self.knife.id, 'quantity': 1}]},
+            {'reference': 'cart-1', 'items': [{'product': 999999, 'quantity': 1}]},
+        ):
+            with self.subTest(data=data):
+                self.assertEqual(self.post('stock-reservation-list', data).status_code, 400)
+
+
+class ConcurrentReservationTests(TransactionTestCase):
+    """
+    Concurrent checkouts must never hold more than the stock available.
+    """
+
+    @override_settings(INVENTORY_RESERVATION_RETRIES=20)
+    def test_no_overselling(self):
+        division = Division.objects.create(name='Home')
+        category = Category.objects.create(name='Kitchen', division=division)
+        product = Product.objects.create(name='Knife', slug='knife', category=category, quantity_on_hand=5)
+        record_movement(1, product.id, 1, MovementReason.RECEIPT)
+        outcomes = []
+
+        def checkout(number):
+            try:
+                reserve_stock(1, [{'product_id': product.id, 'quantity': 1}], f'cart-{number}')
+                outcomes.append('reserved')
+            except InsufficientStock:
+                outcomes.append('short')
+            except Exception as exc:  # pragma: no cover - reported below
+                outcomes.append(repr(exc))
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=checkout, args=(number,)) for number in range(10)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(sorted(outcomes), ['reserved'] * 6 + ['short'] * 4)
+        self.assertEqual(StockReservation.objects.aggregate(total=Sum('quantity'))['total'], 6)
+
+    @override_settings(INVENTORY_RESERVATION_RETRIES=50)
+    def test_no_overselling_sharded_balance(self):
+        division = Division.objects.create(name='Home')
+        category = Category.objects.create(name='Kitchen', division=division)
+        product = Product.objects.create(name='Knife', slug='knife', category=category, quantity_on_hand=10)
+        set_counter_shards(get_balance(1, product.id), 4)
+        outcomes = []
+
+        def sell():
+            try:
+                record_movement(1, product.id, -1, MovementReason.SALE)
+                outcomes.append('sold')
+            except Exception as exc:  # pragma: no cover - reported below
+                outcomes.append(repr(exc))
+            finally:
+                connection.close()
+
+        def checkout(number):
+            try:
+                reserve_stock(1, [{'product_id': product.id, 'quantity': 1}], f'cart-{number}')
+                outcomes.append('reserved')
+            except InsufficientStock:
+                outcomes.append('short')
+            except Exception as exc:  # pragma: no cover - reported below
+                outcomes.append(repr(exc))
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=sell) for _ in range(5)]
+        workers += [threading.Thread(target=checkout, args=(number,)) for number in range(10)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        # Every sale lands; holds only take what the sales left
+        self.assertEqual(sorted(outcomes), ['reserved'] * 5 + ['short'] * 5 + ['sold'] * 5)
+        self.assertEqual(available_to_sell(1, [(product.id, None)]), {(product.id, None): 0})
@@ -0,0 +1,12 @@
+from rest_framework.routers import DefaultRouter
+
+from . import views
+
+router = DefaultRouter()
+router.register(r'locations', views.StockLocationViewSet, basename='stock-location')
+router.register(r'balances', views.StockBalanceViewSet, basename='stock-balance')
+router.register(r'movements', views.StockMovementViewSet, basename='stock-movement')
+router.register(r'reservations', views.StockReservationViewSet, basename='stock-reservation')
+router.register(r'availability', views.AvailabilityViewSet, basename='stock-availability')
+
+urlpatterns = router.urls
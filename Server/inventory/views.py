@@ -1,3 +1,241 @@
-from django.shortcuts import render
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
 
-# Create your views here.
+from core.utils import get_request_client_id
+from inventory.availability import check_availability
+from inventory.ledger import record_movement, set_counter_shards, transfer_stock
+from inventory.models import StockBalance, StockLocation, StockMovement, StockReservation
+from inventory.reservations import (
+    InsufficientStock, ReservationConflict, ReservationExpired, commit_reservations, extend_reservations,
+    release_reservations, reserve_stock, with_availability
+)
+from inventory.serializers import (
+    AvailabilityCheckSerializer, CounterShardsSerializer, ReservationReferenceSerializer, ReserveStockSerializer,
+    StockBalanceSerializer, StockLocationSerializer, StockMovementSerializer, StockReservationSerializer,
+    StockTransferSerializer
+)
+from products.models import Product, ProductVariant
+
+
+def _filter_items(queryset, params, fields=('product', 'variant')):
+    """
+    Narrow a balance or movement queryset by the product/variant (or other ID) query parameters.
+    """
+    for field in fields:
+        value = params.get(field)
+        if value:
+            if not value.isdigit():
+                raise ValidationError({field: "Expected an ID."})
+            queryset = queryset.filter(**{f'{field}_id': value})
+    return queryset
+
+
+class StockLocationViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, mixins.CreateModelMixin,
+                           mixins.UpdateModelMixin, viewsets.GenericViewSet):
+    """
+    API endpoint for the stock locations of the current client.
+
+    Locations holding stock or movements cannot be deleted; set is_active to
+    false to stop recording movements at them.
+    """
+    serializer_class = StockLocationSerializer
+    permission_classes = []  # Authentication temporarily disabled
+
+    def get_queryset(self):
+        return StockLocation.objects.filter(client_id=get_request_client_id(self.request))
+
+    def perform_create(self, serializer):
+        serializer.save(client_id=get_request_client_id(self.request))
+
+
+class StockBalanceViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    API endpoint for the stock balances of the current client.
+
+    GET /api/v1/inventory/balances/?product=&variant= lists balances with their
+    current quantity_on_hand, reserved and available quantities and their
+    stock per location;
+    POST /api/v1/inventory/balances/{id}/shards/ with {"shard_count": 8}
+    spreads the increments of a hot SKU over counter shards (1 turns sharding off).
+    """
+    serializer_class = StockBalanceSerializer
+    permission_classes = []  # Authentication temporarily disabled
+
+    def get_queryset(self):
+        queryset = StockBalance.objects.filter(
+            client_id=get_request_client_id(self.request)
+        ).prefetch_related('locations__location')
+        if self.action == 'list':
+            queryset = _filter_items(queryset, self.request.query_params)
+        return with_availability(queryset)
+
+    @action(detail=True, methods=['post'])
+    def shards(self, request, pk=None):
+        balance = self.get_object()
+        serializer = CounterShardsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        set_counter_shards(balance, serializer.validated_data['shard_count'])
+        return Response(self.get_serializer(self.get_object()).data)
+
+
+class StockMovementViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, mixins.CreateModelMixin,
+                           viewsets.GenericViewSet):
+    """
+    API endpoint for the stock ledger of the current client.
+
+    GET /api/v1/inventory/movements/?product=&variant=&location=&reason= lists
+    movements, newest first; POST /api/v1/inventory/movements/ records one, e.g.
+    {"product": 1, "variant": 2, "location": 3, "quantity": -1, "reason": "SALE",
+    "reference": "SO-1001"}, and applies it to the item's stock.
+    POST .../transfer/ with {"product": 1, "quantity": 5, "from_location": 3,
+    "to_location": 4} moves stock between locations. Movements are never
+    changed or deleted.
+    """
+    serializer_class = StockMovementSerializer
+    permission_classes = []  # Authentication temporarily disabled
+
+    def get_queryset(self):
+        queryset = StockMovement.objects.filter(client_id=get_request_client_id(self.request))
+        if self.action == 'list':
+            queryset = _filter_items(queryset, self.request.query_params, ('product', 'variant', 'location'))
+            reason = self.request.query_params.get('reason')
+            if reason:
+                queryset = queryset.filter(reason=reason)
+        return queryset
+
+    def perform_create(self, serializer):
+        data = serializer.validated_data
+        try:
+            serializer.instance = record_movement(
+                get_request_client_id(self.request), data['product_id'], data['quantity'], data['reason'],
+                variant_id=data.get('variant_id'), location_id=data.get('location_id'),
+                reference=data.get('reference', ''), note=data.get('note', ''), user=self.request.user
+            )
+        except Product.DoesNotExist:
+            raise ValidationError({'product': "Product not found."})
+        except ProductVariant.DoesNotExist:
+            raise ValidationError({'variant': "Variant not found for this product."})
+        except StockLocation.DoesNotExist:
+            raise ValidationError({'location': "No active location with this ID."})
+
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        if response.status_code == status.HTTP_201_CREATED:
+            balance = with_availability(StockBalance.objects.filter(pk=response.data['balance'])).get()
+            response.data['quantity_on_hand'] = balance.quantity_on_hand
+            response.data['available'] = balance.available
+        return response
+
+    @action(detail=False, methods=['post'])
+    def transfer(self, request):
+        serializer = StockTransferSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        try:
+            movements = transfer_stock(
+                get_request_client_id(request), data['product_id'], data['quantity'],
+                data['from_location_id'], data['to_location_id'], variant_id=data.get('variant_id'),
+                reference=data.get('reference', ''), note=data.get('note', ''), user=request.user
+            )
+        except Product.DoesNotExist:
+            raise ValidationError({'product': "Product not found."})
+        except ProductVariant.DoesNotExist:
+            raise ValidationError({'variant': "Variant not found for this product."})
+        except StockLocation.DoesNotExist:
+            raise ValidationError({'location': "Both locations must be active locations."})
+        return Response(self.get_serializer(movements, many=True).data, status=status.HTTP_201_CREATED)
+
+
+class StockReservationViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    API endpoint for stock reservations (holds) of the current client.
+
+    POST /api/v1/inventory/reservations/ holds stock for a batch of items, all
+    or nothing: {"reference": "cart-42", "ttl": 900, "items": [{"product": 1,
+    "variant": 2, "quantity": 1}]}; shortages are answered with 409.
+    POST .../commit/, .../release/ and .../extend/ with {"reference": "cart-42"}
+    turn the active holds of a reference into sales, give their stock back or
+    push back their expiry (by "ttl" seconds). GET lists holds, filtered by
+    ?reference= and ?status=.
+    """
+    serializer_class = StockReservationSerializer
+    permission_classes = []  # Authentication temporarily disabled
+
+    def get_queryset(self):
+        queryset = StockReservation.objects.filter(client_id=get_request_client_id(self.request))
+        if self.action == 'list':
+            queryset = _filter_items(queryset, self.request.query_params)
+            for field in ('reference', 'status'):
+                value = self.request.query_params.get(field)
+                if value:
+                    queryset = queryset.filter(**{field: value})
+        return queryset
+
+    def create(self, request, *args, **kwargs):
+        serializer = ReserveStockSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        try:
+            holds = reserve_stock(
+                get_request_client_id(request), data['items'], data['reference'],
+                ttl=data.get('ttl'), user=request.user
+            )
+        except InsufficientStock as exc:
+            return Response(
+                {'error': "Insufficient stock.", 'shortages': exc.shortages}, status=status.HTTP_409_CONFLICT
+            )
+        except ReservationConflict as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_409_CONFLICT)
+        except (Product.DoesNotExist, ProductVariant.DoesNotExist):
+            raise ValidationError({'items': "Product or variant not found."})
+        return Response(self.get_serializer(holds, many=True).data, status=status.HTTP_201_CREATED)
+
+    def _reference(self, request):
+        serializer = ReservationReferenceSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+    @action(detail=False, methods=['post'])
+    def commit(self, request):
+        data = self._reference(request)
+        try:
+            holds = commit_reservations(get_request_client_id(request), data['reference'], user=request.user)
+        except ReservationExpired as exc:
+            return Response(
+                {'error': "Reservations have expired.", 'expired': exc.reservation_ids},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response({'committed': len(holds)})
+
+    @action(detail=False, methods=['post'])
+    def release(self, request):
+        data = self._reference(request)
+        return Response({'released': release_reservations(get_request_client_id(request), data['reference'])})
+
+    @action(detail=False, methods=['post'])
+    def extend(self, request):
+        data = self._reference(request)
+        return Response({
+            'extended': extend_reservations(get_request_client_id(request), data['reference'], ttl=data.get('ttl'))
+        })
+
+
+class AvailabilityViewSet(viewsets.ViewSet):
+    """
+    API endpoint checking the availability of many SKUs at once.
+
+    POST /api/v1/inventory/availability/ with {"skus": ["KNIFE-RED", "PAN-24"]}
+    answers {"results": {"KNIFE-RED": {"product": 1, "variant": 2,
+    "orderable": true, "available": 5, "eta": null}}, "unknown": ["PAN-24"]};
+    available is null for items whose stock is not tracked and eta is the
+    pre-order date of items not released yet.
+    """
+    permission_classes = []  # Authentication temporarily disabled
+
+    def create(self, request):
+        serializer = AvailabilityCheckSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results, unknown = check_availability(get_request_client_id(request), serializer.validated_data['skus'])
+        return Response({'results': results, 'unknown': unknown})
@@ -243,11 +243,21 @@ class TaxRateSerializer(serializers.ModelSerializer):
         from products.catalogue.serializers import CategorySerializer
         
         if obj.category_id:
-            try:
-                category = Category.objects.get(id=obj.category_id)
-                return CategorySerializer(category).data
-            except Category.DoesNotExist:
-                return None
+            # Load the categories of every rate being serialized in one query
+            categories = self.context.get('tax_rate_categories')
+            if categories is None or obj.category_id not in categories:
+                instances = getattr(self.parent, 'instance', None) or [obj]
+                category_ids = {instance.category_id for instance in instances if instance.category_id}
+                category_ids.add(obj.category_id)
+                categories = {
+                    category.id: category
+                    for category in Category.objects.select_related(
+                        'division', 'created_by', 'updated_by'
+                    ).filter(id__in=category_ids)
+                }
+                self.context['tax_rate_categories'] = categories
+            category = categories.get(obj.category_id)
+            return CategorySerializer(category).data if category is not None else None
         return None
     
     def validate(self, data):
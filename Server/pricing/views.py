@@ -4,6 +4,7 @@ Views for the pricing app.
 This module defines ViewSets for pricing-related models such as CustomerGroup,
 SellingChannel, TaxRegion, TaxRate, and TaxRateProfile.
 """
+from django.db.models import Prefetch
 from rest_framework.permissions import IsAuthenticated
 from core.viewsets import TenantModelViewSet
 from .models import CustomerGroup, SellingChannel, TaxRegion, TaxRate, TaxRateProfile
@@ -21,7 +22,8 @@ class CustomerGroupViewSet(TenantModelViewSet):
     Provides CRUD operations for customer groups.
     """
     serializer_class = CustomerGroupSerializer
-    queryset = CustomerGroup.objects.all()
+    # Serializers read client.id, created_by.id and updated_by.id of every row
+    queryset = CustomerGroup.objects.select_related('client', 'created_by', 'updated_by')
     
     def get_queryset(self):
         """
@@ -38,7 +40,7 @@ class SellingChannelViewSet(TenantModelViewSet):
     Provides CRUD operations for selling channels.
     """
     serializer_class = SellingChannelSerializer
-    queryset = SellingChannel.objects.all().order_by('id')
+    queryset = SellingChannel.objects.select_related('client', 'created_by', 'updated_by').order_by('id')
 
 
 class TaxRegionViewSet(TenantModelViewSet):
@@ -48,7 +50,9 @@ class TaxRegionViewSet(TenantModelViewSet):
     Provides CRUD operations for tax regions.
     """
     serializer_class = TaxRegionSerializer
-    queryset = TaxRegion.objects.all().order_by('id')
+    queryset = TaxRegion.objects.select_related(
+        'client', 'created_by', 'updated_by'
+    ).prefetch_related('countries').order_by('id')
 
 
 class TaxRateViewSet(TenantModelViewSet):
@@ -58,7 +62,15 @@ class TaxRateViewSet(TenantModelViewSet):
     Provides CRUD operations for tax rates.
     """
     serializer_class = TaxRateSerializer
-    queryset = TaxRate.objects.all().order_by('id')
+    queryset = TaxRate.objects.select_related('client', 'created_by', 'updated_by').prefetch_related(
+        # Nested region details include the same per-row relations
+        Prefetch(
+            'tax_regions',
+            queryset=TaxRegion.objects.select_related(
+                'client', 'created_by', 'updated_by'
+            ).prefetch_related('countries')
+        )
+    ).order_by('id')
     
     def perform_create(self, serializer):
         """
@@ -97,7 +109,9 @@ class TaxRateProfileViewSet(TenantModelViewSet):
     Provides CRUD operations for tax rate profiles.
     """
     serializer_class = TaxRateProfileSerializer
-    queryset = TaxRateProfile.objects.all().order_by('id')
+    queryset = TaxRateProfile.objects.select_related(
+        'client', 'created_by', 'updated_by'
+    ).prefetch_related('tax_rates').order_by('id')
     
     def perform_create(self, serializer):
         """
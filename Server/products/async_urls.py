@@ -0,0 +1,11 @@
+from django.urls import path
+
+from products import async_views
+
+# Async (ASGI) read endpoints, mounted under /api/v1/async/products/
+urlpatterns = [
+    path('products/', async_views.product_list, name='async-product-list'),
+    path('products/<int:pk>/', async_views.product_detail, name='async-product-detail'),
+    path('products/<int:product_pk>/variants/', async_views.variant_list, name='async-product-variant-list'),
+    path('catalogue/tree/', async_views.catalogue_tree, name='async-catalogue-tree'),
+]
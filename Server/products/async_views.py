@@ -0,0 +1,160 @@
+"""
+Async (ASGI) read endpoints for products and the catalogue.
+
+These run alongside the sync viewsets in products.views and return the same
+documents: product list and detail through FastProductSerializer, variant
+lists through ProductVariantSerializer, plus a catalogue tree (divisions with
+their categories and subcategories) read with three queries awaited together.
+List responses carry change-counter ETags and product detail responses the
+same row-version ETag as the sync routes; see core.async_views.
+"""
+import asyncio
+import logging
+
+from asgiref.sync import sync_to_async
+from django.http import Http404
+
+from core.async_views import (
+    async_api_view, build_etag, drf_request, json_response, list_etag, respond_conditionally, viewset_for
+)
+from core.conditional import get_change_counters
+from core.pagination import AsyncPageNumberPagination
+from core.utils import get_request_client_id
+from products.catalogue.models import Category, Division, Subcategory
+from products.fast_serializers import FastProductSerializer
+from products.models import CATALOGUE_CHANGE_SCOPE, PRODUCTS_CHANGE_SCOPE, Product
+from products.views import ProductVariantViewSet, ProductViewSet
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_SCOPES = (PRODUCTS_CHANGE_SCOPE, CATALOGUE_CHANGE_SCOPE)
+
+TREE_FIELDS = ['id', 'name', 'description', 'image', 'image_alt_text', 'is_active']
+
+
+def filtered_product_ids(request):
+    """
+    Return the primary keys of the products a list request selects, ordered.
+
+    Runs ProductViewSet's filters, search and ordering. Validating filter
+    values may query the database, so this is called through sync_to_async.
+    """
+    view = viewset_for(request, ProductViewSet, 'list')
+    queryset = view.filter_queryset(view.get_queryset())
+    return queryset.select_related(None).prefetch_related(None).values_list('pk', flat=True)
+
+
+@async_api_view
+async def product_list(request):
+    """
+    Async equivalent of the product list (ProductViewSet.list).
+    """
+    client_id = get_request_client_id(request)
+
+    async def build():
+        product_ids = await sync_to_async(filtered_product_ids)(request)
+        paginator = AsyncPageNumberPagination()
+        page = await paginator.apaginate_queryset(product_ids, drf_request(request))
+        data = await FastProductSerializer(context={'request': request}).aserialize(page)
+        return json_response(paginator.get_paginated_response(data).data)
+
+    return await respond_conditionally(request, await list_etag(request, client_id, PRODUCT_SCOPES), build)
+
+
+@async_api_view
+async def product_detail(request, pk):
+    """
+    Async equivalent of product retrieval (ProductViewSet.retrieve).
+    """
+    client_id = get_request_client_id(request)
+    row, dependencies = await asyncio.gather(
+        Product.objects.filter(client_id=client_id, pk=pk).values_list('pk', 'updated_at').afirst(),
+        sync_to_async(get_change_counters)([CATALOGUE_CHANGE_SCOPE], client_id),
+    )
+    if row is None:
+        raise Http404
+
+    etag = last_modified = None
+    if row[1] is not None and dependencies is not None:
+        etag = build_etag(Product._meta.label, row[0], row[1].isoformat(), *dependencies)
+        last_modified = row[1].timestamp()
+
+    async def build():
+        data = await FastProductSerializer(context={'request': request}).aserialize([row[0]])
+        if not data:
+            raise Http404
+        return json_response(data[0])
+
+    return await respond_conditionally(request, etag, build, last_modified)
+
+
+@async_api_view
+async def variant_list(request, product_pk):
+    """
+    Async equivalent of the variant list of a product (ProductVariantViewSet.list).
+    """
+    client_id = get_request_client_id(request)
+
+    async def build():
+        view = viewset_for(request, ProductVariantViewSet, 'list', product_pk=product_pk)
+        paginator = AsyncPageNumberPagination()
+        page = await paginator.apaginate_queryset(view.get_queryset(), view.request)
+        # Serializer fields may load related rows, which only sync code can do
+        data = await sync_to_async(lambda: view.get_serializer(page, many=True).data)()
+        return json_response(paginator.get_paginated_response(data).data)
+
+    return await respond_conditionally(request, await list_etag(request, client_id, PRODUCT_SCOPES), build)
+
+
+def build_tree(request, divisions, categories, subcategories):
+    """
+    Nest category and subcategory rows under their divisions.
+
+    Image names are turned into absolute URLs, which may sign them remotely,
+    so this runs in a worker thread.
+    """
+    def convert(rows, model):
+        storage = model._meta.get_field('image').storage
+        for row in rows:
+            if row['image']:
+                row['image'] = request.build_absolute_uri(storage.url(row['image']))
+            else:
+                row['image'] = None
+        return rows
+
+    by_category = {}
+    for row in convert(subcategories, Subcategory):
+        by_category.setdefault(row.pop('category_id'), []).append(row)
+    by_division = {}
+    for row in convert(categories, Category):
+        row['subcategories'] = by_category.get(row['id'], [])
+        by_division.setdefault(row.pop('division_id'), []).append(row)
+    for row in convert(divisions, Division):
+        row['categories'] = by_division.get(row['id'], [])
+    return divisions
+
+
+@async_api_view
+async def catalogue_tree(request):
+    """
+    Return the client's divisions with their categories and subcategories.
+
+    Response:
+        {"divisions": [{..., "categories": [{..., "subcategories": [...]}]}]}
+    """
+    client_id = get_request_client_id(request)
+
+    async def rows(queryset, *fields):
+        return [row async for row in queryset.filter(client_id=client_id).values(*TREE_FIELDS, *fields)]
+
+    async def build():
+        divisions, categories, subcategories = await asyncio.gather(
+            rows(Division.objects.order_by('name', 'id')),
+            rows(Category.objects.order_by('sort_order', 'name', 'id'), 'division_id', 'sort_order'),
+            rows(Subcategory.objects.order_by('sort_order', 'name', 'id'), 'category_id', 'sort_order'),
+        )
+        tree = await sync_to_async(build_tree, thread_sensitive=False)(request, divisions, categories, subcategories)
+        return json_response({'divisions': tree})
+
+    etag = await list_etag(request, client_id, (CATALOGUE_CHANGE_SCOPE,))
+    return await respond_conditionally(request, etag, build)
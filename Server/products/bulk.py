@@ -0,0 +1,410 @@
+"""
+Set-based bulk operations for products and their related rows.
+
+Deleting through the ORM collects and signals every object before deleting it,
+which takes minutes for large selections. The functions here delete with one
+statement per table, in dependency order, inside a single transaction. Because
+they bypass model signals, they update row versions and change counters
+themselves.
+"""
+import logging
+
+from django.db import connection, transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from assets.models import ImageBlob
+from core.conditional import bump_change_counter
+from inventory.models import (
+    LocationStock, ProductStockRollup, StockBalance, StockCounterShard, StockMovement, StockReservation
+)
+from products.models import (
+    Product, ProductImage, ProductVariant, ProductAttributeValue,
+    ProductAttributeMultiValue, KitComponent, PublicationStatus, PublicationStatusChange,
+    PRODUCTS_CHANGE_SCOPE
+)
+
+logger = logging.getLogger(__name__)
+
+# Sent once per batch after bulk_set_publication_status commits, with
+# client_id, status and product_ids (the products that changed)
+publication_status_changed = Signal()
+
+
+def _table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def _through_table(model, field_name):
+    return connection.ops.quote_name(model._meta.get_field(field_name).remote_field.through._meta.db_table)
+
+
+def _delete_images(cursor, where_sql, params):
+    """
+    Delete images matching a WHERE clause, clearing variant default-image references first.
+
+    Also releases the images' references to their content-addressed blobs.
+
+    Returns:
+        int: Number of images deleted
+    """
+    cursor.execute(
+        f"""
+        UPDATE {_table(ImageBlob)} b SET ref_count = GREATEST(b.ref_count - refs.n, 0)
+        FROM (
+            SELECT blob_id, COUNT(*) AS n FROM {_table(ProductImage)}
+            WHERE blob_id IS NOT NULL AND {where_sql} GROUP BY blob_id
+        ) refs
+        WHERE b.id = refs.blob_id
+        """,
+        params
+    )
+    cursor.execute(
+        f"UPDATE {_table(ProductVariant)} SET image_id = NULL "
+        f"WHERE image_id IN (SELECT id FROM {_table(ProductImage)} WHERE {where_sql})",
+        params
+    )
+    cursor.execute(f"DELETE FROM {_table(ProductImage)} WHERE {where_sql}", params)
+    return cursor.rowcount
+
+
+def _delete_stock_rows(cursor, column, ids):
+    """
+    Delete the stock balances of products or variants with their ledger rows.
+
+    One statement: the foreign keys between these tables are checked at commit.
+
+    Args:
+        column: 'product_id' (balances of the products and their variants, and
+            the products' stock rollups) or 'variant_id' (their stock is taken
+            out of the products' rollups)
+
+    Returns:
+        int: Number of balances deleted
+    """
+    dependents = ',\n'.join(
+        f"{name} AS (DELETE FROM {_table(model)} WHERE balance_id IN (SELECT id FROM balances))"
+        for name, model in (
+            ('holds', StockReservation), ('movements', StockMovement),
+            ('shards', StockCounterShard), ('locations', LocationStock),
+        )
+    )
+    if column == 'product_id':
+        dependents += f",\nrollups AS (DELETE FROM {_table(ProductStockRollup)} WHERE product_id = ANY(%s))"
+    else:
+        # Take the compacted stock of the deleted variants out of their products' rollups
+        dependents += f""",
+        rollups AS (
+            UPDATE {_table(ProductStockRollup)} r
+            SET quantity_on_hand = r.quantity_on_hand - gone.quantity, updated_at = NOW()
+            FROM (
+                SELECT product_id, SUM(on_hand) AS quantity FROM {_table(StockBalance)}
+                WHERE id IN (SELECT id FROM balances) GROUP BY product_id
+            ) gone
+            WHERE r.product_id = gone.product_id
+        )"""
+    cursor.execute(
+        f"""
+        WITH balances AS (SELECT id FROM {_table(StockBalance)} WHERE {column} = ANY(%s)),
+        {dependents}
+        DELETE FROM {_table(StockBalance)} WHERE id IN (SELECT id FROM balances)
+        """,
+        [ids, ids] if column == 'product_id' else [ids]
+    )
+    return cursor.rowcount
+
+
+def _delete_variant_rows(cursor, variant_ids, stock=True):
+    """
+    Delete variants and everything that cascades from them.
+
+    Args:
+        stock: Whether to delete the variants' stock balances; False when the
+            caller already deleted those of their products
+
+    Returns:
+        dict: Rows deleted per table
+    """
+    counts = {'stock_balances': 0}
+    if stock:
+        counts['stock_balances'] = _delete_stock_rows(cursor, 'variant_id', variant_ids)
+    counts['images'] = _delete_images(cursor, "variant_id = ANY(%s)", [variant_ids])
+    cursor.execute(
+        f"DELETE FROM {_through_table(ProductVariant, 'options')} WHERE productvariant_id = ANY(%s)",
+        [variant_ids]
+    )
+    cursor.execute(f"DELETE FROM {_table(ProductVariant)} WHERE id = ANY(%s)", [variant_ids])
+    counts['variants'] = cursor.rowcount
+    return counts
+
+
+def _touch(model, ids):
+    # Keep row versions current for conditional GET (see products.models.touch_product)
+    if ids:
+        model.objects.filter(pk__in=ids).update(updated_at=timezone.now())
+
+
+def bulk_delete_products(client_id, product_ids):
+    """
+    Delete products and all rows that cascade from them.
+
+    Products used as components of kits that are not themselves being deleted,
+    or whose variants are, are protected and left in place, mirroring the
+    PROTECT foreign keys on KitComponent.
+
+    Args:
+        client_id: The client whose products are deleted
+        product_ids: IDs of the products to delete; IDs of other clients are ignored
+
+    Returns:
+        dict: {'deleted': {table: count}, 'protected': [product IDs not deleted]}
+    """
+    requested = sorted(set(product_ids))
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Lock the selected products so concurrent kit edits cannot reference them mid-delete
+        cursor.execute(
+            f"SELECT id FROM {_table(Product)} WHERE client_id = %s AND id = ANY(%s) FOR UPDATE",
+            [client_id, requested]
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+
+        cursor.execute(
+            f"""
+            SELECT DISTINCT COALESCE(kc.component_product_id, v.product_id)
+            FROM {_table(KitComponent)} kc
+            LEFT JOIN {_table(ProductVariant)} v ON v.id = kc.component_variant_id
+            WHERE (kc.component_product_id = ANY(%s) OR v.product_id = ANY(%s))
+              AND NOT kc.kit_product_id = ANY(%s)
+            """,
+            [ids, ids, ids]
+        )
+        protected = sorted(row[0] for row in cursor.fetchall())
+        if protected:
+            ids = sorted(set(ids) - set(protected))
+
+        counts = {'products': 0}
+        if ids:
+            cursor.execute(
+                f"SELECT id FROM {_table(ProductVariant)} WHERE product_id = ANY(%s)", [ids]
+            )
+            variant_ids = [row[0] for row in cursor.fetchall()]
+
+            cursor.execute(
+                f"DELETE FROM {_table(KitComponent)} WHERE kit_product_id = ANY(%s)", [ids]
+            )
+            counts['kit_components'] = cursor.rowcount
+
+            cursor.execute(
+                f"""
+                DELETE FROM {_table(ProductAttributeMultiValue)}
+                WHERE product_attribute_value_id IN (
+                    SELECT id FROM {_table(ProductAttributeValue)} WHERE product_id = ANY(%s)
+                )
+                """,
+                [ids]
+            )
+            cursor.execute(
+                f"DELETE FROM {_table(ProductAttributeValue)} WHERE product_id = ANY(%s)", [ids]
+            )
+            counts['attribute_values'] = cursor.rowcount
+
+            counts['stock_balances'] = _delete_stock_rows(cursor, 'product_id', ids)
+            variant_counts = {'variants': 0, 'images': 0}
+            if variant_ids:
+                variant_counts = _delete_variant_rows(cursor, variant_ids, stock=False)
+            counts['images'] = variant_counts['images'] + _delete_images(
+                cursor, "product_id = ANY(%s)", [ids]
+            )
+            counts['variants'] = variant_counts['variants']
+
+            for field_name in ('attribute_groups', 'variant_defining_attributes'):
+                cursor.execute(
+                    f"DELETE FROM {_through_table(Product, field_name)} WHERE product_id = ANY(%s)", [ids]
+                )
+
+            cursor.execute(f"DELETE FROM {_table(Product)} WHERE id = ANY(%s)", [ids])
+            counts['products'] = cursor.rowcount
+
+    if counts['products']:
+        bump_change_counter(PRODUCTS_CHANGE_SCOPE, client_id)
+    logger.info(
+        "Bulk deleted %s products for client %s; %s protected by kit components",
+        counts['products'], client_id, len(protected)
+    )
+    return {'deleted': counts, 'protected': protected}
+
+
+def bulk_delete_variants(client_id, variant_ids, product_id=None):
+    """
+    Delete product variants and their images and option links.
+
+    Variants used as kit components are protected and left in place.
+
+    Args:
+        client_id: The client whose variants are deleted
+        variant_ids: IDs of the variants to delete
+        product_id: If given, only variants of this product are deleted
+
+    Returns:
+        dict: {'deleted': {table: count}, 'protected': [variant IDs not deleted]}
+    """
+    requested = sorted(set(variant_ids))
+    product_filter = " AND product_id = %s" if product_id is not None else ""
+    params = [client_id, requested] + ([product_id] if product_id is not None else [])
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT id, product_id FROM {_table(ProductVariant)} "
+            f"WHERE client_id = %s AND id = ANY(%s){product_filter} FOR UPDATE",
+            params
+        )
+        rows = cursor.fetchall()
+        ids = [row[0] for row in rows]
+
+        cursor.execute(
+            f"SELECT DISTINCT component_variant_id FROM {_table(KitComponent)} "
+            f"WHERE component_variant_id = ANY(%s)",
+            [ids]
+        )
+        protected = sorted(row[0] for row in cursor.fetchall())
+        ids = sorted(set(ids) - set(protected))
+        parent_ids = sorted({product for variant, product in rows if variant in ids})
+
+        counts = {'variants': 0, 'images': 0, 'stock_balances': 0}
+        if ids:
+            counts = _delete_variant_rows(cursor, ids)
+            _touch(Product, parent_ids)
+
+    if counts['variants']:
+        bump_change_counter(PRODUCTS_CHANGE_SCOPE, client_id)
+    return {'deleted': counts, 'protected': protected}
+
+
+def bulk_delete_images(client_id, image_ids, product_id=None):
+    """
+    Delete product and variant images.
+
+    Args:
+        client_id: The client whose images are deleted
+        image_ids: IDs of the images to delete
+        product_id: If given, only images of this product are deleted
+
+    Returns:
+        dict: {'deleted': {'images': count}, 'protected': []}
+    """
+    requested = sorted(set(image_ids))
+    product_filter = " AND product_id = %s" if product_id is not None else ""
+    params = [client_id, requested] + ([product_id] if product_id is not None else [])
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT id, product_id, variant_id FROM {_table(ProductImage)} "
+            f"WHERE client_id = %s AND id = ANY(%s){product_filter} FOR UPDATE",
+            params
+        )
+        rows = cursor.fetchall()
+        ids = [row[0] for row in rows]
+
+        deleted = 0
+        if ids:
+            deleted = _delete_images(cursor, "id = ANY(%s)", [ids])
+            variant_ids = sorted({row[2] for row in rows if row[2] is not None})
+            product_ids = {row[1] for row in rows if row[1] is not None}
+            product_ids.update(
+                ProductVariant.objects.filter(pk__in=variant_ids).values_list('product_id', flat=True)
+            )
+            _touch(ProductVariant, variant_ids)
+            _touch(Product, sorted(product_ids))
+
+    if deleted:
+        bump_change_counter(PRODUCTS_CHANGE_SCOPE, client_id)
+    return {'deleted': {'images': deleted}, 'protected': []}
+
+
+def bulk_set_publication_status(client_id, products, status, from_statuses=None, user=None, selection=None, job=None):
+    """
+    Move a batch of products to a publication status with one UPDATE.
+    
+    The UPDATE is guarded: it only changes the client's selected products
+    whose current status is one of from_statuses, and never touches products
+    already in the target status, so concurrent or repeated requests do not
+    rewrite rows. The same statement reports how many selected products were
+    in each status. One PublicationStatusChange is written for the batch, and
+    the change counter is bumped and publication_status_changed sent once.
+    
+    Args:
+        client_id: The client whose products change
+        products: Product IDs, or a Product queryset selecting them
+        status: The target PublicationStatus
+        from_statuses: Statuses products may be moved from; all others if None
+        user: The user making the change, for the audit record
+        selection: How the products were selected, for the audit record
+        job: The BulkJob running the change, if any
+    
+    Returns:
+        dict: {'status', 'matched': selected products, 'updated', 'unchanged':
+        already in the status, 'skipped': excluded by from_statuses,
+        'previous': {status: products moved from it}, 'audit_id'}
+    """
+    sources = [
+        source for source in (from_statuses or PublicationStatus.values) if source != status
+    ]
+    if isinstance(products, (list, tuple, set)):
+        selection_sql, selection_params = "id = ANY(%s)", [sorted(set(products))]
+    else:
+        subquery, selection_params = products.order_by().values('pk').query.sql_with_params()
+        selection_sql = f"id IN ({subquery})"
+    
+    now = timezone.now()
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH selected AS (
+                SELECT id, publication_status FROM {_table(Product)}
+                WHERE client_id = %s AND {selection_sql}
+                FOR UPDATE
+            ), changed AS (
+                UPDATE {_table(Product)} p SET publication_status = %s, updated_at = %s
+                FROM selected s
+                WHERE p.id = s.id AND s.publication_status = ANY(%s)
+                RETURNING p.id
+            )
+            SELECT s.publication_status, COUNT(*), ARRAY_AGG(c.id ORDER BY c.id) FILTER (WHERE c.id IS NOT NULL)
+            FROM selected s LEFT JOIN changed c ON c.id = s.id
+            GROUP BY s.publication_status
+            """,
+            [client_id, *selection_params, status, now, sources]
+        )
+        rows = cursor.fetchall()
+        
+        counts = {previous: count for previous, count, _ in rows}
+        previous = {previous: len(ids) for previous, _, ids in rows if ids}
+        product_ids = sorted(product_id for _, _, ids in rows for product_id in ids or ())
+        audit = None
+        if product_ids:
+            audit = PublicationStatusChange.objects.create(
+                client_id=client_id,
+                status=status,
+                previous=previous,
+                product_count=len(product_ids),
+                product_ids=product_ids,
+                selection=selection or {},
+                changed_by=user if user is not None and user.is_authenticated else None,
+                job=job,
+            )
+            transaction.on_commit(lambda: publication_status_changed.send(
+                sender=Product, client_id=client_id, status=status, product_ids=product_ids
+            ))
+    
+    if product_ids:
+        bump_change_counter(PRODUCTS_CHANGE_SCOPE, client_id)
+    logger.info("Moved %s products of client %s to %s", len(product_ids), client_id, status)
+    return {
+        'status': status,
+        'matched': sum(counts.values()),
+        'updated': len(product_ids),
+        'unchanged': counts.get(status, 0),
+        'skipped': sum(counts.values()) - len(product_ids) - counts.get(status, 0),
+        'previous': previous,
+        'audit_id': audit.pk if audit else None,
+    }
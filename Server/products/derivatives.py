@@ -0,0 +1,234 @@
+"""
+Resized derivatives of product images.
+
+List pages should not ship multi-megabyte originals. Every linked image gets a
+configurable set of smaller renditions (PRODUCT_IMAGE_DERIVATIVES, name ->
+longest edge in pixels) in each of PRODUCT_IMAGE_DERIVATIVE_FORMATS. They are
+generated asynchronously by products.tasks.generate_image_derivatives and
+recorded on ``ProductImage.derivatives``:
+
+    {'thumbnail': {'webp': {'name': 'derivatives/<sha>/thumbnail.webp',
+                            'width': 150, 'height': 100}, 'jpeg': {...}}, ...}
+
+Serializers expose them as ``srcset`` strings per format via ``build_srcset``.
+"""
+import io
+import logging
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DERIVATIVES = {
+    'thumbnail': 150,
+    'card': 480,
+    'zoom': 1600,
+}
+DEFAULT_FORMATS = ('webp', 'jpeg')
+
+FORMAT_EXTENSIONS = {
+    'webp': 'webp',
+    'jpeg': 'jpg',
+}
+
+
+def get_derivative_specs():
+    """
+    Return the configured derivatives as {name: longest edge}.
+    """
+    return getattr(settings, 'PRODUCT_IMAGE_DERIVATIVES', DEFAULT_DERIVATIVES)
+
+
+def get_derivative_formats():
+    """
+    Return the configured output formats, e.g. ('webp', 'jpeg').
+    """
+    return tuple(getattr(settings, 'PRODUCT_IMAGE_DERIVATIVE_FORMATS', DEFAULT_FORMATS))
+
+
+def render_derivatives(source, specs, formats, quality=80):
+    """
+    Decode an image once and encode every derivative from it.
+
+    JPEG sources are decoded in draft mode, which lets libjpeg scale the image
+    down by up to 8x while decoding, so large originals never get fully
+    decoded. Derivatives are produced largest first, each resized from the
+    previous one. Images are never upscaled.
+
+    This function does no I/O beyond reading ``source`` and is safe to run in
+    worker processes.
+
+    Args:
+        source: Path or binary file object of the original image
+        specs: {name: longest edge in pixels}
+        formats: Output formats (Pillow format names, lowercase)
+        quality: Encoder quality for lossy formats
+
+    Returns:
+        dict: {name: {format: (bytes, width, height)}}
+    """
+    rendered = {}
+    with Image.open(source) as original:
+        largest = max(specs.values())
+        original.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(original)
+        if image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info:
+            # Flatten transparency onto white, since JPEG has no alpha channel
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            rgba = image.convert('RGBA')
+            background.paste(rgba, mask=rgba.getchannel('A'))
+            image = background
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        current = image
+        for name, edge in sorted(specs.items(), key=lambda item: item[1], reverse=True):
+            current = current.copy()
+            current.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+            rendered[name] = {}
+            for image_format in formats:
+                buffer = io.BytesIO()
+                current.save(buffer, format=image_format.upper(), quality=quality, optimize=True)
+                rendered[name][image_format] = (buffer.getvalue(), current.width, current.height)
+    return rendered
+
+
+def derivative_prefix(image):
+    """
+    Return the storage directory for an image's derivatives.
+
+    Images backed by a content-addressed blob share derivatives, so the
+    directory is derived from the content hash; other images get their own.
+    """
+    if image.blob_id is not None:
+        return f"derivatives/{image.blob.sha256}"
+    return f"derivatives/images/{image.pk}"
+
+
+def store_derivatives(image, rendered):
+    """
+    Save rendered derivatives to storage and record them on the image.
+
+    Images sharing the same blob that have no derivatives yet are updated too.
+
+    Args:
+        image: The ProductImage the derivatives were rendered from
+        rendered: Result of render_derivatives
+
+    Returns:
+        dict: The recorded derivatives
+    """
+    prefix = derivative_prefix(image)
+    derivatives = {}
+    for name, renditions in rendered.items():
+        derivatives[name] = {}
+        for image_format, (content, width, height) in renditions.items():
+            path = f"{prefix}/{name}.{FORMAT_EXTENSIONS.get(image_format, image_format)}"
+            if default_storage.exists(path):
+                default_storage.delete(path)
+            saved = default_storage.save(path, ContentFile(content))
+            derivatives[name][image_format] = {'name': saved, 'width': width, 'height': height}
+
+    record_derivatives(image, derivatives)
+    return derivatives
+
+
+def record_derivatives(image, derivatives):
+    """
+    Record derivatives on an image (and on images sharing its blob) and advance row versions.
+    """
+    from products.models import ProductImage, touch_product
+
+    images = ProductImage.objects.filter(pk=image.pk)
+    if image.blob_id is not None:
+        images = images | ProductImage.objects.filter(blob_id=image.blob_id, derivatives={})
+    targets = list(images.values_list('pk', 'client_id', 'product_id', 'variant_id'))
+    ProductImage.objects.filter(pk__in=[pk for pk, *_ in targets]).update(
+        derivatives=derivatives, updated_at=timezone.now()
+    )
+    for _, client_id, product_id, variant_id in targets:
+        touch_product(client_id, product_id=product_id, variant_id=variant_id)
+
+
+def generate_for_image(image):
+    """
+    Generate and record the configured derivatives for an image.
+
+    If another image with the same content already has derivatives they are
+    reused instead of being rendered again.
+
+    Args:
+        image: The ProductImage
+
+    Returns:
+        dict: The recorded derivatives, or {} if the image has no file
+    """
+    from products.models import ProductImage
+
+    if not image.image:
+        return {}
+    if image.blob_id is not None:
+        existing = ProductImage.objects.filter(blob_id=image.blob_id).exclude(
+            derivatives={}
+        ).values_list('derivatives', flat=True).first()
+        if existing:
+            record_derivatives(image, existing)
+            return existing
+
+    with image.image.open('rb') as source:
+        rendered = render_derivatives(
+            source, get_derivative_specs(), get_derivative_formats(),
+            getattr(settings, 'PRODUCT_IMAGE_DERIVATIVE_QUALITY', 80)
+        )
+    logger.info("Rendered %s derivatives for image %s", len(rendered), image.pk)
+    return store_derivatives(image, rendered)
+
+
+def queue_derivatives(image_ids):
+    """
+    Queue derivative generation for images once the current transaction commits.
+
+    Args:
+        image_ids: IDs of ProductImages that have a file
+    """
+    from products.tasks import generate_image_derivatives
+
+    image_ids = list(image_ids)
+    if not image_ids:
+        return
+
+    def dispatch():
+        for image_id in image_ids:
+            try:
+                generate_image_derivatives.delay(image_id)
+            except Exception as e:
+                logger.error("Failed to queue derivatives for image %s: %s", image_id, e)
+
+    transaction.on_commit(dispatch)
+
+
+def build_srcset(derivatives, url_for):
+    """
+    Build ``srcset`` attribute values from recorded derivatives.
+
+    Args:
+        derivatives: ``ProductImage.derivatives``
+        url_for: Callable turning a storage name into a URL
+
+    Returns:
+        dict: {format: 'url 150w, url 480w, ...'}, ordered by width; empty if
+        no derivatives have been generated yet
+    """
+    candidates = {}
+    for renditions in (derivatives or {}).values():
+        for image_format, rendition in renditions.items():
+            candidates.setdefault(image_format, []).append((rendition['width'], rendition['name']))
+    return {
+        image_format: ', '.join(f"{url_for(name)} {width}w" for width, name in sorted(entries))
+        for image_format, entries in candidates.items()
+    }
@@ -0,0 +1,484 @@
+"""
+Fast read-only serialization for product lists.
+
+ProductSerializer spends most of its time in DRF field machinery: every value
+of every product, image and attribute value passes through a Field instance,
+and every nested row is hydrated into a model instance first. For list pages
+this module produces the same JSON shape from ``values()`` rows instead, with a
+fixed table of per-field converters compiled once at import time.
+
+Output must stay identical to ProductSerializer; products/tests/test_fast_serializers.py
+compares the two. When a field is added to ProductSerializer it must be added
+here too.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+
+from django.utils import timezone
+from rest_framework import serializers
+
+from attributes.models import Attribute
+from products.catalogue.models import Category, Division, Subcategory
+from products.derivatives import build_srcset
+from products.models import (
+    Product, ProductImage, ProductAttributeValue, ProductAttributeMultiValue
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _decimal_converter(model, field_name):
+    """
+    Build a converter matching the DecimalField ModelSerializer generates for a model field.
+    """
+    model_field = model._meta.get_field(field_name)
+    return serializers.DecimalField(
+        max_digits=model_field.max_digits,
+        decimal_places=model_field.decimal_places,
+    ).to_representation
+
+
+def _date(value):
+    return value.isoformat()
+
+
+_DISPLAY_PRICE = _decimal_converter(Product, 'display_price')
+_COMPARE_AT_PRICE = _decimal_converter(Product, 'compare_at_price')
+_VALUE_NUMBER = _decimal_converter(ProductAttributeValue, 'value_number')
+
+# Converter kinds resolved per call, because they depend on the request or the
+# active time zone
+DATETIME = 'datetime'
+FILE_URL = 'file_url'
+SRCSET = 'srcset'
+
+# (output key, values() key, converter) for the flat product fields, in
+# ProductSerializer.Meta.fields order. Nested fields are marked by a None
+# values() key and filled in by FastProductSerializer. None values are passed
+# through unconverted, as Serializer.to_representation does.
+PRODUCT_FIELDS = [
+    ('id', 'id', None),
+    ('client_id', 'client_id', None),
+    ('company_id', 'company_id', None),
+    ('product_type', 'product_type', None),
+    ('name', 'name', None),
+    ('slug', 'slug', None),
+    ('sku', 'sku', None),
+    ('description', 'description', None),
+    ('short_description', 'short_description', None),
+    ('category', 'category_id', None),
+    ('category_details', None, None),
+    ('subcategory', 'subcategory_id', None),
+    ('subcategory_details', None, None),
+    ('division', 'division_id', None),
+    ('division_details', None, None),
+    ('uom', 'uom_id', None),
+    ('uom_details', None, None),
+    ('productstatus', 'productstatus_id', None),
+    ('productstatus_details', None, None),
+    ('currency_code', 'currency_code__code', None),
+    ('default_tax_rate_profile', 'default_tax_rate_profile_id', None),
+    ('is_tax_exempt', 'is_tax_exempt', None),
+    ('display_price', 'display_price', _DISPLAY_PRICE),
+    ('compare_at_price', 'compare_at_price', _COMPARE_AT_PRICE),
+    ('is_active', 'is_active', None),
+    ('allow_reviews', 'allow_reviews', None),
+    ('inventory_tracking_enabled', 'inventory_tracking_enabled', None),
+    ('backorders_allowed', 'backorders_allowed', None),
+    ('quantity_on_hand', 'quantity_on_hand', None),
+    ('total_quantity_on_hand', 'stock_rollup__quantity_on_hand', None),
+    ('is_serialized', 'is_serialized', None),
+    ('is_lotted', 'is_lotted', None),
+    ('pre_order_available', 'pre_order_available', None),
+    ('pre_order_date', 'pre_order_date', _date),
+    ('publication_status', 'publication_status', None),
+    ('attribute_groups', None, None),
+    ('variant_defining_attributes', None, None),
+    ('seo_title', 'seo_title', None),
+    ('seo_description', 'seo_description', None),
+    ('seo_keywords', 'seo_keywords', None),
+    ('tags', 'tags', None),
+    ('faqs', 'faqs', None),
+    ('images', None, None),
+    ('attribute_values', None, None),
+    ('created_at', 'created_at', DATETIME),
+    ('updated_at', 'updated_at', DATETIME),
+    ('created_by', 'created_by_id', None),
+    ('created_by_details', None, None),
+    ('updated_by', 'updated_by_id', None),
+    ('updated_by_details', None, None),
+]
+
+# Nested "details" objects read from joined columns: output key -> (relation, fields)
+# where fields are (output key, column, converter) and the relation's primary key
+# column decides whether the object is present at all.
+_CATALOGUE_DETAIL_FIELDS = [
+    ('id', 'id', None),
+    ('name', 'name', None),
+    ('description', 'description', None),
+    ('image', 'image', FILE_URL),
+    ('image_alt_text', 'image_alt_text', None),
+]
+_USER_DETAIL_FIELDS = [
+    ('id', 'id', None),
+    ('username', 'username', None),
+    ('email', 'email', None),
+]
+DETAIL_FIELDS = {
+    'category_details': ('category', _CATALOGUE_DETAIL_FIELDS),
+    'subcategory_details': ('subcategory', [
+        ('id', 'id', None),
+        ('category', 'category_id', None),
+        ('name', 'name', None),
+        ('description', 'description', None),
+        ('image', 'image', FILE_URL),
+        ('image_alt_text', 'image_alt_text', None),
+    ]),
+    'division_details': ('division', _CATALOGUE_DETAIL_FIELDS),
+    'uom_details': ('uom', [
+        ('name', 'name', None),
+        ('symbol', 'symbol', None),
+        ('description', 'description', None),
+    ]),
+    'productstatus_details': ('productstatus', [
+        ('name', 'name', None),
+        ('description', 'description', None),
+    ]),
+    'created_by_details': ('created_by', _USER_DETAIL_FIELDS),
+    'updated_by_details': ('updated_by', _USER_DETAIL_FIELDS),
+}
+
+# Storage of each nested image column, used to build URLs from stored names
+DETAIL_STORAGES = {
+    'category': Category._meta.get_field('image').storage,
+    'subcategory': Subcategory._meta.get_field('image').storage,
+    'division': Division._meta.get_field('image').storage,
+}
+
+IMAGE_FIELDS = [
+    ('id', 'id', None),
+    ('client_id', 'client_id', None),
+    ('company_id', 'company_id', None),
+    ('product', 'product_id', None),
+    ('image', 'image', FILE_URL),
+    ('srcset', 'derivatives', SRCSET),
+    ('alt_text', 'alt_text', None),
+    ('sort_order', 'sort_order', None),
+    ('is_default', 'is_default', None),
+    ('created_at', 'created_at', DATETIME),
+    ('updated_at', 'updated_at', DATETIME),
+]
+
+ATTRIBUTE_VALUE_FIELDS = [
+    ('id', 'id', None),
+    ('client_id', 'client_id', None),
+    ('company_id', 'company_id', None),
+    ('product', 'product_id', None),
+    ('attribute', 'attribute_id', None),
+    ('attribute_name', 'attribute__name', None),
+    ('attribute_code', 'attribute__code', None),
+    ('attribute_type', 'attribute__data_type', None),
+    ('value', None, None),
+    ('value_text', 'value_text', None),
+    ('value_number', 'value_number', _VALUE_NUMBER),
+    ('value_boolean', 'value_boolean', None),
+    ('value_date', 'value_date', _date),
+    ('value_option', 'value_option_id', None),
+    ('created_at', 'created_at', DATETIME),
+    ('updated_at', 'updated_at', DATETIME),
+]
+
+
+def _detail_columns():
+    columns = []
+    for relation, fields in DETAIL_FIELDS.values():
+        columns.append(f'{relation}__id')
+        columns.extend(f'{relation}__{column}' for _, column, _ in fields if column != 'id')
+    return columns
+
+
+PRODUCT_COLUMNS = list(dict.fromkeys(
+    [column for _, column, _ in PRODUCT_FIELDS if column is not None] + _detail_columns()
+))
+IMAGE_COLUMNS = [column for _, column, _ in IMAGE_FIELDS]
+ATTRIBUTE_VALUE_COLUMNS = [
+    column for _, column, _ in ATTRIBUTE_VALUE_FIELDS if column is not None
+] + ['value_option__option_label', 'value_option__option_value']
+
+
+class FastProductSerializer:
+    """
+    Read-only, list-oriented equivalent of ProductSerializer.
+
+    Builds product representations from a handful of ``values()`` queries
+    (products with their joined details, images, attribute values, multi-select
+    options and the two many-to-many id lists) without instantiating models or
+    DRF fields.
+
+    Example:
+        serializer = FastProductSerializer(context={'request': request})
+        data = serializer.serialize(product_ids)
+        data = await serializer.aserialize(product_ids)  # in async views
+    """
+
+    def __init__(self, context=None):
+        self.context = context or {}
+        request = self.context.get('request')
+        self._build_absolute_uri = request.build_absolute_uri if request is not None else None
+        self._timezone = timezone.get_current_timezone()
+
+    def _datetime(self, value):
+        # Same steps as DateTimeField.to_representation for aware values
+        value = value.astimezone(self._timezone).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+
+    def _file_url_converter(self, storage):
+        build_absolute_uri = self._build_absolute_uri
+
+        def convert(name):
+            if not name:
+                return None
+            url = storage.url(name)
+            return build_absolute_uri(url) if build_absolute_uri else url
+        return convert
+
+    def _srcset_converter(self, storage):
+        url_for = self._file_url_converter(storage)
+
+        def convert(derivatives):
+            return build_srcset(derivatives, url_for)
+        return convert
+
+    def _compile(self, fields, storage=None):
+        """
+        Resolve per-call converter kinds into callables.
+
+        Returns:
+            list: (output key, column, callable or None) tuples
+        """
+        compiled = []
+        for key, column, converter in fields:
+            if converter == DATETIME:
+                converter = self._datetime
+            elif converter == FILE_URL:
+                converter = self._file_url_converter(storage)
+            elif converter == SRCSET:
+                converter = self._srcset_converter(storage)
+            compiled.append((key, column, converter))
+        return compiled
+
+    @staticmethod
+    def _convert_row(row, fields, prefix=''):
+        data = {}
+        for key, column, converter in fields:
+            value = row[prefix + column]
+            if value is not None and converter is not None:
+                value = converter(value)
+            data[key] = value
+        return data
+
+    def get_querysets(self, product_ids):
+        """
+        Return the independent queries a page of products is read from.
+
+        Returns:
+            dict: Name -> ``values()``/``values_list()`` queryset
+        """
+        return {
+            'products': Product.objects.filter(pk__in=product_ids).order_by().values(*PRODUCT_COLUMNS),
+            # Keep ProductImage's default ordering, as the prefetch in ProductViewSet does
+            'images': ProductImage.objects.filter(product_id__in=product_ids).values(*IMAGE_COLUMNS),
+            'attribute_values': ProductAttributeValue.objects.filter(
+                product_id__in=product_ids
+            ).values(*ATTRIBUTE_VALUE_COLUMNS),
+            'attribute_groups': self._m2m_ids(
+                Product.attribute_groups.through, 'attributegroup',
+                ['attributegroup__display_order', 'attributegroup__name'], product_ids
+            ),
+            'variant_defining_attributes': self._m2m_ids(
+                Product.variant_defining_attributes.through, 'attribute',
+                ['attribute__name'], product_ids
+            ),
+        }
+
+    @staticmethod
+    def get_multi_values_queryset(attribute_value_rows):
+        """
+        Return the query for the options of multi-select attribute values, or None if there are none.
+        """
+        multi_select_ids = [
+            row['id'] for row in attribute_value_rows
+            if row['attribute__data_type'] == Attribute.AttributeDataType.MULTI_SELECT
+        ]
+        if not multi_select_ids:
+            return None
+        return ProductAttributeMultiValue.objects.filter(
+            product_attribute_value_id__in=multi_select_ids
+        ).order_by('pk').values_list(
+            'product_attribute_value_id', 'attribute_option_id',
+            'attribute_option__option_label', 'attribute_option__option_value'
+        )
+
+    def serialize(self, product_ids):
+        """
+        Serialize products in the given order.
+
+        Args:
+            product_ids: Product IDs, already filtered, ordered and paginated
+
+        Returns:
+            list: Product representations in the order of product_ids; IDs that
+            no longer exist are skipped
+        """
+        product_ids = list(product_ids)
+        if not product_ids:
+            return []
+
+        rows = {name: list(queryset) for name, queryset in self.get_querysets(product_ids).items()}
+        multi_values = self.get_multi_values_queryset(rows['attribute_values'])
+        rows['multi_values'] = list(multi_values) if multi_values is not None else []
+        return self.build(product_ids, rows)
+
+    async def aserialize(self, product_ids):
+        """
+        Async equivalent of serialize() for async views.
+
+        The independent queries are awaited together through the async ORM.
+        Rows are converted in a worker thread rather than on the event loop,
+        because building file URLs may sign them with a remote call.
+        """
+        product_ids = list(product_ids)
+        if not product_ids:
+            return []
+
+        querysets = self.get_querysets(product_ids)
+        results = await asyncio.gather(*(_alist(queryset) for queryset in querysets.values()))
+        rows = dict(zip(querysets, results))
+        multi_values = self.get_multi_values_queryset(rows['attribute_values'])
+        rows['multi_values'] = await _alist(multi_values) if multi_values is not None else []
+        return await sync_to_async(self.build, thread_sensitive=False)(product_ids, rows)
+
+    def build(self, product_ids, rows):
+        """
+        Build product representations from the rows of get_querysets().
+
+        Args:
+            product_ids: Product IDs in output order
+            rows: Name -> list of rows, as read from get_querysets(), plus
+                'multi_values' read from get_multi_values_queryset()
+
+        Returns:
+            list: Product representations
+        """
+        products = {row['id']: row for row in rows['products']}
+        product_fields = self._compile(PRODUCT_FIELDS)
+        detail_fields = {
+            key: (relation, self._compile(fields, DETAIL_STORAGES.get(relation)))
+            for key, (relation, fields) in DETAIL_FIELDS.items()
+        }
+        nested = {
+            'images': self._images(rows['images']),
+            'attribute_values': self._attribute_values(rows['attribute_values'], rows['multi_values']),
+            'attribute_groups': self._group_ids(rows['attribute_groups']),
+            'variant_defining_attributes': self._group_ids(rows['variant_defining_attributes']),
+        }
+
+        results = []
+        for product_id in product_ids:
+            row = products.get(product_id)
+            if row is None:
+                continue
+            data = {}
+            for key, column, converter in product_fields:
+                if column is None:
+                    if key in detail_fields:
+                        relation, fields = detail_fields[key]
+                        if row[f'{relation}__id'] is None:
+                            data[key] = None
+                        else:
+                            data[key] = self._convert_row(row, fields, f'{relation}__')
+                    else:
+                        data[key] = nested[key].get(product_id, [])
+                    continue
+                value = row[column]
+                if value is not None and converter is not None:
+                    value = converter(value)
+                data[key] = value
+            results.append(data)
+        return results
+
+    def _images(self, rows):
+        storage = ProductImage._meta.get_field('image').storage
+        fields = self._compile(IMAGE_FIELDS, storage)
+        images = defaultdict(list)
+        for row in rows:
+            images[row['product_id']].append(self._convert_row(row, fields))
+        return images
+
+    def _attribute_values(self, rows, multi_value_rows):
+        fields = self._compile(ATTRIBUTE_VALUE_FIELDS)
+        multi_values = defaultdict(list)
+        for value_id, option_id, label, value in multi_value_rows:
+            multi_values[value_id].append({'id': option_id, 'label': label, 'value': value})
+
+        attribute_values = defaultdict(list)
+        for row in rows:
+            data = {}
+            for key, column, converter in fields:
+                if column is None:
+                    data[key] = self._attribute_value(row, multi_values)
+                    continue
+                value = row[column]
+                if value is not None and converter is not None:
+                    value = converter(value)
+                data[key] = value
+            attribute_values[row['product_id']].append(data)
+        return attribute_values
+
+    @staticmethod
+    def _attribute_value(row, multi_values):
+        """
+        Equivalent of ProductAttributeValueSerializer.get_value for a values() row.
+        """
+        data_type = row['attribute__data_type']
+        if data_type == Attribute.AttributeDataType.TEXT:
+            return row['value_text']
+        elif data_type == Attribute.AttributeDataType.NUMBER:
+            return row['value_number']
+        elif data_type == Attribute.AttributeDataType.BOOLEAN:
+            return row['value_boolean']
+        elif data_type == Attribute.AttributeDataType.DATE:
+            return row['value_date']
+        elif data_type == Attribute.AttributeDataType.SELECT:
+            if row['value_option_id'] is None:
+                return None
+            return {
+                'id': row['value_option_id'],
+                'label': row['value_option__option_label'],
+                'value': row['value_option__option_value'],
+            }
+        elif data_type == Attribute.AttributeDataType.MULTI_SELECT:
+            return multi_values.get(row['id'], [])
+        return None
+
+    @staticmethod
+    def _m2m_ids(through, target, ordering, product_ids):
+        return through.objects.filter(product_id__in=product_ids).order_by(*ordering).values_list(
+            'product_id', f'{target}_id'
+        )
+
+    @staticmethod
+    def _group_ids(rows):
+        ids = defaultdict(list)
+        for product_id, target_id in rows:
+            ids[product_id].append(target_id)
+        return ids
+
+
+async def _alist(queryset):
+    return [row async for row in queryset]
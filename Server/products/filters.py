@@ -6,6 +6,8 @@ using django-filter.
 """
 
 import django_filters
+from rest_framework import serializers
+
 from products.models import PRODUCT_TYPE_CHOICES, Product, PublicationStatus
 
 
@@ -34,3 +36,21 @@ class ProductFilter(django_filters.FilterSet):
             'is_tax_exempt': ['exact'],
             'allow_reviews': ['exact'],
         }
+
+
+def filter_products(client_id, filters):
+    """
+    Select a client's products with the product list filters, outside a request.
+    
+    Used by bulk operations that accept {"filters": {...}} in place of IDs.
+    
+    Raises:
+        serializers.ValidationError: If a filter value is invalid
+    
+    Returns:
+        QuerySet: The selected products
+    """
+    filterset = ProductFilter(filters, queryset=Product.objects.filter(client_id=client_id))
+    if not filterset.is_valid():
+        raise serializers.ValidationError({'filters': filterset.errors})
+    return filterset.qs
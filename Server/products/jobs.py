@@ -0,0 +1,443 @@
+"""
+Bulk product operations run as background jobs (see core.jobs).
+
+- products.delete: deletes products with products.bulk.bulk_delete_products
+- products.import: creates and updates products from rows matched by SKU
+- products.price_update: sets the prices of products given by ID or SKU
+- products.export: writes the products selected by list filters to a CSV or
+  JSON Lines file in storage
+- products.publication_status: moves products to a publication status in
+  batches, with products.bulk.bulk_set_publication_status
+- products.price_adjustment: adjusts prices by a percentage or amount, see
+  products.price_adjustments
+
+Writes are set-based (bulk_create, bulk_update, SQL deletes) and so bypass
+model signals; each chunk bumps the products change counter itself and sets
+updated_at, which keeps list and detail ETags current.
+"""
+import csv
+import io
+import json
+import logging
+import tempfile
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.text import slugify
+
+from core.conditional import bump_change_counter
+from core.jobs import JobOperation, merge_results, register_operation
+from inventory.models import StockBalance
+from products.bulk import bulk_delete_products, bulk_set_publication_status
+from products.catalogue.models import Category, Division, ProductStatus, Subcategory, UnitOfMeasure
+from products.fast_serializers import FastProductSerializer
+from products.filters import filter_products
+from products.models import PRODUCTS_CHANGE_SCOPE, Product
+from products.price_adjustments import apply_adjustment, scoped_products
+from products.serializers import (
+    BulkDeleteSerializer, BulkPriceUpdateSerializer, BulkPublicationStatusSerializer, PriceAdjustmentSerializer,
+    ProductExportSerializer, ProductImportRowSerializer, ProductImportSerializer
+)
+
+logger = logging.getLogger(__name__)
+
+# Import row field -> catalogue model it references by ID
+IMPORT_REFERENCES = {
+    'category': Category,
+    'subcategory': Subcategory,
+    'division': Division,
+    'uom': UnitOfMeasure,
+    'productstatus': ProductStatus,
+}
+
+# Columns of CSV exports, read from FastProductSerializer documents
+EXPORT_CSV_FIELDS = [
+    'id', 'sku', 'name', 'slug', 'product_type', 'publication_status', 'category', 'subcategory',
+    'division', 'uom', 'productstatus', 'display_price', 'compare_at_price', 'currency_code',
+    'is_active', 'quantity_on_hand', 'tags', 'created_at', 'updated_at',
+]
+
+
+def _numbered(rows):
+    # Keep each row's position in the request for error reports
+    return [{'row': number, 'data': row} for number, row in enumerate(rows, start=1)]
+
+
+@register_operation
+class ProductDeleteOperation(JobOperation):
+    """
+    Delete products; params: {"ids": [1, 2, 3]}.
+
+    Kit protection is decided per chunk, so components whose kits are deleted
+    in a later chunk are deleted once more when the job finishes.
+    """
+    name = 'products.delete'
+
+    def validate(self, params, client_id):
+        serializer = BulkDeleteSerializer(data=params)
+        serializer.is_valid(raise_exception=True)
+        return {'ids': sorted(set(serializer.validated_data['ids']))}
+
+    def get_items(self, job):
+        return job.params['ids']
+
+    def process_chunk(self, job, chunk):
+        return bulk_delete_products(job.client_id, chunk.items)
+
+    def finalize(self, job, results):
+        result = self.summarize(job, results)
+        if result.get('protected'):
+            retry = bulk_delete_products(job.client_id, result['protected'])
+            result['deleted'] = merge_results([result['deleted'], retry['deleted']])
+            result['protected'] = retry['protected']
+        return result
+
+
+@register_operation
+class ProductPublicationStatusOperation(JobOperation):
+    """
+    Move products to a publication status; params: {"status": "ACTIVE",
+    "ids": [...] or "filters": {...}, "from_status": [...]}.
+
+    Each chunk is one batch: one guarded UPDATE, one audit record and one
+    invalidation. Filters are resolved to IDs when the job is planned.
+    """
+    name = 'products.publication_status'
+
+    def validate(self, params, client_id):
+        serializer = BulkPublicationStatusSerializer(data=params)
+        serializer.is_valid(raise_exception=True)
+        params = dict(serializer.validated_data)
+        if 'filters' in params:
+            filter_products(client_id, params['filters'])
+        return params
+
+    def get_items(self, job):
+        if 'ids' in job.params:
+            return sorted(set(job.params['ids']))
+        return filter_products(job.client_id, job.params['filters']).order_by('pk').values_list('pk', flat=True)
+
+    def process_chunk(self, job, chunk):
+        params = job.params
+        result = bulk_set_publication_status(
+            job.client_id, chunk.items, params['status'], params.get('from_status'), user=job.created_by,
+            selection={'filters': params['filters']} if 'filters' in params else {'ids': chunk.items}, job=job,
+        )
+        audit_id = result.pop('audit_id')
+        result['audit_ids'] = [audit_id] if audit_id else []
+        return result
+
+
+@register_operation
+class ProductImportOperation(JobOperation):
+    """
+    Create and update products from rows; params: {"rows": [...], "update_existing": true}.
+
+    Rows are matched to the client's products by SKU: matches are updated with
+    the fields given in the row, other rows create products and need at least
+    name and category. Invalid rows are reported per row number and do not
+    stop the rest of their chunk. Once planned, the rows are kept in the
+    chunks only.
+    """
+    name = 'products.import'
+
+    def validate(self, params, client_id):
+        serializer = ProductImportSerializer(data=params)
+        serializer.is_valid(raise_exception=True)
+        return dict(serializer.validated_data)
+
+    def get_items(self, job):
+        return _numbered(job.params['rows'])
+
+    def plan(self, job):
+        chunks = super().plan(job)
+        job.params['row_count'] = len(job.params.pop('rows'))
+        return chunks
+
+    def process_chunk(self, job, chunk):
+        client_id = job.client_id
+        errors, valid = [], []
+        for item in chunk.items:
+            serializer = ProductImportRowSerializer(data=item['data'])
+            if serializer.is_valid():
+                valid.append((item['row'], serializer.validated_data))
+            else:
+                errors.append({'row': item['row'], 'errors': serializer.errors})
+
+        skus = [data['sku'] for _, data in valid]
+        existing = {}
+        for product in Product.objects.filter(client_id=client_id, sku__in=skus):
+            existing.setdefault(product.sku, []).append(product)
+        known_ids = self._known_references(client_id, [data for _, data in valid])
+        # Stock kept in the inventory ledger only changes through stock movements
+        managed = set(StockBalance.objects.filter(
+            client_id=client_id, variant__isnull=True,
+            product__in=[product for products in existing.values() for product in products]
+        ).values_list('product_id', flat=True)) if existing else set()
+
+        now = timezone.now()
+        created, updated, update_fields, seen = [], [], {'updated_at', 'updated_by'}, set()
+        for row, data in valid:
+            row_errors = self._row_errors(data, existing, known_ids, seen, job.params.get('update_existing', True))
+            if row_errors:
+                errors.append({'row': row, 'errors': row_errors})
+                continue
+            seen.add(data['sku'])
+            matches = existing.get(data['sku'])
+            if matches:
+                product = matches[0]
+                if product.pk in managed:
+                    data = {field: value for field, value in data.items() if field != 'quantity_on_hand'}
+                update_fields.update(self._apply(product, data))
+                product.updated_at = now
+                product.updated_by = job.created_by
+                updated.append(product)
+            else:
+                product = Product(client_id=client_id, created_by=job.created_by, updated_by=job.created_by)
+                self._apply(product, data)
+                created.append(product)
+
+        _assign_slugs(client_id, created)
+        Product.objects.bulk_create(created)
+        Product.objects.bulk_update(updated, sorted(update_fields))
+        if created or updated:
+            bump_change_counter(PRODUCTS_CHANGE_SCOPE, client_id)
+        return {
+            'created': len(created),
+            'updated': len(updated),
+            'failed': len(errors),
+            'errors': sorted(errors, key=lambda error: error['row']),
+        }
+
+    @staticmethod
+    def _known_references(client_id, rows):
+        """
+        Return the IDs referenced by rows that exist for the client, per field.
+        """
+        known = {}
+        for field, model in IMPORT_REFERENCES.items():
+            ids = {data[field] for data in rows if data.get(field) is not None}
+            known[field] = set(
+                model.objects.filter(client_id=client_id, pk__in=ids).values_list('pk', flat=True)
+            ) if ids else set()
+        return known
+
+    @staticmethod
+    def _row_errors(data, existing, known_ids, seen, update_existing):
+        errors = {}
+        for field in IMPORT_REFERENCES:
+            value = data.get(field)
+            if value is not None and value not in known_ids[field]:
+                errors[field] = [f'Invalid pk "{value}" - object does not exist.']
+
+        matches = existing.get(data['sku'], [])
+        if data['sku'] in seen:
+            errors['sku'] = ['Duplicate of an earlier row with this SKU.']
+        elif len(matches) > 1:
+            errors['sku'] = ['SKU matches more than one product.']
+        elif matches and not update_existing:
+            errors['sku'] = ['A product with this SKU already exists.']
+        elif not matches:
+            for field in ('name', 'category'):
+                if data.get(field) is None:
+                    errors[field] = ['This field is required for new products.']
+        return errors
+
+    @staticmethod
+    def _apply(product, data):
+        """
+        Set the row's fields on the product and return the names of the fields set.
+        """
+        fields = []
+        for field, value in data.items():
+            attname = f'{field}_id' if field in IMPORT_REFERENCES else field
+            setattr(product, attname, value)
+            fields.append(field)
+        return fields
+
+
+def _assign_slugs(client_id, products):
+    """
+    Give new products slugs from their name and SKU, unique within the client.
+
+    Taken slugs are looked up once per round for all products instead of once
+    per product and candidate, as Product.save() does.
+    """
+    pending, attempt, taken = list(products), 1, set()
+    while pending:
+        candidates = []
+        for product in pending:
+            base = slugify(f"{product.name} {product.sku}")[:240] or 'product'
+            candidates.append((product, base if attempt == 1 else f"{base}-{attempt}"))
+        taken.update(Product.objects.filter(
+            client_id=client_id, slug__in=[slug for _, slug in candidates]
+        ).values_list('slug', flat=True))
+
+        pending = []
+        for product, slug in candidates:
+            if slug in taken:
+                pending.append(product)
+            else:
+                product.slug = slug
+                taken.add(slug)
+        attempt += 1
+
+
+@register_operation
+class ProductPriceUpdateOperation(JobOperation):
+    """
+    Set product prices; params: {"prices": [{"sku": "ABC-1", "display_price": "9.99"}, ...]}.
+
+    Rows naming products the client does not have are reported as failed.
+    """
+    name = 'products.price_update'
+
+    def validate(self, params, client_id):
+        serializer = BulkPriceUpdateSerializer(data=params)
+        serializer.is_valid(raise_exception=True)
+        # Prices are stored as strings to keep them exact in JSON
+        return {'prices': [
+            {key: str(value) if value is not None and key.endswith('price') else value for key, value in row.items()}
+            for row in serializer.validated_data['prices']
+        ]}
+
+    def get_items(self, job):
+        return _numbered(job.params['prices'])
+
+    def plan(self, job):
+        chunks = super().plan(job)
+        job.params['row_count'] = len(job.params.pop('prices'))
+        return chunks
+
+    def process_chunk(self, job, chunk):
+        rows = chunk.items
+        ids = [item['data']['id'] for item in rows if 'id' in item['data']]
+        skus = [item['data']['sku'] for item in rows if 'id' not in item['data']]
+        products = Product.objects.filter(client_id=job.client_id).filter(
+            Q(pk__in=ids) | Q(sku__in=skus)
+        ).only('id', 'sku', 'display_price', 'compare_at_price', 'updated_at')
+        by_id, by_sku = {}, {}
+        for product in products:
+            by_id[product.pk] = product
+            by_sku.setdefault(product.sku, []).append(product)
+
+        now = timezone.now()
+        updated, errors = {}, []
+        for item in rows:
+            data = item['data']
+            if 'id' in data:
+                matches = [by_id[data['id']]] if data['id'] in by_id else []
+            else:
+                matches = by_sku.get(data['sku'], [])
+            if len(matches) != 1:
+                message = 'Product not found.' if not matches else 'SKU matches more than one product.'
+                errors.append({'row': item['row'], 'errors': {'product': [message]}})
+                continue
+            product = matches[0]
+            for field in ('display_price', 'compare_at_price'):
+                if field in data:
+                    setattr(product, field, data[field])
+            product.updated_at = now
+            updated[product.pk] = product
+
+        Product.objects.bulk_update(updated.values(), ['display_price', 'compare_at_price', 'updated_at'])
+        if updated:
+            bump_change_counter(PRODUCTS_CHANGE_SCOPE, job.client_id)
+        return {'updated': len(updated), 'failed': len(errors), 'errors': errors}
+
+
+@register_operation
+class ProductPriceAdjustmentOperation(JobOperation):
+    """
+    Adjust prices of the products in a scope, and of their variants;
+    params as PriceAdjustmentSerializer (dry_run is ignored).
+
+    The scope is resolved to product IDs when the job is planned; each chunk
+    is then one UPDATE per table.
+    """
+    name = 'products.price_adjustment'
+
+    def validate(self, params, client_id):
+        serializer = PriceAdjustmentSerializer(data=params)
+        serializer.is_valid(raise_exception=True)
+        # Decimals are stored as strings to keep them exact in JSON
+        return json.loads(json.dumps(serializer.validated_data, cls=DjangoJSONEncoder))
+
+    def get_items(self, job):
+        return scoped_products(job.client_id, job.params['scope']).order_by('pk').values_list('pk', flat=True)
+
+    def process_chunk(self, job, chunk):
+        return apply_adjustment(job.client_id, chunk.items, job.params)
+
+
+@register_operation
+class ProductExportOperation(JobOperation):
+    """
+    Export products to a file; params: {"format": "csv" | "jsonl", "filters": {...}}.
+
+    Each chunk writes a part file under BULK_JOB_EXPORT_DIR (rewritten if the
+    chunk runs again); the parts are joined into one file when the job
+    finishes, and its storage name and URL are the job's result. JSON Lines
+    files hold one product document per line, as the product API returns
+    them; CSV files the EXPORT_CSV_FIELDS columns.
+    """
+    name = 'products.export'
+
+    def validate(self, params, client_id):
+        serializer = ProductExportSerializer(data=params)
+        serializer.is_valid(raise_exception=True)
+        params = dict(serializer.validated_data)
+        filter_products(client_id, params['filters'])
+        return params
+
+    def get_items(self, job):
+        queryset = filter_products(job.client_id, job.params['filters'])
+        return queryset.order_by('pk').values_list('pk', flat=True)
+
+    @staticmethod
+    def file_name(job, suffix):
+        return f"{settings.BULK_JOB_EXPORT_DIR}/{job.pk}/products-{job.pk}{suffix}.{job.params['format']}"
+
+    def process_chunk(self, job, chunk):
+        documents = FastProductSerializer().serialize(chunk.items)
+        if job.params['format'] == 'jsonl':
+            content = ''.join(json.dumps(document, separators=(',', ':')) + '\n' for document in documents)
+        else:
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, EXPORT_CSV_FIELDS, extrasaction='ignore')
+            for document in documents:
+                writer.writerow({**document, 'tags': '|'.join(document['tags'] or [])})
+            content = buffer.getvalue()
+
+        name = self.file_name(job, f'-part-{chunk.index:05d}')
+        if default_storage.exists(name):
+            default_storage.delete(name)
+        default_storage.save(name, ContentFile(content.encode('utf-8')))
+        return {'rows': len(documents)}
+
+    def finalize(self, job, results):
+        name = self.file_name(job, '')
+        parts = [self.file_name(job, f'-part-{index:05d}') for index in range(job.total_chunks)]
+        with tempfile.TemporaryFile() as output:
+            if job.params['format'] == 'csv':
+                output.write((','.join(EXPORT_CSV_FIELDS) + '\r\n').encode('utf-8'))
+            for part in parts:
+                with default_storage.open(part, 'rb') as part_file:
+                    for block in part_file.chunks():
+                        output.write(block)
+            output.seek(0)
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            name = default_storage.save(name, File(output, name=name))
+        for part in parts:
+            default_storage.delete(part)
+
+        result = self.summarize(job, results)
+        result.update({'format': job.params['format'], 'file': name, 'url': default_storage.url(name)})
+        logger.info("Exported %s products for client %s to %s", result.get('rows', 0), job.client_id, name)
+        return result
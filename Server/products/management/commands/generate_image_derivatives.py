@@ -0,0 +1,79 @@
+"""
+Management command to backfill resized derivatives of product images.
+"""
+import io
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from products.derivatives import (
+    get_derivative_formats, get_derivative_specs, render_derivatives, store_derivatives
+)
+from products.models import ProductImage
+
+
+class Command(BaseCommand):
+    help = 'Generate resized derivatives (thumbnail, card, zoom...) for product images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Regenerate derivatives for every image, not only images without them'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Number of processes decoding and encoding images (default: CPU count)'
+        )
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        specs = get_derivative_specs()
+        formats = get_derivative_formats()
+        quality = getattr(settings, 'PRODUCT_IMAGE_DERIVATIVE_QUALITY', 80)
+
+        images = ProductImage.objects.exclude(image='').exclude(image__isnull=True).select_related('blob')
+        if not options['all']:
+            images = images.filter(derivatives={})
+
+        # Images sharing a blob get the derivatives of the first one rendered
+        seen_blobs = set()
+        done = failed = 0
+        pending = {}
+
+        def collect(futures):
+            nonlocal done, failed
+            for future in futures:
+                image = pending.pop(future)
+                try:
+                    store_derivatives(image, future.result())
+                    done += 1
+                except Exception as e:
+                    failed += 1
+                    self.stdout.write(self.style.ERROR(f'Image {image.pk}: {str(e)}'))
+
+        # Decoding and encoding are CPU bound; storage I/O stays in this process
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for image in images.iterator(chunk_size=200):
+                if image.blob_id is not None:
+                    if image.blob_id in seen_blobs:
+                        continue
+                    seen_blobs.add(image.blob_id)
+                try:
+                    with image.image.open('rb') as source:
+                        content = source.read()
+                except Exception as e:
+                    failed += 1
+                    self.stdout.write(self.style.ERROR(f'Image {image.pk}: {str(e)}'))
+                    continue
+
+                future = pool.submit(render_derivatives, io.BytesIO(content), specs, formats, quality)
+                pending[future] = image
+                # Bound the number of originals held in memory
+                if len(pending) >= workers * 2:
+                    completed, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(completed)
+            collect(list(pending))
+
+        self.stdout.write(self.style.SUCCESS(f'Generated derivatives for {done} images ({failed} failed)'))
@@ -0,0 +1,102 @@
+"""
+Management command to generate synthetic catalogs for performance testing.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+
+from products.placeholder_images import get_shared_placeholder
+from products.synthetic import CatalogSpec, generate_catalog
+from tenants.models import Domain, Tenant
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate synthetic tenants with products, variants, attributes, images and kits '
+        '(e.g. --products 1000000 --variants 5000000 --attributes 200)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tenant', type=int, action='append', dest='tenant_ids',
+            help='Existing tenant ID to fill (repeatable); default is to create --tenants tenants'
+        )
+        parser.add_argument('--tenants', type=int, default=1, help='Synthetic tenants to create or reuse')
+        parser.add_argument('--products', type=int, default=1000, help='Products per tenant, kits included')
+        parser.add_argument('--variants', type=int, default=5000, help='Variants per tenant')
+        parser.add_argument('--variants-per-product', type=int, default=10, help='Variants of each PARENT product')
+        parser.add_argument('--kits', type=int, default=0, help='KIT products per tenant')
+        parser.add_argument('--attributes', type=int, default=200, help='Attributes in the attribute library')
+        parser.add_argument('--options', type=int, default=8, help='Options of each attribute')
+        parser.add_argument('--images', type=int, default=2, help='Images of each product')
+        parser.add_argument('--attribute-values', type=int, default=3, help='Attribute values of each product')
+        parser.add_argument(
+            '--no-image-files', action='store_true',
+            help='Create image rows without a file instead of pointing them at the shared placeholder'
+        )
+        parser.add_argument('--prefix', default='syn', help='Prefix of generated names, slugs and SKUs')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Products written per batch')
+
+    def handle(self, *args, **options):
+        if options['products'] < 0 or options['variants'] < 0:
+            raise CommandError('--products and --variants must not be negative')
+        spec = CatalogSpec(
+            products=options['products'],
+            variants=options['variants'],
+            variants_per_product=options['variants_per_product'],
+            kits=options['kits'],
+            attributes=options['attributes'],
+            options_per_attribute=options['options'],
+            images_per_product=options['images'],
+            attribute_values=options['attribute_values'],
+        )
+        if spec.variants and spec.parents * spec.variants_per_product < spec.variants:
+            self.stdout.write(self.style.WARNING(
+                f'Only {spec.parents} parent products: they get more than '
+                f'{spec.variants_per_product} variants each'
+            ))
+
+        image_name = None if options['no_image_files'] or not spec.images_per_product else get_shared_placeholder()
+        for tenant in self.get_tenants(options):
+            started = time.monotonic()
+
+            def progress(done, total):
+                rate = done / max(time.monotonic() - started, 1e-6)
+                self.stdout.write(f'  tenant {tenant.id}: {done}/{total} products ({rate:.0f}/s)')
+
+            self.stdout.write(f'Generating catalog for tenant {tenant.id} ({tenant.name}, client {tenant.client_id})')
+            counts = generate_catalog(
+                tenant.client_id, spec,
+                prefix=options['prefix'],
+                seed=options['seed'],
+                batch_size=options['batch_size'],
+                image_name=image_name,
+                progress=progress,
+            )
+            summary = ', '.join(f'{count} {kind}' for kind, count in counts.items())
+            self.stdout.write(self.style.SUCCESS(
+                f'Tenant {tenant.id}: {summary} in {time.monotonic() - started:.1f}s'
+            ))
+
+    def get_tenants(self, options):
+        if options['tenant_ids']:
+            tenants = list(Tenant.objects.filter(id__in=options['tenant_ids']))
+            missing = set(options['tenant_ids']) - {tenant.id for tenant in tenants}
+            if missing:
+                raise CommandError(f'Unknown tenant IDs: {sorted(missing)}')
+            return tenants
+        tenants = []
+        for index in range(1, options['tenants'] + 1):
+            tenant = Tenant.objects.filter(schema_name=f'synthetic_{index}').first()
+            if tenant is None:
+                # Catalogs are scoped by client_id, so each new tenant gets its own
+                next_client_id = (Tenant.objects.aggregate(high=Max('client_id'))['high'] or 0) + 1
+                tenant = Tenant.objects.create(
+                    schema_name=f'synthetic_{index}', name=f'Synthetic tenant {index}', client_id=next_client_id
+                )
+            # Requests for this hostname are routed to the tenant (see benchmarks.bench_api)
+            Domain.objects.get_or_create(domain=f'synthetic-{index}.localhost', defaults={'tenant': tenant})
+            tenants.append(tenant)
+        return tenants
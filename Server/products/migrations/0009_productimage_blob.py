@@ -0,0 +1,26 @@
+# Generated by Django 4.2.20 on 2026-10-19 12:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("assets", "0001_initial"),
+        ("products", "0008_alter_productimage_options_productimage_variant_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="productimage",
+            name="blob",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="Content-addressed file shared by all images with the same content",
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="product_images",
+                to="assets.imageblob",
+            ),
+        ),
+    ]
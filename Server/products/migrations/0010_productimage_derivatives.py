@@ -0,0 +1,21 @@
+# Generated by Django 4.2.20 on 2026-10-19 12:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0009_productimage_blob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="productimage",
+            name="derivatives",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                help_text="Resized renditions by name and format (see products.derivatives)",
+            ),
+        ),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 4.2.20 on 2026-10-19 13:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("core", "0001_initial"),
+        ("products", "0010_productimage_derivatives"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PublicationStatusChange",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("client_id", models.IntegerField(db_index=True)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("DRAFT", "Draft"),
+                            ("ACTIVE", "Active"),
+                            ("ARCHIVED", "Archived"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "previous",
+                    models.JSONField(
+                        default=dict,
+                        help_text="Number of products moved from each previous status",
+                    ),
+                ),
+                ("product_count", models.PositiveIntegerField(default=0)),
+                (
+                    "product_ids",
+                    models.JSONField(
+                        default=list, help_text="IDs of the products that changed"
+                    ),
+                ),
+                (
+                    "selection",
+                    models.JSONField(
+                        blank=True,
+                        default=dict,
+                        help_text='How the products were selected: {"ids": [...]} or {"filters": {...}}',
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, editable=False
+                    ),
+                ),
+                (
+                    "changed_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "job",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="core.bulkjob",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["client_id", "-created_at"],
+                        name="products_pu_client__bada1a_idx",
+                    )
+                ],
+            },
+        ),
+    ]
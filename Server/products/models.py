@@ -6,9 +6,15 @@ ProductAttributeValue, and ProductVariant, which form the central structure for
 """
 
 from django.db import models
+from django.db.models import DEFERRED
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
 from django.conf import settings
+from django.utils import timezone
 from django.utils.text import slugify
 from django.utils.translation import gettext_lazy as _
+from core.conditional import bump_change_counter
+from assets.blobs import adjust_ref_count
 from core.models.base import TimestampedModel, AuditableModel
 
 # Import the models from the catalogue app
@@ -17,6 +23,15 @@ from products.catalogue.models import Division, Subcategory, UnitOfMeasure, Prod
 # Import Category from the correct module based on the database table name
 from products.catalogue.models import Category
 
+# Change counter scopes used for HTTP validators of product endpoints.
+# PRODUCTS covers products and everything nested in their representation;
+# CATALOGUE covers related rows whose details are embedded in product responses.
+# SKUS only moves when products or variants are created, deleted or change their
+# SKU, and versions the per-client SKU index (inventory.availability).
+PRODUCTS_CHANGE_SCOPE = 'products'
+CATALOGUE_CHANGE_SCOPE = 'catalogue'
+SKUS_CHANGE_SCOPE = 'skus'
+
 
 class PublicationStatus(models.TextChoices):
     """
@@ -225,6 +240,9 @@ class Product(AuditableModel):
     # FAQ field as JSON
     faqs = models.JSONField(blank=True, null=True, help_text="Store as list of objects: [{\"question\": \"...\", \"answer\": \"...\"}, ...]") 
     
+    # sku as loaded from the database, used to tell when the SKU index must be rebuilt
+    _loaded_sku = DEFERRED
+    
     class Meta:
         unique_together = [
             ('client_id', 'slug')
@@ -234,6 +252,12 @@ class Product(AuditableModel):
     def __str__(self):
         return self.name
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_sku = instance.__dict__.get('sku', DEFERRED)
+        return instance
+    
     def save(self, *args, **kwargs):
         # Generate slug if not provided
         if not self.slug:
@@ -273,10 +297,26 @@ class ProductImage(TimestampedModel):
         blank=True
     )
     image = models.ImageField(upload_to='products/', blank=True, null=True)
+    blob = models.ForeignKey(
+        'assets.ImageBlob',
+        on_delete=models.PROTECT,
+        related_name='product_images',
+        null=True,
+        blank=True,
+        help_text="Content-addressed file shared by all images with the same content"
+    )
+    derivatives = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Resized renditions by name and format (see products.derivatives)"
+    )
     alt_text = models.CharField(max_length=255, blank=True)
     sort_order = models.PositiveIntegerField(default=0)
     is_default = models.BooleanField(default=False)
     
+    # blob_id as loaded from the database, used to keep ImageBlob.ref_count in step
+    _loaded_blob_id = None
+    
     class Meta:
         ordering = ['product', 'variant', 'sort_order']
         constraints = [
@@ -296,6 +336,22 @@ class ProductImage(TimestampedModel):
             return f"Image for variant {self.variant.sku}"
         return "Unlinked image"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_blob_id = instance.__dict__.get('blob_id', DEFERRED)
+        return instance
+    
+    def set_blob(self, blob):
+        """
+        Point this image at a stored blob instead of its own file.
+        
+        Args:
+            blob: The ImageBlob holding the image content
+        """
+        self.blob = blob
+        self.image = blob.file.name
+    
     def save(self, *args, **kwargs):
         # If this image is set as default, ensure no other image for this product/variant is default
         if self.is_default:
@@ -304,13 +360,13 @@ class ProductImage(TimestampedModel):
                     client_id=self.client_id,
                     product=self.product,
                     is_default=True
-                ).update(is_default=False)
+                ).update(is_default=False, updated_at=timezone.now())
             elif self.variant:
                 ProductImage.objects.filter(
                     client_id=self.client_id,
                     variant=self.variant,
                     is_default=True
-                ).update(is_default=False)
+                ).update(is_default=False, updated_at=timezone.now())
         
         # If this is the first image for the product/variant, make it default
         if not self.pk:
@@ -320,6 +376,11 @@ class ProductImage(TimestampedModel):
                 self.is_default = True
         
         super().save(*args, **kwargs)
+        
+        if self._loaded_blob_id is not DEFERRED and self.blob_id != self._loaded_blob_id:
+            adjust_ref_count(self.blob_id, 1)
+            adjust_ref_count(self._loaded_blob_id, -1)
+        self._loaded_blob_id = self.blob_id
 
 
 class ProductAttributeValue(TimestampedModel):
@@ -456,12 +517,21 @@ class ProductVariant(TimestampedModel):
         help_text='Optional override of the parent product status.'
     )
     
+    # sku as loaded from the database, used to tell when the SKU index must be rebuilt
+    _loaded_sku = DEFERRED
+    
     class Meta:
         unique_together = ('client_id', 'sku')
         ordering = ['product', 'sku']
         verbose_name = 'Product Variant'
         verbose_name_plural = 'Product Variants'
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_sku = instance.__dict__.get('sku', DEFERRED)
+        return instance
+    
     def get_options_display(self):
         """
         Helper method to display options concisely.
@@ -574,3 +644,175 @@ class KitComponent(TimestampedModel):
                 raise ValidationError({
                     'component_product': 'For swappable groups, the component product must be a PARENT type product.'
                 })
+
+
+
+class PublicationStatusChange(models.Model):
+    """
+    Audit record of one batch of products moved to a publication status.
+    
+    Written by products.bulk.bulk_set_publication_status, once per batch
+    rather than once per product.
+    """
+    client_id = models.IntegerField(db_index=True)
+    status = models.CharField(max_length=10, choices=PublicationStatus.choices)
+    previous = models.JSONField(default=dict, help_text='Number of products moved from each previous status')
+    product_count = models.PositiveIntegerField(default=0)
+    product_ids = models.JSONField(default=list, help_text='IDs of the products that changed')
+    selection = models.JSONField(
+        default=dict, blank=True, help_text='How the products were selected: {"ids": [...]} or {"filters": {...}}'
+    )
+    changed_by = models.ForeignKey(
+        'auth.User', on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    job = models.ForeignKey(
+        'core.BulkJob', on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['client_id', '-created_at'])]
+    
+    def __str__(self):
+        return f"{self.product_count} products -> {self.status} ({self.created_at:%Y-%m-%d %H:%M})"
+
+def touch_product(client_id, product_id=None, variant_id=None):
+    """
+    Advance the row version of a product after one of its nested rows changed.
+    
+    Product responses embed images, variants and attribute values, so
+    ``Product.updated_at`` must move whenever any of them is written for it to
+    be usable as a validator. Also bumps the products change counter.
+    
+    Args:
+        client_id: The client ID owning the product
+        product_id: ID of the product to touch
+        variant_id: ID of a variant to touch together with its parent product
+    """
+    now = timezone.now()
+    if variant_id is not None:
+        ProductVariant.objects.filter(pk=variant_id).update(updated_at=now)
+        Product.objects.filter(variants__id=variant_id).update(updated_at=now)
+    if product_id is not None:
+        Product.objects.filter(pk=product_id).update(updated_at=now)
+    bump_change_counter(PRODUCTS_CHANGE_SCOPE, client_id)
+
+
+def _record_sku_change(instance, signal, created=False):
+    """
+    Bump the SKU change counter when a product or variant is created, deleted or changes its SKU.
+    
+    Writes of other fields leave the SKU index (inventory.availability) valid.
+    Instances whose SKU was not loaded from the database count as changed.
+    """
+    if created or signal is post_delete or instance._loaded_sku is DEFERRED or instance.sku != instance._loaded_sku:
+        bump_change_counter(SKUS_CHANGE_SCOPE, instance.client_id)
+    instance._loaded_sku = instance.sku
+
+
+@receiver([post_save, post_delete], sender=Product)
+def product_changed(sender, instance, signal, created=False, **kwargs):
+    """
+    Record product writes in the products change counter, and SKU changes in the SKU change counter.
+    """
+    bump_change_counter(PRODUCTS_CHANGE_SCOPE, instance.client_id)
+    _record_sku_change(instance, signal, created)
+
+
+@receiver([post_save, post_delete], sender=ProductImage)
+def product_image_changed(sender, instance, **kwargs):
+    """
+    Touch the owning product or variant when an image changes.
+    """
+    touch_product(instance.client_id, product_id=instance.product_id, variant_id=instance.variant_id)
+
+
+@receiver(post_delete, sender=ProductImage)
+def product_image_blob_released(sender, instance, **kwargs):
+    """
+    Signal handler to drop a deleted image's reference to its blob.
+    
+    Unreferenced blobs are deleted later by assets.blobs.collect_unreferenced_blobs.
+    """
+    blob_id = instance._loaded_blob_id
+    adjust_ref_count(instance.blob_id if blob_id is DEFERRED else blob_id, -1)
+
+
+@receiver([post_save, post_delete], sender=ProductVariant)
+def product_variant_changed(sender, instance, signal, created=False, **kwargs):
+    """
+    Touch the parent product when a variant changes.
+    """
+    touch_product(instance.client_id, product_id=instance.product_id)
+    _record_sku_change(instance, signal, created)
+
+
+@receiver([post_save, post_delete], sender=ProductAttributeValue)
+def product_attribute_value_changed(sender, instance, **kwargs):
+    """
+    Touch the product when one of its attribute values changes.
+    """
+    touch_product(instance.client_id, product_id=instance.product_id)
+
+
+@receiver([post_save, post_delete], sender=ProductAttributeMultiValue)
+def product_attribute_multi_value_changed(sender, instance, **kwargs):
+    """
+    Touch the product when a multi-select attribute value changes.
+    """
+    product = Product.objects.filter(
+        attribute_values__id=instance.product_attribute_value_id
+    ).values_list('pk', 'client_id').first()
+    if product is not None:
+        touch_product(product[1], product_id=product[0])
+
+
+@receiver([post_save, post_delete], sender=KitComponent)
+def kit_component_changed(sender, instance, **kwargs):
+    """
+    Touch the kit product when one of its components changes.
+    """
+    touch_product(instance.client_id, product_id=instance.kit_product_id)
+
+
+@receiver(m2m_changed, sender=Product.attribute_groups.through)
+@receiver(m2m_changed, sender=Product.variant_defining_attributes.through)
+@receiver(m2m_changed, sender=ProductVariant.options.through)
+def product_relations_changed(sender, instance, action, reverse, model, pk_set, **kwargs):
+    """
+    Touch products whose many-to-many relations changed.
+    """
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    
+    if not reverse:
+        if isinstance(instance, ProductVariant):
+            touch_product(instance.client_id, variant_id=instance.pk)
+        else:
+            touch_product(instance.client_id, product_id=instance.pk)
+        return
+    
+    # Changed from the related side: pk_set holds the affected products or variants
+    # (it is None for clear(), in which case only the change counter moves)
+    for pk in pk_set or ():
+        if model is ProductVariant:
+            touch_product(instance.client_id, variant_id=pk)
+        else:
+            touch_product(instance.client_id, product_id=pk)
+    if not pk_set:
+        bump_change_counter(PRODUCTS_CHANGE_SCOPE, instance.client_id)
+
+
+@receiver([post_save, post_delete], sender=Division)
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Subcategory)
+@receiver([post_save, post_delete], sender=UnitOfMeasure)
+@receiver([post_save, post_delete], sender=ProductStatus)
+@receiver([post_save, post_delete], sender='attributes.Attribute')
+@receiver([post_save, post_delete], sender='attributes.AttributeOption')
+def catalogue_changed(sender, instance, **kwargs):
+    """
+    Record writes to rows whose details are embedded in product responses.
+    """
+    bump_change_counter(CATALOGUE_CHANGE_SCOPE, instance.client_id)
@@ -1,47 +1,51 @@
 import io
 import os
 import random
+import threading
+from functools import lru_cache
 from PIL import Image, ImageDraw, ImageFont
+from django.conf import settings
 from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 
-def generate_placeholder_image(width=800, height=600, text=None, bg_color=None, text_color=(255, 255, 255)):
+# Storage directory of the shared placeholders used when PRODUCT_PLACEHOLDER_SHARED is set
+SHARED_PLACEHOLDER_PREFIX = 'placeholders'
+
+# Shared placeholder names already known to exist in storage, per process
+_shared_placeholders = {}
+_shared_placeholders_lock = threading.Lock()
+
+
+@lru_cache(maxsize=32)
+def get_font(font_size):
     """
-    Generate a placeholder image with optional text.
+    Load the placeholder font for a size, once per process.
+    """
+    try:
+        return ImageFont.truetype("arial.ttf", font_size)
+    except IOError:
+        # Use default font if arial.ttf is not available
+        return ImageFont.load_default()
+
+
+@lru_cache(maxsize=getattr(settings, 'PRODUCT_PLACEHOLDER_CACHE_SIZE', 256))
+def render_placeholder(width, height, text, bg_color, text_color):
+    """
+    Render a placeholder image to JPEG bytes.
+    
+    Results are kept in a bounded per-process LRU cache keyed by all
+    arguments (PRODUCT_PLACEHOLDER_CACHE_SIZE entries), so repeated
+    placeholders are encoded once.
     
-    Args:
-        width: Width of the image in pixels
-        height: Height of the image in pixels
-        text: Optional text to display on the image
-        bg_color: Background color as RGB tuple, random if None
-        text_color: Text color as RGB tuple
-        
     Returns:
-        ContentFile: A Django ContentFile containing the image data
+        bytes: The encoded image
     """
-    # Generate a random background color if none provided
-    if bg_color is None:
-        bg_color = (
-            random.randint(50, 200),
-            random.randint(50, 200),
-            random.randint(50, 200)
-        )
-    
     # Create a new image with the given background color
     image = Image.new('RGB', (width, height), color=bg_color)
     draw = ImageDraw.Draw(image)
     
-    # Add text if provided, otherwise use dimensions
-    if text is None:
-        text = f"{width}x{height}"
-    
-    # Try to load a font, fall back to default if not available
-    try:
-        # Adjust font size based on image dimensions
-        font_size = min(width, height) // 10
-        font = ImageFont.truetype("arial.ttf", font_size)
-    except IOError:
-        # Use default font if arial.ttf is not available
-        font = ImageFont.load_default()
+    # Adjust font size based on image dimensions
+    font = get_font(max(1, min(width, height) // 10))
     
     # Calculate text position (centered)
     # PIL 9.0+ uses textbbox, older versions use getsize
@@ -68,10 +72,40 @@ def generate_placeholder_image(width=800, height=600, text=None, bg_color=None,
     # Convert to bytes
     img_byte_array = io.BytesIO()
     image.save(img_byte_array, format='JPEG')
-    img_byte_array.seek(0)
+    return img_byte_array.getvalue()
+
+
+def generate_placeholder_image(width=800, height=600, text=None, bg_color=None, text_color=(255, 255, 255)):
+    """
+    Generate a placeholder image with optional text.
+    
+    Rendering is cached by render_placeholder; each call returns a new
+    ContentFile over the cached bytes.
+    
+    Args:
+        width: Width of the image in pixels
+        height: Height of the image in pixels
+        text: Optional text to display on the image
+        bg_color: Background color as RGB tuple, random if None
+        text_color: Text color as RGB tuple
+        
+    Returns:
+        ContentFile: A Django ContentFile containing the image data
+    """
+    # Generate a random background color if none provided
+    if bg_color is None:
+        bg_color = (
+            random.randint(50, 200),
+            random.randint(50, 200),
+            random.randint(50, 200)
+        )
+    
+    # Add text if provided, otherwise use dimensions
+    if text is None:
+        text = f"{width}x{height}"
     
-    # Return as ContentFile
-    return ContentFile(img_byte_array.getvalue())
+    return ContentFile(render_placeholder(width, height, text, tuple(bg_color), tuple(text_color)))
+
 
 def get_placeholder_for_product(product_id, image_id, width=800, height=600):
     """
@@ -97,3 +131,30 @@ def get_placeholder_for_product(product_id, image_id, width=800, height=600):
     text = f"Product {product_id}\nImage {image_id}"
     
     return generate_placeholder_image(width, height, text, bg_color)
+
+
+def get_shared_placeholder(width=800, height=600):
+    """
+    Return the storage name of the shared placeholder for a size.
+    
+    The placeholder is neutral (it only shows its dimensions) and stored once
+    under ``placeholders/``, so any number of images can reference it
+    instead of each getting its own file.
+    
+    Args:
+        width: Width of the image
+        height: Height of the image
+        
+    Returns:
+        str: Storage name of the placeholder
+    """
+    name = f"{SHARED_PLACEHOLDER_PREFIX}/{width}x{height}.jpg"
+    if name in _shared_placeholders:
+        return _shared_placeholders[name]
+    with _shared_placeholders_lock:
+        if name not in _shared_placeholders:
+            stored = name
+            if not default_storage.exists(name):
+                stored = default_storage.save(name, generate_placeholder_image(width, height, bg_color=(180, 180, 180)))
+            _shared_placeholders[name] = stored
+    return _shared_placeholders[name]
@@ -0,0 +1,245 @@
+"""
+Set-based bulk price adjustments for products and their variants.
+
+An adjustment changes prices by a percentage or by an amount, rounds the
+result (to an increment, optionally with a price ending such as .99) and
+keeps it at or above a minimum. It applies to the products matched by a scope
+(categories, subcategories, tags, attribute options or IDs) and, optionally,
+to their variants. Prices are computed in SQL, so applying an adjustment to a
+chunk of products is one UPDATE per table, and a dry run previews the counts
+and the before/after price distribution with aggregate queries only.
+
+Example adjustment, as validated by PriceAdjustmentSerializer:
+
+    {
+        "mode": "percent", "value": "-15",
+        "fields": ["display_price"],
+        "rounding": {"increment": "1", "method": "up", "ending": "0.99"},
+        "scope": {"categories": [4], "tags": ["summer"]},
+        "include_variants": true
+    }
+"""
+import logging
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.conditional import bump_change_counter
+from products.models import PRODUCTS_CHANGE_SCOPE, Product, ProductAttributeValue, ProductVariant
+
+logger = logging.getLogger(__name__)
+
+# Rounding method -> SQL function applied to (price - ending) / increment
+ROUNDING_FUNCTIONS = {
+    'nearest': 'ROUND',
+    'up': 'CEIL',
+    'down': 'FLOOR',
+}
+
+# Price columns of each table an adjustment can change
+PRODUCT_PRICE_FIELDS = ('display_price', 'compare_at_price')
+VARIANT_PRICE_FIELDS = ('display_price',)
+
+# Quantiles reported by previews
+PREVIEW_QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+CENT = Decimal('0.01')
+
+
+def _table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def scoped_products(client_id, scope):
+    """
+    Select the client's products matched by an adjustment scope.
+
+    Criteria are combined with AND; the values of one criterion with OR.
+
+    Args:
+        client_id: The client ID
+        scope: {"all": bool, "ids": [...], "categories": [...], "subcategories": [...],
+                "tags": [...], "attribute_options": [...]}
+
+    Returns:
+        QuerySet: The matched products
+    """
+    queryset = Product.objects.filter(client_id=client_id)
+    if scope.get('ids'):
+        queryset = queryset.filter(pk__in=scope['ids'])
+    if scope.get('categories'):
+        queryset = queryset.filter(category__in=scope['categories'])
+    if scope.get('subcategories'):
+        queryset = queryset.filter(subcategory__in=scope['subcategories'])
+    if scope.get('tags'):
+        queryset = queryset.filter(tags__has_any_keys=scope['tags'])
+    if scope.get('attribute_options'):
+        options = scope['attribute_options']
+        queryset = queryset.filter(pk__in=ProductAttributeValue.objects.filter(
+            Q(value_option__in=options) | Q(multi_values__attribute_option__in=options),
+            client_id=client_id,
+        ).values('product_id'))
+    return queryset
+
+
+def price_sql(column, adjustment):
+    """
+    Build the SQL expression computing the adjusted value of a price column.
+
+    NULL prices stay NULL.
+
+    Returns:
+        tuple: (sql, params)
+    """
+    value = Decimal(adjustment['value'])
+    if adjustment['mode'] == 'percent':
+        adjusted, params = f"{column} * %s", [1 + value / 100]
+    else:
+        adjusted, params = f"{column} + %s", [value]
+
+    rounding = adjustment.get('rounding') or {}
+    increment = Decimal(rounding.get('increment') or CENT)
+    ending = Decimal(rounding.get('ending') or 0)
+    function = ROUNDING_FUNCTIONS[rounding.get('method') or 'nearest']
+    sql = (
+        f"CASE WHEN {column} IS NULL THEN NULL ELSE "
+        f"GREATEST(ROUND({function}(({adjusted} - %s) / %s) * %s + %s, 2), %s) END"
+    )
+    return sql, params + [ending, increment, increment, ending, Decimal(adjustment.get('min_price') or 0)]
+
+
+def _targets(adjustment):
+    """
+    Yield (model, link column, price fields) for each table the adjustment changes.
+    """
+    fields = adjustment['fields']
+    yield Product, 'id', [field for field in PRODUCT_PRICE_FIELDS if field in fields]
+    if adjustment.get('include_variants'):
+        variant_fields = [field for field in VARIANT_PRICE_FIELDS if field in fields]
+        if variant_fields:
+            yield ProductVariant, 'product_id', variant_fields
+
+
+def _decimal(value):
+    return str(Decimal(value).quantize(CENT)) if value is not None else None
+
+
+def preview_adjustment(client_id, adjustment):
+    """
+    Compute what an adjustment would change, without writing.
+
+    Returns:
+        dict: {'products': n, 'variants': n, 'fields': {'products.display_price':
+        {'rows', 'changed', 'before': {...}, 'after': {...}}, ...}} where before
+        and after hold min, max, average, total and quantiles (p10, p25, p50,
+        p75, p90) of the prices; counts and prices cover non-null prices only
+    """
+    subquery, scope_params = scoped_products(client_id, adjustment['scope']).order_by().values('pk').query.sql_with_params()
+    quantiles = ', '.join(str(quantile) for quantile in PREVIEW_QUANTILES)
+    summary = {'products': 0, 'variants': 0, 'fields': {}}
+
+    with connection.cursor() as cursor:
+        for model, link, fields in _targets(adjustment):
+            label = 'products' if model is Product else 'variants'
+            cursor.execute(
+                f"SELECT COUNT(*) FROM {_table(model)} WHERE client_id = %s AND {link} IN ({subquery})",
+                [client_id, *scope_params]
+            )
+            summary[label] = cursor.fetchone()[0]
+
+            for field in fields:
+                column = connection.ops.quote_name(field)
+                expression, expression_params = price_sql(column, adjustment)
+                cursor.execute(
+                    f"""
+                    WITH target AS (
+                        SELECT {column} AS before, {expression} AS after FROM {_table(model)}
+                        WHERE client_id = %s AND {link} IN ({subquery}) AND {column} IS NOT NULL
+                    )
+                    SELECT COUNT(*), COUNT(*) FILTER (WHERE after <> before),
+                        MIN(before), MAX(before), AVG(before), SUM(before),
+                        PERCENTILE_CONT(ARRAY[{quantiles}]) WITHIN GROUP (ORDER BY before),
+                        MIN(after), MAX(after), AVG(after), SUM(after),
+                        PERCENTILE_CONT(ARRAY[{quantiles}]) WITHIN GROUP (ORDER BY after)
+                    FROM target
+                    """,
+                    [*expression_params, client_id, *scope_params]
+                )
+                row = cursor.fetchone()
+                summary['fields'][f'{label}.{field}'] = {
+                    'rows': row[0],
+                    'changed': row[1],
+                    'before': _distribution(row[2:7]),
+                    'after': _distribution(row[7:12]),
+                }
+    return summary
+
+
+def _distribution(values):
+    minimum, maximum, average, total, quantiles = values
+    return {
+        'min': _decimal(minimum),
+        'max': _decimal(maximum),
+        'average': _decimal(average),
+        'total': _decimal(total),
+        'quantiles': {
+            f'p{round(quantile * 100)}': _decimal(value)
+            for quantile, value in zip(PREVIEW_QUANTILES, quantiles or [None] * len(PREVIEW_QUANTILES))
+        },
+    }
+
+
+def apply_adjustment(client_id, product_ids, adjustment):
+    """
+    Apply an adjustment to a chunk of products, and their variants if included.
+
+    Runs one UPDATE per table; only rows whose price changes are written,
+    and their updated_at is advanced. Product rows are touched when only
+    their variants change, so product ETags stay current.
+
+    Args:
+        client_id: The client ID
+        product_ids: IDs of the products to adjust, already matched by the scope
+
+    Returns:
+        dict: {'products': rows updated, 'variants': rows updated}
+    """
+    counts = {'products': 0, 'variants': 0}
+    now = timezone.now()
+    with transaction.atomic(), connection.cursor() as cursor:
+        touched = set()
+        for model, link, fields in _targets(adjustment):
+            if not fields:
+                continue
+            assignments, changed, params = [], [], []
+            for field in fields:
+                column = connection.ops.quote_name(field)
+                expression, expression_params = price_sql(column, adjustment)
+                assignments.append(f"{column} = {expression}")
+                changed.append(f"{column} IS DISTINCT FROM {expression}")
+                params += expression_params
+            cursor.execute(
+                f"""
+                UPDATE {_table(model)} SET {', '.join(assignments)}, updated_at = %s
+                WHERE client_id = %s AND {link} = ANY(%s) AND ({' OR '.join(changed)})
+                RETURNING {link}
+                """,
+                [*params, now, client_id, list(product_ids), *params]
+            )
+            rows = cursor.fetchall()
+            counts['products' if model is Product else 'variants'] = len(rows)
+            touched.update(row[0] for row in rows)
+
+        if counts['variants']:
+            # Product responses embed their variants
+            Product.objects.filter(pk__in=touched).update(updated_at=now)
+
+    if counts['products'] or counts['variants']:
+        bump_change_counter(PRODUCTS_CHANGE_SCOPE, client_id)
+    logger.info(
+        "Adjusted prices of %s products and %s variants for client %s",
+        counts['products'], counts['variants'], client_id
+    )
+    return counts
@@ -1,3 +1,5 @@
+from decimal import Decimal
+
 from django.db import transaction
 from django.core.exceptions import ValidationError
 from rest_framework import serializers
@@ -17,7 +19,11 @@ from products.catalogue.models import (
 )
 from attributes.models import Attribute, AttributeOption, AttributeGroup
 from products.utils import link_temporary_images, generate_unique_sku
-from shared.models import Currency
+from core.reference_data import ReferenceDataField
+from core.utils import get_request_client_id
+from products.derivatives import build_srcset
+from products.price_adjustments import PRODUCT_PRICE_FIELDS, ROUNDING_FUNCTIONS
+from inventory.models import StockBalance
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
@@ -65,6 +71,9 @@ class ProductImageSerializer(serializers.ModelSerializer):
     company_id = serializers.IntegerField(read_only=True)
     product = serializers.PrimaryKeyRelatedField(read_only=True)
     
+    # Resized renditions as srcset strings per format, e.g. {'webp': 'url 150w, url 480w'}
+    srcset = serializers.SerializerMethodField()
+    
     class Meta:
         model = ProductImage
         fields = [
@@ -73,6 +82,7 @@ class ProductImageSerializer(serializers.ModelSerializer):
             'company_id',
             'product',
             'image',
+            'srcset',
             'alt_text',
             'sort_order',
             'is_default',
@@ -81,6 +91,20 @@ class ProductImageSerializer(serializers.ModelSerializer):
         ]
 
 
+    def get_srcset(self, obj):
+        """
+        Build srcset values from the image's generated derivatives.
+        """
+        storage = obj.image.storage
+        request = self.context.get('request')
+        
+        def url_for(name):
+            url = storage.url(name)
+            return request.build_absolute_uri(url) if request is not None else url
+        
+        return build_srcset(obj.derivatives, url_for)
+
+
 class ProductAttributeValueSerializer(serializers.ModelSerializer):
     """
     Serializer for the ProductAttributeValue model.
@@ -191,18 +215,18 @@ class ProductSerializer(serializers.ModelSerializer):
         """
         Validate the default_tax_rate_profile field.
         """
-        logger.info(f"Validating default_tax_rate_profile: {value}")
+        logger.debug("Validating default_tax_rate_profile: %s", value)
         return value
     
     def to_internal_value(self, data):
         # Log the incoming data for debugging
-        logger.info(f"ProductSerializer.to_internal_value received: {data}")
+        logger.debug("ProductSerializer.to_internal_value received: %s", data)
         if 'default_tax_rate_profile' in data:
-            logger.info(f"default_tax_rate_profile value: {data['default_tax_rate_profile']}")
+            logger.debug("default_tax_rate_profile value: %s", data['default_tax_rate_profile'])
         
         # Call the parent method
         result = super().to_internal_value(data)
-        logger.info(f"ProductSerializer.to_internal_value result: {result}")
+        logger.debug("ProductSerializer.to_internal_value result: %s", result)
         return result
     """
     Serializer for the Product model.
@@ -230,10 +254,14 @@ class ProductSerializer(serializers.ModelSerializer):
     created_by_details = SimpleUserSerializer(source='created_by', read_only=True)
     updated_by_details = SimpleUserSerializer(source='updated_by', read_only=True)
     
+    # Reference data is resolved from the cached snapshot rather than queried per request
+    uom = ReferenceDataField('units_of_measure', allow_null=True)
+    productstatus = ReferenceDataField('product_statuses', allow_null=True)
+    
     # Handle currency_code as string input
-    currency_code = serializers.SlugRelatedField(
-        queryset=Currency.objects.all(),
-        slug_field='code',
+    currency_code = ReferenceDataField(
+        'currencies',
+        lookup_field='code',
         required=False,
         allow_null=True
     )
@@ -245,6 +273,11 @@ class ProductSerializer(serializers.ModelSerializer):
         write_only=True
     )
     
+    # Stock of the product and its variants, materialized by the inventory ledger
+    total_quantity_on_hand = serializers.IntegerField(
+        source='stock_rollup.quantity_on_hand', read_only=True, default=None
+    )
+    
     # Publication status field
     publication_status = serializers.ChoiceField(
         choices=PublicationStatus.choices,
@@ -313,6 +346,7 @@ class ProductSerializer(serializers.ModelSerializer):
             'inventory_tracking_enabled',
             'backorders_allowed',
             'quantity_on_hand',
+            'total_quantity_on_hand',
             'is_serialized',
             'is_lotted',
             'pre_order_available',
@@ -593,7 +627,7 @@ class ProductSerializer(serializers.ModelSerializer):
         # Check if attribute_values_input is present
         attribute_values_input = data.get('attribute_values_input', [])
         
-        logger.info(f"Validating product data. Attribute values input: {attribute_values_input}")
+        logger.debug("Validating product data. Attribute values input: %s", attribute_values_input)
         
         # Validate each attribute value
         validated_attribute_values = []
@@ -601,14 +635,14 @@ class ProductSerializer(serializers.ModelSerializer):
             try:
                 # Ensure required keys are present
                 if 'attribute' not in attr_value_data or 'value' not in attr_value_data:
-                    logger.warning(f"Incomplete attribute value data: {attr_value_data}")
+                    logger.warning("Incomplete attribute value data: %s", attr_value_data)
                     continue
                 
                 # Fetch the attribute
                 try:
                     attribute = Attribute.objects.get(id=attr_value_data['attribute'])
                 except Attribute.DoesNotExist:
-                    logger.error(f"Attribute not found: {attr_value_data['attribute']}")
+                    logger.error("Attribute not found: %s", attr_value_data['attribute'])
                     continue
                 
                 # Validate value based on attribute type
@@ -620,7 +654,7 @@ class ProductSerializer(serializers.ModelSerializer):
                     # Ensure value can be converted to string
                     str_value = str(value)
                     if not str_value or len(str_value) > 255:  # Example length constraint
-                        logger.warning(f"Invalid text value: {value}")
+                        logger.warning("Invalid text value: %s", value)
                         continue
                 
                 elif data_type == 'NUMBER':
@@ -628,7 +662,7 @@ class ProductSerializer(serializers.ModelSerializer):
                     try:
                         float_value = float(value)
                     except (TypeError, ValueError):
-                        logger.warning(f"Invalid number value: {value}")
+                        logger.warning("Invalid number value: %s", value)
                         continue
                 
                 elif data_type == 'BOOLEAN':
@@ -642,10 +676,10 @@ class ProductSerializer(serializers.ModelSerializer):
                         if isinstance(value, str):
                             datetime.fromisoformat(value.replace('Z', '+00:00'))
                         elif not isinstance(value, datetime):
-                            logger.warning(f"Invalid date value: {value}")
+                            logger.warning("Invalid date value: %s", value)
                             continue
                     except ValueError:
-                        logger.warning(f"Could not parse date: {value}")
+                        logger.warning("Could not parse date: %s", value)
                         continue
                 
                 elif data_type in ['SELECT', 'MULTI_SELECT']:
@@ -653,20 +687,20 @@ class ProductSerializer(serializers.ModelSerializer):
                     try:
                         AttributeOption.objects.get(id=value)
                     except AttributeOption.DoesNotExist:
-                        logger.error(f"Invalid option for {data_type}: {value}")
+                        logger.error("Invalid option for %s: %s", data_type, value)
                         continue
                 
                 # If we've made it this far, the attribute value is valid
                 validated_attribute_values.append(attr_value_data)
             
             except Exception as e:
-                logger.error(f"Unexpected error validating attribute value: {str(e)}")
-                logger.error(f"Problematic data: {attr_value_data}")
+                logger.error("Unexpected error validating attribute value: %s", e)
+                logger.error("Problematic data: %s", attr_value_data)
         
         # Update the data with validated attribute values
         data['attribute_values_input'] = validated_attribute_values
         
-        logger.info(f"Validated attribute values: {validated_attribute_values}")
+        logger.debug("Validated attribute values: %s", validated_attribute_values)
         
         return data
     
@@ -683,44 +717,39 @@ class ProductSerializer(serializers.ModelSerializer):
             variant_defining_attributes_data = validated_data.pop('variant_defining_attributes', None)
             attribute_values_input = validated_data.pop('attribute_values_input', [])
             
-            # Get tenant from context or use default client_id
-            try:
-                tenant = self.context['request'].tenant
-            except (KeyError, AttributeError):
-                # If tenant is not available in request, use client_id from instance
-                logger.info("No tenant found in request, using client_id from instance")
-                tenant = instance.client_id
+            # The client of the request (tenants are scoped by client_id, not their primary key)
+            tenant = get_request_client_id(self.context.get('request'), default=validated_data.get('client_id', 1))
+            validated_data.setdefault('client_id', tenant)
             
             # Handle publication status
             publication_status = validated_data.pop('publication_status', 'DRAFT')
             
             # Create the product instance
-            logger.info(f"Creating product with data: {validated_data}")
+            logger.debug("Creating product with data: %s", validated_data)
             product = Product.objects.create(
-                tenant=tenant,
                 publication_status=publication_status,
                 **validated_data
             )
-            logger.info(f"Created product with ID: {product.id}")
+            logger.info("Created product with ID: %s", product.id)
             
             # Set M2M fields if provided
             if attribute_groups_data is not None:
-                logger.info(f"Setting attribute groups: {attribute_groups_data}")
+                logger.debug("Setting attribute groups: %s", attribute_groups_data)
                 product.attribute_groups.set(attribute_groups_data)
             
             if variant_defining_attributes_data is not None:
-                logger.info(f"Setting variant defining attributes: {variant_defining_attributes_data}")
+                logger.debug("Setting variant defining attributes: %s", variant_defining_attributes_data)
                 product.variant_defining_attributes.set(variant_defining_attributes_data)
             
             # Link temporary images
             if temp_images:
                 try:
-                    logger.info(f"Linking {len(temp_images)} temporary images")
+                    logger.debug("Linking %s temporary images", len(temp_images))
                     # Handle different tenant types (object or ID)
                     tenant_param = tenant
                     if isinstance(tenant, int):
                         # If tenant is just an ID (client_id), pass it directly
-                        logger.info(f"Using client_id {tenant} as tenant parameter")
+                        logger.debug("Using client_id %s as tenant parameter", tenant)
                         
                     link_temporary_images(
                         owner_instance=product,
@@ -729,19 +758,19 @@ class ProductSerializer(serializers.ModelSerializer):
                         tenant=tenant_param
                     )
                 except Exception as e:
-                    logger.error(f"Error linking temporary images: {str(e)}")
+                    logger.error("Error linking temporary images: %s", e)
                     raise serializers.ValidationError(f"Error processing images: {str(e)}")
             
             # Process attribute values
             if attribute_values_input:
-                logger.info(f"Processing {len(attribute_values_input)} attribute values")
+                logger.debug("Processing %s attribute values", len(attribute_values_input))
                 for attr_value in attribute_values_input:
                     try:
                         attribute_id = attr_value.get('attribute')
                         # Handle different tenant types (object or client_id)
                         if isinstance(tenant, int):
                             # If tenant is just an ID (client_id), use client_id filter
-                            logger.info(f"Using client_id {tenant} for attribute lookup")
+                            logger.debug("Using client_id %s for attribute lookup", tenant)
                             attribute = Attribute.objects.get(
                                 id=attribute_id,
                                 client_id=tenant,  # Use client_id directly, not tenant__client_id
@@ -801,16 +830,16 @@ class ProductSerializer(serializers.ModelSerializer):
                                 **value_data  # Use the type-specific field
                             )
                     except Attribute.DoesNotExist:
-                        logger.error(f"Attribute {attribute_id} not found")
+                        logger.error("Attribute %s not found", attribute_id)
                         raise serializers.ValidationError(f"Attribute {attribute_id} not found")
                     except Exception as e:
-                        logger.error(f"Error processing attribute value: {str(e)}")
+                        logger.error("Error processing attribute value: %s", e)
                         raise serializers.ValidationError(f"Error processing attribute value: {str(e)}")
             
             return product
             
         except Exception as e:
-            logger.error(f"Error in create method: {str(e)}")
+            logger.error("Error in create method: %s", e)
             raise
 
     @transaction.atomic
@@ -829,36 +858,37 @@ class ProductSerializer(serializers.ModelSerializer):
             variant_defining_attributes_data = validated_data.pop('variant_defining_attributes', None)
             attribute_values_input = validated_data.pop('attribute_values_input', None)
             
-            # Get tenant from context or use default client_id
-            try:
-                tenant = self.context['request'].tenant
-            except (KeyError, AttributeError):
-                # If tenant is not available in request, use client_id from instance
-                logger.info("No tenant found in request, using client_id from instance")
-                tenant = instance.client_id
+            # Stock kept in the inventory ledger only changes through stock movements
+            if 'quantity_on_hand' in validated_data and StockBalance.objects.filter(
+                product=instance, variant__isnull=True
+            ).exists():
+                validated_data.pop('quantity_on_hand', None)
+            
+            # The client of the request (tenants are scoped by client_id, not their primary key)
+            tenant = get_request_client_id(self.context.get('request'), default=instance.client_id)
             
             # Update the product instance
-            logger.info(f"Updating product {instance.id} with data: {validated_data}")
+            logger.debug("Updating product %s with data: %s", instance.id, validated_data)
             product = super().update(instance, validated_data)
             
             # Update M2M fields if provided
             if attribute_groups_data is not None:
-                logger.info(f"Updating attribute groups: {attribute_groups_data}")
+                logger.debug("Updating attribute groups: %s", attribute_groups_data)
                 product.attribute_groups.set(attribute_groups_data)
             
             if variant_defining_attributes_data is not None:
-                logger.info(f"Updating variant defining attributes: {variant_defining_attributes_data}")
+                logger.debug("Updating variant defining attributes: %s", variant_defining_attributes_data)
                 product.variant_defining_attributes.set(variant_defining_attributes_data)
             
             # Link temporary images if provided
             if temp_images is not None:
                 try:
-                    logger.info(f"Linking {len(temp_images)} temporary images")
+                    logger.debug("Linking %s temporary images", len(temp_images))
                     # Handle different tenant types (object or ID)
                     tenant_param = tenant
                     if isinstance(tenant, int):
                         # If tenant is just an ID (client_id), pass it directly
-                        logger.info(f"Using client_id {tenant} as tenant parameter")
+                        logger.debug("Using client_id %s as tenant parameter", tenant)
                         
                     link_temporary_images(
                         owner_instance=product,
@@ -867,12 +897,12 @@ class ProductSerializer(serializers.ModelSerializer):
                         tenant=tenant_param
                     )
                 except Exception as e:
-                    logger.error(f"Error linking temporary images: {str(e)}")
+                    logger.error("Error linking temporary images: %s", e)
                     raise serializers.ValidationError(f"Error processing images: {str(e)}")
             
             # Process attribute values if provided
             if attribute_values_input is not None:
-                logger.info(f"Processing {len(attribute_values_input)} attribute values")
+                logger.debug("Processing %s attribute values", len(attribute_values_input))
                 
                 # Clear existing values if we're updating
                 # First get all ProductAttributeValue objects for this product
@@ -891,7 +921,7 @@ class ProductSerializer(serializers.ModelSerializer):
                         # Handle different tenant types (object or client_id)
                         if isinstance(tenant, int):
                             # If tenant is just an ID (client_id), use client_id filter
-                            logger.info(f"Using client_id {tenant} for attribute lookup")
+                            logger.debug("Using client_id %s for attribute lookup", tenant)
                             attribute = Attribute.objects.get(
                                 id=attribute_id,
                                 client_id=tenant,  # Use client_id directly, not tenant__client_id
@@ -951,16 +981,16 @@ class ProductSerializer(serializers.ModelSerializer):
                                 **value_data  # Use the type-specific field
                             )
                     except Attribute.DoesNotExist:
-                        logger.error(f"Attribute {attribute_id} not found")
+                        logger.error("Attribute %s not found", attribute_id)
                         raise serializers.ValidationError(f"Attribute {attribute_id} not found")
                     except Exception as e:
-                        logger.error(f"Error processing attribute value: {str(e)}")
+                        logger.error("Error processing attribute value: %s", e)
                         raise serializers.ValidationError(f"Error processing attribute value: {str(e)}")
             
             return product
             
         except Exception as e:
-            logger.error(f"Error in update method: {str(e)}")
+            logger.error("Error in update method: %s", e)
             raise
 
 class ProductVariantSerializer(serializers.ModelSerializer):
@@ -976,6 +1006,7 @@ class ProductVariantSerializer(serializers.ModelSerializer):
     product = serializers.PrimaryKeyRelatedField(read_only=True)
     
     # Related fields
+    status_override = ReferenceDataField('product_statuses', required=False, allow_null=True)
     options = serializers.PrimaryKeyRelatedField(
         many=True,
         queryset=AttributeOption.objects.all(),
@@ -1034,9 +1065,10 @@ class ProductVariantSerializer(serializers.ModelSerializer):
         # Filter related fields by client if request is available
         request = self.context.get('request')
         if request and hasattr(request, 'tenant'):
-            tenant = request.tenant
             # Filter options by tenant
-            self.fields['options'].queryset = AttributeOption.objects.filter(attribute__tenant=tenant)
+            self.fields['options'].queryset = AttributeOption.objects.filter(
+                attribute__client_id=get_request_client_id(request)
+            )
     
     def get_options_display(self, obj):
         """
@@ -1077,11 +1109,11 @@ class ProductVariantSerializer(serializers.ModelSerializer):
         client_id = None
         
         if request and hasattr(request, 'tenant'):
-            client_id = request.tenant
+            client_id = get_request_client_id(request)
         else:
             # Default to client_id=1 for development
             client_id = 1
-            logger.info("No tenant found in request, using default client_id=1 for variant options validation")
+            logger.debug("No tenant found in request, using default client_id=1 for variant options validation")
         
         # Check that all options belong to variant-enabled attributes
         invalid_options = [
@@ -1136,11 +1168,11 @@ class ProductVariantSerializer(serializers.ModelSerializer):
         client_id = None
         
         if request and hasattr(request, 'tenant'):
-            client_id = request.tenant
+            client_id = get_request_client_id(request)
         else:
             # Default to client_id=1 for development
             client_id = 1
-            logger.info("No tenant found in request, using default client_id=1 for variant validation")
+            logger.debug("No tenant found in request, using default client_id=1 for variant validation")
         
         # Get the parent product
         if self.instance:
@@ -1222,7 +1254,7 @@ class ProductVariantSerializer(serializers.ModelSerializer):
         This method handles the creation of a ProductVariant and processes any
         temporary images, linking them to the newly created variant.
         """
-        logger.critical("Entering VariantSerializer create. Validated data keys: %s", validated_data.keys())
+        logger.debug("Entering VariantSerializer create. Validated data keys: %s", validated_data.keys())
         
         try:
             # Extract options from validated data
@@ -1234,13 +1266,13 @@ class ProductVariantSerializer(serializers.ModelSerializer):
             temp_images = None
             if 'temp_images' in validated_data:
                 temp_images = validated_data.pop('temp_images')
-                logger.critical("Popped temp_images data: %s", temp_images)
+                logger.debug("Popped temp_images data: %s", temp_images)
             else:
-                logger.critical("No temp_images found in validated_data")
+                logger.debug("No temp_images found in validated_data")
                 
             # Get tenant and product from context
             request = self.context.get('request')
-            client_id = getattr(request, 'client_id', 1) if request else 1
+            client_id = get_request_client_id(request)
             product_id = self.context['view'].kwargs['product_pk']
             
             # Verify product exists and belongs to tenant
@@ -1256,20 +1288,20 @@ class ProductVariantSerializer(serializers.ModelSerializer):
                 )
             
             # Create the variant
-            logger.critical(f"Creating variant for product {product_id} with data: {validated_data}")
+            logger.debug("Creating variant for product %s with data: %s", product_id, validated_data)
             variant = ProductVariant.objects.create(
                 product_id=product_id,
                 **validated_data
             )
-            logger.critical("Created Variant instance with ID: %s", variant.id)
+            logger.debug("Created Variant instance with ID: %s", variant.id)
             
             # Set options
             variant.options.set(options_data)
-            logger.critical("Set options for variant ID: %s with options: %s", variant.id, [o.id for o in options_data])
+            logger.debug("Set options for variant ID: %s with options: %s", variant.id, [o.id for o in options_data])
             
             # Process temporary images
             if temp_images:
-                logger.critical("Calling link_temporary_images for variant ID %s with owner_type='variant'", variant.id)
+                logger.debug("Calling link_temporary_images for variant ID %s with owner_type='variant'", variant.id)
                 try:
                     link_temporary_images(
                         owner_instance=variant,
@@ -1277,19 +1309,17 @@ class ProductVariantSerializer(serializers.ModelSerializer):
                         temp_image_data=temp_images,
                         tenant=client_id
                     )
-                    logger.critical("Finished calling link_temporary_images for variant ID %s", variant.id)
+                    logger.debug("Finished calling link_temporary_images for variant ID %s", variant.id)
                 except Exception as e:
-                    logger.critical("ERROR calling link_temporary_images for variant ID %s: %s", variant.id, e, exc_info=True)
-                    logger.error(f"Error linking temporary images: {str(e)}")
+                    logger.error("Error linking temporary images for variant %s: %s", variant.id, e, exc_info=True)
                     raise serializers.ValidationError(f"Error processing images: {str(e)}")
             else:
-                logger.critical("No temp_images data found for variant ID %s.", variant.id)
+                logger.debug("No temp_images data found for variant ID %s.", variant.id)
             
             return variant
             
         except Exception as e:
-            logger.critical(f"Error in create method: {str(e)}", exc_info=True)
-            logger.error(f"Error in create method: {str(e)}")
+            logger.error("Error in create method: %s", e, exc_info=True)
             raise
 
     @transaction.atomic
@@ -1310,19 +1340,23 @@ class ProductVariantSerializer(serializers.ModelSerializer):
             if 'options' in validated_data:
                 options_data = validated_data.pop('options')
             
+            # Stock kept in the inventory ledger only changes through stock movements
+            if 'quantity_on_hand' in validated_data and StockBalance.objects.filter(variant=instance).exists():
+                validated_data.pop('quantity_on_hand', None)
+            
             # Update the variant
-            logger.info(f"Updating variant {instance.id} with data: {validated_data}")
+            logger.debug("Updating variant %s with data: %s", instance.id, validated_data)
             variant = super().update(instance, validated_data)
             
             # Update options if provided
             if options_data is not None:
                 variant.options.set(options_data)
-                logger.info(f"Updated options for variant {variant.id}: {[o.id for o in options_data]}")
+                logger.debug("Updated options for variant %s: %s", variant.id, [o.id for o in options_data])
             
             # Process temporary images if provided
             if temp_images is not None:
                 try:
-                    logger.info(f"Linking {len(temp_images)} temporary images to variant {variant.id}")
+                    logger.debug("Linking %s temporary images to variant %s", len(temp_images), variant.id)
                     link_temporary_images(
                         owner_instance=variant,
                         owner_type='variant',
@@ -1330,13 +1364,13 @@ class ProductVariantSerializer(serializers.ModelSerializer):
                         tenant=instance.client_id
                     )
                 except Exception as e:
-                    logger.error(f"Error linking temporary images: {str(e)}")
+                    logger.error("Error linking temporary images: %s", e)
                     raise serializers.ValidationError(f"Error processing images: {str(e)}")
             
             return variant
             
         except Exception as e:
-            logger.error(f"Error in update method: {str(e)}")
+            logger.error("Error in update method: %s", e)
             raise
 
     def validate_status_override(self, status_override):
@@ -1475,3 +1509,192 @@ class KitComponentSerializer(serializers.ModelSerializer):
             )
         
         return data
+
+
+class BulkDeleteSerializer(serializers.Serializer):
+    """
+    Serializer validating the payload of bulk delete endpoints.
+    
+    Expects {"ids": [1, 2, 3]}; IDs that do not exist or belong to another
+    client are ignored by the delete itself.
+    """
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=50000
+    )
+
+
+class ProductImportRowSerializer(serializers.Serializer):
+    """
+    Serializer validating one row of a product import (products.jobs).
+    
+    Rows are matched to the client's products by SKU. Catalogue references
+    are plain IDs here; the import checks them against the client's rows once
+    per chunk instead of once per row.
+    """
+    sku = serializers.CharField(max_length=100)
+    name = serializers.CharField(max_length=255, required=False)
+    description = serializers.CharField(required=False, allow_blank=True)
+    short_description = serializers.CharField(required=False, allow_blank=True)
+    product_type = serializers.ChoiceField(choices=PRODUCT_TYPE_CHOICES.CHOICES, required=False)
+    publication_status = serializers.ChoiceField(choices=PublicationStatus.choices, required=False)
+    category = serializers.IntegerField(min_value=1, required=False)
+    subcategory = serializers.IntegerField(min_value=1, required=False, allow_null=True)
+    division = serializers.IntegerField(min_value=1, required=False, allow_null=True)
+    uom = serializers.IntegerField(min_value=1, required=False, allow_null=True)
+    productstatus = serializers.IntegerField(min_value=1, required=False, allow_null=True)
+    display_price = serializers.DecimalField(
+        max_digits=12, decimal_places=2, min_value=0, required=False, allow_null=True
+    )
+    compare_at_price = serializers.DecimalField(
+        max_digits=12, decimal_places=2, min_value=0, required=False, allow_null=True
+    )
+    is_active = serializers.BooleanField(required=False)
+    quantity_on_hand = serializers.IntegerField(required=False)
+    tags = serializers.ListField(child=serializers.CharField(max_length=100), required=False, allow_null=True)
+
+
+class ProductImportSerializer(serializers.Serializer):
+    """
+    Serializer validating the payload of a product import.
+    
+    Expects {"rows": [{"sku": "...", "name": "...", "category": 1, ...}], "update_existing": true};
+    rows are validated one by one while the import runs, see ProductImportRowSerializer.
+    """
+    rows = serializers.ListField(child=serializers.DictField(), allow_empty=False, max_length=50000)
+    update_existing = serializers.BooleanField(default=True)
+
+
+class ProductExportSerializer(serializers.Serializer):
+    """
+    Serializer validating the payload of a product export.
+    
+    Expects {"format": "csv", "filters": {"category": 1, ...}}; filters are
+    those of the product list (products.filters.ProductFilter).
+    """
+    format = serializers.ChoiceField(choices=['csv', 'jsonl'], default='csv')
+    filters = serializers.DictField(required=False, default=dict)
+
+
+class PriceUpdateRowSerializer(serializers.Serializer):
+    """
+    Serializer validating one row of a bulk price update.
+    
+    A product is given by "id" or "sku"; prices that are left out are unchanged.
+    """
+    id = serializers.IntegerField(min_value=1, required=False)
+    sku = serializers.CharField(max_length=100, required=False)
+    display_price = serializers.DecimalField(
+        max_digits=12, decimal_places=2, min_value=0, required=False, allow_null=True
+    )
+    compare_at_price = serializers.DecimalField(
+        max_digits=12, decimal_places=2, min_value=0, required=False, allow_null=True
+    )
+    
+    def validate(self, data):
+        if 'id' not in data and 'sku' not in data:
+            raise serializers.ValidationError("Either id or sku is required.")
+        if 'display_price' not in data and 'compare_at_price' not in data:
+            raise serializers.ValidationError("At least one of display_price and compare_at_price is required.")
+        return data
+
+
+class BulkPriceUpdateSerializer(serializers.Serializer):
+    """
+    Serializer validating the payload of bulk price updates.
+    
+    Expects {"prices": [{"sku": "ABC-1", "display_price": "9.99"}, {"id": 7, "compare_at_price": null}]}.
+    """
+    prices = PriceUpdateRowSerializer(many=True, allow_empty=False, max_length=50000)
+
+
+class BulkPublicationStatusSerializer(serializers.Serializer):
+    """
+    Serializer validating the payload of bulk publication status changes.
+    
+    Expects {"status": "ACTIVE", "ids": [1, 2]} or {"status": "ARCHIVED", "filters": {...}},
+    optionally with "from_status": ["DRAFT"] to only move products currently
+    in those statuses. Filters are those of the product list.
+    """
+    status = serializers.ChoiceField(choices=PublicationStatus.choices)
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, allow_empty=False, max_length=50000
+    )
+    filters = serializers.DictField(required=False)
+    from_status = serializers.ListField(
+        child=serializers.ChoiceField(choices=PublicationStatus.choices), required=False, allow_empty=False
+    )
+    
+    def validate(self, data):
+        if ('ids' in data) == ('filters' in data):
+            raise serializers.ValidationError("Provide either ids or filters.")
+        return data
+
+
+class PriceAdjustmentScopeSerializer(serializers.Serializer):
+    """
+    Serializer validating which products a price adjustment applies to.
+    
+    Criteria combine with AND, values within one criterion with OR; "all"
+    must be set explicitly to adjust every product of the client.
+    """
+    all = serializers.BooleanField(default=False)
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, allow_empty=False)
+    categories = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, allow_empty=False)
+    subcategories = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, allow_empty=False
+    )
+    tags = serializers.ListField(child=serializers.CharField(max_length=100), required=False, allow_empty=False)
+    attribute_options = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, allow_empty=False
+    )
+    
+    def validate(self, data):
+        if not data['all'] and len(data) == 1:
+            raise serializers.ValidationError("Select products with at least one criterion, or set all to true.")
+        return data
+
+
+class PriceRoundingSerializer(serializers.Serializer):
+    """
+    Serializer validating the rounding of adjusted prices.
+    
+    Prices are rounded to a multiple of increment, optionally plus an ending:
+    {"increment": "1", "method": "up", "ending": "0.99"} turns 12.30 into 12.99.
+    """
+    increment = serializers.DecimalField(
+        max_digits=10, decimal_places=2, min_value=Decimal('0.01'), default=Decimal('0.01')
+    )
+    method = serializers.ChoiceField(choices=list(ROUNDING_FUNCTIONS), default='nearest')
+    ending = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False, allow_null=True)
+    
+    def validate(self, data):
+        if data.get('ending') is not None and data['ending'] >= data['increment']:
+            raise serializers.ValidationError({'ending': "Must be smaller than the increment."})
+        return data
+
+
+class PriceAdjustmentSerializer(serializers.Serializer):
+    """
+    Serializer validating bulk price adjustments (products.price_adjustments).
+    
+    Expects {"mode": "percent", "value": "-15", "scope": {"categories": [4]}}
+    with optional "fields", "rounding", "min_price", "include_variants" and
+    "dry_run". Amounts and percentages may be negative.
+    """
+    mode = serializers.ChoiceField(choices=['percent', 'amount'])
+    value = serializers.DecimalField(max_digits=12, decimal_places=4)
+    fields = serializers.ListField(
+        child=serializers.ChoiceField(choices=list(PRODUCT_PRICE_FIELDS)), default=['display_price'], allow_empty=False
+    )
+    rounding = PriceRoundingSerializer(required=False)
+    min_price = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=0, default=Decimal('0'))
+    scope = PriceAdjustmentScopeSerializer()
+    include_variants = serializers.BooleanField(default=True)
+    dry_run = serializers.BooleanField(default=False)
+    
+    def validate(self, data):
+        if data['mode'] == 'percent' and data['value'] <= -100:
+            raise serializers.ValidationError({'value': "A percentage decrease must be less than 100."})
+        return data
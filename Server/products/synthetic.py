@@ -0,0 +1,387 @@
+"""
+Synthetic catalog generation for performance work.
+
+Builds realistic catalogs (reference data, attributes with options, products,
+variants, images, attribute values and kits) at any scale with bulk inserts:
+products are generated in batches and every batch is written with one
+``bulk_create`` per table, so memory stays flat and a million products take
+a few thousand round trips rather than millions.
+
+Generation is deterministic for a given seed and additive: running it again
+for the same tenant and prefix appends new products after the existing ones.
+Used by the ``generate_synthetic_catalog`` management command and by the
+benchmarks in ``benchmarks/``.
+"""
+import logging
+import random
+import time
+from decimal import Decimal
+
+from django.db import transaction
+
+from attributes.models import Attribute, AttributeGroup, AttributeOption
+from core.conditional import bump_change_counter
+from products.catalogue.models import Category, Division, ProductStatus, Subcategory, UnitOfMeasure
+from products.models import (
+    CATALOGUE_CHANGE_SCOPE, PRODUCT_TYPE_CHOICES, PRODUCTS_CHANGE_SCOPE, KitComponent, Product,
+    ProductAttributeValue, ProductImage, ProductVariant, PublicationStatus
+)
+
+logger = logging.getLogger(__name__)
+
+ADJECTIVES = (
+    'Classic', 'Premium', 'Compact', 'Organic', 'Wireless', 'Vintage', 'Ergonomic', 'Durable',
+    'Lightweight', 'Deluxe', 'Eco', 'Smart', 'Rustic', 'Modern', 'Portable', 'Heavy-Duty',
+)
+NOUNS = (
+    'Chair', 'Lamp', 'Backpack', 'Kettle', 'Headphones', 'Jacket', 'Sneakers', 'Desk',
+    'Blender', 'Notebook', 'Watch', 'Bottle', 'Speaker', 'Tent', 'Mug', 'Keyboard',
+)
+MATERIALS = ('cotton', 'steel', 'oak', 'bamboo', 'leather', 'aluminium', 'glass', 'ceramic')
+
+# Attributes defining variants; the others only carry product attribute values
+VARIANT_ATTRIBUTES = 2
+
+
+class CatalogSpec:
+    """
+    Size of a synthetic catalog.
+
+    Attributes:
+        products: Products to create, kits included
+        variants: Variants to create, spread over PARENT products
+        variants_per_product: Variants of each PARENT product (sets the number of parents)
+        kits: KIT products among the products
+        attributes: Attributes in the attribute library
+        options_per_attribute: Options of each attribute
+        images_per_product: Images of each product
+        attribute_values: Attribute values of each product
+        kit_components: Components of each kit
+    """
+
+    def __init__(self, products=1000, variants=5000, variants_per_product=10, kits=0, attributes=200,
+                 options_per_attribute=8, images_per_product=2, attribute_values=3, kit_components=3):
+        self.products = products
+        self.variants = variants
+        self.variants_per_product = max(1, variants_per_product)
+        self.kits = min(kits, products)
+        self.attributes = max(attributes, VARIANT_ATTRIBUTES if variants else 0)
+        self.options_per_attribute = max(1, options_per_attribute)
+        self.images_per_product = images_per_product
+        self.attribute_values = min(attribute_values, max(0, self.attributes - VARIANT_ATTRIBUTES))
+        self.kit_components = kit_components
+
+    @property
+    def parents(self):
+        """
+        Return the number of PARENT products carrying the variants.
+        """
+        if not self.variants:
+            return 0
+        parents = -(-self.variants // self.variants_per_product)
+        return min(parents, self.products - self.kits)
+
+
+def spread(total, parts, index):
+    """
+    Return the share of total given to part index when splitting it evenly.
+    """
+    return spread_range(total, parts, index, index + 1)
+
+
+def spread_range(total, parts, start, end):
+    """
+    Return the share of total given to parts start..end when splitting it evenly.
+    """
+    return total * end // parts - total * start // parts
+
+
+def ensure_reference_data(client_id, spec, prefix):
+    """
+    Create the catalogue reference data and attribute library of a tenant.
+
+    Rows already present (from an earlier run) are reused.
+
+    Returns:
+        dict: Lists of the reference rows by kind, and options by attribute ID
+    """
+    def bulk_get_or_create(model, rows, *lookup):
+        model.objects.bulk_create(rows, ignore_conflicts=True)
+        keys = {tuple(getattr(row, field) for field in lookup) for row in rows}
+        existing = model.objects.filter(client_id=client_id, **{f'{lookup[0]}__in': {key[0] for key in keys}})
+        return [row for row in existing if tuple(getattr(row, field) for field in lookup) in keys]
+
+    divisions = bulk_get_or_create(Division, [
+        Division(client_id=client_id, name=f'{prefix} Division {index}') for index in range(5)
+    ], 'name')
+    categories = bulk_get_or_create(Category, [
+        Category(client_id=client_id, division=division, name=f'{prefix} Category {index}')
+        for division in divisions for index in range(5)
+    ], 'name', 'division_id')
+    subcategories = bulk_get_or_create(Subcategory, [
+        Subcategory(client_id=client_id, category=category, name=f'{prefix} Subcategory {index}')
+        for category in categories for index in range(4)
+    ], 'name', 'category_id')
+    uoms = bulk_get_or_create(UnitOfMeasure, [
+        UnitOfMeasure(client_id=client_id, name=f'{prefix} {name}', symbol=f'{prefix[:6]}{symbol}')
+        for name, symbol in (('Pieces', 'PC'), ('Kilograms', 'KG'), ('Litres', 'L'), ('Metres', 'M'))
+    ], 'name')
+    statuses = bulk_get_or_create(ProductStatus, [
+        ProductStatus(client_id=client_id, name=f'{prefix} {name}')
+        for name in ('Available', 'New', 'Discontinued', 'Pre-Order')
+    ], 'name')
+    groups = bulk_get_or_create(AttributeGroup, [
+        AttributeGroup(client_id=client_id, name=f'{prefix} Group {index}', display_order=index)
+        for index in range(10)
+    ], 'name')
+
+    attributes = bulk_get_or_create(Attribute, [
+        Attribute(
+            client_id=client_id,
+            name=f'{prefix} Attribute {index:03d}',
+            code=f'{prefix}_attr_{index:03d}',
+            label=f'Attribute {index}',
+            data_type=Attribute.AttributeDataType.SELECT,
+            is_filterable=index < 20,
+            use_for_variants=index < VARIANT_ATTRIBUTES,
+        )
+        for index in range(spec.attributes)
+    ], 'code')
+    attributes.sort(key=lambda attribute: attribute.code)
+    AttributeOption.objects.bulk_create([
+        AttributeOption(
+            client_id=client_id, attribute=attribute, option_label=f'Option {index}',
+            option_value=f'option-{index}', sort_order=index
+        )
+        for attribute in attributes for index in range(spec.options_per_attribute)
+    ], ignore_conflicts=True, batch_size=5000)
+    options = {}
+    for option in AttributeOption.objects.filter(attribute__in=attributes).order_by('sort_order', 'id'):
+        options.setdefault(option.attribute_id, []).append(option.id)
+
+    return {
+        'division_by_category': {category.id: category.division_id for category in categories},
+        'subcategories': subcategories,
+        'uoms': uoms,
+        'statuses': statuses,
+        'groups': groups,
+        'variant_attributes': attributes[:VARIANT_ATTRIBUTES],
+        'value_attributes': attributes[VARIANT_ATTRIBUTES:],
+        'options': options,
+    }
+
+
+class CatalogGenerator:
+    """
+    Generates the products of one tenant in batches.
+
+    Args:
+        client_id: Tenant (client) ID of the generated rows
+        spec: CatalogSpec
+        prefix: Prefix of names, slugs and SKUs, keeping runs apart from real data
+        seed: Random seed
+        batch_size: Products written per batch
+        image_name: Storage name used by generated images (None for no file)
+    """
+
+    def __init__(self, client_id, spec, prefix='syn', seed=0, batch_size=1000, image_name=None):
+        self.client_id = client_id
+        self.spec = spec
+        self.prefix = prefix
+        self.batch_size = max(1, batch_size)
+        self.image_name = image_name
+        self.rng = random.Random(f'{seed}:{client_id}:{prefix}')
+        self.counts = {
+            'products': 0, 'variants': 0, 'kits': 0, 'images': 0,
+            'attribute_values': 0, 'kit_components': 0,
+        }
+
+    def generate(self, progress=None):
+        """
+        Create the reference data and every product of the spec.
+
+        Args:
+            progress: Called with (products done, products total) after each batch
+
+        Returns:
+            dict: Number of rows created by kind
+        """
+        started = time.monotonic()
+        self.reference = ensure_reference_data(self.client_id, self.spec, self.prefix)
+        # Append after products of earlier runs with the same prefix
+        self.offset = Product.objects.filter(client_id=self.client_id, slug__startswith=f'{self.prefix}-').count()
+
+        spec = self.spec
+        parents_done = 0
+        for start in range(0, spec.products, self.batch_size):
+            end = min(start + self.batch_size, spec.products)
+            kits = spread_range(spec.kits, spec.products, start, end)
+            parents = spread_range(spec.parents, spec.products, start, end)
+            with transaction.atomic():
+                self.write_batch(start, end, kits, parents, parents_done)
+            parents_done += parents
+            if progress:
+                progress(end, spec.products)
+
+        if spec.products:
+            bump_change_counter(PRODUCTS_CHANGE_SCOPE, self.client_id)
+        bump_change_counter(CATALOGUE_CHANGE_SCOPE, self.client_id)
+        logger.info(
+            "Generated synthetic catalog for client %s: %s in %.1fs",
+            self.client_id, self.counts, time.monotonic() - started
+        )
+        return dict(self.counts)
+
+    def write_batch(self, start, end, kits, parents, parents_done):
+        """
+        Write products start..end (kits first, then parents, then regular products).
+        """
+        rng = self.rng
+        reference = self.reference
+        types = (
+            [PRODUCT_TYPE_CHOICES.KIT] * kits
+            + [PRODUCT_TYPE_CHOICES.PARENT] * parents
+            + [PRODUCT_TYPE_CHOICES.REGULAR] * (end - start - kits - parents)
+        )
+        products = []
+        for position, product_type in enumerate(types):
+            number = self.offset + start + position
+            name = f'{rng.choice(ADJECTIVES)} {rng.choice(MATERIALS)} {rng.choice(NOUNS)} {number}'
+            subcategory = rng.choice(reference['subcategories'])
+            price = Decimal(rng.randrange(199, 99999)) / 100
+            products.append(Product(
+                client_id=self.client_id,
+                product_type=product_type,
+                publication_status=PublicationStatus.ACTIVE if rng.random() < 0.8 else PublicationStatus.DRAFT,
+                name=name,
+                slug=f'{self.prefix}-{number:07d}',
+                sku=f'{self.prefix.upper()}-{number:07d}',
+                description=f'{name} made of {rng.choice(MATERIALS)}. ' * 3,
+                short_description=name,
+                category_id=subcategory.category_id,
+                subcategory=subcategory,
+                division_id=reference['division_by_category'][subcategory.category_id],
+                uom=rng.choice(reference['uoms']),
+                productstatus=rng.choice(reference['statuses']),
+                display_price=price,
+                compare_at_price=price + 10 if rng.random() < 0.2 else None,
+                quantity_on_hand=rng.randrange(0, 500),
+                tags=rng.sample(['new', 'sale', 'bestseller', 'eco', 'gift'], 2),
+            ))
+        Product.objects.bulk_create(products)
+        self.counts['products'] += len(products)
+        self.counts['kits'] += kits
+
+        self.link_groups(products)
+        self.create_attribute_values(products)
+        self.create_images(products)
+        variants = self.create_variants(products[kits:kits + parents], parents_done)
+        self.create_kit_components(products[:kits], products[kits + parents:], variants)
+
+    def link_groups(self, products):
+        through = Product.attribute_groups.through
+        groups = self.reference['groups']
+        through.objects.bulk_create([
+            through(product_id=product.id, attributegroup_id=group.id)
+            for product in products for group in self.rng.sample(groups, min(2, len(groups)))
+        ])
+
+    def create_attribute_values(self, products):
+        attributes = self.reference['value_attributes']
+        options = self.reference['options']
+        values = []
+        for product in products:
+            for attribute in self.rng.sample(attributes, self.spec.attribute_values):
+                values.append(ProductAttributeValue(
+                    client_id=self.client_id, product_id=product.id, attribute_id=attribute.id,
+                    value_option_id=self.rng.choice(options[attribute.id]),
+                ))
+        ProductAttributeValue.objects.bulk_create(values, batch_size=5000)
+        self.counts['attribute_values'] += len(values)
+
+    def create_images(self, products):
+        images = [
+            ProductImage(
+                client_id=self.client_id, product_id=product.id, image=self.image_name,
+                alt_text=f'{product.name} {index + 1}', sort_order=index, is_default=index == 0,
+            )
+            for product in products for index in range(self.spec.images_per_product)
+        ]
+        ProductImage.objects.bulk_create(images, batch_size=5000)
+        self.counts['images'] += len(images)
+
+    def create_variants(self, parents, parents_done):
+        """
+        Create the variants of PARENT products, one option of each variant attribute apiece.
+        """
+        spec = self.spec
+        attributes = self.reference['variant_attributes']
+        options = [self.reference['options'][attribute.id] for attribute in attributes]
+        defining = Product.variant_defining_attributes.through
+        defining.objects.bulk_create([
+            defining(product_id=product.id, attribute_id=attribute.id)
+            for product in parents for attribute in attributes
+        ])
+
+        variants = []
+        combinations = []
+        for position, product in enumerate(parents):
+            count = spread(spec.variants, spec.parents, parents_done + position)
+            for index in range(count):
+                # Distinct option combinations while the options allow it
+                combination, rest = [], index
+                for attribute_options in options:
+                    combination.append(attribute_options[rest % len(attribute_options)])
+                    rest //= len(attribute_options)
+                combinations.append(combination)
+                variants.append(ProductVariant(
+                    client_id=self.client_id, product_id=product.id,
+                    sku=f'{product.sku}-{index:03d}',
+                    display_price=product.display_price + Decimal(self.rng.randrange(0, 500)) / 100,
+                    quantity_on_hand=self.rng.randrange(0, 100),
+                ))
+        ProductVariant.objects.bulk_create(variants, batch_size=5000)
+
+        through = ProductVariant.options.through
+        through.objects.bulk_create([
+            through(productvariant_id=variant.id, attributeoption_id=option_id)
+            for variant, combination in zip(variants, combinations) for option_id in combination
+        ], batch_size=10000)
+        self.counts['variants'] += len(variants)
+        return variants
+
+    def create_kit_components(self, kits, regulars, variants):
+        """
+        Give each kit components picked among the batch's regular products and variants.
+        """
+        if not kits or not (regulars or variants):
+            return
+        components = []
+        for kit in kits:
+            for _ in range(self.spec.kit_components):
+                if regulars and (not variants or self.rng.random() < 0.5):
+                    component = {'component_product_id': self.rng.choice(regulars).id}
+                else:
+                    component = {'component_variant_id': self.rng.choice(variants).id}
+                components.append(KitComponent(
+                    client_id=self.client_id, kit_product_id=kit.id,
+                    quantity=self.rng.randrange(1, 4), **component
+                ))
+        KitComponent.objects.bulk_create(components, batch_size=5000)
+        self.counts['kit_components'] += len(components)
+
+
+def generate_catalog(client_id, spec, **kwargs):
+    """
+    Generate a synthetic catalog for a tenant.
+
+    Args:
+        client_id: Tenant (client) ID
+        spec: CatalogSpec
+        **kwargs: Passed on to CatalogGenerator (prefix, seed, batch_size, image_name)
+
+    Returns:
+        dict: Number of rows created by kind
+    """
+    progress = kwargs.pop('progress', None)
+    return CatalogGenerator(client_id, spec, **kwargs).generate(progress=progress)
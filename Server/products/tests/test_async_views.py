@@ -0,0 +1,168 @@
+"""
+Tests for the async (ASGI) read endpoints.
+"""
+from decimal import Decimal
+
+from asgiref.sync import async_to_sync
+from django.core.cache import caches
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from attributes.models import Attribute, AttributeOption
+from products.catalogue.models import Category, Division, ProductStatus, Subcategory, UnitOfMeasure
+from products.models import Product, ProductAttributeValue, ProductImage, ProductVariant
+
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'async-view-tests',
+    }
+}
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    DEFAULT_FILE_STORAGE='django.core.files.storage.FileSystemStorage',
+    REDIS_CLIENT_BACKEND='memory',
+)
+class AsyncReadEndpointTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.division = Division.objects.create(name='Home', image='divisions/home.png')
+        cls.other_division = Division.objects.create(name='Garden')
+        cls.category = Category.objects.create(name='Kitchen', division=cls.division, sort_order=2)
+        cls.first_category = Category.objects.create(name='Bath', division=cls.division, sort_order=1)
+        cls.subcategory = Subcategory.objects.create(name='Knives', category=cls.category)
+        UnitOfMeasure.objects.create(name='Pieces', symbol='PCS')
+        ProductStatus.objects.create(name='Active')
+
+        colour = Attribute.objects.create(name='Colour', code='colour', label='Colour', data_type='SELECT')
+        red = AttributeOption.objects.create(attribute=colour, option_label='Red', option_value='red')
+
+        cls.parent = Product.objects.create(
+            name='Chef Knife', slug='chef-knife', sku='KNIFE-1', product_type='PARENT',
+            category=cls.category, subcategory=cls.subcategory, division=cls.division,
+            display_price=Decimal('49.00'), publication_status='ACTIVE',
+        )
+        cls.parent.variant_defining_attributes.set([colour])
+        ProductAttributeValue.objects.create(product=cls.parent, attribute=colour, value_option=red)
+        ProductImage.objects.create(product=cls.parent, image='products/knife.jpg', alt_text='Knife')
+        variant = ProductVariant.objects.create(product=cls.parent, sku='KNIFE-1-RED', display_price='52.00')
+        variant.options.set([red])
+        cls.other = Product.objects.create(
+            name='Bath Mat', slug='bath-mat', sku='MAT-1', category=cls.first_category,
+            display_price=Decimal('12.00'), publication_status='ACTIVE',
+        )
+        Product.objects.create(name='Other client', slug='other-client', sku='OTHER-1', category=cls.category, client_id=2)
+
+    def setUp(self):
+        caches['default'].clear()
+        self.sync_client = APIClient()
+        self.async_client = AsyncClient()
+
+    def async_request(self, method, path, data=None, etag=None):
+        headers = {'If-None-Match': etag} if etag else None
+
+        async def send():
+            return await getattr(self.async_client, method)(path, data, headers=headers)
+        return async_to_sync(send)()
+
+    def async_get(self, path, data=None, etag=None):
+        return self.async_request('get', path, data, etag)
+
+    def assert_same_response(self, sync_url, async_url, data=None):
+        expected = self.sync_client.get(sync_url, data)
+        actual = self.async_get(async_url, data)
+
+        self.assertEqual(actual.status_code, expected.status_code)
+        self.assertEqual(actual['Content-Type'], 'application/json')
+        body = actual.json()
+        if isinstance(body, dict):
+            # Pagination links point at the route that was requested
+            for key in ('next', 'previous'):
+                if body.get(key):
+                    body[key] = body[key].replace('/api/v1/async/products/', '/api/v1/products/')
+        self.assertEqual(body, expected.json())
+        return actual
+
+    def test_product_list_matches_sync_route(self):
+        for params in ({}, {'search': 'knife'}, {'ordering': '-name'}, {'page_size': 1, 'page': 2},
+                       {'category': self.category.id}):
+            with self.subTest(params=params):
+                self.assert_same_response(reverse('product-list'), reverse('async-product-list'), params)
+
+    def test_product_list_errors_match_sync_route(self):
+        for params in ({'category': 999999}, {'page': 7}):
+            with self.subTest(params=params):
+                response = self.assert_same_response(reverse('product-list'), reverse('async-product-list'), params)
+                self.assertIn(response.status_code, (400, 404))
+
+    def test_product_list_is_scoped_to_client(self):
+        skus = [product['sku'] for product in self.async_get(reverse('async-product-list')).json()['results']]
+
+        self.assertEqual(skus, ['KNIFE-1', 'MAT-1'])
+
+    def test_product_list_revalidates_with_etag(self):
+        url = reverse('async-product-list')
+        first = self.async_get(url)
+
+        self.assertTrue(first['ETag'])
+        self.assertEqual(self.async_get(url, etag=first['ETag']).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.filter(pk=self.other.pk).get().save()
+        self.assertEqual(self.async_get(url, etag=first['ETag']).status_code, 200)
+
+    def test_product_detail_matches_sync_route(self):
+        sync_url = reverse('product-detail', args=[self.parent.id])
+        response = self.assert_same_response(sync_url, reverse('async-product-detail', args=[self.parent.id]))
+
+        self.assertEqual(response['ETag'], self.sync_client.get(sync_url)['ETag'])
+        self.assertEqual(
+            self.async_get(
+                reverse('async-product-detail', args=[self.parent.id]), etag=response['ETag']
+            ).status_code,
+            304
+        )
+
+    def test_product_detail_of_missing_product(self):
+        response = self.async_get(reverse('async-product-detail', args=[999999]))
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), self.sync_client.get(reverse('product-detail', args=[999999])).json())
+
+    def test_variant_list_matches_sync_route(self):
+        response = self.assert_same_response(
+            reverse('product-variant-list', kwargs={'product_pk': self.parent.id}),
+            reverse('async-product-variant-list', kwargs={'product_pk': self.parent.id}),
+        )
+
+        self.assertEqual([variant['sku'] for variant in response.json()['results']], ['KNIFE-1-RED'])
+
+    def test_catalogue_tree(self):
+        response = self.async_get(reverse('async-catalogue-tree'))
+
+        self.assertEqual(response.status_code, 200)
+        divisions = response.json()['divisions']
+        self.assertEqual([division['name'] for division in divisions], ['Garden', 'Home'])
+        home = divisions[1]
+        self.assertTrue(home['image'].startswith('http://testserver/'))
+        self.assertEqual([category['name'] for category in home['categories']], ['Bath', 'Kitchen'])
+        self.assertEqual(home['categories'][1]['subcategories'][0]['name'], 'Knives')
+        self.assertIsNone(home['categories'][1]['subcategories'][0]['image'])
+        self.assertEqual(divisions[0]['categories'], [])
+        self.assertNotIn('division_id', home['categories'][0])
+
+    def test_reference_data_matches_sync_route(self):
+        expected = self.sync_client.get(reverse('reference-data'))
+        actual = self.async_get(reverse('async-reference-data'))
+
+        self.assertEqual(actual.json(), expected.json())
+        self.assertEqual(actual['ETag'], expected['ETag'])
+        self.assertEqual(self.async_get(reverse('async-reference-data'), etag=actual['ETag']).status_code, 304)
+
+    def test_only_safe_methods_are_allowed(self):
+        response = self.async_request('post', reverse('async-product-list'), {})
+
+        self.assertEqual(response.status_code, 405)
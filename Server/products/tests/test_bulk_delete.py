@@ -0,0 +1,184 @@
+"""
+Tests for set-based bulk deletes of products, variants and images.
+"""
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from attributes.models import Attribute, AttributeOption
+from inventory.ledger import record_movement, set_counter_shards
+from inventory.models import MovementReason, ProductStockRollup, StockBalance, StockMovement, StockReservation
+from inventory.reservations import reserve_stock
+from products.catalogue.models import Category, Division
+from products.models import (
+    KitComponent, Product, ProductAttributeMultiValue, ProductAttributeValue,
+    ProductImage, ProductVariant
+)
+
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bulk-delete-tests',
+    }
+}
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    DEFAULT_FILE_STORAGE='django.core.files.storage.FileSystemStorage',
+)
+class BulkDeleteTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.client = APIClient()
+        division = Division.objects.create(name='Division')
+        self.category = Category.objects.create(name='Category', division=division)
+        self.attribute = Attribute.objects.create(name='Features', code='features', label='Features', data_type='MULTI_SELECT')
+        self.option = AttributeOption.objects.create(attribute=self.attribute, option_label='USB', option_value='usb')
+
+    def create_product(self, name, product_type='REGULAR', client_id=1):
+        product = Product.objects.create(
+            name=name, slug=name.lower().replace(' ', '-'), product_type=product_type,
+            category=self.category, client_id=client_id,
+        )
+        ProductImage.objects.create(product=product, client_id=client_id, image='products/x.jpg')
+        value = ProductAttributeValue.objects.create(product=product, attribute=self.attribute, client_id=client_id)
+        ProductAttributeMultiValue.objects.create(product_attribute_value=value, attribute_option=self.option)
+        return product
+
+    def create_variant(self, product, sku):
+        variant = ProductVariant.objects.create(product=product, sku=sku, display_price='1.00')
+        variant.options.add(self.option)
+        image = ProductImage.objects.create(variant=variant, image='products/v.jpg')
+        variant.image = image
+        variant.save()
+        return variant
+
+    def test_bulk_delete_products_cascades(self):
+        parent = self.create_product('Parent', 'PARENT')
+        self.create_variant(parent, 'P-1')
+        regular = self.create_product('Regular')
+        kit = self.create_product('Kit', 'KIT')
+        KitComponent.objects.create(kit_product=kit, component_product=regular)
+        keep = self.create_product('Keep')
+
+        response = self.client.post(
+            reverse('product-bulk-delete'), {'ids': [parent.id, regular.id, kit.id]}, format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['deleted']['products'], 3)
+        self.assertEqual(response.data['protected'], [])
+        self.assertEqual(list(Product.objects.values_list('id', flat=True)), [keep.id])
+        self.assertFalse(ProductVariant.objects.exists())
+        self.assertFalse(KitComponent.objects.exists())
+        self.assertEqual(ProductImage.objects.count(), 1)
+        self.assertEqual(ProductAttributeValue.objects.count(), 1)
+        self.assertEqual(ProductAttributeMultiValue.objects.count(), 1)
+
+    def test_kit_components_protect_products_and_variants(self):
+        regular = self.create_product('Regular')
+        parent = self.create_product('Parent', 'PARENT')
+        variant = self.create_variant(parent, 'P-1')
+        kit = self.create_product('Kit', 'KIT')
+        KitComponent.objects.create(kit_product=kit, component_product=regular)
+        KitComponent.objects.create(kit_product=kit, component_variant=variant)
+        unused = self.create_product('Unused')
+
+        response = self.client.post(
+            reverse('product-bulk-delete'), {'ids': [regular.id, parent.id, unused.id]}, format='json'
+        )
+
+        self.assertEqual(response.data['protected'], sorted([regular.id, parent.id]))
+        self.assertEqual(response.data['deleted']['products'], 1)
+        self.assertTrue(Product.objects.filter(pk=regular.pk).exists())
+
+        response = self.client.post(
+            reverse('product-variant-bulk-delete', args=[parent.id]), {'ids': [variant.id]}, format='json'
+        )
+        self.assertEqual(response.data['protected'], [variant.id])
+        self.assertTrue(ProductVariant.objects.filter(pk=variant.pk).exists())
+
+    def test_other_clients_rows_are_ignored(self):
+        foreign = self.create_product('Foreign', client_id=2)
+
+        response = self.client.post(reverse('product-bulk-delete'), {'ids': [foreign.id]}, format='json')
+
+        self.assertEqual(response.data['deleted']['products'], 0)
+        self.assertTrue(Product.objects.filter(pk=foreign.pk).exists())
+
+    def test_bulk_delete_is_set_based(self):
+        products = [self.create_product(f'Product {i}') for i in range(30)]
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(
+                reverse('product-bulk-delete'), {'ids': [p.id for p in products]}, format='json'
+            )
+
+        self.assertEqual(response.data['deleted']['products'], 30)
+        self.assertLess(len(ctx.captured_queries), 20)
+
+    def test_bulk_delete_variants_and_images_touch_parent(self):
+        parent = self.create_product('Parent', 'PARENT')
+        first = self.create_variant(parent, 'P-1')
+        second = self.create_variant(parent, 'P-2')
+        detail_url = reverse('product-detail', args=[parent.id])
+        etag = self.client.get(detail_url)['ETag']
+
+        response = self.client.post(
+            reverse('product-variant-bulk-delete', args=[parent.id]), {'ids': [first.id]}, format='json'
+        )
+        self.assertEqual(response.data['deleted']['variants'], 1)
+        self.assertEqual(self.client.get(detail_url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+        image_ids = list(ProductImage.objects.filter(product=parent).values_list('id', flat=True))
+        response = self.client.post(
+            reverse('product-image-bulk-delete', args=[parent.id]),
+            {'ids': image_ids + [second.image_id]}, format='json'
+        )
+        # The variant image is not an image of the product itself
+        self.assertEqual(response.data['deleted']['images'], len(image_ids))
+        self.assertTrue(ProductImage.objects.filter(pk=second.image_id).exists())
+
+    def test_stocked_items_are_deleted_with_their_ledger(self):
+        parent = self.create_product('Parent', 'PARENT')
+        first = self.create_variant(parent, 'P-1')
+        second = self.create_variant(parent, 'P-2')
+        regular = self.create_product('Regular')
+        record_movement(1, parent.id, 5, MovementReason.RECEIPT, variant_id=first.id)
+        balance = record_movement(1, parent.id, 5, MovementReason.RECEIPT, variant_id=second.id).balance
+        set_counter_shards(balance, 2)
+        record_movement(1, parent.id, -1, MovementReason.SALE, variant_id=second.id)
+        record_movement(1, regular.id, 5, MovementReason.RECEIPT)
+        reserve_stock(1, [{'product_id': regular.id, 'quantity': 1}], 'cart-1')
+
+        response = self.client.post(
+            reverse('product-variant-bulk-delete', args=[parent.id]), {'ids': [first.id]}, format='json'
+        )
+        self.assertEqual(response.data['deleted']['stock_balances'], 1)
+
+        response = self.client.post(
+            reverse('product-bulk-delete'), {'ids': [parent.id, regular.id]}, format='json'
+        )
+        self.assertEqual(response.data['deleted']['products'], 2)
+        self.assertEqual(response.data['deleted']['stock_balances'], 3)
+        for model in (StockBalance, StockMovement, StockReservation, ProductStockRollup):
+            self.assertFalse(model.objects.exists(), model.__name__)
+
+    def test_empty_ids_are_rejected(self):
+        response = self.client.post(reverse('product-bulk-delete'), {'ids': []}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_reset_id_sequences_command(self):
+        products = [self.create_product(f'Product {i}') for i in range(3)]
+        Product.objects.filter(pk__in=[p.pk for p in products[1:]]).delete()
+
+        call_command('reset_id_sequences', 'products.Product', stdout=open('/dev/null', 'w'))
+
+        self.assertEqual(self.create_product('Next').id, products[0].id + 1)
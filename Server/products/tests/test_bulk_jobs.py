@@ -0,0 +1,175 @@
+"""
+Tests for the bulk product operations run as background jobs (products.jobs).
+"""
+import csv
+import io
+import json
+import shutil
+import tempfile
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import caches
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.conditional import get_change_counters
+from core.jobs import execute_job
+from core.models.jobs import BulkJob, JobStatus
+from products.catalogue.models import Category, Division
+from products.models import PRODUCTS_CHANGE_SCOPE, KitComponent, Product
+
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bulk-job-tests',
+    }
+}
+
+
+@override_settings(REDIS_CLIENT_BACKEND='memory', BULK_JOB_CHUNK_SIZE=2, BULK_JOB_SYNC_LIMIT=2)
+class ProductBulkJobTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.division = Division.objects.create(name='Home')
+        cls.category = Category.objects.create(name='Kitchen', division=cls.division)
+        cls.other_category = Category.objects.create(name='Other client', division=cls.division, client_id=2)
+        cls.knife = Product.objects.create(
+            name='Knife', slug='knife', sku='KNIFE-1', category=cls.category, display_price=Decimal('10.00')
+        )
+        cls.board = Product.objects.create(
+            name='Board', slug='board', sku='BOARD-1', category=cls.category, display_price=Decimal('20.00')
+        )
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            CACHES=LOCMEM_CACHES,
+            MEDIA_ROOT=self.media_root,
+            DEFAULT_FILE_STORAGE='django.core.files.storage.FileSystemStorage',
+        )
+        self.settings_override.enable()
+        caches['default'].clear()
+        self.client = APIClient()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def run_job(self, url, data):
+        """
+        POST to an endpoint starting a job, running the job when it is queued.
+        """
+        with mock.patch('core.tasks.run_bulk_job.delay', side_effect=execute_job):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, 202, response.data)
+        return BulkJob.objects.get(pk=response.data['id'])
+
+    def test_import_creates_and_updates_by_sku(self):
+        counter = get_change_counters([PRODUCTS_CHANGE_SCOPE], 1)
+        rows = [
+            {'sku': 'KNIFE-1', 'display_price': '12.50', 'tags': ['steel']},
+            {'sku': 'PAN-1', 'name': 'Frying Pan', 'category': self.category.id, 'publication_status': 'ACTIVE'},
+            {'sku': 'PAN-2', 'name': 'Frying Pan', 'category': self.category.id},
+            {'sku': 'BAD-1', 'name': 'No category'},
+            {'sku': 'BAD-2', 'name': 'Foreign category', 'category': self.other_category.id},
+            {'name': 'No SKU'},
+        ]
+
+        job = self.run_job(reverse('product-bulk-import'), {'rows': rows})
+
+        self.assertEqual(job.status, JobStatus.SUCCEEDED)
+        self.assertEqual(job.result, {'created': 2, 'updated': 1, 'failed': 3})
+        self.assertEqual((job.total_chunks, job.processed_items, job.failed_items), (3, 6, 3))
+        self.assertEqual([error['row'] for error in job.errors], [4, 5, 6])
+        self.assertIn('category', job.errors[0]['errors'])
+        self.assertEqual(job.params, {'update_existing': True, 'row_count': 6})
+
+        self.knife.refresh_from_db()
+        self.assertEqual((self.knife.display_price, self.knife.tags, self.knife.name), (Decimal('12.50'), ['steel'], 'Knife'))
+        pans = Product.objects.filter(sku__startswith='PAN-').order_by('sku')
+        self.assertEqual([pan.slug for pan in pans], ['frying-pan-pan-1', 'frying-pan-pan-2'])
+        self.assertEqual(pans[0].publication_status, 'ACTIVE')
+        self.assertNotEqual(get_change_counters([PRODUCTS_CHANGE_SCOPE], 1), counter)
+
+    def test_import_can_refuse_updates(self):
+        job = self.run_job(reverse('product-bulk-import'), {
+            'rows': [{'sku': 'KNIFE-1', 'name': 'Renamed'}], 'update_existing': False
+        })
+
+        self.assertEqual(job.result['failed'], 1)
+        self.assertEqual(job.errors[0]['errors']['sku'], ['A product with this SKU already exists.'])
+        self.knife.refresh_from_db()
+        self.assertEqual(self.knife.name, 'Knife')
+
+    def test_invalid_import_is_rejected_before_queueing(self):
+        response = self.client.post(reverse('product-bulk-import'), {'rows': []}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(BulkJob.objects.exists())
+
+    def test_bulk_price_update(self):
+        job = self.run_job(reverse('product-bulk-price-update'), {'prices': [
+            {'sku': 'KNIFE-1', 'display_price': '11.00', 'compare_at_price': '15.00'},
+            {'id': self.board.id, 'display_price': '19.99'},
+            {'sku': 'MISSING', 'display_price': '1.00'},
+        ]})
+
+        self.assertEqual(job.result, {'updated': 2, 'failed': 1})
+        self.assertEqual(job.errors, [{'row': 3, 'errors': {'product': ['Product not found.']}}])
+        self.knife.refresh_from_db()
+        self.board.refresh_from_db()
+        self.assertEqual((self.knife.display_price, self.knife.compare_at_price), (Decimal('11.00'), Decimal('15.00')))
+        self.assertEqual(self.board.display_price, Decimal('19.99'))
+
+    def test_bulk_delete_above_sync_limit_runs_as_job(self):
+        kit = Product.objects.create(name='Kit', slug='kit', sku='KIT-1', product_type='KIT', category=self.category)
+        KitComponent.objects.create(kit_product=kit, component_product=self.knife, quantity=1)
+        keep = Product.objects.create(name='Keep', slug='keep', category=self.category)
+
+        # The knife is deleted before its kit, in an earlier chunk, and is retried at the end
+        job = self.run_job(reverse('product-bulk-delete'), {'ids': [self.knife.id, self.board.id, kit.id]})
+
+        self.assertEqual(job.status, JobStatus.SUCCEEDED)
+        self.assertEqual(job.result['deleted']['products'], 3)
+        self.assertEqual(job.result['protected'], [])
+        self.assertEqual(list(Product.objects.values_list('pk', flat=True)), [keep.pk])
+
+    def test_bulk_delete_within_sync_limit_answers_directly(self):
+        response = self.client.post(reverse('product-bulk-delete'), {'ids': [self.board.id]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(BulkJob.objects.exists())
+
+    def test_export_csv(self):
+        Product.objects.create(name='Pan', slug='pan', sku='PAN-1', category=self.category, tags=['a', 'b'])
+
+        job = self.run_job(reverse('product-export'), {'format': 'csv', 'filters': {'name': 'n'}})
+
+        self.assertEqual(job.status, JobStatus.SUCCEEDED)
+        self.assertEqual(job.result['rows'], 2)
+        with default_storage.open(job.result['file']) as export:
+            rows = list(csv.DictReader(io.StringIO(export.read().decode('utf-8'))))
+        self.assertEqual([row['sku'] for row in rows], ['KNIFE-1', 'PAN-1'])
+        self.assertEqual(rows[1]['tags'], 'a|b')
+        self.assertEqual(rows[0]['display_price'], '10.00')
+        self.assertEqual(default_storage.listdir(f'exports/{job.pk}')[1], [f'products-{job.pk}.csv'])
+
+    def test_export_jsonl(self):
+        job = self.run_job(reverse('product-export'), {'format': 'jsonl'})
+
+        with default_storage.open(job.result['file']) as export:
+            documents = [json.loads(line) for line in export.read().decode('utf-8').splitlines()]
+        self.assertEqual([document['sku'] for document in documents], ['KNIFE-1', 'BOARD-1'])
+        self.assertEqual(documents[0]['category_details']['name'], 'Kitchen')
+
+    def test_export_rejects_invalid_filters(self):
+        response = self.client.post(
+            reverse('product-export'), {'filters': {'publication_status': 'NOPE'}}, format='json'
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('filters', response.data)
@@ -0,0 +1,143 @@
+"""
+Tests for conditional GET support on the product endpoints.
+"""
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from products.models import Product, ProductImage, ProductVariant
+from products.catalogue.models import Division, Category
+
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'conditional-get-tests',
+    }
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ProductConditionalGetTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.client = APIClient()
+
+        self.division = Division.objects.create(name='Test Division')
+        self.category = Category.objects.create(name='Test Category', division=self.division)
+        self.product = Product.objects.create(
+            name='Parent Product',
+            slug='parent-product',
+            product_type='PARENT',
+            category=self.category,
+            publication_status='ACTIVE',
+        )
+        self.list_url = reverse('product-list')
+        self.detail_url = reverse('product-detail', args=[self.product.id])
+
+    def test_detail_returns_validators(self):
+        response = self.client.get(self.detail_url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+
+    def test_detail_not_modified_skips_serialization(self):
+        etag = self.client.get(self.detail_url)['ETag']
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+        # Only the row version lookup runs
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    def test_detail_etag_changes_when_product_is_updated(self):
+        etag = self.client.get(self.detail_url)['ETag']
+
+        self.product.name = 'Renamed Product'
+        self.product.save()
+
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_detail_etag_changes_when_nested_rows_change(self):
+        etag = self.client.get(self.detail_url)['ETag']
+
+        ProductVariant.objects.create(product=self.product, sku='VAR-1', display_price='9.99')
+
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+
+        ProductImage.objects.create(product=self.product, alt_text='Front')
+
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_detail_etag_changes_when_embedded_catalogue_row_changes(self):
+        etag = self.client.get(self.detail_url)['ETag']
+
+        self.category.name = 'Renamed Category'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.save()
+
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['category_details']['name'], 'Renamed Category')
+
+    def test_list_not_modified_until_change_counter_moves(self):
+        etag = self.client.get(self.list_url)['ETag']
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(
+                name='Another Product', slug='another-product', category=self.category,
+                publication_status='ACTIVE',
+            )
+
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_change_counter_moves_only_when_the_write_commits(self):
+        etag = self.client.get(self.list_url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                Product.objects.create(name='Rolled Back', slug='rolled-back', category=self.category)
+                transaction.set_rollback(True)
+            with transaction.atomic():
+                self.product.name = 'Renamed Product'
+                self.product.save()
+                # Not committed yet: a revalidation now must not pick up a new validator
+                response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_list_etag_depends_on_query_string(self):
+        etag = self.client.get(self.list_url)['ETag']
+
+        response = self.client.get(self.list_url, {'search': 'Parent'}, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_variant_list_and_image_detail_support_validators(self):
+        variant_url = reverse('product-variant-list', args=[self.product.id])
+        image = ProductImage.objects.create(product=self.product, alt_text='Front')
+        image_url = reverse('product-image-detail', args=[self.product.id, image.id])
+
+        for url in (variant_url, image_url):
+            etag = self.client.get(url)['ETag']
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
@@ -0,0 +1,129 @@
+"""
+Tests for resized product image derivatives.
+"""
+import io
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from assets.models import ImageBlob
+from products.catalogue.models import Category, Division
+from products.derivatives import build_srcset, render_derivatives
+from products.models import Product, ProductImage
+from products.serializers import ProductImageSerializer
+from products.tasks import generate_image_derivatives
+
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'derivative-tests',
+    }
+}
+
+SPECS = {'thumbnail': 150, 'card': 480}
+
+
+def make_image(size=(2000, 1000), mode='RGB', image_format='JPEG'):
+    buffer = io.BytesIO()
+    Image.new(mode, size, 'red').save(buffer, format=image_format)
+    return buffer.getvalue()
+
+
+class RenderDerivativesTests(TestCase):
+    def test_renders_each_size_and_format(self):
+        rendered = render_derivatives(io.BytesIO(make_image()), SPECS, ('webp', 'jpeg'))
+
+        self.assertEqual(set(rendered), {'thumbnail', 'card'})
+        _, width, height = rendered['card']['webp']
+        self.assertEqual((width, height), (480, 240))
+        content, width, height = rendered['thumbnail']['jpeg']
+        self.assertEqual((width, height), (150, 75))
+        self.assertEqual(Image.open(io.BytesIO(content)).format, 'JPEG')
+        self.assertEqual(Image.open(io.BytesIO(rendered['thumbnail']['webp'][0])).format, 'WEBP')
+
+    def test_transparent_images_and_small_images(self):
+        rendered = render_derivatives(
+            io.BytesIO(make_image((100, 50), 'RGBA', 'PNG')), SPECS, ('jpeg',)
+        )
+
+        # Never upscaled
+        self.assertEqual(rendered['card']['jpeg'][1:], (100, 50))
+
+    def test_srcset_is_ordered_by_width(self):
+        derivatives = {
+            'card': {'webp': {'name': 'c.webp', 'width': 480, 'height': 240}},
+            'thumbnail': {'webp': {'name': 't.webp', 'width': 150, 'height': 75}},
+        }
+
+        self.assertEqual(build_srcset(derivatives, lambda name: f'/m/{name}'), {'webp': '/m/t.webp 150w, /m/c.webp 480w'})
+        self.assertEqual(build_srcset({}, str), {})
+
+
+@override_settings(PRODUCT_IMAGE_DERIVATIVES=SPECS, PRODUCT_IMAGE_DERIVATIVE_FORMATS=['webp', 'jpeg'])
+class GenerateImageDerivativesTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            CACHES=LOCMEM_CACHES,
+            MEDIA_ROOT=self.media_root,
+            DEFAULT_FILE_STORAGE='django.core.files.storage.FileSystemStorage',
+        )
+        self.settings_override.enable()
+        caches['default'].clear()
+        division = Division.objects.create(name='Division')
+        category = Category.objects.create(name='Category', division=division)
+        self.product = Product.objects.create(name='Product', slug='product', category=category)
+        name = default_storage.save('blobs/ab/cd/abcd.jpg', ContentFile(make_image()))
+        self.blob = ImageBlob.objects.create(sha256='abcd' * 16, file=name, size_bytes=1)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def create_image(self):
+        image = ProductImage(product=self.product)
+        image.set_blob(self.blob)
+        image.save()
+        return image
+
+    def test_task_records_derivatives_and_serializer_exposes_srcset(self):
+        image = self.create_image()
+
+        result = generate_image_derivatives(image.id)
+
+        self.assertEqual(result, {'thumbnail': ['jpeg', 'webp'], 'card': ['jpeg', 'webp']})
+        image.refresh_from_db()
+        thumbnail = image.derivatives['thumbnail']['webp']
+        self.assertEqual(thumbnail['name'], f'derivatives/{self.blob.sha256}/thumbnail.webp')
+        self.assertTrue(default_storage.exists(thumbnail['name']))
+        srcset = ProductImageSerializer(image).data['srcset']
+        self.assertEqual(srcset['webp'], f"/media/{thumbnail['name']} 150w, /media/{image.derivatives['card']['webp']['name']} 480w")
+
+    def test_images_with_the_same_content_share_derivatives(self):
+        first = self.create_image()
+        generate_image_derivatives(first.id)
+        second = self.create_image()
+
+        with patch('products.derivatives.render_derivatives') as render:
+            generate_image_derivatives(second.id)
+
+        render.assert_not_called()
+        second.refresh_from_db()
+        first.refresh_from_db()
+        self.assertEqual(second.derivatives, first.derivatives)
+
+    def test_backfill_command(self):
+        images = [self.create_image(), self.create_image()]
+
+        call_command('generate_image_derivatives', '--workers=1', stdout=io.StringIO())
+
+        for image in images:
+            image.refresh_from_db()
+            self.assertEqual(set(image.derivatives), set(SPECS))
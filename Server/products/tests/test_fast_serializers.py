@@ -0,0 +1,152 @@
+"""
+Equivalence tests for FastProductSerializer against ProductSerializer.
+"""
+import datetime
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from attributes.models import Attribute, AttributeGroup, AttributeOption
+from core.renderers import FastJSONRenderer
+from products.catalogue.models import Category, Division, ProductStatus, Subcategory, UnitOfMeasure
+from products.fast_serializers import FastProductSerializer
+from products.models import (
+    Product, ProductAttributeMultiValue, ProductAttributeValue, ProductImage, ProductVariant
+)
+from products.serializers import ProductSerializer
+from products.views import ProductViewSet
+from shared.models import Currency
+
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'fast-serializer-tests',
+    }
+}
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    DEFAULT_FILE_STORAGE='django.core.files.storage.FileSystemStorage',
+)
+class FastProductSerializerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = get_user_model().objects.create_user(username='editor', email='editor@example.com')
+        division = Division.objects.create(name='Division', image='divisions/d.png')
+        category = Category.objects.create(name='Category', division=division, image_alt_text='alt')
+        subcategory = Subcategory.objects.create(name='Subcategory', category=category)
+        uom = UnitOfMeasure.objects.create(name='Pieces', symbol='PCS')
+        status = ProductStatus.objects.create(name='Active')
+        currency = Currency.objects.create(code='EUR', name='Euro', symbol='€')
+
+        def attribute(code, data_type, **kwargs):
+            return Attribute.objects.create(name=code.title(), code=code, label=code, data_type=data_type, **kwargs)
+
+        text = attribute('material', 'TEXT')
+        number = attribute('weight', 'NUMBER')
+        boolean = attribute('fragile', 'BOOLEAN')
+        date = attribute('released', 'DATE')
+        select = attribute('colour', 'SELECT', use_for_variants=True)
+        multi = attribute('features', 'MULTI_SELECT', use_for_variants=True)
+        red = AttributeOption.objects.create(attribute=select, option_label='Red', option_value='red')
+        wifi = AttributeOption.objects.create(attribute=multi, option_label='Wi-Fi', option_value='wifi')
+        usb = AttributeOption.objects.create(attribute=multi, option_label='USB', option_value='usb')
+        groups = [
+            AttributeGroup.objects.create(name='Specs', display_order=2),
+            AttributeGroup.objects.create(name='Basics', display_order=1),
+        ]
+
+        cls.full = Product.objects.create(
+            name='Full Product', slug='full-product', sku='FULL-1', product_type='PARENT',
+            category=category, subcategory=subcategory, division=division, uom=uom,
+            productstatus=status, currency_code=currency, display_price=Decimal('12.50'),
+            compare_at_price=Decimal('15'), pre_order_date=datetime.date(2025, 3, 1),
+            tags=['new', 'sale'], faqs=[{'question': 'Q?', 'answer': 'A.'}],
+            created_by=user, updated_by=user, publication_status='ACTIVE',
+        )
+        cls.full.attribute_groups.set(groups)
+        cls.full.variant_defining_attributes.set([select, multi])
+
+        ProductAttributeValue.objects.create(product=cls.full, attribute=text, value_text='Steel')
+        ProductAttributeValue.objects.create(product=cls.full, attribute=number, value_number=Decimal('1.25'))
+        ProductAttributeValue.objects.create(product=cls.full, attribute=boolean, value_boolean=False)
+        ProductAttributeValue.objects.create(product=cls.full, attribute=date, value_date=datetime.date(2024, 5, 6))
+        ProductAttributeValue.objects.create(product=cls.full, attribute=select, value_option=red)
+        multi_value = ProductAttributeValue.objects.create(product=cls.full, attribute=multi)
+        ProductAttributeMultiValue.objects.create(product_attribute_value=multi_value, attribute_option=wifi)
+        ProductAttributeMultiValue.objects.create(product_attribute_value=multi_value, attribute_option=usb)
+
+        ProductImage.objects.create(product=cls.full, image='products/b.jpg', alt_text='Back', sort_order=2)
+        ProductImage.objects.create(
+            product=cls.full, image='products/a.jpg', alt_text='Front', sort_order=1,
+            derivatives={
+                'card': {'webp': {'name': 'derivatives/a/card.webp', 'width': 480, 'height': 320}},
+                'thumbnail': {'webp': {'name': 'derivatives/a/thumbnail.webp', 'width': 150, 'height': 100}},
+            },
+        )
+        variant = ProductVariant.objects.create(product=cls.full, sku='FULL-1-RED', display_price='13.00')
+        ProductImage.objects.create(variant=variant, image='products/variant.jpg')
+
+        cls.bare = Product.objects.create(
+            name='Bare Product', slug='bare-product', category=category, sku=None,
+            publication_status='ACTIVE',
+        )
+
+    def setUp(self):
+        caches['default'].clear()
+        self.request = Request(APIRequestFactory().get('/api/v1/products/products/'))
+
+    def assert_equivalent(self, products):
+        expected = ProductSerializer(products, many=True, context={'request': self.request}).data
+        actual = FastProductSerializer(context={'request': self.request}).serialize(p.id for p in products)
+
+        self.assertEqual(actual, [dict(item) for item in expected])
+        for fast_item, drf_item in zip(actual, expected):
+            self.assertEqual(list(fast_item), list(drf_item))
+        renderer = FastJSONRenderer()
+        self.assertEqual(renderer.render(actual), renderer.render(expected))
+
+    def get_view_queryset(self):
+        view = ProductViewSet()
+        view.request = self.request
+        view.kwargs = {}
+        return list(view.get_queryset().order_by('id'))
+
+    def test_output_matches_product_serializer(self):
+        self.assert_equivalent(self.get_view_queryset())
+
+    def test_output_without_request_matches_product_serializer(self):
+        self.request = None
+        products = list(Product.objects.order_by('id'))
+        expected = ProductSerializer(products, many=True).data
+        actual = FastProductSerializer().serialize(p.id for p in products)
+
+        self.assertEqual(actual, [dict(item) for item in expected])
+
+    def test_preserves_requested_order_and_skips_missing(self):
+        actual = FastProductSerializer().serialize([self.bare.id, 999999, self.full.id])
+
+        self.assertEqual([item['id'] for item in actual], [self.bare.id, self.full.id])
+
+    def test_variant_images_are_not_listed_on_the_product(self):
+        images = FastProductSerializer().serialize([self.full.id])[0]['images']
+
+        self.assertEqual([image['alt_text'] for image in images], ['Front', 'Back'])
+
+    def test_list_endpoint_matches_serializer_path(self):
+        client = APIClient()
+        url = reverse('product-list')
+
+        with self.settings(PRODUCT_FAST_READ_ENABLED=True):
+            fast = client.get(url)
+        with self.settings(PRODUCT_FAST_READ_ENABLED=False):
+            slow = client.get(url)
+
+        self.assertEqual(fast.status_code, 200)
+        self.assertEqual(fast.content, slow.content)
@@ -0,0 +1,117 @@
+"""
+Tests for linking temporary uploads to products in batches.
+"""
+import os
+import shutil
+import tempfile
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from assets.models import ImageBlob
+from assets.temp_uploads import INDEX_KEY, TENANTS_KEY, register_temporary_upload
+from core.redis_client import get_redis
+from products import placeholder_images
+from products.catalogue.models import Category, Division
+from products.models import Product, ProductImage
+from products.utils import link_temporary_images
+
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'image-linking-tests',
+    }
+}
+
+
+class LinkTemporaryImagesTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            CACHES=LOCMEM_CACHES,
+            MEDIA_ROOT=self.media_root,
+            DEFAULT_FILE_STORAGE='django.core.files.storage.FileSystemStorage',
+            REDIS_CLIENT_BACKEND='memory',
+        )
+        self.settings_override.enable()
+        caches['default'].clear()
+        division = Division.objects.create(name='Division')
+        category = Category.objects.create(name='Category', division=division)
+        self.product = Product.objects.create(name='Product', slug='product', category=category)
+        self.redis = get_redis()
+        self.redis.flushdb()
+        self.tenant = MagicMock(id=1, client_id=1, company_id=1)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def add_upload(self, temp_id, content):
+        path = os.path.join(self.media_root, f'{temp_id}.jpg')
+        with open(path, 'wb') as f:
+            f.write(content)
+        register_temporary_upload(self.redis, temp_id, {
+            'file_path': path, 'original_filename': f'{temp_id}.jpg', 'mime_type': 'image/jpeg', 'tenant_id': 1
+        })
+        return path
+
+    def link(self, temp_image_data):
+        return link_temporary_images(
+            owner_instance=self.product, owner_type='product',
+            temp_image_data=temp_image_data, tenant=self.tenant,
+        )
+
+    def test_batch_is_linked_with_a_bounded_number_of_queries(self):
+        paths = [self.add_upload(f'temp-{i}', f'image {i}'.encode()) for i in range(20)]
+        self.add_upload('temp-copy', b'image 0')
+        data = [{'id': f'temp-{i}', 'sort_order': i} for i in range(20)] + [{'id': 'temp-copy'}]
+
+        with patch('products.utils.queue_derivatives'), self.assertNumQueries(9):
+            images = self.link(data)
+
+        self.assertEqual(len(images), 21)
+        self.assertEqual(ImageBlob.objects.count(), 20)
+        self.assertEqual(ImageBlob.objects.get(pk=images[0].blob_id).ref_count, 2)
+        self.assertEqual(images[0].image.name, images[20].image.name)
+        self.assertFalse(any(os.path.exists(path) for path in paths))
+        # Only the registry of tenants with uploads is left
+        self.assertEqual(self.redis.keys(), [TENANTS_KEY])
+        self.assertEqual(self.redis.zrangebyscore(INDEX_KEY, '-inf', '+inf'), [])
+
+    def test_default_image_rules(self):
+        self.add_upload('first', b'first')
+        self.add_upload('second', b'second')
+
+        images = self.link([{'id': 'first'}, {'id': 'second'}])
+        self.assertEqual([image.is_default for image in images], [True, False])
+
+        self.add_upload('third', b'third')
+        self.add_upload('fourth', b'fourth')
+        images = self.link([{'id': 'third', 'is_default': True}, {'id': 'fourth', 'is_default': True}])
+
+        # The last image flagged as default wins
+        default = ProductImage.objects.get(product=self.product, is_default=True)
+        self.assertEqual(default, images[1])
+
+    def test_uploads_without_metadata_create_records_without_files(self):
+        images = self.link([{'id': 'unknown', 'alt_text': 'Missing'}])
+
+        self.assertEqual(len(images), 1)
+        self.assertFalse(images[0].image)
+        self.assertTrue(images[0].is_default)
+
+    @override_settings(PRODUCT_PLACEHOLDER_SHARED=True)
+    def test_uploads_without_metadata_share_the_placeholder(self):
+        placeholder_images._shared_placeholders.clear()
+        self.addCleanup(placeholder_images._shared_placeholders.clear)
+
+        self.add_upload('temp-real', b'real image')
+
+        with patch('products.utils.queue_derivatives') as queue_derivatives:
+            images = self.link([{'id': 'unknown-1'}, {'id': 'unknown-2'}, {'id': 'temp-real'}])
+
+        self.assertEqual({image.image.name for image in images[:2]}, {'placeholders/800x600.jpg'})
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'placeholders')), ['800x600.jpg'])
+        # Only the uploaded image gets derivatives of its own
+        self.assertEqual(list(queue_derivatives.call_args[0][0]), [images[2].id])
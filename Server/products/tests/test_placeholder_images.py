@@ -0,0 +1,61 @@
+"""
+Tests for placeholder image rendering.
+"""
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from django.core.files.storage import default_storage
+from django.test import SimpleTestCase, override_settings
+
+from products import placeholder_images
+from products.placeholder_images import (
+    generate_placeholder_image, get_placeholder_for_product, get_shared_placeholder, render_placeholder
+)
+
+
+class PlaceholderImageTests(SimpleTestCase):
+    def setUp(self):
+        render_placeholder.cache_clear()
+        placeholder_images._shared_placeholders.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            DEFAULT_FILE_STORAGE='django.core.files.storage.FileSystemStorage',
+        )
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        placeholder_images._shared_placeholders.clear()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_placeholders_are_rendered_once(self):
+        first = get_placeholder_for_product(7, 1, 200, 100)
+
+        with patch('products.placeholder_images.Image.new') as new_image:
+            second = get_placeholder_for_product(7, 1, 200, 100)
+
+        new_image.assert_not_called()
+        self.assertIsNot(first, second)
+        self.assertEqual(first.read(), second.read())
+        self.assertEqual(render_placeholder.cache_info().hits, 1)
+
+    def test_distinct_text_colors_and_sizes_are_distinct_entries(self):
+        generate_placeholder_image(200, 100, 'A', (1, 2, 3))
+        generate_placeholder_image(200, 100, 'B', (1, 2, 3))
+        generate_placeholder_image(200, 100, 'A', [1, 2, 4])
+        generate_placeholder_image(201, 100, 'A', (1, 2, 3))
+
+        self.assertEqual(render_placeholder.cache_info().currsize, 4)
+
+    def test_shared_placeholders_are_stored_once(self):
+        first = get_shared_placeholder(200, 100)
+        with patch('products.placeholder_images.default_storage') as storage:
+            second = get_shared_placeholder(200, 100)
+
+        storage.exists.assert_not_called()
+        storage.save.assert_not_called()
+        self.assertEqual(first, 'placeholders/200x100.jpg')
+        self.assertEqual(second, first)
+        self.assertTrue(default_storage.exists('placeholders/200x100.jpg'))
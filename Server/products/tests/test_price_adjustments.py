@@ -0,0 +1,155 @@
+"""
+Tests for set-based bulk price adjustments.
+"""
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from attributes.models import Attribute, AttributeOption
+from core.conditional import get_change_counters
+from core.jobs import execute_job
+from core.models.jobs import BulkJob, JobStatus
+from products.catalogue.models import Category, Division
+from products.models import PRODUCTS_CHANGE_SCOPE, Product, ProductAttributeValue, ProductVariant
+
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'price-adjustment-tests',
+    }
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES, REDIS_CLIENT_BACKEND='memory')
+class PriceAdjustmentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        division = Division.objects.create(name='Home')
+        cls.kitchen = Category.objects.create(name='Kitchen', division=division)
+        cls.garden = Category.objects.create(name='Garden', division=division)
+        cls.knife = Product.objects.create(
+            name='Knife', slug='knife', category=cls.kitchen, product_type='PARENT',
+            display_price=Decimal('10.00'), compare_at_price=Decimal('20.00'), tags=['summer', 'steel'],
+        )
+        cls.variant = ProductVariant.objects.create(product=cls.knife, sku='KNIFE-RED', display_price='12.00')
+        cls.pan = Product.objects.create(name='Pan', slug='pan', category=cls.kitchen, display_price=Decimal('25.50'))
+        cls.hose = Product.objects.create(name='Hose', slug='hose', category=cls.garden, display_price=Decimal('8.00'))
+        cls.unpriced = Product.objects.create(name='Rake', slug='rake', category=cls.garden)
+        cls.foreign = Product.objects.create(
+            name='Foreign', slug='foreign', category=cls.kitchen, display_price=Decimal('10.00'), client_id=2
+        )
+
+        colour = Attribute.objects.create(name='Colour', code='colour', label='Colour', data_type='SELECT')
+        cls.green = AttributeOption.objects.create(attribute=colour, option_label='Green', option_value='green')
+        ProductAttributeValue.objects.create(product=cls.hose, attribute=colour, value_option=cls.green)
+
+    def setUp(self):
+        caches['default'].clear()
+        self.client = APIClient()
+
+    def adjust(self, **data):
+        return self.client.post(reverse('product-price-adjustment'), data, format='json')
+
+    def prices(self):
+        return {
+            product.slug: (product.display_price, product.compare_at_price)
+            for product in Product.objects.filter(client_id=1)
+        }
+
+    def test_percentage_adjustment_of_category_with_variants(self):
+        counter = get_change_counters([PRODUCTS_CHANGE_SCOPE], 1)
+        before = self.knife.updated_at
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.adjust(mode='percent', value='-10', scope={'categories': [self.kitchen.id]})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'products': 2, 'variants': 1})
+        prices = self.prices()
+        self.assertEqual(prices['knife'], (Decimal('9.00'), Decimal('20.00')))
+        self.assertEqual(prices['pan'], (Decimal('22.95'), None))
+        self.assertEqual(prices['hose'], (Decimal('8.00'), None))
+        self.assertEqual(ProductVariant.objects.get().display_price, Decimal('10.80'))
+        self.assertEqual(Product.objects.get(pk=self.foreign.pk).display_price, Decimal('10.00'))
+        self.assertGreater(Product.objects.get(pk=self.knife.pk).updated_at, before)
+        self.assertNotEqual(get_change_counters([PRODUCTS_CHANGE_SCOPE], 1), counter)
+
+    def test_rounding_to_price_ending(self):
+        self.adjust(
+            mode='amount', value='1', include_variants=False, scope={'categories': [self.kitchen.id]},
+            rounding={'increment': '1', 'method': 'up', 'ending': '0.99'},
+        )
+
+        prices = self.prices()
+        self.assertEqual(prices['knife'][0], Decimal('11.99'))
+        self.assertEqual(prices['pan'][0], Decimal('26.99'))
+        self.assertEqual(ProductVariant.objects.get().display_price, Decimal('12.00'))
+
+    def test_minimum_price_and_null_prices(self):
+        response = self.adjust(mode='amount', value='-9', min_price='0.50', scope={'categories': [self.garden.id]})
+
+        self.assertEqual(response.data['products'], 1)
+        prices = self.prices()
+        self.assertEqual(prices['hose'][0], Decimal('0.50'))
+        self.assertIsNone(prices['rake'][0])
+
+    def test_scope_by_tag_and_attribute_option(self):
+        self.adjust(mode='amount', value='5', scope={'tags': ['summer']})
+        self.adjust(mode='amount', value='5', scope={'attribute_options': [self.green.id]})
+
+        prices = self.prices()
+        self.assertEqual((prices['knife'][0], prices['pan'][0], prices['hose'][0]),
+                         (Decimal('15.00'), Decimal('25.50'), Decimal('13.00')))
+
+    def test_compare_at_price_only(self):
+        response = self.adjust(mode='percent', value='50', fields=['compare_at_price'], scope={'all': True})
+
+        self.assertEqual(response.data, {'products': 1, 'variants': 0})
+        self.assertEqual(self.prices()['knife'], (Decimal('10.00'), Decimal('30.00')))
+        self.assertEqual(ProductVariant.objects.get().display_price, Decimal('12.00'))
+
+    def test_dry_run_previews_without_writing(self):
+        response = self.adjust(
+            mode='percent', value='10', dry_run=True, scope={'all': True},
+            fields=['display_price', 'compare_at_price'],
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['products'], response.data['variants']), (4, 1))
+        display = response.data['fields']['products.display_price']
+        self.assertEqual((display['rows'], display['changed']), (3, 3))
+        self.assertEqual(display['before']['min'], '8.00')
+        self.assertEqual(display['after']['max'], '28.05')
+        self.assertEqual(display['before']['total'], '43.50')
+        self.assertEqual(display['after']['quantiles']['p50'], '11.00')
+        self.assertEqual(response.data['fields']['variants.display_price']['after']['total'], '13.20')
+        self.assertEqual(response.data['fields']['products.compare_at_price']['rows'], 1)
+        self.assertNotIn('variants.compare_at_price', response.data['fields'])
+        self.assertEqual(self.prices()['knife'][0], Decimal('10.00'))
+
+    @override_settings(BULK_JOB_SYNC_LIMIT=1, BULK_JOB_CHUNK_SIZE=1)
+    def test_large_scope_runs_as_job_in_chunks(self):
+        with mock.patch('core.tasks.run_bulk_job.delay', side_effect=execute_job):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.adjust(mode='percent', value='100', scope={'categories': [self.kitchen.id]})
+
+        self.assertEqual(response.status_code, 202)
+        job = BulkJob.objects.get()
+        self.assertEqual(job.status, JobStatus.SUCCEEDED)
+        self.assertEqual(job.total_chunks, 2)
+        self.assertEqual(job.result, {'products': 2, 'variants': 1})
+        self.assertEqual(self.prices()['pan'][0], Decimal('51.00'))
+
+    def test_validation(self):
+        for data in (
+            {'mode': 'percent', 'value': '5', 'scope': {}},
+            {'mode': 'percent', 'value': '-100', 'scope': {'all': True}},
+            {'mode': 'amount', 'value': '1', 'scope': {'all': True}, 'rounding': {'increment': '1', 'ending': '1'}},
+            {'mode': 'double', 'value': '1', 'scope': {'all': True}},
+        ):
+            with self.subTest(data=data):
+                self.assertEqual(self.adjust(**data).status_code, 400)
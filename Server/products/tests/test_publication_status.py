@@ -0,0 +1,139 @@
+"""
+Tests for set-based bulk publication status changes.
+"""
+from unittest import mock
+
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.conditional import get_change_counters
+from core.jobs import execute_job
+from core.models.jobs import BulkJob, JobStatus
+from products.bulk import bulk_set_publication_status, publication_status_changed
+from products.catalogue.models import Category, Division
+from products.models import PRODUCTS_CHANGE_SCOPE, Product, PublicationStatusChange
+
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'publication-status-tests',
+    }
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES, REDIS_CLIENT_BACKEND='memory')
+class BulkPublicationStatusTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        division = Division.objects.create(name='Home')
+        cls.category = Category.objects.create(name='Kitchen', division=division)
+        cls.other_category = Category.objects.create(name='Bath', division=division)
+        cls.drafts = [
+            Product.objects.create(name=f'Draft {i}', slug=f'draft-{i}', category=cls.category) for i in range(3)
+        ]
+        cls.active = Product.objects.create(
+            name='Active', slug='active', category=cls.category, publication_status='ACTIVE'
+        )
+        cls.archived = Product.objects.create(
+            name='Archived', slug='archived', category=cls.other_category, publication_status='ARCHIVED'
+        )
+        cls.foreign = Product.objects.create(name='Foreign', slug='foreign', category=cls.category, client_id=2)
+
+    def setUp(self):
+        caches['default'].clear()
+        self.client = APIClient()
+
+    def ids(self, *products):
+        return [product.id for product in products]
+
+    def test_moves_batch_with_one_update_and_audit_record(self):
+        counter = get_change_counters([PRODUCTS_CHANGE_SCOPE], 1)
+        before = self.drafts[0].updated_at
+        products = [*self.drafts, self.active, self.archived, self.foreign]
+        received = []
+
+        def receiver(**kwargs):
+            received.append(kwargs)
+        publication_status_changed.connect(receiver)
+        self.addCleanup(publication_status_changed.disconnect, receiver)
+
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as ctx:
+            result = bulk_set_publication_status(1, self.ids(*products), 'ACTIVE', selection={'ids': 'test'})
+
+        statements = [query['sql'] for query in ctx.captured_queries if 'SAVEPOINT' not in query['sql']]
+        self.assertEqual(len(statements), 2)
+        self.assertIn('UPDATE', statements[0])
+        self.assertIn('INSERT', statements[1])
+
+        self.assertEqual(result['matched'], 5)
+        self.assertEqual((result['updated'], result['unchanged'], result['skipped']), (4, 1, 0))
+        self.assertEqual(result['previous'], {'DRAFT': 3, 'ARCHIVED': 1})
+        self.assertEqual(
+            set(Product.objects.filter(client_id=1).values_list('publication_status', flat=True)), {'ACTIVE'}
+        )
+        self.assertEqual(Product.objects.get(pk=self.foreign.pk).publication_status, 'DRAFT')
+        self.assertGreater(Product.objects.get(pk=self.drafts[0].pk).updated_at, before)
+
+        audit = PublicationStatusChange.objects.get()
+        self.assertEqual(audit.pk, result['audit_id'])
+        self.assertEqual(audit.product_ids, sorted(self.ids(*self.drafts, self.archived)))
+        self.assertEqual((audit.product_count, audit.status, audit.selection), (4, 'ACTIVE', {'ids': 'test'}))
+        self.assertNotEqual(get_change_counters([PRODUCTS_CHANGE_SCOPE], 1), counter)
+        self.assertEqual(len(received), 1)
+        self.assertEqual(received[0]['product_ids'], audit.product_ids)
+
+    def test_from_status_guards_the_update(self):
+        result = bulk_set_publication_status(
+            1, Product.objects.filter(client_id=1), 'ARCHIVED', from_statuses=['DRAFT']
+        )
+
+        self.assertEqual((result['matched'], result['updated'], result['unchanged'], result['skipped']), (5, 3, 1, 1))
+        self.assertEqual(Product.objects.get(pk=self.active.pk).publication_status, 'ACTIVE')
+
+    def test_nothing_to_change_writes_no_audit_record(self):
+        counter = get_change_counters([PRODUCTS_CHANGE_SCOPE], 1)
+
+        result = bulk_set_publication_status(1, self.ids(self.active), 'ACTIVE')
+
+        self.assertEqual((result['updated'], result['unchanged'], result['audit_id']), (0, 1, None))
+        self.assertFalse(PublicationStatusChange.objects.exists())
+        self.assertEqual(get_change_counters([PRODUCTS_CHANGE_SCOPE], 1), counter)
+
+    def test_endpoint_with_filters(self):
+        response = self.client.post(reverse('product-bulk-publication-status'), {
+            'status': 'DRAFT', 'filters': {'category': self.other_category.id}
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(response.data['previous'], {'ARCHIVED': 1})
+        self.assertEqual(
+            PublicationStatusChange.objects.get().selection, {'filters': {'category': self.other_category.id}}
+        )
+
+    def test_endpoint_validation(self):
+        url = reverse('product-bulk-publication-status')
+        for data in ({'status': 'ACTIVE'}, {'status': 'ACTIVE', 'ids': [1], 'filters': {}},
+                     {'status': 'LIVE', 'ids': [1]}, {'status': 'ACTIVE', 'filters': {'publication_status': 'NOPE'}}):
+            with self.subTest(data=data):
+                self.assertEqual(self.client.post(url, data, format='json').status_code, 400)
+
+    @override_settings(BULK_JOB_SYNC_LIMIT=2, BULK_JOB_CHUNK_SIZE=2)
+    def test_large_selection_runs_as_job_in_batches(self):
+        with mock.patch('core.tasks.run_bulk_job.delay', side_effect=execute_job):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse('product-bulk-publication-status'), {
+                    'status': 'ARCHIVED', 'ids': self.ids(*self.drafts, self.active), 'from_status': ['DRAFT']
+                }, format='json')
+
+        self.assertEqual(response.status_code, 202)
+        job = BulkJob.objects.get()
+        self.assertEqual(job.status, JobStatus.SUCCEEDED)
+        self.assertEqual((job.result['updated'], job.result['skipped']), (3, 1))
+        self.assertEqual(job.result['previous'], {'DRAFT': 3})
+        self.assertEqual(len(job.result['audit_ids']), 2)
+        self.assertEqual(PublicationStatusChange.objects.filter(job=job).count(), 2)
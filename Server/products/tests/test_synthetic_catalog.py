@@ -0,0 +1,106 @@
+"""
+Tests for the synthetic catalog generator.
+"""
+import io
+
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from attributes.models import Attribute, AttributeOption
+from core.instrumentation import QueryRecorder
+from products.models import KitComponent, Product, ProductAttributeValue, ProductImage, ProductVariant
+from products.synthetic import CatalogSpec, generate_catalog, spread_range
+from tenants.models import Domain
+
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'synthetic-catalog-tests',
+    }
+}
+
+SPEC = CatalogSpec(
+    products=60, variants=100, variants_per_product=5, kits=6, attributes=12,
+    options_per_attribute=4, images_per_product=2, attribute_values=3, kit_components=2,
+)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class GenerateCatalogTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+
+    def test_generates_the_requested_catalog(self):
+        counts = generate_catalog(7, SPEC, batch_size=25, image_name='placeholders/800x600.jpg')
+
+        self.assertEqual(counts, {
+            'products': 60, 'variants': 100, 'kits': 6, 'images': 120,
+            'attribute_values': 180, 'kit_components': 12,
+        })
+        products = Product.objects.filter(client_id=7)
+        self.assertEqual(products.filter(product_type='PARENT').count(), 20)
+        self.assertEqual(products.filter(product_type='KIT').count(), 6)
+        self.assertEqual(ProductVariant.objects.filter(client_id=7).count(), 100)
+        self.assertEqual(Attribute.objects.filter(client_id=7).count(), 12)
+        self.assertEqual(AttributeOption.objects.filter(client_id=7).count(), 48)
+        self.assertEqual(ProductAttributeValue.objects.filter(client_id=7).count(), 180)
+        self.assertEqual(KitComponent.objects.filter(client_id=7).count(), 12)
+        self.assertEqual(ProductImage.objects.filter(client_id=7, is_default=True).count(), 60)
+
+        # Each variant has one option of each variant-defining attribute, all distinct per product
+        variant = ProductVariant.objects.filter(client_id=7).first()
+        self.assertEqual(
+            set(variant.options.values_list('attribute_id', flat=True)),
+            set(variant.product.variant_defining_attributes.values_list('id', flat=True)),
+        )
+        combinations = [
+            tuple(sorted(sibling.options.values_list('id', flat=True)))
+            for sibling in variant.product.variants.all()
+        ]
+        self.assertEqual(len(combinations), len(set(combinations)))
+
+    def test_batches_are_bulk_inserted(self):
+        generate_catalog(7, SPEC, batch_size=60)
+
+        # Reference data already exists; one batch costs a fixed number of queries
+        with QueryRecorder() as recorder:
+            generate_catalog(7, SPEC, batch_size=60)
+        with QueryRecorder() as larger:
+            generate_catalog(7, CatalogSpec(**{**vars(SPEC), 'products': 120, 'variants': 200}), batch_size=120)
+
+        self.assertEqual(larger.count, recorder.count)
+
+    def test_runs_are_additive_and_deterministic(self):
+        generate_catalog(7, SPEC, seed=3)
+        generate_catalog(7, SPEC, seed=3)
+
+        self.assertEqual(Product.objects.filter(client_id=7).count(), 120)
+        self.assertEqual(Attribute.objects.filter(client_id=7).count(), 12)
+        first = Product.objects.get(client_id=7, slug='syn-0000000')
+        self.assertTrue(first.name.endswith(' 0'))
+
+    def test_spread_range_splits_exactly(self):
+        shares = [spread_range(7, 10, start, start + 3) for start in range(0, 9, 3)] + [spread_range(7, 10, 9, 10)]
+
+        self.assertEqual(sum(shares), 7)
+        self.assertLessEqual(max(shares) - min(shares[:3]), 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class GenerateSyntheticCatalogCommandTests(TestCase):
+    def test_creates_tenants_with_domains(self):
+        out = io.StringIO()
+
+        call_command(
+            'generate_synthetic_catalog', '--tenants=2', '--products=10', '--variants=20',
+            '--attributes=5', '--kits=1', '--no-image-files', '--batch-size=4', stdout=out,
+        )
+
+        domains = Domain.objects.filter(domain__in=['synthetic-1.localhost', 'synthetic-2.localhost'])
+        self.assertEqual(domains.count(), 2)
+        client_ids = {domain.tenant.client_id for domain in domains}
+        self.assertEqual(len(client_ids), 2)
+        for client_id in client_ids:
+            self.assertEqual(Product.objects.filter(client_id=client_id).count(), 10)
+        self.assertIn('10 products, 20 variants', out.getvalue())
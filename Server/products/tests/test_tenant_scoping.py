@@ -0,0 +1,55 @@
+"""
+Tests for scoping product writes and reads by the client of a routed tenant.
+"""
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from products.catalogue.models import Category, Division, ProductStatus, UnitOfMeasure
+from products.models import Product
+from tenants import routing
+from tenants.models import Domain, Tenant
+
+LOCMEM_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tenant-scoping-tests',
+    }
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES, REDIS_CLIENT_BACKEND='memory', ALLOWED_HOSTS=['.example.com'])
+class TenantScopingTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        routing.resolver.invalidate()
+        self.addCleanup(routing.resolver.invalidate)
+        # The client is not the tenant's primary key
+        self.tenant = Tenant.objects.create(name='Acme', schema_name='acme', client_id=1000)
+        Domain.objects.create(domain='acme.example.com', tenant=self.tenant)
+        division = Division.objects.create(name='Home')
+        self.category = Category.objects.create(name='Kitchen', division=division, client_id=self.tenant.client_id)
+        self.uom = UnitOfMeasure.objects.create(name='Pieces', symbol='PCS', client_id=self.tenant.client_id)
+        self.status = ProductStatus.objects.create(name='Active', client_id=self.tenant.client_id)
+        self.client = APIClient(HTTP_HOST='acme.example.com')
+
+    def test_created_product_is_read_back_on_the_same_host(self):
+        response = self.client.post(
+            reverse('product-list'), {
+                'name': 'Knife', 'sku': 'KNIFE', 'category': self.category.id, 'uom': self.uom.id,
+                'productstatus': self.status.id,
+            },
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        product = Product.objects.get(pk=response.data['id'])
+        self.assertEqual(product.client_id, self.tenant.client_id)
+
+        response = self.client.get(reverse('product-detail', args=[product.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['name'], 'Knife')
+
+        response = APIClient(HTTP_HOST='other.example.com').get(reverse('product-detail', args=[product.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -13,15 +13,22 @@ import shutil
 from django.utils.text import slugify
 from django.db import transaction
 from rest_framework import serializers
-import redis
 from django.conf import settings
 import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from django.core.files import File
 from django.core.files.storage import default_storage
+from django.utils import timezone
 
-from products.models import Product, ProductVariant, ProductImage
-from products.placeholder_images import get_placeholder_for_product
+from products.models import Product, ProductVariant, ProductImage, touch_product
+from products.placeholder_images import get_shared_placeholder
+from assets.blobs import adjust_ref_counts, register_blobs, store_blob_file
+from assets.temp_uploads import unregister_temporary_uploads
+from core.redis_client import get_redis
+from core.utils import get_tenant_client_id
+from products.derivatives import queue_derivatives
 
 logger = logging.getLogger(__name__)
 
@@ -83,8 +90,9 @@ def generate_unique_sku(tenant, product_data=None):
     generated_sku = base_sku
     
     # Keep checking and modifying until we find a unique SKU
-    while (Product.objects.filter(client_id=tenant.id, sku=generated_sku).exists() or 
-           ProductVariant.objects.filter(client_id=tenant.id, sku=generated_sku).exists()):
+    client_id = get_tenant_client_id(tenant)
+    while (Product.objects.filter(client_id=client_id, sku=generated_sku).exists() or 
+           ProductVariant.objects.filter(client_id=client_id, sku=generated_sku).exists()):
         # If the SKU already has a counter suffix, increment it
         if re.search(r'-\d+$', generated_sku):
             generated_sku = re.sub(r'-\d+$', f'-{counter}', generated_sku)
@@ -97,23 +105,148 @@ def generate_unique_sku(tenant, product_data=None):
 
 
 @contextmanager
-def cleanup_context(temp_file_path: str, redis_client, redis_key: str):
+def cleanup_context(temp_file_path: str, redis_key: str, redis_client=None):
     """Context manager to ensure cleanup of temporary files and Redis keys."""
+    redis_client = redis_client or get_redis()
     try:
         yield
     finally:
         try:
             if os.path.exists(temp_file_path):
                 os.remove(temp_file_path)
-                logger.debug(f"Cleaned up temporary file: {temp_file_path}")
+                logger.debug("Cleaned up temporary file: %s", temp_file_path)
         except OSError as e:
-            logger.warning(f"Failed to remove temporary file {temp_file_path}: {e}")
+            logger.warning("Failed to remove temporary file %s: %s", temp_file_path, e)
         
         try:
             redis_client.delete(redis_key)
-            logger.debug(f"Cleaned up Redis key: {redis_key}")
+            logger.debug("Cleaned up Redis key: %s", redis_key)
         except Exception as e:
-            logger.warning(f"Failed to delete Redis key {redis_key}: {e}")
+            logger.warning("Failed to delete Redis key %s: %s", redis_key, e)
+
+
+def get_temporary_upload_metadata(redis_client, temp_ids):
+    """
+    Load the metadata stored for several temporary uploads with one MGET.
+    
+    Args:
+        redis_client: Redis client holding ``temp_upload:{temp_id}`` keys
+        temp_ids: The temporary upload IDs
+        
+    Returns:
+        dict: {temp_id: metadata} for the uploads whose metadata is available
+    """
+    temp_ids = list(dict.fromkeys(temp_ids))
+    if not temp_ids:
+        return {}
+    try:
+        values = redis_client.mget([f"temp_upload:{temp_id}" for temp_id in temp_ids])
+    except Exception as e:
+        logger.warning("Failed to load metadata for temporary uploads %s: %s", temp_ids, e)
+        return {}
+    
+    metadata_by_id = {}
+    for temp_id, raw in zip(temp_ids, values):
+        if not raw:
+            continue
+        try:
+            metadata_by_id[temp_id] = json.loads(raw)
+        except ValueError as e:
+            logger.warning("Invalid metadata for temporary upload %s: %s", temp_id, e)
+    return metadata_by_id
+
+
+def discard_temporary_uploads(redis_client, metadata_by_id):
+    """
+    Delete temporary uploads' files and metadata once their content has been stored.
+    
+    Args:
+        redis_client: Redis client holding the metadata
+        metadata_by_id: {temp_id: metadata} of the uploads to discard
+    """
+    if not metadata_by_id:
+        return
+    for metadata in metadata_by_id.values():
+        file_path = metadata.get('file_path')
+        try:
+            if file_path and os.path.exists(file_path):
+                os.remove(file_path)
+        except OSError as e:
+            logger.warning("Failed to remove temporary file %s: %s", file_path, e)
+    try:
+        unregister_temporary_uploads(redis_client, metadata_by_id)
+    except Exception as e:
+        logger.warning("Failed to delete Redis keys for temporary uploads %s: %s", list(metadata_by_id), e)
+
+
+def resolve_temporary_blobs(metadata_by_id):
+    """
+    Return the content-addressed blobs for a batch of temporary uploads.
+    
+    Uploads whose content was already stored carry the blob's hash and need no
+    file at all; they are looked up with a single query. The remaining files
+    are uploaded to storage concurrently by a bounded thread pool
+    (PRODUCT_IMAGE_LINK_WORKERS), each distinct content once, and their rows
+    are created here afterwards so no database work happens in the threads.
+    
+    Args:
+        metadata_by_id: {temp_id: metadata}
+        
+    Returns:
+        dict: {temp_id: ImageBlob} for the uploads that have usable content
+    """
+    from assets.models import ImageBlob
+    
+    hashes = {metadata['sha256'].lower() for metadata in metadata_by_id.values() if metadata.get('sha256')}
+    existing = {blob.sha256: blob for blob in ImageBlob.objects.filter(sha256__in=hashes)} if hashes else {}
+    
+    blobs = {}
+    uploads = {}
+    for temp_id, metadata in metadata_by_id.items():
+        sha256 = (metadata.get('sha256') or '').lower()
+        if sha256 in existing:
+            blobs[temp_id] = existing[sha256]
+            continue
+        file_path = metadata.get('file_path')
+        if not file_path or not os.path.exists(file_path):
+            continue
+        # The same content twice in one batch is uploaded once
+        uploads.setdefault(sha256 or file_path, []).append(temp_id)
+    
+    if not uploads:
+        return blobs
+    
+    def upload(temp_id):
+        metadata = metadata_by_id[temp_id]
+        return store_blob_file(
+            file_path=metadata['file_path'],
+            filename=metadata.get('original_filename') or metadata['file_path'],
+            sha256=metadata.get('sha256'),
+        )
+    
+    workers = max(1, min(getattr(settings, 'PRODUCT_IMAGE_LINK_WORKERS', 8), len(uploads)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(upload, temp_ids[0]): temp_ids for temp_ids in uploads.values()}
+    
+    stored = {}
+    for future, temp_ids in futures.items():
+        try:
+            # Different files may turn out to have the same content
+            stored.setdefault(future.result(), []).extend(temp_ids)
+        except Exception as e:
+            logger.error("Failed to store temporary uploads %s: %s", temp_ids, e)
+    
+    registered = register_blobs(
+        (sha256, saved_name, size_bytes,
+         metadata_by_id[temp_ids[0]].get('mime_type') or metadata_by_id[temp_ids[0]].get('content_type') or '')
+        for (sha256, saved_name, size_bytes), temp_ids in stored.items()
+        if sha256 not in existing
+    )
+    existing.update(registered)
+    for (sha256, _, _), temp_ids in stored.items():
+        for temp_id in temp_ids:
+            blobs[temp_id] = existing[sha256]
+    return blobs
 
 
 def link_temporary_images(*, owner_instance, owner_type: str, temp_image_data: list, tenant, redis_client=None):
@@ -121,16 +254,20 @@ def link_temporary_images(*, owner_instance, owner_type: str, temp_image_data: l
     Link temporary images to a product or variant.
     
     This function creates ProductImage instances linked to the specified owner (product or variant).
-    In development mode, it creates records without actual image files.
-    In production, it would process temporary image files and upload them to storage.
+    The whole batch is handled at once: metadata is read with one MGET, new
+    content is uploaded to storage concurrently, the rows are created with a
+    single bulk insert and the default image rules are applied with one update.
+    Images without metadata are created as records without image files, or
+    referencing the shared placeholder when PRODUCT_PLACEHOLDER_SHARED is set.
     
     Args:
         owner_instance: The product or variant instance to link images to
         owner_type: Either 'product' or 'variant'
         temp_image_data: List of dictionaries with temp image metadata
             Format: [{'id': temp_id, 'alt_text': '...', 'sort_order': 0, 'is_default': False}, ...]
-        tenant: The tenant object
-        redis_client: Optional Redis client instance (for testing)
+        tenant: The tenant (or a client ID) the images belong to
+        redis_client: Redis client holding the temporary upload metadata
+            (the shared client by default)
         
     Returns:
         list: List of created ProductImage instances
@@ -138,60 +275,76 @@ def link_temporary_images(*, owner_instance, owner_type: str, temp_image_data: l
     Raises:
         ValidationError: If validation fails
     """
-    created_images = []
-    
-    # Debug logging
-    logger.info(f"Starting link_temporary_images with {len(temp_image_data)} images")
-    logger.info(f"Tenant: {tenant}, Tenant ID: {tenant.id if hasattr(tenant, 'id') else 'No ID'}")
-    logger.info(f"Owner instance: {owner_instance}, Owner type: {owner_type}")
+    logger.info("Starting link_temporary_images with %s images for %s %s", len(temp_image_data), owner_type, owner_instance.id)
     
     if owner_type not in ('product', 'variant'):
         raise serializers.ValidationError("owner_type must be either 'product' or 'variant'")
+    if not temp_image_data:
+        return []
     
+    redis_client = redis_client or get_redis()
+    client_id = get_tenant_client_id(tenant)
+    owner_filter = {'client_id': client_id, owner_type: owner_instance}
+    
+    # Reference the stored content, uploading only files whose content is new
+    metadata_by_id = get_temporary_upload_metadata(redis_client, [img_data['id'] for img_data in temp_image_data])
+    blobs = resolve_temporary_blobs(metadata_by_id)
+    
+    shared_placeholder = getattr(settings, 'PRODUCT_PLACEHOLDER_SHARED', False)
+    images = []
     for img_data in temp_image_data:
         temp_id = img_data['id']
-        logger.info(f"Processing image with ID: {temp_id}")
-        
-        try:
-            # Create ProductImage instance with the correct structure
-            logger.info(f"Creating ProductImage with client_id={tenant.id}, owner_type={owner_type}")
-            
-            # Create the image instance with common fields
-            image_instance = ProductImage(
-                client_id=tenant.id,
-                company_id=getattr(tenant, 'company_id', 1),
-                alt_text=img_data.get('alt_text', ''),
-                sort_order=img_data.get('sort_order', 0),
-                is_default=img_data.get('is_default', False)
-            )
-            
-            # Set the appropriate relationship based on owner_type
-            if owner_type == 'product':
-                image_instance.product = owner_instance
-                image_instance.variant = None
-                logger.info(f"Linking image to product ID: {owner_instance.id}")
-            elif owner_type == 'variant':
-                image_instance.variant = owner_instance
-                image_instance.product = None
-                logger.info(f"Linking image to variant ID: {owner_instance.id}")
-            else:
-                # This should never happen due to the validation above
-                logger.error(f"Invalid owner_type '{owner_type}' passed to link_temporary_images")
-                raise serializers.ValidationError(f"Invalid owner_type: {owner_type}")
-            
-            # Log the state before saving
-            logger.info(f"Image state before save: product_id={getattr(image_instance.product, 'id', None)}, variant_id={getattr(image_instance.variant, 'id', None)}")
-            
-            # Save the image instance
-            image_instance.save()
-            logger.info(f"Successfully saved ProductImage with ID: {image_instance.id}")
-            
-            created_images.append(image_instance)
-            
-        except Exception as e:
-            logger.error(f"Failed to process temporary image {temp_id}: {str(e)}")
-            logger.exception("Exception details:")
+        if temp_id in metadata_by_id and temp_id not in blobs:
+            logger.error("Failed to process temporary image %s: its file could not be stored", temp_id)
             continue
+        image = ProductImage(
+            client_id=client_id,
+            company_id=getattr(tenant, 'company_id', 1),
+            alt_text=img_data.get('alt_text', ''),
+            sort_order=img_data.get('sort_order', 0),
+            is_default=bool(img_data.get('is_default', False)),
+            **{owner_type: owner_instance}
+        )
+        if temp_id in blobs:
+            image.set_blob(blobs[temp_id])
+        elif shared_placeholder:
+            image.image = get_shared_placeholder()
+        images.append(image)
+    
+    if not images:
+        return []
+    
+    # Same outcome as saving one by one: the last image flagged as default wins,
+    # and the first image of an owner without images becomes the default
+    defaults = [image for image in images if image.is_default]
+    for image in defaults[:-1]:
+        image.is_default = False
+    
+    now = timezone.now()
+    with transaction.atomic():
+        if defaults:
+            ProductImage.objects.filter(is_default=True, **owner_filter).update(is_default=False, updated_at=now)
+        elif not ProductImage.objects.filter(**owner_filter).exists():
+            images[0].is_default = True
+        
+        created_images = ProductImage.objects.bulk_create(images)
+        
+        # bulk_create bypasses ProductImage.save() and its signals
+        adjust_ref_counts(Counter(image.blob_id for image in created_images))
+        for image in created_images:
+            image._loaded_blob_id = image.blob_id
+        touch_product(
+            client_id,
+            product_id=owner_instance.id if owner_type == 'product' else None,
+            variant_id=owner_instance.id if owner_type == 'variant' else None,
+        )
+    
+    # The content now lives in the blobs; drop the temporary copies and their metadata
+    discard_temporary_uploads(redis_client, {temp_id: metadata_by_id[temp_id] for temp_id in blobs})
+    
+    # Thumbnails and other renditions are generated in the background; images
+    # pointing at the shared placeholder have no content of their own to render
+    queue_derivatives(image.id for image in created_images if image.blob_id)
     
-    logger.info(f"Completed link_temporary_images, created {len(created_images)} images")
+    logger.info("Completed link_temporary_images, created %s images", len(created_images))
     return created_images
@@ -1,9 +1,12 @@
 from django.shortcuts import render
 from rest_framework import viewsets, status, filters
+from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.permissions import IsAdminUser
 from rest_framework.parsers import MultiPartParser, FormParser
 from django_filters.rest_framework import DjangoFilterBackend
+from django.conf import settings
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
 import os
@@ -11,28 +14,43 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-from core.viewsets import TenantModelViewSet
+from core.conditional import bump_change_counter
+from core.redis_client import get_redis
+from core.utils import get_request_client_id
+from core.views import start_bulk_job
+from core.viewsets import ConditionalGetMixin, TenantModelViewSet
 from django.utils.text import slugify
 from products.models import (
     Product, ProductImage, ProductVariant, KitComponent, 
-    PRODUCT_TYPE_CHOICES, PublicationStatus
+    PRODUCT_TYPE_CHOICES, PublicationStatus,
+    PRODUCTS_CHANGE_SCOPE, CATALOGUE_CHANGE_SCOPE
 )
 from products.serializers import (
     ProductSerializer, 
     ProductImageSerializer, ProductVariantSerializer,
-    KitComponentSerializer
+    KitComponentSerializer, BulkDeleteSerializer, BulkPublicationStatusSerializer,
+    PriceAdjustmentSerializer
 )
-from products.filters import ProductFilter
+from products.bulk import (
+    bulk_delete_products, bulk_delete_variants, bulk_delete_images, bulk_set_publication_status
+)
+from products.filters import ProductFilter, filter_products
+from products.price_adjustments import apply_adjustment, preview_adjustment, scoped_products
+from products.fast_serializers import FastProductSerializer
 
 
-class ProductViewSet(TenantModelViewSet):
+class ProductViewSet(ConditionalGetMixin, TenantModelViewSet):
     """
     ViewSet for managing products.
     
     This viewset provides CRUD operations for the Product model,
     including related attribute values and images.
+    
+    List and detail responses carry ETag validators; see ConditionalGetMixin.
     """
     serializer_class = ProductSerializer
+    change_scope = PRODUCTS_CHANGE_SCOPE
+    dependent_scopes = (CATALOGUE_CHANGE_SCOPE,)
     permission_classes = []  # Authentication temporarily disabled
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_class = ProductFilter
@@ -51,19 +69,19 @@ class ProductViewSet(TenantModelViewSet):
         """
         # For development/testing, use client_id filtering instead of tenant
         # In production, this would use proper tenant isolation
-        client_id = getattr(self.request, 'tenant', None)
+        client_id = get_request_client_id(self.request, default=None)
         
         if client_id is None:
             # Default to client_id=1 for development
             client_id = 1
-            logger.info(f"No tenant found in request, using default client_id={client_id}")
+            logger.debug("No tenant found in request, using default client_id=%s", client_id)
         
         # Base filtering using client_id
         queryset = Product.objects.filter(client_id=client_id)
         
         # Apply necessary select_related/prefetch_related for performance
         queryset = queryset.select_related(
-            'category', 'subcategory', 'productstatus', 'uom'
+            'category', 'subcategory', 'productstatus', 'uom', 'stock_rollup'
         ).prefetch_related(
             'images', 
             'attribute_values__attribute', 
@@ -73,9 +91,8 @@ class ProductViewSet(TenantModelViewSet):
             'variant_defining_attributes'
         )
         
-        # Log the query and count for debugging
-        logger.info(f"Product query: {queryset.query}")
-        logger.info(f"Product count: {queryset.count()}")
+        # Compiling the SQL is costly; it only happens when DEBUG is enabled
+        logger.debug("Product query: %s", queryset.query)
         
         return queryset
         
@@ -83,52 +100,175 @@ class ProductViewSet(TenantModelViewSet):
         """
         List all products for the tenant.
         
-        This method overrides the default list method to ensure proper pagination
-        and to add additional debugging information.
+        Uses FastProductSerializer, which produces the same output as
+        ProductSerializer without model instances, unless the
+        PRODUCT_FAST_READ_ENABLED setting is False.
         """
-        queryset = self.filter_queryset(self.get_queryset())
+        if not getattr(settings, 'PRODUCT_FAST_READ_ENABLED', True):
+            return super().list(request, *args, **kwargs)
+        return self.respond_conditionally(self.get_list_validators(), self.fast_list)
+    
+    def fast_list(self):
+        """
+        Build the list response with FastProductSerializer.
         
-        # Log the filtered queryset count
-        logger.info(f"Filtered product count: {queryset.count()}")
+        Filtering, ordering and pagination run on primary keys only; the
+        serializer then loads the rows for the current page.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        product_ids = queryset.select_related(None).prefetch_related(None).values_list('pk', flat=True)
+        serializer = FastProductSerializer(context={'request': self.request})
         
-        page = self.paginate_queryset(queryset)
+        page = self.paginate_queryset(product_ids)
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            logger.info(f"Returning {len(serializer.data)} products with pagination")
-            return self.get_paginated_response(serializer.data)
-            
-        serializer = self.get_serializer(queryset, many=True)
-        logger.info(f"Returning {len(serializer.data)} products without pagination")
-        return Response(serializer.data)
-
-    def get_serializer_context(self):
+            return self.get_paginated_response(serializer.serialize(page))
+        return Response(serializer.serialize(product_ids))
+    
+    @action(detail=False, methods=['post'], url_path='bulk-delete')
+    def bulk_delete(self, request):
         """
-        Add client information to the serializer context.
+        Delete many products in one request.
+        
+        POST /api/v1/products/bulk-delete/
+        
+        Request body: {"ids": [1, 2, 3]}
+        
+        Related images, variants, attribute values and kit components are
+        deleted with set-based SQL. Products still used as components of
+        other kits are not deleted and are reported as protected.
+        
+        More than BULK_JOB_SYNC_LIMIT IDs are deleted by a background job
+        (products.delete); the response is then 202 with the job's status.
         """
-        context = super().get_serializer_context()
+        serializer = BulkDeleteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
         
-        # Attempt to get client from request
-        try:
-            # First try to get client from request
-            client = self.request.tenant if hasattr(self.request, 'tenant') else None
-        except AttributeError:
-            client = None
-        
-        # If no client found, try to get from authentication
-        if not client and hasattr(self.request, 'user') and self.request.user.is_authenticated:
-            from tenants.models import Tenant
-            try:
-                client = Tenant.objects.filter(users=self.request.user).first()
-            except Exception:
-                client = None
+        ids = serializer.validated_data['ids']
+        if len(ids) > settings.BULK_JOB_SYNC_LIMIT:
+            return start_bulk_job(request, 'products.delete', {'ids': ids})
+        result = bulk_delete_products(get_request_client_id(request), ids)
+        return Response(result, status=status.HTTP_200_OK)
+    
+    @action(detail=False, methods=['post'], url_path='bulk-publication-status')
+    def bulk_publication_status(self, request):
+        """
+        Move many products to a publication status in one batch.
+        
+        POST /api/v1/products/bulk-publication-status/
+        
+        Request body: {"status": "ACTIVE", "ids": [1, 2, 3]}
+                   or {"status": "ARCHIVED", "filters": {"category": 4}, "from_status": ["DRAFT"]}
+        
+        Runs one guarded UPDATE and writes one audit record; see
+        products.bulk.bulk_set_publication_status. Responds with the affected
+        counts. Selections of more than BULK_JOB_SYNC_LIMIT products run as a
+        background job (products.publication_status), in batches.
+        """
+        serializer = BulkPublicationStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        client_id = get_request_client_id(request)
+        
+        if 'ids' in data:
+            products, selection = data['ids'], {'ids': data['ids']}
+            count = len(set(data['ids']))
+        else:
+            products, selection = filter_products(client_id, data['filters']), {'filters': data['filters']}
+            count = products.count()
+        if count > settings.BULK_JOB_SYNC_LIMIT:
+            return start_bulk_job(request, 'products.publication_status', request.data)
+        
+        result = bulk_set_publication_status(
+            client_id, products, data['status'], data.get('from_status'), user=request.user, selection=selection
+        )
+        return Response(result, status=status.HTTP_200_OK)
+    
+    @action(detail=False, methods=['post'], url_path='price-adjustment')
+    def price_adjustment(self, request):
+        """
+        Adjust the prices of many products, and of their variants.
+        
+        POST /api/v1/products/price-adjustment/
+        
+        Request body: {"mode": "percent", "value": "-15", "fields": ["display_price"],
+                       "rounding": {"increment": "1", "method": "up", "ending": "0.99"},
+                       "scope": {"categories": [4], "tags": ["summer"]},
+                       "include_variants": true, "dry_run": true}
+        
+        With dry_run the response previews the affected counts and the
+        before/after price distribution without writing; see
+        products.price_adjustments. Otherwise prices are updated with
+        set-based SQL and the updated row counts returned; scopes of more than
+        BULK_JOB_SYNC_LIMIT products run as a background job
+        (products.price_adjustment), in chunks.
+        """
+        serializer = PriceAdjustmentSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        adjustment = serializer.validated_data
+        client_id = get_request_client_id(request)
+        
+        if adjustment['dry_run']:
+            return Response(preview_adjustment(client_id, adjustment))
+        
+        product_ids = list(
+            scoped_products(client_id, adjustment['scope']).order_by('pk').values_list('pk', flat=True)[
+                :settings.BULK_JOB_SYNC_LIMIT + 1
+            ]
+        )
+        if len(product_ids) > settings.BULK_JOB_SYNC_LIMIT:
+            return start_bulk_job(request, 'products.price_adjustment', request.data)
+        return Response(apply_adjustment(client_id, product_ids, adjustment))
+    
+    @action(detail=False, methods=['post'], url_path='import')
+    def bulk_import(self, request):
+        """
+        Create and update products from rows in a background job.
         
-        # If still no client, use a default
-        if not client:
-            from tenants.models import Tenant
-            client = Tenant.objects.first()
+        POST /api/v1/products/import/
         
-        # Add client to context
-        context['client'] = client
+        Request body: {"rows": [{"sku": "ABC-1", "name": "...", "category": 1, ...}],
+                       "update_existing": true}
+        
+        Rows are matched to existing products by SKU; see
+        products.jobs.ProductImportOperation. Responds 202 with the job, whose
+        progress and per-row errors are at /api/v1/jobs/{id}/.
+        """
+        return start_bulk_job(request, 'products.import', request.data)
+    
+    @action(detail=False, methods=['post'], url_path='export')
+    def export(self, request):
+        """
+        Export products to a CSV or JSON Lines file in a background job.
+        
+        POST /api/v1/products/export/
+        
+        Request body: {"format": "csv", "filters": {"category": 1}}
+        
+        Filters are those of the product list. Responds 202 with the job; the
+        finished job's result holds the file's URL.
+        """
+        return start_bulk_job(request, 'products.export', request.data)
+    
+    @action(detail=False, methods=['post'], url_path='bulk-price-update')
+    def bulk_price_update(self, request):
+        """
+        Set the prices of many products in a background job.
+        
+        POST /api/v1/products/bulk-price-update/
+        
+        Request body: {"prices": [{"sku": "ABC-1", "display_price": "9.99"},
+                                  {"id": 7, "compare_at_price": null}]}
+        
+        Responds 202 with the job.
+        """
+        return start_bulk_job(request, 'products.price_update', request.data)
+    
+    def get_serializer_context(self):
+        """
+        Add client information to the serializer context.
+        """
+        context = super().get_serializer_context()
+        context['client_id'] = get_request_client_id(self.request)
         context['request'] = self.request
         
         return context
@@ -145,11 +285,11 @@ class ProductViewSet(TenantModelViewSet):
         Returns:
             Response: Created product data with 201 status code
         """
-        print(f"Received POST request to create product: {request.data}")
+        logger.debug("Received POST request to create product: %s", request.data)
         
         # Get client information
         client = getattr(self.request, 'tenant', None)
-        client_id = getattr(client, 'id', 1)
+        client_id = get_request_client_id(request)
         company_id = getattr(client, 'company_id', 1)
         
         # Handle foreign key fields with _id suffix
@@ -161,15 +301,15 @@ class ProductViewSet(TenantModelViewSet):
                 
         # Ensure default_tax_rate_profile is properly handled
         if 'default_tax_rate_profile' in data:
-            logger.info(f"Found default_tax_rate_profile in request data: {data['default_tax_rate_profile']}")
+            logger.debug("Found default_tax_rate_profile in request data: %s", data['default_tax_rate_profile'])
             # Make sure it's treated as an integer
             try:
                 data['default_tax_rate_profile'] = int(data['default_tax_rate_profile'])
-                logger.info(f"Converted default_tax_rate_profile to int: {data['default_tax_rate_profile']}")
+                logger.debug("Converted default_tax_rate_profile to int: %s", data['default_tax_rate_profile'])
             except (ValueError, TypeError):
                 if data['default_tax_rate_profile'] == '' or data['default_tax_rate_profile'] is None:
                     data['default_tax_rate_profile'] = None
-                    logger.info("Set empty default_tax_rate_profile to None")
+                    logger.debug("Set empty default_tax_rate_profile to None")
         
         # Generate unique slug and SKU
         name = data.get('name', '')
@@ -262,14 +402,14 @@ class ProductViewSet(TenantModelViewSet):
             currency_code_id = validated_data.get('currency_code').id if validated_data.get('currency_code', None) else None
             
             # Debug logging for default_tax_rate_profile
-            logger.info(f"Raw default_tax_rate_profile from request: {request.data.get('default_tax_rate_profile')}")
-            logger.info(f"validated_data keys: {validated_data.keys()}")
-            logger.info(f"default_tax_rate_profile in validated_data: {validated_data.get('default_tax_rate_profile')}")
+            logger.debug("Raw default_tax_rate_profile from request: %s", request.data.get('default_tax_rate_profile'))
+            logger.debug("validated_data keys: %s", validated_data.keys())
+            logger.debug("default_tax_rate_profile in validated_data: %s", validated_data.get('default_tax_rate_profile'))
             
             default_tax_rate_profile_id = None
             if validated_data.get('default_tax_rate_profile'):
                 default_tax_rate_profile_id = validated_data.get('default_tax_rate_profile').id
-                logger.info(f"Setting default_tax_rate_profile_id to: {default_tax_rate_profile_id}")
+                logger.debug("Setting default_tax_rate_profile_id to: %s", default_tax_rate_profile_id)
             
             # Convert JSON fields
             tags_json = Json(tags) if tags else Json([])
@@ -337,6 +477,9 @@ class ProductViewSet(TenantModelViewSet):
                 # Get the ID of the newly created product
                 product_id = cursor.fetchone()[0]
             
+            # The raw INSERT bypasses model signals, so record the change explicitly
+            bump_change_counter(PRODUCTS_CHANGE_SCOPE, client_id)
+            
             # Fetch the created product
             product = Product.objects.get(id=product_id)
             
@@ -394,7 +537,7 @@ class ProductViewSet(TenantModelViewSet):
                         group = AttributeGroup.objects.get(id=group_id)
                         product.attribute_groups.add(group)
                     except AttributeGroup.DoesNotExist:
-                        logger.warning(f"AttributeGroup with ID {group_id} does not exist")
+                        logger.warning("AttributeGroup with ID %s does not exist", group_id)
             
             # Handle variant_defining_attributes if present in the request
             variant_defining_attributes = request.data.get('variant_defining_attributes', [])
@@ -406,26 +549,23 @@ class ProductViewSet(TenantModelViewSet):
                         attr = Attribute.objects.get(id=attr_id)
                         product.variant_defining_attributes.add(attr)
                     except Attribute.DoesNotExist:
-                        logger.warning(f"Attribute with ID {attr_id} does not exist")
+                        logger.warning("Attribute with ID %s does not exist", attr_id)
             
             # Handle temporary images if present in the request
             temp_images = request.data.get('temp_images', [])
             if temp_images:
                 try:
-                    # Use our mock Redis implementation
-                    from products.mock_redis import mock_redis
-                    
-                    # Create a simple tenant-like object with an id attribute
+                    # Create a simple tenant-like object carrying the client
                     class TenantLike:
-                        def __init__(self, tenant_id, company_id=1):
-                            self.id = tenant_id
+                        def __init__(self, client_id, company_id=1):
+                            self.client_id = client_id
                             self.company_id = company_id
                     
-                    # Use the client_id that's already defined at the beginning of the method
-                    tenant_obj = TenantLike(client_id)
+                    # Use the client_id and company_id already defined at the beginning of the method
+                    tenant_obj = TenantLike(client_id, company_id)
                     
-                    logger.info(f"Processing {len(temp_images)} temporary images for product {product.id}")
-                    logger.info(f"Temp images data: {temp_images}")
+                    logger.debug("Processing %s temporary images for product %s", len(temp_images), product.id)
+                    logger.debug("Temp images data: %s", temp_images)
                     
                     # Import here to avoid circular imports
                     from products.utils import link_temporary_images
@@ -436,27 +576,25 @@ class ProductViewSet(TenantModelViewSet):
                         owner_type='product',
                         temp_image_data=temp_images,
                         tenant=tenant_obj,
-                        redis_client=mock_redis
+                        redis_client=get_redis()
                     )
                     
-                    logger.info(f"Successfully linked {len(created_images)} images to product {product.id}")
+                    logger.info("Successfully linked %s images to product %s", len(created_images), product.id)
                 except Exception as e:
-                    logger.error(f"Failed to handle temporary images for product {product.id}: {str(e)}")
-                    import traceback
-                    logger.error(f"Traceback: {traceback.format_exc()}")
+                    logger.error("Failed to handle temporary images for product %s: %s", product.id, e, exc_info=True)
             
             # Return the serialized product
             serializer = self.get_serializer(product)
             
         except Exception as e:
-            print(f"Error creating product: {str(e)}")
+            logger.error("Error creating product: %s", e)
             raise
             
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
 
-class ProductVariantViewSet(TenantModelViewSet):
+class ProductVariantViewSet(ConditionalGetMixin, TenantModelViewSet):
     """
     ViewSet for managing product variants.
     
@@ -464,6 +602,8 @@ class ProductVariantViewSet(TenantModelViewSet):
     with automatic association to the parent product.
     """
     serializer_class = ProductVariantSerializer
+    change_scope = PRODUCTS_CHANGE_SCOPE
+    dependent_scopes = (CATALOGUE_CHANGE_SCOPE,)
     permission_classes = []
     
     def get_queryset(self):
@@ -473,12 +613,12 @@ class ProductVariantViewSet(TenantModelViewSet):
         product_id = self.kwargs.get('product_pk')
         
         # For development/testing, use client_id filtering instead of tenant
-        client_id = getattr(self.request, 'tenant', None)
+        client_id = get_request_client_id(self.request, default=None)
         
         if client_id is None:
             # Default to client_id=1 for development
             client_id = 1
-            logger.info(f"No tenant found in request, using default client_id={client_id}")
+            logger.debug("No tenant found in request, using default client_id=%s", client_id)
         
         return ProductVariant.objects.filter(
             product_id=product_id,
@@ -497,12 +637,12 @@ class ProductVariantViewSet(TenantModelViewSet):
         product_id = self.kwargs.get('product_pk')
         
         # For development/testing, use client_id filtering instead of tenant
-        client_id = getattr(self.request, 'tenant', None)
+        client_id = get_request_client_id(self.request, default=None)
         
         if client_id is None:
             # Default to client_id=1 for development
             client_id = 1
-            logger.info(f"No tenant found in request, using default client_id={client_id}")
+            logger.debug("No tenant found in request, using default client_id=%s", client_id)
         
         product = Product.objects.get(id=product_id, client_id=client_id)
         
@@ -523,9 +663,28 @@ class ProductVariantViewSet(TenantModelViewSet):
             raise ValidationError("Variants can only be updated for PARENT type products.")
             
         serializer.save()
+    
+    @action(detail=False, methods=['post'], url_path='bulk-delete')
+    def bulk_delete(self, request, product_pk=None):
+        """
+        Delete many variants of a product in one request.
+        
+        POST /api/v1/products/{product_pk}/variants/bulk-delete/
+        
+        Request body: {"ids": [1, 2, 3]}
+        
+        Variants used as kit components are not deleted and are reported as protected.
+        """
+        serializer = BulkDeleteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        result = bulk_delete_variants(
+            get_request_client_id(request), serializer.validated_data['ids'], product_id=product_pk
+        )
+        return Response(result, status=status.HTTP_200_OK)
 
 
-class ProductImageViewSet(TenantModelViewSet):
+class ProductImageViewSet(ConditionalGetMixin, TenantModelViewSet):
     """
     ViewSet for managing product images.
     
@@ -533,6 +692,7 @@ class ProductImageViewSet(TenantModelViewSet):
     with automatic association to the parent product.
     """
     serializer_class = ProductImageSerializer
+    change_scope = PRODUCTS_CHANGE_SCOPE
     permission_classes = []  # Authentication temporarily disabled
     parser_classes = [MultiPartParser, FormParser]
     
@@ -544,12 +704,12 @@ class ProductImageViewSet(TenantModelViewSet):
         product_pk = self.kwargs.get('product_pk')
         
         # For development/testing, use client_id filtering instead of tenant
-        client_id = getattr(self.request, 'tenant', None)
+        client_id = get_request_client_id(self.request, default=None)
         
         if client_id is None:
             # Default to client_id=1 for development
             client_id = 1
-            logger.info(f"No tenant found in request, using default client_id={client_id}")
+            logger.debug("No tenant found in request, using default client_id=%s", client_id)
         
         # Filter by product and client
         return ProductImage.objects.filter(
@@ -565,12 +725,12 @@ class ProductImageViewSet(TenantModelViewSet):
         product_pk = self.kwargs.get('product_pk')
         
         # For development/testing, use client_id filtering instead of tenant
-        client_id = getattr(self.request, 'tenant', None)
+        client_id = get_request_client_id(self.request, default=None)
         
         if client_id is None:
             # Default to client_id=1 for development
             client_id = 1
-            logger.info(f"No tenant found in request, using default client_id={client_id}")
+            logger.debug("No tenant found in request, using default client_id=%s", client_id)
         
         # Get the product
         product = Product.objects.get(id=product_pk, client_id=client_id)
@@ -582,6 +742,27 @@ class ProductImageViewSet(TenantModelViewSet):
             company_id=getattr(client_id, 'company_id', 1) if hasattr(client_id, 'company_id') else 1
         )
 
+    
+    @action(
+        detail=False, methods=['post'], url_path='bulk-delete',
+        parser_classes=api_settings.DEFAULT_PARSER_CLASSES
+    )
+    def bulk_delete(self, request, product_pk=None):
+        """
+        Delete many images of a product in one request.
+        
+        POST /api/v1/products/{product_pk}/images/bulk-delete/
+        
+        Request body: {"ids": [1, 2, 3]}
+        """
+        serializer = BulkDeleteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        result = bulk_delete_images(
+            get_request_client_id(request), serializer.validated_data['ids'], product_id=product_pk
+        )
+        return Response(result, status=status.HTTP_200_OK)
+
 
 class KitComponentViewSet(TenantModelViewSet):
     """
@@ -601,12 +782,12 @@ class KitComponentViewSet(TenantModelViewSet):
         product_pk = self.kwargs.get('product_pk')
         
         # For development/testing, use client_id filtering instead of tenant
-        client_id = getattr(self.request, 'tenant', None)
+        client_id = get_request_client_id(self.request, default=None)
         
         if client_id is None:
             # Default to client_id=1 for development
             client_id = 1
-            logger.info(f"No tenant found in request, using default client_id={client_id}")
+            logger.debug("No tenant found in request, using default client_id=%s", client_id)
         
         # Filter by kit product and client
         return KitComponent.objects.filter(
@@ -623,12 +804,12 @@ class KitComponentViewSet(TenantModelViewSet):
         product_pk = self.kwargs.get('product_pk')
         
         # For development/testing, use client_id filtering instead of tenant
-        client_id = getattr(self.request, 'tenant', None)
+        client_id = get_request_client_id(self.request, default=None)
         
         if client_id is None:
             # Default to client_id=1 for development
             client_id = 1
-            logger.info(f"No tenant found in request, using default client_id={client_id}")
+            logger.debug("No tenant found in request, using default client_id=%s", client_id)
         
         # Get the kit product
         kit_product = Product.objects.get(id=product_pk, client_id=client_id)
@@ -652,12 +833,12 @@ class KitComponentViewSet(TenantModelViewSet):
         product_pk = self.kwargs.get('product_pk')
         
         # For development/testing, use client_id filtering instead of tenant
-        client_id = getattr(self.request, 'tenant', None)
+        client_id = get_request_client_id(self.request, default=None)
         
         if client_id is None:
             # Default to client_id=1 for development
             client_id = 1
-            logger.info(f"No tenant found in request, using default client_id={client_id}")
+            logger.debug("No tenant found in request, using default client_id=%s", client_id)
         
         # Ensure the parent product is of KIT type
         try:
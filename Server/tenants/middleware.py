@@ -0,0 +1,37 @@
+"""
+Middleware for tenant routing.
+"""
+from django.conf import settings
+
+from tenants.routing import PUBLIC_SCHEMA_NAME, activate_schema, resolver
+
+
+class TenantMiddleware:
+    """
+    Attach the tenant for the request's hostname as ``request.tenant``.
+
+    The hostname is resolved through the per-process cache in tenants.routing,
+    so on the hot path this costs a dictionary lookup. Views scope requests
+    for a tenant's hostnames by its ``client_id`` (see
+    core.utils.get_request_client_id), never by the tenant's primary key.
+    Requests for hostnames without a Domain are left without
+    ``request.tenant`` and served from the public schema, which keeps the
+    development default of client_id=1 working.
+
+    When TENANT_SCHEMA_ROUTING_ENABLED is set, the database connection is also
+    switched to the tenant's schema; the switch is skipped when the connection
+    is already on it.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        route = resolver.resolve(request.get_host())
+        if route is not None:
+            request.tenant = route
+
+        if getattr(settings, 'TENANT_SCHEMA_ROUTING_ENABLED', False):
+            activate_schema(route.schema_name if route is not None else PUBLIC_SCHEMA_NAME)
+
+        return self.get_response(request)
@@ -1,5 +1,5 @@
-from django.db import models
-from django.db.models.signals import post_save
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from core.models.base import TimestampedModel
 
@@ -73,3 +73,30 @@ def create_tenant_settings(sender, instance, created, **kwargs):
     """
     if created:
         TenantSetting.objects.create(client=instance)
+
+
+@receiver(post_save, sender=Domain)
+@receiver(post_delete, sender=Domain)
+def invalidate_domain_route(sender, instance, created=False, **kwargs):
+    """
+    Signal handler to evict a hostname from every worker's tenant routing cache.
+
+    A new Domain only replaces a cached miss for its own hostname; an edited
+    Domain may have been renamed, so all hostnames are dropped.
+    """
+    from tenants.routing import INVALIDATE_ALL, publish_invalidation
+
+    hostname = instance.domain if created or kwargs.get('signal') is post_delete else INVALIDATE_ALL
+    transaction.on_commit(lambda: publish_invalidation(hostname))
+
+
+@receiver(post_save, sender=Tenant)
+def invalidate_tenant_routes(sender, instance, created, **kwargs):
+    """
+    Signal handler to drop cached routes when a tenant (e.g. its schema) changes.
+    """
+    if created:
+        return
+    from tenants.routing import publish_invalidation
+
+    transaction.on_commit(publish_invalidation)
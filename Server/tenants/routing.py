@@ -0,0 +1,295 @@
+"""
+Hostname to tenant routing.
+
+Every request is routed to a tenant by looking its hostname up in
+``tenants.Domain``. The mapping changes rarely, so each worker process keeps a
+bounded LRU of hostname -> TenantRoute and only queries the database on a miss.
+Unknown hostnames are cached too (negative caching), with a short TTL, so that
+stray or malicious Host headers cannot turn every request into a query.
+
+Entries are invalidated through Redis pub/sub: saving or deleting a Domain or
+Tenant publishes the affected hostname (or ``*`` for all) on
+TENANT_ROUTING_CHANNEL, and a daemon thread in every worker evicts it from the
+local cache. Positive entries also expire after TENANT_ROUTING_CACHE_TTL as a
+safety net for messages missed while the subscriber was disconnected.
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http.request import split_domain_port
+
+from core.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+TENANT_ROUTING_CHANNEL = 'tenants:routing'
+
+# Published instead of a hostname to drop every cached entry
+INVALIDATE_ALL = '*'
+
+# Seconds the subscriber waits for a message before polling again; kept below
+# the Redis socket timeout so an idle channel is never mistaken for a disconnect
+SUBSCRIBER_POLL_INTERVAL = 1.0
+
+# Schema used for requests that do not belong to a tenant
+PUBLIC_SCHEMA_NAME = 'public'
+
+TenantRoute = namedtuple('TenantRoute', ['id', 'client_id', 'schema_name', 'name'])
+TenantRoute.__doc__ = """
+Immutable routing information for a tenant.
+
+Shared between requests and threads, so it deliberately is not a model
+instance. ``id`` is ``Tenant.id``; data is scoped by ``client_id``
+(``Tenant.client_id``), which core.utils.get_request_client_id returns when
+the route is attached as ``request.tenant``.
+"""
+
+_MISSING = object()
+
+
+def normalize_hostname(host):
+    """
+    Normalize a Host header value for lookup.
+
+    Args:
+        host: Hostname, optionally with a port
+
+    Returns:
+        str: Lowercase hostname without port or trailing dot
+    """
+    domain, _ = split_domain_port(host)
+    return (domain or host).lower().rstrip('.')
+
+
+class TenantResolver:
+    """
+    Per-process LRU cache of hostname -> TenantRoute with negative caching.
+
+    Lookups on a hit take a lock, a dict access and a clock read; the database
+    is only consulted on a miss or after an entry expires.
+    """
+
+    def __init__(self, maxsize=None, ttl=None, negative_ttl=None):
+        self.maxsize = maxsize if maxsize is not None else getattr(settings, 'TENANT_ROUTING_CACHE_SIZE', 1024)
+        self.ttl = ttl if ttl is not None else getattr(settings, 'TENANT_ROUTING_CACHE_TTL', 300)
+        self.negative_ttl = (
+            negative_ttl if negative_ttl is not None
+            else getattr(settings, 'TENANT_ROUTING_NEGATIVE_TTL', 30)
+        )
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._subscriber_pid = None
+
+    def resolve(self, host):
+        """
+        Resolve a hostname to its tenant.
+
+        Args:
+            host: Hostname from the request, optionally with a port
+
+        Returns:
+            TenantRoute or None: The tenant route, or None for unknown hostnames
+        """
+        self.ensure_subscriber()
+        hostname = normalize_hostname(host)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(hostname, _MISSING)
+            if entry is not _MISSING:
+                route, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(hostname)
+                    return route
+                del self._entries[hostname]
+
+        route = self.load(hostname)
+        self.store(hostname, route, now)
+        return route
+
+    def load(self, hostname):
+        """
+        Load the route for a hostname from the database.
+
+        Args:
+            hostname: Normalized hostname
+
+        Returns:
+            TenantRoute or None: The tenant route, or None if no Domain matches
+        """
+        from tenants.models import Domain
+
+        row = Domain.objects.filter(domain__iexact=hostname).values_list(
+            'tenant_id', 'tenant__client_id', 'tenant__schema_name', 'tenant__name'
+        ).first()
+        if row is None:
+            logger.debug("No tenant found for hostname %s", hostname)
+            return None
+        return TenantRoute(*row)
+
+    def store(self, hostname, route, now=None):
+        """
+        Cache a route (or a miss) for a hostname, evicting the least recently used entry when full.
+        """
+        now = time.monotonic() if now is None else now
+        ttl = self.ttl if route is not None else self.negative_ttl
+        with self._lock:
+            self._entries[hostname] = (route, now + ttl)
+            self._entries.move_to_end(hostname)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, hostname=INVALIDATE_ALL):
+        """
+        Drop a hostname, or every hostname, from the local cache.
+
+        Args:
+            hostname: Hostname to evict, or INVALIDATE_ALL
+        """
+        with self._lock:
+            if hostname == INVALIDATE_ALL:
+                self._entries.clear()
+            else:
+                self._entries.pop(normalize_hostname(hostname), None)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def handle_message(self, data):
+        """
+        Apply an invalidation message received from TENANT_ROUTING_CHANNEL.
+
+        Args:
+            data: Message payload (bytes or str) holding a hostname or INVALIDATE_ALL
+        """
+        if isinstance(data, bytes):
+            data = data.decode('utf-8', 'replace')
+        self.invalidate(data)
+
+    def ensure_subscriber(self):
+        """
+        Start the invalidation subscriber thread for this process if it is not running.
+
+        Checked on every resolve so that workers forked after the first request
+        (e.g. with preloaded applications) start their own subscriber.
+        """
+        if self._subscriber_pid == os.getpid():
+            return
+        with self._lock:
+            if self._subscriber_pid == os.getpid():
+                return
+            self._subscriber_pid = os.getpid()
+            # Entries inherited from a parent process missed its messages
+            self._entries.clear()
+
+        redis = get_redis_connection()
+        if redis is None:
+            return
+        thread = threading.Thread(
+            target=self._listen, args=(redis,), name='tenant-routing-invalidation', daemon=True
+        )
+        thread.start()
+
+    def _listen(self, redis):
+        reconnecting = False
+        while True:
+            pubsub = None
+            try:
+                pubsub = redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(TENANT_ROUTING_CHANNEL)
+                if reconnecting:
+                    # Messages may have been missed while disconnected
+                    self.invalidate()
+                    reconnecting = False
+                while True:
+                    message = pubsub.get_message(timeout=SUBSCRIBER_POLL_INTERVAL)
+                    if message is not None and message.get('type') == 'message':
+                        self.handle_message(message['data'])
+            except Exception as e:
+                logger.warning("Tenant routing subscriber disconnected: %s", e)
+                reconnecting = True
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+                time.sleep(5)
+
+
+def get_redis_connection():
+    """
+    Return the shared Redis client, or None if it cannot be created.
+    """
+    try:
+        return get_redis()
+    except Exception as e:
+        logger.debug("Tenant routing invalidation disabled, no Redis connection: %s", e)
+        return None
+
+
+def publish_invalidation(hostname=INVALIDATE_ALL):
+    """
+    Invalidate a hostname in this process and notify every other worker.
+
+    Args:
+        hostname: Hostname to evict, or INVALIDATE_ALL
+    """
+    resolver.invalidate(hostname)
+    redis = get_redis_connection()
+    if redis is None:
+        return
+    try:
+        redis.publish(TENANT_ROUTING_CHANNEL, hostname)
+    except Exception as e:
+        logger.warning("Failed to publish tenant routing invalidation for %s: %s", hostname, e)
+
+
+def activate_schema(schema_name, using='default'):
+    """
+    Point a database connection at a tenant schema, skipping the round trip if it already is.
+
+    The active schema is remembered on the connection wrapper, which outlives
+    requests when connections are persistent (CONN_MAX_AGE), so a worker
+    serving the same tenant repeatedly issues SET search_path only once.
+
+    Args:
+        schema_name: Schema to activate; PUBLIC_SCHEMA_NAME for shared requests
+        using: Database alias
+
+    Returns:
+        bool: True if SET search_path was executed
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return False
+    if connection.connection is not None and getattr(connection, 'tenant_schema', None) == schema_name:
+        return False
+
+    search_path = [schema_name] if schema_name == PUBLIC_SCHEMA_NAME else [schema_name, PUBLIC_SCHEMA_NAME]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SET search_path = ' + ', '.join(connection.ops.quote_name(name) for name in search_path)
+        )
+    connection.tenant_schema = schema_name
+    return True
+
+
+def reset_connection_schema(sender, connection, **kwargs):
+    """
+    Forget the active schema when a new database connection is opened.
+
+    Connected to the connection_created signal; new connections start on the
+    server's default search_path.
+    """
+    connection.tenant_schema = None
+
+
+connection_created.connect(reset_connection_schema, dispatch_uid='tenants.routing.reset_connection_schema')
+
+resolver = TenantResolver()
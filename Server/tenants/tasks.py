@@ -20,7 +20,7 @@ def sample_tenant_task(client_id):
     Returns:
         str: A success message
     """
-    logger.info(f"Processing task for client {client_id}")
+    logger.info("Processing task for client %s", client_id)
     # Simulate some work
     import time
     time.sleep(2)
@@ -43,6 +43,6 @@ def sync_tenant_data(client_id):
     Returns:
         dict: A dictionary containing synchronization results
     """
-    logger.info(f"Starting data synchronization for client {client_id}")
+    logger.info("Starting data synchronization for client %s", client_id)
     # Placeholder for actual synchronization logic
     return {"status": "success", "client_id": client_id, "message": "Data synchronized successfully"}
@@ -0,0 +1,169 @@
+"""
+Tests for hostname to tenant routing.
+"""
+from unittest import mock
+
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core.utils import get_request_client_id
+from tenants import routing
+from tenants.middleware import TenantMiddleware
+from tenants.models import Domain, Tenant
+from tenants.routing import TenantResolver, TenantRoute, activate_schema
+
+
+@override_settings(REDIS_CLIENT_BACKEND='memory')
+class TenantResolverTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name='Acme', schema_name='acme')
+        Domain.objects.create(domain='acme.example.com', tenant=self.tenant)
+        self.resolver = TenantResolver(maxsize=2, ttl=300, negative_ttl=30)
+
+    def test_hit_does_not_query_the_database(self):
+        route = self.resolver.resolve('ACME.example.com:8000')
+
+        self.assertEqual(route, TenantRoute(self.tenant.id, self.tenant.client_id, 'acme', 'Acme'))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.resolver.resolve('acme.example.com'), route)
+
+    def test_unknown_hostnames_are_cached(self):
+        self.assertIsNone(self.resolver.resolve('unknown.example.com'))
+
+        with self.assertNumQueries(0):
+            self.assertIsNone(self.resolver.resolve('unknown.example.com'))
+
+    def test_negative_entries_expire(self):
+        self.assertIsNone(self.resolver.resolve('new.example.com'))
+        Domain.objects.create(domain='new.example.com', tenant=self.tenant)
+
+        with mock.patch('tenants.routing.time.monotonic', return_value=10 ** 9):
+            self.assertEqual(self.resolver.resolve('new.example.com').schema_name, 'acme')
+
+    def test_cache_is_bounded(self):
+        for host in ('a.example.com', 'b.example.com', 'acme.example.com'):
+            self.resolver.resolve(host)
+
+        self.assertEqual(len(self.resolver), 2)
+        with self.assertNumQueries(1):
+            self.resolver.resolve('a.example.com')
+
+    def test_invalidation_messages_evict_entries(self):
+        self.resolver.resolve('acme.example.com')
+        self.resolver.resolve('unknown.example.com')
+
+        self.resolver.handle_message(b'unknown.example.com')
+        self.assertEqual(len(self.resolver), 1)
+
+        self.resolver.handle_message(routing.INVALIDATE_ALL)
+        self.assertEqual(len(self.resolver), 0)
+
+    def test_published_invalidations_reach_other_workers(self):
+        self.resolver.resolve('acme.example.com')
+        pubsub = routing.get_redis_connection().pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(routing.TENANT_ROUTING_CHANNEL)
+
+        routing.publish_invalidation('acme.example.com')
+
+        self.resolver.handle_message(pubsub.get_message(timeout=1)['data'])
+        self.assertEqual(len(self.resolver), 0)
+
+    def test_subscriber_only_flushes_after_reconnecting(self):
+        class Stop(BaseException):
+            pass
+
+        idle = mock.Mock()
+        idle.get_message.side_effect = [None, None, {'type': 'message', 'data': 'b.example.com'}, OSError('gone')]
+        resumed = mock.Mock()
+        redis = mock.Mock()
+        redis.pubsub.side_effect = [idle, resumed]
+        self.resolver.resolve('acme.example.com')
+        self.resolver.resolve('b.example.com')
+
+        def flushed(**kwargs):
+            # Reached once the subscriber is back: the entries were dropped on reconnect
+            self.assertEqual(len(self.resolver), 0)
+            raise Stop()
+
+        def idle_polls_kept_entries(seconds):
+            # Idle polls flushed nothing; only the published hostname was evicted
+            self.assertEqual(len(self.resolver), 1)
+
+        resumed.get_message.side_effect = flushed
+        with mock.patch('tenants.routing.time.sleep', side_effect=idle_polls_kept_entries):
+            with self.assertRaises(Stop):
+                self.resolver._listen(redis)
+        idle.close.assert_called_once()
+
+    def test_domain_changes_publish_invalidation(self):
+        with mock.patch('tenants.routing.publish_invalidation') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                domain = Domain.objects.create(domain='shop.example.com', tenant=self.tenant)
+            publish.assert_called_with('shop.example.com')
+
+            with self.captureOnCommitCallbacks(execute=True):
+                domain.domain = 'store.example.com'
+                domain.save()
+            publish.assert_called_with(routing.INVALIDATE_ALL)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                domain.delete()
+            publish.assert_called_with('store.example.com')
+
+
+@override_settings(REDIS_CLIENT_BACKEND='memory')
+class TenantMiddlewareTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name='Acme', schema_name='acme')
+        Domain.objects.create(domain='acme.example.com', tenant=self.tenant)
+        routing.resolver.invalidate()
+        self.factory = RequestFactory()
+        self.seen = []
+
+        def view(request):
+            self.seen.append(getattr(request, 'tenant', None))
+            return HttpResponse()
+
+        self.middleware = TenantMiddleware(view)
+
+    def tearDown(self):
+        routing.resolver.invalidate()
+
+    @override_settings(ALLOWED_HOSTS=['.example.com'])
+    def test_attaches_tenant_route(self):
+        self.middleware(self.factory.get('/', HTTP_HOST='acme.example.com'))
+        self.middleware(self.factory.get('/', HTTP_HOST='other.example.com'))
+
+        self.assertEqual(self.seen[0].id, self.tenant.id)
+        self.assertIsNone(self.seen[1])
+
+    @override_settings(ALLOWED_HOSTS=['.example.com'])
+    def test_requests_are_scoped_by_client_id(self):
+        # The client is not the tenant's primary key
+        other = Tenant.objects.create(name='Other', schema_name='other', client_id=42)
+        Domain.objects.create(domain='other.example.com', tenant=other)
+
+        for host in ('acme.example.com', 'other.example.com', 'unknown.example.com'):
+            self.middleware(self.factory.get('/', HTTP_HOST=host))
+        requests = [mock.Mock(tenant=route, spec=['tenant']) for route in self.seen]
+
+        self.assertEqual(get_request_client_id(requests[0]), self.tenant.client_id)
+        self.assertEqual(get_request_client_id(requests[1]), 42)
+        self.assertEqual(get_request_client_id(requests[2]), 1)
+
+    @override_settings(ALLOWED_HOSTS=['.example.com'], TENANT_SCHEMA_ROUTING_ENABLED=True)
+    def test_search_path_is_only_set_when_the_schema_changes(self):
+        connection.ensure_connection()
+        connection.tenant_schema = None
+        request = self.factory.get('/', HTTP_HOST='acme.example.com')
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.middleware(request)
+            self.middleware(request)
+            self.middleware(self.factory.get('/', HTTP_HOST='other.example.com'))
+        set_queries = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('SET search_path')]
+
+        self.assertEqual(set_queries, ['SET search_path = "acme", "public"', 'SET search_path = "public"'])
+        self.assertFalse(activate_schema('public'))
@@ -6,6 +6,7 @@ This module defines views for tenant-related functionality such as tenant settin
 from django.http import Http404
 from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated
+from core.utils import get_request_client_id
 from .models import TenantSetting
 from .serializers import TenantSettingSerializer
 
@@ -30,7 +31,7 @@ class TenantSettingView(generics.RetrieveUpdateAPIView):
         """
         try:
             # Assumes TenantSetting is automatically created via signal
-            return TenantSetting.objects.get(tenant=self.request.tenant)
+            return TenantSetting.objects.get(client_id=get_request_client_id(self.request))
         except TenantSetting.DoesNotExist:
             # Handle case where settings might not exist (shouldn't happen with signal)
             raise Http404("Tenant settings not found.")